@@ -0,0 +1,443 @@
+"""Alert rules evaluated on every payin run_scraper adds or updates.
+
+Rules are declared in a JSON file (ALERT_RULES_PATH) next to the notifiers
+they deliver to:
+
+    {
+      "notifiers": {
+        "hook": {"type": "webhook", "url": "http://127.0.0.1:9000/alerts"},
+        "log": {"type": "file", "path": "alerts.jsonl"},
+        "popup": {"type": "desktop"}
+      },
+      "rules": [
+        {"name": "large", "min_amount": 10000, "currency": "EGP", "notify": ["hook", "popup"]},
+        {"name": "watched payer", "counterparty": ["ACME Ltd", "Globex"]},
+        {"name": "invoice ref", "description_matches": "INV-\\\\d{4,}", "notify": ["log"]},
+        {"name": "refunded", "on": "updated", "status": "Refunded", "changed": ["status"]}
+      ]
+    }
+
+Conditions of a rule all have to hold: `<field>` equals a value or one of a
+list (case-insensitive), `min_amount`/`max_amount` bound the amount
+(inclusive), `<field>_matches` is a regular expression searched in the
+field. `on` is "new" (default), "updated" or both; `changed` limits updated
+rules to changes of those fields. Without `notify` a rule goes to every
+notifier.
+
+Rules are compiled once. Each is indexed on one anchor condition - an
+equality in a hash map, an amount bound in a sorted list, patterns of the
+same field in one combined regex (a pattern with global inline flags,
+backreferences or named groups would change meaning in there and is
+searched on its own) - so a payin is only checked against the
+few rules its anchors select, whatever the number of rules. Matches are
+delivered by a background thread; evaluation and delivery latency are in
+`stats()`.
+
+    python alert_rules.py alert_rules.json payins.json   # dry run over an export or store
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import queue
+import bisect
+import argparse
+import platform
+import threading
+import subprocess
+import collections
+import urllib.request
+
+from payin_record import FIELDS, Payin
+from percentiles import percentile
+
+try:
+    from plyer import notification
+    HAS_PLYER = True
+except Exception:
+    HAS_PLYER = False
+
+# CONFIG
+ALERT_RULES_PATH = os.environ.get('ALERT_RULES_PATH', 'alert_rules.json')  # missing file = alerts off
+ALERT_QUEUE_SIZE = 1000  # alerts waiting for delivery; more are dropped and counted
+WEBHOOK_TIMEOUT = 5  # seconds
+ALERTS_LOG_PATH = 'alerts.jsonl'
+
+EVENTS = ('new', 'updated')
+# Anchor preference, most selective first: fields with many distinct values, a lower amount bound
+# (alerts are usually about large payins), patterns, then fields with few values and an upper bound
+_SELECTIVE_FIELDS = ('id', 'counterparty', 'description', 'date', 'time', 'amount')
+_RULE_KEYS = {'name', 'on', 'changed', 'notify', 'min_amount', 'max_amount'}
+# Constructs that break or change meaning once a pattern is one branch of a larger regex:
+# global inline flags, numbered/named backreferences, named groups and conditionals
+_UNCOMBINABLE_RE = re.compile(r"\(\?[aiLmsux]+\)|\\[1-9]|\\g|\(\?P[<=]|\(\?\(")
+
+
+def _norm(value):
+    return str(value).strip().casefold() if value is not None else None
+
+
+def _values(payin):
+    """Field values of a payin as rules see them."""
+    p = Payin.from_dict(payin)
+    values = {name: p.get(name) for name in FIELDS}
+    values['currency'] = p.currency
+    values['amount_value'] = p.amount_value
+    return values
+
+
+class AlertRule:
+    """One compiled rule: a predicate over a payin's field values."""
+
+    def __init__(self, spec, position=0):
+        unknown = [key for key in spec if key not in _RULE_KEYS and key not in FIELDS
+                   and not (key.endswith('_matches') and key[:-8] in FIELDS)]
+        self.name = spec.get('name') or f"rule {position + 1}"
+        if unknown:
+            raise ValueError(f"{self.name}: unknown condition(s) {', '.join(unknown)}")
+        on = spec.get('on', 'new')
+        self.events = frozenset([on] if isinstance(on, str) else on)
+        if not self.events or not self.events <= set(EVENTS):
+            raise ValueError(f"{self.name}: 'on' must be one of {EVENTS}")
+        self.changed = frozenset(spec.get('changed') or ())
+        notify = spec.get('notify')
+        self.notify = [notify] if isinstance(notify, str) else notify  # None = every notifier
+        self.equals = {}
+        for name in FIELDS:
+            if name in spec:
+                wanted = spec[name] if isinstance(spec[name], list) else [spec[name]]
+                self.equals[name] = frozenset(_norm(value) for value in wanted)
+        self.min_amount = float(spec['min_amount']) if spec.get('min_amount') is not None else None
+        self.max_amount = float(spec['max_amount']) if spec.get('max_amount') is not None else None
+        try:
+            self.patterns = {key[:-8]: re.compile(value, re.IGNORECASE)
+                             for key, value in spec.items() if key.endswith('_matches')}
+        except re.error as e:
+            raise ValueError(f"{self.name}: bad pattern: {e}")
+
+    def matches(self, values, event='new', changes=None):
+        if event not in self.events:
+            return False
+        if self.changed and (event != 'updated' or not changes or not self.changed.intersection(changes)):
+            return False
+        for name, wanted in self.equals.items():
+            if _norm(values.get(name)) not in wanted:
+                return False
+        amount = values.get('amount_value')
+        if self.min_amount is not None and (amount is None or amount < self.min_amount):
+            return False
+        if self.max_amount is not None and (amount is None or amount > self.max_amount):
+            return False
+        for name, pattern in self.patterns.items():
+            text = values.get(name)
+            if text is None or not pattern.search(str(text)):
+                return False
+        return True
+
+
+class _RuleIndex:
+    """Anchor indexes over the rules of one event type."""
+
+    def __init__(self, rules):
+        self.rules = rules
+        self.equals = {}  # field -> {normalized value: [rule numbers]}
+        mins, maxs, patterns = [], [], {}
+        self.always = []
+        for number, rule in enumerate(rules):
+            anchor = next((name for name in _SELECTIVE_FIELDS if name in rule.equals), None)
+            if anchor is None and rule.min_amount is None and not rule.patterns:
+                anchor = next(iter(rule.equals), None)
+            if anchor:
+                table = self.equals.setdefault(anchor, {})
+                for value in rule.equals[anchor]:
+                    table.setdefault(value, []).append(number)
+            elif rule.min_amount is not None:
+                mins.append((rule.min_amount, number))
+            elif rule.patterns:
+                name = next(iter(rule.patterns))
+                patterns.setdefault(name, []).append(number)
+            elif rule.max_amount is not None:
+                maxs.append((rule.max_amount, number))
+            else:
+                self.always.append(number)
+        mins.sort()
+        maxs.sort()
+        self.min_bounds, self.min_rules = [b for b, _ in mins], [n for _, n in mins]
+        self.max_bounds, self.max_rules = [b for b, _ in maxs], [n for _, n in maxs]
+        # One combined search per field rejects payins no pattern of that field can match
+        self.patterns = []
+        for name, numbers in patterns.items():
+            combinable = [n for n in numbers if not _UNCOMBINABLE_RE.search(rules[n].patterns[name].pattern)]
+            alone = [n for n in numbers if n not in combinable]
+            if len(combinable) > 1:
+                try:
+                    combined = re.compile('|'.join(f"(?:{rules[n].patterns[name].pattern})" for n in combinable),
+                                          re.IGNORECASE)
+                    self.patterns.append((name, combined, combinable))
+                except re.error:
+                    alone = numbers
+            else:
+                alone = numbers
+            self.patterns += [(name, rules[n].patterns[name], [n]) for n in alone]
+
+    def candidates(self, values):
+        found = list(self.always)
+        for name, table in self.equals.items():
+            numbers = table.get(_norm(values.get(name)))
+            if numbers:
+                found += numbers
+        amount = values.get('amount_value')
+        if amount is not None:
+            found += self.min_rules[:bisect.bisect_right(self.min_bounds, amount)]
+            found += self.max_rules[bisect.bisect_left(self.max_bounds, amount):]
+        for name, combined, numbers in self.patterns:
+            text = values.get(name)
+            if text is not None and combined.search(str(text)):
+                found += numbers
+        return found
+
+
+class AlertRules:
+    """Compiled rule set with asynchronous delivery to notifiers."""
+
+    def __init__(self, rules, notifiers=None, queue_size=ALERT_QUEUE_SIZE):
+        self.rules = [rule if isinstance(rule, AlertRule) else AlertRule(rule, i) for i, rule in enumerate(rules)]
+        self.notifiers = notifiers or {}
+        for rule in self.rules:
+            missing = [name for name in rule.notify or () if name not in self.notifiers]
+            if missing:
+                raise ValueError(f"{rule.name}: unknown notifier(s) {', '.join(missing)}")
+        self._indexes = {event: _RuleIndex([rule for rule in self.rules if event in rule.events]) for event in EVENTS}
+        self.evaluated = 0
+        self.matched = 0
+        self.dropped = 0
+        self.per_rule = collections.Counter()
+        self._eval_seconds = collections.deque(maxlen=1000)
+        self._delivery_seconds = collections.deque(maxlen=1000)
+        self._lock = threading.Lock()
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._thread = None
+        if self.notifiers:
+            self._thread = threading.Thread(target=self._deliver_loop, name='alert-delivery', daemon=True)
+            self._thread.start()
+
+    def match(self, payin, event='new', changes=None):
+        """Rules a payin triggers, without notifying."""
+        index = self._indexes[event]
+        values = _values(payin)
+        matched, seen = [], set()
+        for number in index.candidates(values):
+            if number not in seen:
+                seen.add(number)
+                if index.rules[number].matches(values, event, changes):
+                    matched.append(index.rules[number])
+        return matched
+
+    def evaluate(self, payin, event='new', detected_at=None, changes=None):
+        """Match a payin and queue an alert per triggered rule. Returns the triggered rule names."""
+        started = time.perf_counter()
+        matched = self.match(payin, event, changes)
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self.evaluated += 1
+            self._eval_seconds.append(elapsed)
+        if not matched:
+            return []
+        data = payin.to_dict() if isinstance(payin, Payin) else dict(payin)
+        for rule in matched:
+            alert = {'rule': rule.name, 'event': event, 'transaction': data,
+                     'detected_at': detected_at or time.time(), 'matched_at': time.time()}
+            if changes:
+                alert['changes'] = changes
+            with self._lock:
+                self.matched += 1
+                self.per_rule[rule.name] += 1
+            print(f"🔔 Alert {alert_text(alert)}")
+            if not self.notifiers:
+                continue
+            try:
+                self._queue.put_nowait((rule, alert))
+            except queue.Full:
+                with self._lock:
+                    self.dropped += 1
+        return [rule.name for rule in matched]
+
+    def _deliver_loop(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            rule, alert = item
+            for name in rule.notify or self.notifiers:
+                notifier = self.notifiers[name]
+                try:
+                    notifier.send(alert)
+                    notifier.sent += 1
+                except Exception as e:
+                    notifier.errors += 1
+                    print(f"⚠️ Alert notifier '{name}' failed: {e}")
+            with self._lock:
+                self._delivery_seconds.append(time.time() - alert['detected_at'])
+
+    def stats(self):
+        with self._lock:
+            evals = sorted(self._eval_seconds)
+            deliveries = sorted(self._delivery_seconds)
+            return {
+                'rules': len(self.rules),
+                'evaluated': self.evaluated,
+                'matched': self.matched,
+                'dropped': self.dropped,
+                'per_rule': dict(self.per_rule),
+                'eval_p50_us': None if not evals else round(percentile(evals, 50) * 1e6, 1),
+                'eval_p95_us': None if not evals else round(percentile(evals, 95) * 1e6, 1),
+                'eval_max_us': None if not evals else round(evals[-1] * 1e6, 1),
+                'delivery_p50_ms': None if not deliveries else round(percentile(deliveries, 50) * 1000, 1),
+                'delivery_p95_ms': None if not deliveries else round(percentile(deliveries, 95) * 1000, 1),
+                'notifiers': {name: {'sent': n.sent, 'errors': n.errors} for name, n in self.notifiers.items()},
+            }
+
+    def close(self, timeout=10):
+        """Deliver what is queued, then stop the delivery thread."""
+        if self._thread:
+            self._queue.put(None)
+            self._thread.join(timeout=timeout)
+            self._thread = None
+        for notifier in self.notifiers.values():
+            notifier.close()
+
+
+# Notifiers: anything with send(alert); register more types in NOTIFIER_TYPES
+class Notifier:
+    def __init__(self, **options):
+        self.sent = 0
+        self.errors = 0
+
+    def send(self, alert):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+def alert_text(alert):
+    p = alert['transaction']
+    return f"{alert['rule']}: {p.get('amount') or ''} from {p.get('counterparty') or 'unknown'} ({p.get('status') or ''})"
+
+
+class WebhookNotifier(Notifier):
+    """POSTs each alert as JSON."""
+
+    def __init__(self, url, timeout=WEBHOOK_TIMEOUT, headers=None, **options):
+        super().__init__()
+        self.url = url
+        self.timeout = timeout
+        self.headers = dict(headers or {}, **{'Content-Type': 'application/json'})
+
+    def send(self, alert):
+        body = json.dumps(alert, ensure_ascii=False).encode('utf-8')
+        request = urllib.request.Request(self.url, data=body, headers=self.headers, method='POST')
+        with urllib.request.urlopen(request, timeout=self.timeout) as resp:
+            resp.read()
+
+
+class FileNotifier(Notifier):
+    """Appends each alert as one JSON line."""
+
+    def __init__(self, path=ALERTS_LOG_PATH, **options):
+        super().__init__()
+        self.path = path
+        self._file = None
+
+    def send(self, alert):
+        if self._file is None:
+            self._file = open(self.path, 'a', encoding='utf-8')
+        self._file.write(json.dumps(alert, ensure_ascii=False) + '\n')
+        self._file.flush()
+
+    def close(self):
+        if self._file:
+            self._file.close()
+            self._file = None
+
+
+class DesktopNotifier(Notifier):
+    """Desktop pop-up: plyer when installed, otherwise notify-send / osascript / the console."""
+
+    def __init__(self, title='💰 Payin alert', **options):
+        super().__init__()
+        self.title = title
+
+    def send(self, alert):
+        text = alert_text(alert)
+        if HAS_PLYER:
+            notification.notify(title=self.title, message=text, timeout=10)
+        elif platform.system() == 'Linux':
+            subprocess.run(['notify-send', self.title, text], check=True, timeout=5)
+        elif platform.system() == 'Darwin':
+            subprocess.run(['osascript', '-e', f'display notification {json.dumps(text)} with title {json.dumps(self.title)}'],
+                           check=True, timeout=5)
+        else:
+            print(f"🔔 {self.title}: {text}")
+
+
+NOTIFIER_TYPES = {
+    'webhook': WebhookNotifier,
+    'file': FileNotifier,
+    'desktop': DesktopNotifier,
+}
+
+
+def load_alert_rules(path, notify=True):
+    """AlertRules from a JSON config file; `notify=False` compiles the rules without notifiers."""
+    with open(path, 'r', encoding='utf-8') as f:
+        config = json.load(f)
+    notifiers = {}
+    if notify:
+        for name, options in (config.get('notifiers') or {}).items():
+            options = dict(options)
+            kind = options.pop('type', None)
+            if kind not in NOTIFIER_TYPES:
+                raise ValueError(f"notifier {name}: unknown type {kind!r}")
+            notifiers[name] = NOTIFIER_TYPES[kind](**options)
+    rules = config.get('rules') or []
+    if not notify:
+        rules = [dict(rule, notify=None) for rule in rules]
+    return AlertRules(rules, notifiers)
+
+
+def open_alert_rules(path=ALERT_RULES_PATH):
+    """Alert rules for run_scraper; None when there is no config file or it is invalid."""
+    if not path or not os.path.exists(path):
+        return None
+    try:
+        alerts = load_alert_rules(path)
+        print(f"🔔 Loaded {len(alerts.rules)} alert rules, {len(alerts.notifiers)} notifiers from {path}")
+        return alerts
+    except Exception as e:
+        print(f"⚠️ Alerts disabled - cannot load {path}: {e}")
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Dry-run alert rules over collected payins')
+    parser.add_argument('rules', help='alert rules JSON')
+    parser.add_argument('payins', help='payins export/snapshot JSON or checkpoint store (.db)')
+    parser.add_argument('--notify', action='store_true', help='deliver the alerts instead of only listing them')
+    args = parser.parse_args()
+
+    from reconciliation import load_payins
+    alerts = load_alert_rules(args.rules, notify=args.notify)
+    try:
+        for p in load_payins(args.payins):
+            alerts.evaluate(p)
+    finally:
+        alerts.close()
+    print(f"📋 Summary: {json.dumps(alerts.stats(), ensure_ascii=False)}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,149 @@
+"""History backfill benchmark: one tab paging back vs date ranges in several tabs.
+
+The fake site holds `--days` of history (`--per-day` payins a day). The
+activity page lists `--page-rows` rows with a 'Load more' button; each range
+URL (tab_backfill.BACKFILL_RANGE_URL) lists only that range's rows. Page
+loads take `--load` seconds and 'Load more' `--more` seconds on a virtual
+clock, so the times are the waits a real session would see.
+
+- single tab, old way: harvest_once from the activity page back to the
+  first day ('Load more' all the way down);
+- tab_backfill with 1 tab (the baseline the speedup is measured against)
+  and with more tabs (asking for more than MAX_BACKFILL_TABS is capped).
+
+Captured rows are merged with payin_pipeline.upsert_payins (parsed by
+`bench_parse()`, gpay_parser is not needed), and every run is checked to
+collect each payin exactly once.
+
+    python benchmarks/bench_backfill.py --days 365 --tabs 1 2 3 4 8
+"""
+
+import os
+import sys
+import time
+import argparse
+import datetime
+import contextlib
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import tab_backfill
+from html_dom import css_select
+from fake_webdriver import FakeSite, FakeWebDriver, VirtualClock, ACTIVITY_URL
+from payin_pipeline import upsert_payins
+from scraping import harvest_once
+from tab_backfill import backfill, split_ranges, range_url, MAX_BACKFILL_TABS
+from synthetic import bench_parse
+
+
+class MergingPipeline:
+    """Synchronous stand-in for PayinPipeline: parse and merge through the same upsert."""
+
+    def __init__(self):
+        self.collected = []
+        self.index = {}
+        self.captures = 0
+
+    def submit(self, capture, capture_seconds=None):
+        self.captures += 1
+        upsert_payins(self.collected, self.index, bench_parse(capture.rows))
+        return True
+
+
+def history(days, per_day, until):
+    """Rows newest first, `per_day` a day spread over working hours."""
+    rows = []
+    for back in range(days):
+        day = until - datetime.timedelta(days=back)
+        for n in range(per_day - 1, -1, -1):
+            minute = 9 * 60 + n * (9 * 60 // per_day)
+            stamp = datetime.datetime(day.year, day.month, day.day, minute // 60, minute % 60)
+            i = back * per_day + n
+            rows.append({'id': f'BCR{day:%Y%m%d}{n:04d}', 'date': stamp.strftime('%b %d, %Y, %I:%M %p'),
+                         'description': f'Payment from customer {i % 500}', 'status': 'Completed',
+                         'amount': f'EGP {100 + i % 900}.00', 'day': day})
+    return rows
+
+
+def render(rows, shown, page_rows):
+    body = ''.join(f'<tr data-row-id="{r["id"]}"><td>{r["date"]}</td><td>{r["description"]}</td>'
+                   f'<td>{r["status"]}</td><td>{r["amount"]}</td></tr>' for r in rows[:shown])
+    more = '<button id="load-more">Load more</button>' if shown < len(rows) else ''
+    return (f'<html><head><title>Google Pay</title></head><body><h1>Activity</h1>'
+            f'<table><tbody>{body}</tbody></table>{more}</body></html>')
+
+
+def make_site(rows, ranges, page_rows, more_s):
+    site = FakeSite()
+    lists = {ACTIVITY_URL: rows}
+    for start, end in ranges:
+        lists[range_url(start, end)] = [r for r in rows if start <= r['day'] <= end]
+    for url, listed in lists.items():
+        site.add_page(url, lambda driver, listed=listed: render(listed, page_rows, page_rows))
+
+    def load_more(driver, element):
+        listed = lists[driver._url]
+        shown = len(css_select(driver.document, 'tr[data-row-id]')) + page_rows
+        driver.set_html_later(lambda d: render(listed, shown, page_rows), more_s)
+    site.on_click('#load-more', load_more)
+    return site
+
+
+def timed(run):
+    with open(os.devnull, 'w') as quiet, contextlib.redirect_stdout(quiet):
+        started = time.monotonic()
+        result = run()
+        return time.monotonic() - started, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Backfill across tabs vs one tab')
+    parser.add_argument('--days', type=int, default=365)
+    parser.add_argument('--per-day', type=int, default=8)
+    parser.add_argument('--page-rows', type=int, default=50)
+    parser.add_argument('--load', type=float, default=3.0, help='seconds per page load')
+    parser.add_argument('--more', type=float, default=1.5, help="seconds per 'Load more'")
+    parser.add_argument('--tabs', type=int, nargs='+', default=[1, 2, 3, 4, 8])
+    parser.add_argument('--skip-single', action='store_true', help='skip the old single-tab harvest')
+    args = parser.parse_args()
+
+    until = datetime.date.today()
+    since = until - datetime.timedelta(days=args.days - 1)
+    rows = history(args.days, args.per_day, until)
+    ranges = split_ranges(since, until)
+    site = make_site(rows, ranges, args.page_rows, args.more)
+    print(f"{len(rows):,} payins over {args.days} days, {len(ranges)} ranges of {tab_backfill.BACKFILL_RANGE_DAYS} "
+          f"days, page load {args.load}s, 'Load more' {args.more}s, tab cap {MAX_BACKFILL_TABS}")
+    print(f"{'run':<22} {'time':>9} {'pages':>6} {'payins':>7} {'rows/s':>7} {'vs 1 tab':>9} {'own estimate':>13}")
+
+    def driver():
+        d = FakeWebDriver(site)
+        d.load_delay = args.load
+        return d
+
+    with VirtualClock():
+        if not args.skip_single:
+            pipeline = MergingPipeline()
+            d = driver()
+            d.get(ACTIVITY_URL)
+            seconds, result = timed(lambda: harvest_once(d, pipeline, since_ts=time.mktime(since.timetuple()),
+                                                          max_pages=10 ** 6))
+            print(f"{'single tab, Load more':<22} {seconds:>8.0f}s {result['pages']:>6} {len(pipeline.collected):>7,} "
+                  f"{len(pipeline.collected) / seconds:>7.2f} {'':>9} {'':>13}")
+        baseline = None
+        for tabs in args.tabs:
+            pipeline = MergingPipeline()
+            d = driver()
+            d.get(ACTIVITY_URL)
+            seconds, summary = timed(lambda: backfill(d, pipeline, since, until, tabs=tabs))
+            assert len(pipeline.collected) == len(rows), (len(pipeline.collected), len(rows))
+            assert summary['stop_reason'] == 'done' and not summary['failed_ranges'], summary
+            baseline = baseline or (seconds if tabs == 1 else None)
+            versus = f"{baseline / seconds:.2f}x" if baseline else '-'
+            label = f"backfill, {tabs} tab(s)" + (f" -> {summary['tabs']}" if summary['tabs'] != tabs else '')
+            print(f"{label:<22} {seconds:>8.0f}s {summary['pages']:>6} {len(pipeline.collected):>7,} "
+                  f"{summary['rows_per_s']:>7.2f} {versus:>9} {summary['speedup']:>12.2f}x")
+
+
+if __name__ == '__main__':
+    main()
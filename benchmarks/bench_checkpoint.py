@@ -0,0 +1,69 @@
+"""Restart-to-ready time of the checkpoint store.
+
+Fills a throwaway store with N synthetic payins, then times a cold
+`PayinStore(path).load()` (dedup index + watermarks) against re-reading the
+same data from an indent=2 JSON snapshot, which is what a restart had before.
+
+    python benchmarks/bench_checkpoint.py --rows 1000000
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from payin_store import PayinStore, identity_key
+from synthetic import synthetic_payin
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Checkpoint restart benchmark')
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--batch', type=int, default=50_000)
+    parser.add_argument('--skip-json', action='store_true', help='do not time the JSON snapshot baseline')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'payins.db')
+        store = PayinStore(db_path)
+        started = time.perf_counter()
+        for offset in range(0, args.rows, args.batch):
+            batch = [synthetic_payin(i) for i in range(offset, min(args.rows, offset + args.batch))]
+            store.checkpoint([(identity_key(p), p) for p in batch], refresh_count=offset // args.batch)
+        fill = time.perf_counter() - started
+        store.close()
+        print(f"filled {args.rows:,} rows in {fill:.2f}s ({args.rows / fill:,.0f} rows/s), "
+              f"db size {os.path.getsize(db_path) / 1e6:.1f} MB")
+
+        started = time.perf_counter()
+        store = PayinStore(db_path)
+        payins, index, meta = store.load()
+        ready = time.perf_counter() - started
+        store.close()
+        print(f"restart-to-ready: {ready:.2f}s for {len(payins):,} payins / {len(index):,} keys "
+              f"(refresh #{meta.get('refresh_count')})")
+
+        if not args.skip_json:
+            snapshot_path = os.path.join(tmp, 'payins_snapshot.json')
+            with open(snapshot_path, 'w', encoding='utf-8') as f:
+                json.dump({'transactions': [p.to_dict() for p in payins]}, f, ensure_ascii=False, indent=2)
+            del payins, index
+            started = time.perf_counter()
+            with open(snapshot_path, 'r', encoding='utf-8') as f:
+                restored = json.load(f)['transactions']
+            collected = []
+            for p in restored[:20_000]:
+                # the old list-membership dedup, extrapolated: it is quadratic
+                if p not in collected:
+                    collected.append(p)
+            partial = time.perf_counter() - started
+            print(f"JSON snapshot + list dedup of first 20k rows: {partial:.2f}s "
+                  f"(full replay is O(n^2) and not run)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+"""Dashboard totals benchmark: incremental refresh cost as history grows.
+
+Grows a store to each size in `--sizes`, then times what one dashboard
+rerun costs at that size: a RunningTotals.refresh() picking up `--new` new
+transactions and `--updates` status changes, against rebuilding the totals
+from scratch. Checks that the incremental tables equal a fresh rebuild.
+
+    python benchmarks/bench_dashboard_totals.py --sizes 10000,100000,1000000
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from payin_store import PayinStore, identity_key
+from payin_record import payin_changes
+from payin_aggregates import RunningTotals
+from synthetic import synthetic_payin
+
+
+def grow(store, start, end, batch=50000):
+    for offset in range(start, end, batch):
+        payins = [synthetic_payin(i) for i in range(offset, min(end, offset + batch))]
+        store.checkpoint([(identity_key(p), p) for p in payins])
+
+
+def same_tables(a, b):
+    for group in a.tables:
+        left, right = a.tables[group], b.tables[group]
+        if left.keys() != right.keys():
+            return False
+        if any(left[k][0] != right[k][0] or abs(left[k][1] - right[k][1]) > 1e-6 * max(1, abs(right[k][1]))
+               for k in left):
+            return False
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Incremental dashboard totals benchmark')
+    parser.add_argument('--sizes', default='10000,100000,1000000')
+    parser.add_argument('--new', type=int, default=10, help='new transactions per rerun')
+    parser.add_argument('--updates', type=int, default=3, help='status changes per rerun')
+    parser.add_argument('--reruns', type=int, default=20)
+    args = parser.parse_args()
+    rng = random.Random(3)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = PayinStore(os.path.join(tmp, 'payins.db'))
+        reader = PayinStore(os.path.join(tmp, 'payins.db'))
+        size = 0
+        totals = None
+        refunded = set()
+        for target in (int(s) for s in args.sizes.split(',')):
+            grow(store, size, target)
+            size = target
+            if totals is None:
+                totals = RunningTotals(reader)
+            totals.refresh()
+
+            worst = total = 0.0
+            for _ in range(args.reruns):
+                new = [synthetic_payin(size + i) for i in range(args.new)]
+                size += args.new
+                updated = []
+                # Each row is refunded once: its changes are logged against the synthetic (original) state
+                picks = set()
+                while len(picks) < args.updates:
+                    i = rng.randrange(size - args.new)
+                    if i not in refunded:
+                        picks.add(i)
+                refunded |= picks
+                for i in sorted(picks):
+                    old = synthetic_payin(i)
+                    p = dict(old, status='Refunded')
+                    updated.append((identity_key(p), p, payin_changes(old, p)))
+                store.checkpoint([(identity_key(p), p) for p in new], updated_payins=updated)
+                t0 = time.perf_counter()
+                totals.refresh()
+                elapsed = (time.perf_counter() - t0) * 1000
+                worst = max(worst, elapsed)
+                total += elapsed
+
+            t0 = time.perf_counter()
+            rebuilt = RunningTotals(reader)
+            rebuild_ms = (time.perf_counter() - t0) * 1000
+            print(f"{size:>10,} rows: refresh mean {total / args.reruns:.2f} ms, max {worst:.2f} ms "
+                  f"(+{args.new} new, {args.updates} updated) vs full rebuild {rebuild_ms:,.0f} ms; "
+                  f"tables match rebuild: {same_tables(totals, rebuilt)}")
+        reader.close()
+        store.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""Time-to-first-window and bundle size of the desktop app.
+
+Launches the app (source or a PyInstaller build) with
+DESKTOP_SCRAPER_STARTUP_PROBE=1, which makes `descktop.main()` print the
+time until the main window is up and quit. Fails with exit code 1 when a
+limit is exceeded, so it can guard releases.
+
+    python benchmarks/bench_desktop_startup.py                      # from source
+    python benchmarks/bench_desktop_startup.py --exe dist/desktop_scraper/desktop_scraper --max-ms 3000
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def bundle_size(path):
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            total += os.path.getsize(os.path.join(root, name))
+    return total
+
+
+def launch_once(cmd, timeout):
+    env = dict(os.environ, DESKTOP_SCRAPER_STARTUP_PROBE='1')
+    started = time.perf_counter()
+    proc = subprocess.run(cmd, cwd=ROOT, env=env, capture_output=True, text=True, timeout=timeout)
+    wall_ms = (time.perf_counter() - started) * 1000
+    for line in proc.stdout.splitlines():
+        if line.startswith('STARTUP_MS'):
+            return wall_ms, float(line.split()[1])
+    raise RuntimeError(f"no STARTUP_MS line (exit {proc.returncode}):\n{proc.stdout}\n{proc.stderr}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Desktop startup benchmark')
+    parser.add_argument('--exe', help='built executable (default: run descktop.py with this interpreter)')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--timeout', type=float, default=120)
+    parser.add_argument('--max-ms', type=float, help='fail if median wall time to first window exceeds this')
+    parser.add_argument('--max-size-mb', type=float, help='fail if the bundle is larger than this')
+    parser.add_argument('--json', help='also write the results to this file')
+    args = parser.parse_args()
+
+    cmd = [os.path.abspath(args.exe)] if args.exe else [sys.executable, os.path.join(ROOT, 'descktop.py')]
+    wall, internal = [], []
+    for _ in range(args.runs):
+        w, i = launch_once(cmd, args.timeout)
+        wall.append(w)
+        internal.append(i)
+
+    result = {
+        'command': cmd,
+        'runs': args.runs,
+        'first_window_ms_median': round(statistics.median(wall), 1),
+        'first_window_ms_cold': round(wall[0], 1),
+        'in_process_ms_median': round(statistics.median(internal), 1),
+    }
+    if args.exe:
+        exe_dir = os.path.dirname(os.path.abspath(args.exe))
+        target = exe_dir if os.path.isdir(os.path.join(exe_dir, '_internal')) else os.path.abspath(args.exe)
+        result['bundle_size_mb'] = round(bundle_size(target) / 1e6, 1)
+    print(json.dumps(result, indent=2))
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=2)
+
+    failed = False
+    if args.max_ms and result['first_window_ms_median'] > args.max_ms:
+        print(f"❌ startup {result['first_window_ms_median']} ms > {args.max_ms} ms")
+        failed = True
+    if args.max_size_mb and result.get('bundle_size_mb', 0) > args.max_size_mb:
+        print(f"❌ bundle {result['bundle_size_mb']} MB > {args.max_size_mb} MB")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
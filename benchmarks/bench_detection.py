@@ -0,0 +1,104 @@
+"""Detection latency vs refresh interval on the fake Google Pay site.
+
+Payins are posted at random (`--rate` per minute on average) over
+`--hours` of virtual time; the activity page lists those posted at least
+`--page-lag` seconds ago, newest first, with the minute-precision time the
+real page shows. For each refresh interval the loop refreshes, captures and
+persists through PayinPipeline, and detection_latency reports how long after
+posting each payin was seen. Sleeps run on a virtual clock.
+
+The page shows times to the minute, so every figure includes up to 60 s
+of rounding on top of the wait for the next refresh.
+
+gpay_parser is not needed: captured rows are parsed by `bench_parse()`.
+
+    python benchmarks/bench_detection.py --intervals 30 60 120 300 --hours 6
+"""
+
+import os
+import sys
+import time
+import bisect
+import random
+import argparse
+import tempfile
+import contextlib
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import payin_pipeline
+from detection_latency import DETECTION_SLO_S, detection_stats, reset_detection
+from fake_webdriver import FakeSite, FakeWebDriver, VirtualClock, render_activity, ACTIVITY_URL
+from payin_pipeline import PayinPipeline, capture_rows
+from synthetic import bench_parse
+
+
+def posting_times(start, end, rate_per_min, seed):
+    rng = random.Random(seed)
+    times, t = [], start
+    while True:
+        t += rng.expovariate(rate_per_min / 60.0)
+        if t >= end:
+            return times
+        times.append(t)
+
+
+def run(interval, posts, start, end, page_lag, visible_rows):
+    rows = [{'id': f'BCR{i:08d}', 'date': time.strftime('%b %d, %Y, %I:%M %p', time.localtime(t)),
+             'description': f'Payment from customer {i % 500}', 'status': 'Completed', 'amount': f'EGP {100 + i % 900}.00'}
+            for i, t in enumerate(posts)]
+    site = FakeSite()
+
+    def activity(driver):
+        listed = bisect.bisect_right(posts, time.time() - page_lag)
+        return render_activity(rows[i] for i in range(listed - 1, max(listed - visible_rows, 0) - 1, -1))
+    site.add_page(ACTIVITY_URL, activity)
+    reset_detection()
+    collected = []
+    pipeline = PayinPipeline(collected, {})
+    with VirtualClock() as clock:
+        clock.skipped = start - time.time()
+        driver = FakeWebDriver(site)
+        driver.get(ACTIVITY_URL)
+        refresh = 0
+        while time.time() < end:
+            refresh += 1
+            driver.refresh()
+            capture = capture_rows(driver, refresh)
+            pipeline._persist(capture, bench_parse(capture.rows))
+            time.sleep(interval)
+    pipeline.close()
+    return refresh, len(collected), detection_stats()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Detection latency vs refresh interval')
+    parser.add_argument('--intervals', type=float, nargs='+', default=[30, 60, 120, 300])
+    parser.add_argument('--hours', type=float, default=6)
+    parser.add_argument('--rate', type=float, default=0.5, help='payins posted per minute')
+    parser.add_argument('--page-lag', type=float, default=0, help='seconds before a posted payin is listed')
+    parser.add_argument('--rows', type=int, default=20, help='rows visible on the page')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    end = time.time()
+    start = end - args.hours * 3600
+    # An hour of history before the run starts: the first capture's backfill
+    posts = posting_times(start - 3600, end, args.rate, args.seed)
+    payin_pipeline.SNAPSHOT_PATH = os.path.join(tempfile.mkdtemp(prefix='bench_detection_'), 'payins_snapshot.json')
+    payin_pipeline.BACKUP_EVERY = 10 ** 9
+
+    print(f"{len(posts)} payins over {args.hours:g}h (+1h before start), SLO {DETECTION_SLO_S:.0f}s")
+    print(f"{'interval':>8} {'refreshes':>9} {'seen':>5} {'backfill':>8} {'p50':>7} {'p95':>7} {'p99':>7} "
+          f"{'max':>7} {'in SLO':>7}  worst hour p95")
+    for interval in args.intervals:
+        with open(os.devnull, 'w') as quiet, contextlib.redirect_stdout(quiet):
+            refreshes, seen, stats = run(interval, posts, start, end, args.page_lag, args.rows)
+        worst = max(stats['hours'].items(), key=lambda item: item[1].get('p95_s') or 0, default=(None, {}))
+        print(f"{interval:>7.0f}s {refreshes:>9} {seen:>5} {stats['backfill']:>8} {stats.get('p50_s', '-'):>6}s "
+              f"{stats.get('p95_s', '-'):>6}s {stats.get('p99_s', '-'):>6}s {stats.get('max_s', '-'):>6}s "
+              f"{stats['within_slo'] or 0:>7.1%}  {worst[0]} {worst[1].get('p95_s')}s")
+
+
+if __name__ == '__main__':
+    main()
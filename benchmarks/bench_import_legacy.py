@@ -0,0 +1,94 @@
+"""Legacy import benchmark: a directory of overlapping backup files into a fresh store.
+
+Writes `--files` gzip backups the way write_snapshot() did over a long run:
+each holds the whole collection at that moment (`--records` transactions at
+the end, growing by the same step every file) and Pending payins turn
+Completed a few files later, so most records are duplicates and some are
+conflicts. Then imports the directory into an empty store:
+
+- naively: every file loaded in turn and merged with the pipeline's
+  upsert_payins(), one checkpoint per file;
+- with import_legacy.import_files() on 1 worker and on `--workers`.
+
+    python benchmarks/bench_import_legacy.py --files 1000 --records 20000 --workers 4
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from payin_store import PayinStore
+from payin_pipeline import upsert_payins
+from serialization import dump_records, load
+from import_legacy import discover, import_files
+from synthetic import synthetic_payin
+
+
+def write_backups(directory, files, records):
+    """`files` backups an hour apart; payin i appears in file i // step and settles 3 files later."""
+    step = max(1, records // files)
+    start = time.time() - files * 3600
+    for n in range(files):
+        count = min(records, (n + 1) * step)
+        payins = [synthetic_payin(i, display=True, settled=n - i // step >= 3) for i in range(count)]
+        when = start + n * 3600
+        header = {'timestamp': time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(when)), 'refresh_count': n,
+                  'consecutive_failures': 0, 'total_transactions': count}
+        dump_records(os.path.join(directory, f"payins_backup_{time.strftime('%Y%m%d_%H%M%S', time.localtime(when))}"
+                                             f".json.gz"), header, 'transactions', payins)
+
+
+def naive_import(files, store):
+    payins, index, _ = store.load()
+    for path in files:
+        new_payins, updated_payins = upsert_payins(payins, index, load(path).get('transactions', []))
+        if new_payins or updated_payins:
+            store.checkpoint(new_payins, updated_payins=updated_payins)
+    return len(payins)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Legacy backup import throughput')
+    parser.add_argument('--files', type=int, default=1000)
+    parser.add_argument('--records', type=int, default=20000, help='transactions in the newest backup')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--skip-naive', action='store_true')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        backups = os.path.join(tmp, 'backups')
+        os.makedirs(backups)
+        started = time.perf_counter()
+        write_backups(backups, args.files, args.records)
+        files = discover([backups])
+        size = sum(os.path.getsize(p) for p in files)
+        print(f"{len(files):,} backups, {size / 1e6:.0f} MB gzip, written in {time.perf_counter() - started:.1f}s")
+
+        runs = [] if args.skip_naive else [('naive upsert_payins', None)]
+        runs += [('import_files, 1 worker', 1)]
+        if args.workers > 1:
+            runs.append((f'import_files, {args.workers} workers', args.workers))
+        for n, (label, workers) in enumerate(runs):
+            store = PayinStore(os.path.join(tmp, f'store{n}.db'))
+            started = time.perf_counter()
+            if workers is None:
+                naive_import(files, store)
+                records = None
+            else:
+                summary = import_files(files, store, workers=workers)
+                records = summary['records']
+            seconds = time.perf_counter() - started
+            stored = store.count()
+            pending = sum(row[2] for row in store.totals('status') if row[0] == 'Pending')
+            store.close()
+            rate = f"  {records / seconds:9,.0f} records/s" if records else ''
+            print(f"{label:<26} {seconds:7.1f}s  {len(files) / seconds:6.1f} files/s{rate}  "
+                  f"{stored:,} stored ({pending} pending)")
+
+
+if __name__ == '__main__':
+    main()
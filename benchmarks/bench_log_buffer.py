@@ -0,0 +1,70 @@
+"""Streamlit log buffer benchmark: what a rerun costs after a long run.
+
+Appends `--lines` scraper-like lines to a LogBuffer (spilling to a temporary
+file), then compares one rerun of the old viewer - join every line into one
+HTML div - with the paginated viewer: one filtered page of `--page-size`
+lines, HTML-escaped.
+
+    python benchmarks/bench_log_buffer.py --lines 500000
+"""
+
+import os
+import sys
+import html
+import time
+import argparse
+import tempfile
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from log_buffer import LogBuffer
+
+SAMPLE_LINES = [
+    "💰 Found {i} transactions in refresh #{i}",
+    "📈 Total collected: {i} transactions",
+    "⚠️ Error writing checkpoint: database is locked (refresh #{i})",
+    "🔄 Refreshing page (#{i})...",
+    "❌ Error parsing transactions: row {i} has no amount",
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Log buffer vs unbounded log list')
+    parser.add_argument('--lines', type=int, default=500_000)
+    parser.add_argument('--page-size', type=int, default=200)
+    args = parser.parse_args()
+
+    lines = [SAMPLE_LINES[i % len(SAMPLE_LINES)].format(i=i) for i in range(args.lines)]
+    with tempfile.TemporaryDirectory() as tmp:
+        tracemalloc.start()
+        buffer = LogBuffer(spill_path=os.path.join(tmp, 'streamlit_scraper.log'))
+        started = time.perf_counter()
+        for line in lines:
+            buffer.append(line)
+        append_s = time.perf_counter() - started
+        buffer_mb = tracemalloc.get_traced_memory()[0] / 1e6
+        tracemalloc.stop()
+        print(f"appended {args.lines:,} lines in {append_s:.2f}s ({1e6 * append_s / args.lines:.1f} us/line), "
+              f"buffer {buffer_mb:.1f} MB for {len(buffer):,} lines, spill "
+              f"{sum(os.path.getsize(os.path.join(tmp, f)) for f in os.listdir(tmp)) / 1e6:.1f} MB")
+
+        started = time.perf_counter()
+        log_text = "\n".join(lines)
+        old_html = f'<div class="log-container">{log_text.replace(chr(10), "<br>")}</div>'
+        old_ms = (time.perf_counter() - started) * 1000
+        print(f"old viewer: {old_ms:.1f} ms per rerun, {len(old_html.encode('utf-8')) / 1e6:.1f} MB to the browser")
+
+        for label, query, level in [('newest page', '', 'all'), ('errors only', '', 'errors'),
+                                    ('text filter', 'checkpoint', 'all')]:
+            started = time.perf_counter()
+            window, matching, pages = buffer.page(0, args.page_size, query, level)
+            page_html = "<br>".join(html.escape(entry[3]) for entry in window)
+            new_ms = (time.perf_counter() - started) * 1000
+            print(f"paginated viewer, {label}: {new_ms:.2f} ms per rerun, "
+                  f"{len(page_html.encode('utf-8')) / 1e3:.1f} KB to the browser ({matching:,} matching, {pages} pages)")
+        buffer.close()
+
+
+if __name__ == '__main__':
+    main()
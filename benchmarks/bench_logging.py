@@ -0,0 +1,144 @@
+"""Logging benchmark: how long the logging thread is held per record.
+
+Logs `--records` messages (every `--error-every`th one with a traceback)
+from one thread, the way the refresh loop does, on a disk whose writes take
+`--slow-ms`:
+
+- the old pattern: print() plus, for errors, open the error log, append the
+  traceback and close it, in the calling thread;
+- a plain synchronous logging.FileHandler with the JSON formatter;
+- scraper_log: queue handler, listener thread, rotating JSON file.
+
+Then a burst of identical driver errors shows the per-category rate limit.
+
+    python benchmarks/bench_logging.py --records 2000 --slow-ms 2
+"""
+
+import os
+import sys
+import time
+import logging
+import argparse
+import tempfile
+import traceback
+import contextlib
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import scraper_log
+from scraper_log import JsonLineFormatter, RotatingJsonFileHandler, get_logger, start_logging, stop_logging, logging_stats
+from percentiles import percentile
+
+
+def slow_write(stream, slow_s):
+    """Make every write to `stream` take `slow_s` seconds (a busy or network disk)."""
+    write = stream.write
+
+    def slow(data):
+        time.sleep(slow_s)
+        return write(data)
+    stream.write = slow
+    return stream
+
+
+def failing():
+    try:
+        {}['missing']
+    except KeyError:
+        return sys.exc_info()
+
+
+def old_pattern(path, n, error_every, slow_s):
+    latencies = []
+    for i in range(n):
+        started = time.perf_counter()
+        print(f"📊 Found {i} transaction elements using selector: tr[data-row-id]")
+        if i % error_every == 0:
+            exc_info = failing()
+            with open(path, 'a', encoding='utf-8') as f:
+                slow_write(f, slow_s)
+                f.write(f"\n--- {time.strftime('%Y-%m-%dT%H:%M:%S')} SOLVER RUNTIME ERROR ---\n")
+                f.write(''.join(traceback.format_exception(*exc_info)))
+        latencies.append(time.perf_counter() - started)
+    return latencies
+
+
+def logged(log, n, error_every):
+    latencies = []
+    for i in range(n):
+        started = time.perf_counter()
+        if i % error_every == 0:
+            log.error(f"❌ Driver error {i}", exc_info=failing(), extra={'category': f'error{i}'})
+        else:
+            log.info(f"📊 Found {i} transaction elements using selector: tr[data-row-id]",
+                     extra={'category': f'refresh{i}'})
+        latencies.append(time.perf_counter() - started)
+    return latencies
+
+
+def line(label, latencies, written):
+    values = sorted(latencies)
+    return (f"{label:<28} p50 {percentile(values, 50) * 1e6:8.1f} us  p99 {percentile(values, 99) * 1e6:9.1f} us  "
+            f"max {values[-1] * 1e3:7.2f} ms  total {sum(values):6.2f}s  ({written})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Caller-side cost of logging')
+    parser.add_argument('--records', type=int, default=2000)
+    parser.add_argument('--error-every', type=int, default=10)
+    parser.add_argument('--slow-ms', type=float, default=2.0, help='added to every disk write')
+    parser.add_argument('--burst', type=int, default=1000, help='identical errors for the rate limit')
+    args = parser.parse_args()
+    slow_s = args.slow_ms / 1000
+
+    with tempfile.TemporaryDirectory() as tmp, open(os.devnull, 'w') as quiet:
+        with contextlib.redirect_stdout(quiet):
+            old = old_pattern(os.path.join(tmp, 'error.log'), args.records, args.error_every, slow_s)
+
+            sync_logger = logging.getLogger('bench.sync')
+            sync_logger.propagate = False
+            handler = logging.FileHandler(os.path.join(tmp, 'sync.jsonl'), encoding='utf-8')
+            handler.setFormatter(JsonLineFormatter())
+            slow_write(handler.stream, slow_s)
+            sync_logger.addHandler(handler)
+            sync = logged(sync_logger, args.records, args.error_every)
+            handler.close()
+
+            path = os.path.join(tmp, 'async.jsonl')
+            active = start_logging(path, console=True)
+            for output in active.outputs:
+                if isinstance(output, RotatingJsonFileHandler):
+                    slow_write(output.stream, slow_s)
+            started = time.perf_counter()
+            queued = logged(get_logger('bench'), args.records, args.error_every)
+            stats = logging_stats()
+            stop_logging()
+            drained_s = time.perf_counter() - started
+        with open(path, encoding='utf-8') as f:
+            async_lines = sum(1 for _ in f)
+
+        print(line('old print + append/close', old, 'errors to error.log'))
+        print(line('sync logging.FileHandler', sync, 'all records'))
+        print(line('scraper_log (queue)', queued,
+                   f"{async_lines} lines, {stats['dropped']} dropped, written out after {drained_s:.2f}s"))
+
+        path = os.path.join(tmp, 'burst.jsonl')
+        with contextlib.redirect_stdout(quiet):
+            start_logging(path, console=True)
+            log = get_logger('bench')
+            started = time.perf_counter()
+            for i in range(args.burst):
+                log.warning("❌ Driver error (attempt 1/3): Message: injected refresh failure",
+                            extra={'category': 'driver_error'})
+            burst_s = time.perf_counter() - started
+            stats = logging_stats()
+            stop_logging()
+        with open(path, encoding='utf-8') as f:
+            burst_lines = sum(1 for _ in f)
+        print(f"burst of {args.burst} identical driver errors: {burst_lines} written, {stats['suppressed']} suppressed "
+              f"(limit {scraper_log.LOG_RATE_BURST} per {scraper_log.LOG_RATE_WINDOW:.0f}s), "
+              f"{burst_s / args.burst * 1e6:.1f} us per call")
+
+
+if __name__ == '__main__':
+    main()
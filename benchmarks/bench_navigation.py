@@ -0,0 +1,112 @@
+"""Time-to-transactions-page benchmark on the in-memory fake driver.
+
+Compares the old navigation (each known URL in turn with a fixed 3 s sleep,
+then activity links) with transactions_nav.navigate(), cold and with the
+URL remembered from the previous navigation. The fake site takes `--load`
+seconds per page load; sleeps and page loads run on a virtual clock, so the
+numbers are the waits a real session would see, not Python time.
+
+Sites: the first known URL works; only the third one works (the others
+show a browser error page); none works but the last one redirects to a
+page with an Activity link.
+
+    python benchmarks/bench_navigation.py --load 1.5
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+import contextlib
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault('NAV_STATE_PATH', os.path.join(tempfile.mkdtemp(prefix='bench_nav_'), 'nav_state.json'))
+
+import transactions_nav
+from transactions_nav import TRANSACTION_URLS, ACTIVITY_LINK_XPATH, navigate, navigation_stats
+from page_state import PageState, classify_page, mark_page_changed
+from fake_webdriver import FakeSite, FakeWebDriver, VirtualClock, render_activity
+from selenium.webdriver.common.by import By
+
+LANDING_HTML = ('<html><body><h2>Google Payments</h2>'
+                '<a href="https://payments.google.com/payments/u/0/history">Activity</a></body></html>')
+
+
+class LoadingDriver(FakeWebDriver):
+    """Fake driver whose page loads take `load_s` (virtual) seconds."""
+
+    def __init__(self, site, load_s):
+        super().__init__(site)
+        self.load_s = load_s
+
+    def _load(self, url):
+        time.sleep(self.load_s)
+        super()._load(url)
+
+
+def make_site(kind):
+    site = FakeSite()
+    rows = [{'id': f'BCR{i:06d}', 'date': 'Mar 1, 2025', 'description': f'Payment {i}', 'amount': 'EGP 100.00',
+             'status': 'Completed'} for i in range(20)]
+    activity = lambda driver: render_activity(rows)
+    if kind == 'first URL':
+        site.add_page(TRANSACTION_URLS[0], activity)
+    elif kind == 'third URL':
+        site.add_page(TRANSACTION_URLS[2], activity)
+    else:
+        site.redirect(TRANSACTION_URLS[-1], 'https://payments.google.com/payments/u/0/home')
+        site.add_page('https://payments.google.com/payments/u/0/home', LANDING_HTML)
+        site.add_page('https://payments.google.com/payments/u/0/history', activity)
+    return site
+
+
+def legacy_navigate(driver):
+    """The navigation before transactions_nav: fixed sleeps after every attempt."""
+    for url in TRANSACTION_URLS:
+        try:
+            driver.get(url)
+            mark_page_changed(driver)
+            time.sleep(3)
+            if classify_page(driver).state is PageState.TRANSACTIONS:
+                return True
+        except Exception:
+            continue
+    for link in driver.find_elements(By.XPATH, ACTIVITY_LINK_XPATH):
+        if link.is_displayed():
+            driver.execute_script("arguments[0].click();", link)
+            mark_page_changed(driver)
+            time.sleep(3)
+            return classify_page(driver).state is PageState.TRANSACTIONS
+    return False
+
+
+def timed(function, driver):
+    with open(os.devnull, 'w') as quiet, contextlib.redirect_stdout(quiet):
+        started = time.monotonic()
+        ok = function(driver)
+        return time.monotonic() - started, ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Time to the transactions page')
+    parser.add_argument('--load', type=float, default=1.5, help='seconds per page load')
+    args = parser.parse_args()
+
+    print(f"{'site':<12} {'old (fixed sleeps)':>20} {'new, cold':>12} {'new, remembered':>17}")
+    with VirtualClock():
+        for n, kind in enumerate(('first URL', 'third URL', 'Activity link')):
+            site = make_site(kind)
+            old_s, old_ok = timed(legacy_navigate, LoadingDriver(site, args.load))
+            account = f'bench{n}@example.com'
+            cold_s, cold_ok = timed(lambda d: navigate(d, account), LoadingDriver(site, args.load))
+            warm_s, warm_ok = timed(lambda d: navigate(d, account), LoadingDriver(site, args.load))
+            print(f"{kind:<12} {old_s:>18.1f}s{'' if old_ok else '!'} {cold_s:>10.1f}s{'' if cold_ok else '!'} "
+                  f"{warm_s:>15.1f}s{'' if warm_ok else '!'}")
+    print(f"navigation stats: {navigation_stats()}")
+    print(f"remembered URLs in {transactions_nav.NAV_STATE_PATH}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+"""Partitioned store benchmark: restart, export and write latency during compaction.
+
+Builds a store of `--payins` transactions spread over the last `--months`
+months, copies it, and compacts the copy into monthly partitions while a
+writer thread keeps checkpointing small batches (like the persist stage).
+Reports checkpoint latency idle vs during compaction, restart load() time
+and date-bounded export time on the flat store vs the partitioned one, and
+the disk footprint of both.
+
+    python benchmarks/bench_partitions.py --payins 500000 --months 24
+"""
+
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from payin_store import PayinStore, identity_key
+from percentiles import percentile
+from payin_partitions import Compactor, iter_range, list_partitions, add_months, month_of, month_start
+from synthetic import synthetic_payin
+
+
+def checkpoint_latencies(path, stop, first_id, out):
+    """Checkpoint 20 new payins every 20 ms until `stop` is set, recording each checkpoint's duration."""
+    store = PayinStore(path)
+    i = first_id
+    while not stop.is_set():
+        payins = [synthetic_payin(n, time.time()) for n in range(i, i + 20)]
+        i += 20
+        started = time.perf_counter()
+        store.checkpoint([(identity_key(p), p) for p in payins])
+        out.append(time.perf_counter() - started)
+        time.sleep(0.02)
+    store.close()
+
+
+def latency_line(label, latencies):
+    values = sorted(latencies)
+    return (f"{label:<22} {len(values):5} checkpoints  p50 {percentile(values, 50) * 1000:6.2f} ms  "
+            f"p99 {percentile(values, 99) * 1000:7.2f} ms  max {values[-1] * 1000:7.2f} ms")
+
+
+def footprint(paths):
+    return sum(os.path.getsize(p) for p in paths if os.path.exists(p)) / 1e6
+
+
+def live_mb(store):
+    """Pages in use: the space moved rows leave behind is reused by new ones rather than returned to the OS."""
+    pages, free, size = (store._conn.execute(f"PRAGMA {name}").fetchone()[0]
+                         for name in ('page_count', 'freelist_count', 'page_size'))
+    return (pages - free) * size / 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Monthly partitions vs one flat store')
+    parser.add_argument('--payins', type=int, default=500000)
+    parser.add_argument('--months', type=int, default=24)
+    args = parser.parse_args()
+    now = time.time()
+    start = month_start(add_months(month_of(now), 1 - args.months))
+    step = (now - start) / args.payins
+
+    with tempfile.TemporaryDirectory() as tmp:
+        flat_path = os.path.join(tmp, 'flat.db')
+        store = PayinStore(flat_path)
+        for offset in range(0, args.payins, 50000):
+            payins = [synthetic_payin(i, start + i * step) for i in range(offset, min(args.payins, offset + 50000))]
+            store.checkpoint([(identity_key(p), p) for p in payins])
+        store._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        store.close()
+        hot_path = os.path.join(tmp, 'hot.db')
+        shutil.copy(flat_path, hot_path)
+        partition_dir = os.path.join(tmp, 'partitions')
+
+        idle, busy = [], []
+        stop = threading.Event()
+        writer = threading.Thread(target=checkpoint_latencies, args=(hot_path, stop, 10 ** 8, idle))
+        writer.start()
+        time.sleep(3)
+        stop.set()
+        writer.join()
+
+        stop = threading.Event()
+        writer = threading.Thread(target=checkpoint_latencies, args=(hot_path, stop, 2 * 10 ** 8, busy))
+        writer.start()
+        summary = Compactor(hot_path, partition_dir).run_isolated()
+        stop.set()
+        writer.join()
+        print(f"compaction moved {summary['moved']:,} transactions into {len(summary['months'])} partitions "
+              f"in {summary['seconds']}s")
+        print(latency_line('checkpoint, idle', idle))
+        print(latency_line('checkpoint, compacting', busy))
+
+        # A month in the middle of the generated span, so the export is never of an empty range
+        middle = add_months(month_of(now), 1 - args.months + args.months // 2)
+        since, until = month_start(middle), month_start(add_months(middle, 1))
+        for label, path in (('flat store', flat_path), ('partitioned store', hot_path)):
+            store = PayinStore(path)
+            started = time.perf_counter()
+            payins, index, meta = store.load()
+            load_s = time.perf_counter() - started
+            started = time.perf_counter()
+            if path == flat_path:
+                month = store.range_rows(since, until)
+            else:
+                month = list(iter_range(store, since, until, partition_dir))
+            month_s = time.perf_counter() - started
+            started = time.perf_counter()
+            everything = store.range_rows() if path == flat_path else list(iter_range(store, directory=partition_dir))
+            all_s = time.perf_counter() - started
+            store_mb = live_mb(store)
+            store.close()
+            files = [path, path + '-wal'] + [p for _, p in list_partitions(partition_dir)] * (path == hot_path)
+            print(f"{label:<18} restart load {load_s:6.2f}s ({len(payins):,} rows)  one-month export {month_s:5.2f}s "
+                  f"({len(month):,})  full export {all_s:5.2f}s ({len(everything):,})  "
+                  f"store {store_mb:6.1f} MB in use, partitions "
+                  f"{footprint(files[2:]):6.1f} MB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+"""Measure detection-to-consumer latency of the payin push channel.
+
+    python benchmarks/bench_payin_stream.py --events 2000 --rate 200
+"""
+
+import os
+import sys
+import time
+import argparse
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from payin_stream import PayinStream, iter_events
+from percentiles import percentile
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Payin stream latency benchmark')
+    parser.add_argument('--events', type=int, default=2000)
+    parser.add_argument('--rate', type=float, default=0, help='events per second (0 = as fast as possible)')
+    parser.add_argument('--reconnect-at', type=int, default=0, help='drop and resume the consumer after N events')
+    args = parser.parse_args()
+
+    stream = PayinStream().start('127.0.0.1', 0)
+    host, port = stream.address
+    url = f"http://{host}:{port}/events"
+    latencies = []
+    received = []
+    ready = threading.Event()
+
+    def consume(cursor=None, stop_after=None):
+        ready.set()
+        for event in iter_events(url, cursor=cursor):
+            if event['event'] != 'payin':
+                continue
+            latencies.append(event['latency'])
+            received.append(event['id'])
+            if stop_after and len(received) >= stop_after:
+                return
+            if len(received) >= args.events:
+                return
+
+    def consumer():
+        if args.reconnect_at:
+            consume(cursor=0, stop_after=args.reconnect_at)
+        consume(cursor=received[-1] if received else 0)
+
+    t = threading.Thread(target=consumer, daemon=True)
+    t.start()
+    ready.wait()
+    time.sleep(0.2)
+
+    started = time.perf_counter()
+    for i in range(args.events):
+        stream.publish({'id': f'tx-{i}', 'amount': f'{i}.00', 'status': 'Completed'}, detected_at=time.time())
+        if args.rate:
+            time.sleep(1.0 / args.rate)
+    t.join(timeout=30)
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    print(f"events published: {args.events}, received: {len(received)}, duplicates: {len(received) - len(set(received))}")
+    print(f"throughput: {len(received) / elapsed:,.0f} events/s")
+    for pct in (50, 95, 99):
+        value = percentile(latencies, pct)
+        print(f"p{pct} latency: {value * 1000:.3f} ms" if value is not None else f"p{pct} latency: n/a")
+    print(f"server stats: {stream.stats()}")
+    stream.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+"""Raw capture archive benchmark: archive size/dedup and re-parse scaling.
+
+Captures `--refreshes` pages from the fake Google Pay site (each refresh
+shows `--rows` rows, `--new-per-refresh` of them new, and every
+`--unchanged-every`-th refresh shows the same page again), archives them,
+then re-parses the archive into a fresh store with 1, 2, 4, ... workers up
+to `--workers`.
+
+gpay_parser is not needed: rows are parsed by `bench_parse()`, which walks
+the captured HTML with html_dom the way a DOM-based parser would, so the
+per-row cost is realistic and CPU-bound.
+
+    python benchmarks/bench_raw_archive.py --refreshes 20000 --rows 20 --workers 8
+"""
+
+import os
+import sys
+import time
+import json
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fake_webdriver import FakeWebDriver, google_pay_site, ACTIVITY_URL
+from payin_pipeline import capture_rows
+from payin_store import PayinStore
+from raw_archive import RawArchive, reparse
+from synthetic import bench_parse
+
+
+def build_archive(path, args):
+    site = google_pay_site(visible_rows=args.rows, new_per_refresh=args.new_per_refresh)
+    driver = FakeWebDriver(site)
+    driver.get(ACTIVITY_URL)
+    archive = RawArchive(path)
+    raw_bytes = 0
+    capture_seconds = archive_seconds = 0.0
+    for refresh in range(1, args.refreshes + 1):
+        if not (args.unchanged_every and refresh % args.unchanged_every == 0):
+            driver.refresh()
+        started = time.perf_counter()
+        capture = capture_rows(driver, refresh)
+        capture_seconds += time.perf_counter() - started
+        raw_bytes += len(json.dumps(capture.rows, ensure_ascii=False))
+        started = time.perf_counter()
+        archive.add(capture)
+        archive_seconds += time.perf_counter() - started
+    stats = archive.stats()
+    print(f"archived {args.refreshes:,} refreshes in {archive_seconds:.2f}s "
+          f"({1000 * archive_seconds / args.refreshes:.3f} ms/refresh; capture itself {capture_seconds:.2f}s)")
+    print(f"  stored captures  {archive.stored:,}   unchanged skipped {archive.skipped:,}")
+    print(f"  distinct rows    {stats['distinct_rows']:,} of {args.refreshes * args.rows:,} captured")
+    print(f"  raw JSON         {raw_bytes / 1e6:,.1f} MB -> row blobs {stats['compressed_bytes'] / 1e6:,.2f} MB, "
+          f"archive file {stats['file_bytes'] / 1e6:,.2f} MB ({raw_bytes / stats['file_bytes']:,.0f}x smaller)")
+    return archive
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Raw archive and re-parse benchmark')
+    parser.add_argument('--refreshes', type=int, default=5000)
+    parser.add_argument('--rows', type=int, default=20)
+    parser.add_argument('--new-per-refresh', type=int, default=1)
+    parser.add_argument('--unchanged-every', type=int, default=3, help='every Nth refresh shows the same page (0 = never)')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='largest worker count to time')
+    parser.add_argument('--chunk-rows', type=int, default=500)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        archive = build_archive(os.path.join(tmp, 'raw_archive.db'), args)
+        counts = []
+        n = 1
+        while n < args.workers:
+            counts.append(n)
+            n *= 2
+        counts.append(args.workers)
+
+        baseline = None
+        for workers in counts:
+            store = PayinStore(os.path.join(tmp, f'payins_{workers}.db'))
+            started = time.perf_counter()
+            summary = reparse(archive, store, workers=workers, chunk_rows=args.chunk_rows, parse=bench_parse)
+            elapsed = time.perf_counter() - started
+            again = reparse(archive, store, workers=workers, chunk_rows=args.chunk_rows, parse=bench_parse)
+            store.close()
+            baseline = baseline or summary['parse_seconds']
+            print(f"reparse workers={workers}: {elapsed:.2f}s total, parse {summary['parse_seconds']:.2f}s "
+                  f"({summary['distinct_rows'] / max(summary['parse_seconds'], 1e-9):,.0f} rows/s, "
+                  f"speedup {baseline / max(summary['parse_seconds'], 1e-9):.2f}x), "
+                  f"{summary['new_transactions']:,} transactions; second run: "
+                  f"{again['new_transactions']} new / {again['updated_transactions']} updated")
+        archive.close()
+
+
+if __name__ == '__main__':
+    main()
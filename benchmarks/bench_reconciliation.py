@@ -0,0 +1,96 @@
+"""Reconciliation throughput: N expected payments against M payins.
+
+Builds synthetic invoices (amounts drawn from a few thousand price points,
+dates over a year, a third carrying a reference that the matching payin
+quotes) and payins paying most of them a few days later, plus noise. Times
+indexing, matching, and compares with the naive nested-loop lookup on a
+small sample.
+
+    python benchmarks/bench_reconciliation.py --invoices 1000000 --payins 1000000
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from payin_record import Payin
+from reconciliation import Reconciler, Invoice
+
+DAY = 86400
+START = 1735689600  # 2025-01-01
+
+
+def synthetic_data(n_invoices, n_payins, seed=7):
+    rng = random.Random(seed)
+    invoices = []
+    for i in range(n_invoices):
+        invoices.append({
+            'invoice_id': f'INV-{i:07d}',
+            'amount': f'{rng.randint(50, 5000)}.{rng.choice((0, 50, 99)):02d}',
+            'currency': 'EGP',
+            'due_date': time.strftime('%Y-%m-%d', time.gmtime(START + rng.randrange(365) * DAY)),
+            'customer': f'Customer {i % 20000}',
+        })
+    payins = []
+    for j in range(n_payins):
+        if j < n_invoices and rng.random() < 0.9:
+            inv = invoices[j]
+            due = time.mktime(time.strptime(inv['due_date'], '%Y-%m-%d'))
+            paid = time.strftime('%Y-%m-%d %H:%M', time.localtime(due + rng.randrange(0, 10 * DAY)))
+            description = f"Payment {inv['invoice_id']}" if j % 3 == 0 else f"From {inv['customer']}"
+            payins.append(Payin(id=f'T{j:08d}', date=paid, amount=f"EGP {inv['amount']}", description=description))
+        else:
+            paid = time.strftime('%Y-%m-%d %H:%M', time.gmtime(START + rng.randrange(365 * DAY)))
+            payins.append(Payin(id=f'T{j:08d}', date=paid, amount=f'EGP {rng.randint(1, 9000)}.13',
+                                description='Transfer'))
+    return invoices, payins
+
+
+def naive(invoices, payins):
+    """The spreadsheet approach: scan every invoice for every payin."""
+    matched = 0
+    for p in payins:
+        for inv in invoices:
+            if inv.amount_minor == int(round(p.amount_value * 100)):
+                matched += 1
+                break
+    return matched
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Reconciliation benchmark')
+    parser.add_argument('--invoices', type=int, default=1_000_000)
+    parser.add_argument('--payins', type=int, default=1_000_000)
+    parser.add_argument('--naive-sample', type=int, default=200, help='payins timed with the nested loop (0 = skip)')
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    invoices, payins = synthetic_data(args.invoices, args.payins)
+    print(f"generated {len(invoices):,} invoices / {len(payins):,} payins in {time.perf_counter() - started:.1f}s")
+
+    started = time.perf_counter()
+    reconciler = Reconciler(invoices)
+    index_s = time.perf_counter() - started
+    print(f"index:  {index_s:.2f}s ({len(reconciler.invoices) / index_s:,.0f} invoices/s)")
+
+    started = time.perf_counter()
+    reconciler.add_payins(payins)
+    match_s = time.perf_counter() - started
+    print(f"match:  {match_s:.2f}s ({len(payins) / match_s:,.0f} payins/s, {1e6 * match_s / len(payins):.1f} us/payin)")
+    print(f"result: {reconciler.summary()}")
+
+    if args.naive_sample:
+        sample = payins[:args.naive_sample]
+        indexed = [Invoice(d) for d in invoices]
+        started = time.perf_counter()
+        naive(indexed, sample)
+        per = (time.perf_counter() - started) / len(sample)
+        print(f"naive:  {1e6 * per:,.0f} us/payin -> ~{per * len(payins) / 3600:,.1f} h for all payins")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+"""Memory per collected payin: plain dicts vs Payin records.
+
+    python benchmarks/bench_record_memory.py --rows 200000
+"""
+
+import os
+import sys
+import time
+import argparse
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from payin_record import Payin
+
+
+def parsed_rows(n):
+    # Built fresh each time, the way rows come out of the parser: every value a new string.
+    for i in range(n):
+        yield {
+            'id': f'BCR{i:010d}',
+            'date': ''.join(['2025-09-', f'{1 + i % 28:02d}']),
+            'time': ''.join([f'{i % 24:02d}', ':', f'{i % 60:02d}']),
+            'description': ''.join(['Payment from customer ', str(i % 5000)]),
+            'status': ''.join(['Comp', 'leted']) if i % 7 else ''.join(['Pen', 'ding']),
+            'amount': ''.join(['EGP ', str(100 + i % 900), '.00']),
+        }
+
+
+def measure(build, n):
+    tracemalloc.start()
+    started = time.perf_counter()
+    data = build(n)
+    elapsed = time.perf_counter() - started
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return data, current, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Payin memory benchmark')
+    parser.add_argument('--rows', type=int, default=200_000)
+    args = parser.parse_args()
+
+    dicts, dict_bytes, dict_time = measure(lambda n: list(parsed_rows(n)), args.rows)
+    del dicts
+    records, rec_bytes, rec_time = measure(lambda n: [Payin.from_dict(p) for p in parsed_rows(n)], args.rows)
+
+    started = time.perf_counter()
+    round_trip = [p.to_dict() for p in records]
+    to_dict_time = time.perf_counter() - started
+    assert round_trip[0] == next(parsed_rows(1)), 'to_dict() must return the parsed shape'
+
+    print(f"rows: {args.rows:,}")
+    print(f"dict:  {dict_bytes / args.rows:7.1f} bytes/record  (build {dict_time:.2f}s)")
+    print(f"Payin: {rec_bytes / args.rows:7.1f} bytes/record  (build {rec_time:.2f}s, incl. amount/date parsing)")
+    print(f"saving: {100 * (1 - rec_bytes / dict_bytes):.0f}%   to_dict() for all rows: {to_dict_time:.2f}s")
+
+
+if __name__ == '__main__':
+    main()
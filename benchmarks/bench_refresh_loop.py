@@ -0,0 +1,141 @@
+"""Browser-free refresh-loop benchmark on the in-memory fake driver.
+
+Cycle mode (default) drives `scraping.refresh_and_capture()` against a fake
+Google Pay activity page that gains rows on every refresh, optionally feeding
+the captures through the parse/persist pipeline, and injects a
+WebDriverException every `--fail-every` refreshes. Sleeps and WebDriverWait
+timeouts run on a virtual clock, so only Python time is measured.
+
+`--full` runs the whole `run_scraper()` (login, navigation, loop, export)
+for `--cycles` refreshes in a temporary directory instead; there every
+browser fails three refreshes in a row after `--fail-every` refreshes, so
+the recycle path (quit, restart, re-login) is exercised too.
+
+    python benchmarks/bench_refresh_loop.py --cycles 5000 --rows 20
+    python benchmarks/bench_refresh_loop.py --cycles 2000 --pipeline --profile
+    python benchmarks/bench_refresh_loop.py --full --cycles 200
+"""
+
+import os
+import sys
+import time
+import pstats
+import argparse
+import cProfile
+import tempfile
+import contextlib
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_WORKDIR = tempfile.mkdtemp(prefix='bench_refresh_')
+os.environ.setdefault('PAYIN_STREAM_PORT', '0')
+os.environ.setdefault('PAYIN_STORE_PATH', os.path.join(_WORKDIR, 'payins.db'))
+
+from selenium.common.exceptions import WebDriverException, TimeoutException
+
+import scraping
+from fake_webdriver import FakeWebDriver, VirtualClock, google_pay_site, use_fake_driver, ACTIVITY_URL
+
+
+class CycleLimit:
+    """stop_event stand-in: set once run_scraper has finished `cycles` refreshes; waits on the virtual clock."""
+
+    def __init__(self, cycles):
+        self.cycles = cycles
+        self.seen = 0
+
+    def is_set(self):
+        self.seen += 1
+        return self.seen > self.cycles
+
+    def wait(self, timeout=None):
+        time.sleep(timeout or 0)
+        return False
+
+
+def run_cycles(args):
+    site = google_pay_site(visible_rows=args.rows, new_per_refresh=args.new_per_refresh)
+    driver = FakeWebDriver(site)
+    driver.get(ACTIVITY_URL)
+    pipeline = None
+    if args.pipeline:
+        from payin_pipeline import PayinPipeline
+        pipeline = PayinPipeline([], set())
+
+    errors = 0
+    captured = 0
+    started = time.perf_counter()
+    for cycle in range(1, args.cycles + 1):
+        if args.fail_every and cycle % args.fail_every == 0:
+            driver.fail('refresh')
+        try:
+            capture = scraping.refresh_and_capture(driver, 'bench@example.com', 'secret', cycle)
+            captured += len(capture.rows)
+            if pipeline:
+                pipeline.submit(capture)
+        except (WebDriverException, TimeoutException):
+            errors += 1
+    elapsed = time.perf_counter() - started
+    if pipeline:
+        pipeline.close()
+    return elapsed, errors, captured, driver.calls
+
+
+def run_full(args):
+    site = google_pay_site(visible_rows=args.rows, new_per_refresh=args.new_per_refresh)
+    stop = CycleLimit(args.cycles)
+
+    def factory(site):
+        driver = FakeWebDriver(site)
+        if args.fail_every:
+            # three consecutive refresh failures make run_scraper recycle the browser
+            driver.fail('refresh', times=3, after=args.fail_every)
+        return driver
+
+    with use_fake_driver(site, factory) as drivers:
+        started = time.perf_counter()
+        scraping.run_scraper('bench@example.com', 'secret', stop_event=stop)
+        elapsed = time.perf_counter() - started
+    calls = Counter()
+    for driver in drivers:
+        calls.update(driver.calls)
+    return elapsed, len(drivers) - 1, site.state['loads'], calls
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Fake-driver refresh loop benchmark')
+    parser.add_argument('--cycles', type=int, default=2000)
+    parser.add_argument('--rows', type=int, default=20, help='transaction rows visible per page')
+    parser.add_argument('--new-per-refresh', type=int, default=1)
+    parser.add_argument('--fail-every', type=int, default=100, help='inject a refresh failure every N cycles (0 = never)')
+    parser.add_argument('--pipeline', action='store_true', help='also feed captures through PayinPipeline')
+    parser.add_argument('--full', action='store_true', help='run the complete run_scraper() instead')
+    parser.add_argument('--profile', action='store_true', help='print the top functions by cumulative time')
+    parser.add_argument('--verbose', action='store_true', help='keep the scraper output')
+    args = parser.parse_args()
+
+    os.chdir(_WORKDIR)
+    profiler = cProfile.Profile() if args.profile else None
+    quiet = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(open(os.devnull, 'w'))
+    with VirtualClock() as clock, quiet:
+        if profiler:
+            profiler.enable()
+        elapsed, errors, captured, calls = (run_full if args.full else run_cycles)(args)
+        if profiler:
+            profiler.disable()
+
+    print(f"{'run_scraper' if args.full else 'refresh_and_capture'}: {args.cycles} cycles, {args.rows} rows/page")
+    print(f"  wall time        {elapsed:.3f}s  ({args.cycles / elapsed:,.0f} cycles/s, {1000 * elapsed / args.cycles:.3f} ms/cycle)")
+    print(f"  virtual time     {clock.skipped:,.0f}s skipped (sleeps and waits)")
+    if args.full:
+        print(f"  page loads       {captured:,}   browser recycles: {errors}")
+    else:
+        print(f"  rows captured    {captured:,}   injected failures hit: {errors}")
+    print(f"  driver calls     " + ', '.join(f"{name}={count}" for name, count in sorted(calls.items(), key=lambda kv: -kv[1])))
+    if profiler:
+        pstats.Stats(profiler).sort_stats('cumulative').print_stats(20)
+
+
+if __name__ == '__main__':
+    main()
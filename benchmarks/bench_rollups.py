@@ -0,0 +1,97 @@
+"""Rollup benchmark: report latency from payin_rollups vs scanning the payins.
+
+Grows a store to each size in `--sizes` through checkpoint() - with a share of
+status changes going through updated_payins - and times the daily, hourly,
+top-payer and summary reports from the rollup table against the same
+GROUP BY over every row. Also reports what maintaining the rollups adds to a
+checkpoint, and checks the rollups equal a rebuild from scratch.
+
+    python benchmarks/bench_rollups.py --sizes 10000,100000,1000000
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from payin_store import PayinStore, ROLLUP_GRAINS, identity_key
+from payin_record import payin_changes
+from synthetic import synthetic_payin
+
+
+def timed(fn, repeat=5):
+    best = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        elapsed = (time.perf_counter() - t0) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def scan(store, grain):
+    return store._conn.execute(
+        f"SELECT {ROLLUP_GRAINS[grain]}, currency, status, COUNT(*), TOTAL(amount_value) FROM payins GROUP BY 1, 2, 3"
+    ).fetchall()
+
+
+def rollup_rows(store):
+    return {(grain, bucket, currency, status): (count, total) for grain, bucket, currency, status, count, total
+            in store._conn.execute("SELECT * FROM payin_rollups")}
+
+
+def same_rollups(a, b):
+    return a.keys() == b.keys() and all(
+        a[k][0] == b[k][0] and abs(a[k][1] - b[k][1]) <= 1e-6 * max(1, abs(b[k][1])) for k in a)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Materialized rollups vs full scans')
+    parser.add_argument('--sizes', default='10000,100000,1000000')
+    parser.add_argument('--batch', type=int, default=500, help='new payins per checkpoint')
+    parser.add_argument('--update-every', type=int, default=50, help='one status change per this many new payins')
+    args = parser.parse_args()
+    rng = random.Random(5)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = PayinStore(os.path.join(tmp, 'payins.db'))
+        size = 0
+        checkpoint_s = 0.0
+        for target in (int(s) for s in args.sizes.split(',')):
+            while size < target:
+                new = [synthetic_payin(i) for i in range(size, min(target, size + args.batch))]
+                updated = []
+                for i in rng.sample(range(size), min(size, len(new) // args.update_every)):
+                    old = synthetic_payin(i)
+                    p = dict(old, status=rng.choice(('Refunded', 'Completed', 'Failed')))
+                    updated.append((identity_key(p), p, payin_changes(old, p)))
+                t0 = time.perf_counter()
+                store.checkpoint([(identity_key(p), p) for p in new], updated_payins=updated)
+                checkpoint_s += time.perf_counter() - t0
+                size += len(new)
+
+            reports = [
+                ('daily totals', lambda: store.rollup('day'), lambda: scan(store, 'day')),
+                ('hourly inflow', lambda: store.rollup('hour', since='2025-06-01', until='2025-07-01'),
+                 lambda: scan(store, 'hour')),
+                ('top 20 payers', lambda: store.top_payers(20), lambda: scan(store, 'counterparty')),
+                ('average ticket', lambda: store.rollup_summary(), lambda: scan(store, 'all')),
+            ]
+            print(f"{size:>10,} payins ({1e6 * checkpoint_s / size:.1f} us per payin checkpointed, rollups included):")
+            for label, fast, slow in reports:
+                print(f"    {label:<15} rollup {timed(fast):8.2f} ms   full scan {timed(slow, 2):9.1f} ms")
+
+        maintained = rollup_rows(store)
+        with store._conn:
+            store.rebuild_rollups()
+        print(f"rollups match a rebuild from scratch: {same_rollups(maintained, rollup_rows(store))} "
+              f"({len(maintained):,} rollup rows)")
+        store.close()
+
+
+if __name__ == '__main__':
+    main()
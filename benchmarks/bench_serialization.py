@@ -0,0 +1,65 @@
+"""Snapshot/backup serialization benchmark: size and speed against today's output.
+
+Writes `--payins` synthetic payins the way write_snapshot() used to
+(json.dump with indent=2) and through serialization.dump_records() in every
+format available here, then reads each file back and checks the
+transactions round-trip.
+
+    python benchmarks/bench_serialization.py --payins 200000
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import serialization
+from serialization import dump_records, load
+from synthetic import synthetic_payin
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Snapshot serialization formats')
+    parser.add_argument('--payins', type=int, default=200000)
+    args = parser.parse_args()
+    records = [synthetic_payin(i, display=True) for i in range(args.payins)]
+    header = {'timestamp': time.strftime('%Y-%m-%d %H:%M:%S'), 'refresh_count': 1, 'consecutive_failures': 0,
+              'total_transactions': len(records)}
+    print(f"{args.payins:,} payins; orjson: {serialization.HAS_ORJSON}, msgpack: {serialization.HAS_MSGPACK}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        baseline = os.path.join(tmp, 'indent2.json')
+        started = time.perf_counter()
+        with open(baseline, 'w', encoding='utf-8') as f:
+            json.dump(dict(header, transactions=records), f, ensure_ascii=False, indent=2)
+        write_s = time.perf_counter() - started
+        started = time.perf_counter()
+        with open(baseline, encoding='utf-8') as f:
+            json.load(f)
+        read_s = time.perf_counter() - started
+        base_size = os.path.getsize(baseline)
+        print(f"{'today (indent=2 json)':<24} {base_size / 1e6:8.1f} MB  write {write_s * 1000:7.0f} ms  "
+              f"read {read_s * 1000:7.0f} ms")
+
+        names = ['payins.json', 'payins.json.gz']
+        if serialization.HAS_MSGPACK:
+            names += ['payins.msgpack', 'payins.msgpack.gz']
+        for name in names:
+            path = os.path.join(tmp, name)
+            started = time.perf_counter()
+            dump_records(path, header, 'transactions', records)
+            write_s = time.perf_counter() - started
+            started = time.perf_counter()
+            data = load(path)
+            read_s = time.perf_counter() - started
+            size = os.path.getsize(path)
+            print(f"{name:<24} {size / 1e6:8.1f} MB  write {write_s * 1000:7.0f} ms  read {read_s * 1000:7.0f} ms  "
+                  f"({base_size / size:.1f}x smaller, round trip ok: {data['transactions'] == records})")
+
+
+if __name__ == '__main__':
+    main()
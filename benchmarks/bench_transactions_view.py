@@ -0,0 +1,97 @@
+"""Transactions view benchmark: paging a large store the way the table view does.
+
+Fills a store with `--rows` synthetic transactions, then drives a
+TransactionPager (the Qt-free part of the desktop transactions view) like a
+scrolling QTableView: a screenful of `--visible` rows at a time, scrolling
+down, scrolling back up, jumping to random positions, for every sortable
+column and with filters. Reports per-screen latency and the peak number of
+rows held in memory, plus the cost of picking up newly inserted rows.
+
+    python benchmarks/bench_transactions_view.py --rows 1000000
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from payin_store import PayinStore, identity_key
+from transaction_pager import TransactionPager
+from synthetic import synthetic_payin
+
+
+def fill(store, rows, batch=50000):
+    started = time.perf_counter()
+    for offset in range(0, rows, batch):
+        payins = [synthetic_payin(i) for i in range(offset, min(rows, offset + batch))]
+        store.checkpoint([(identity_key(p), p) for p in payins])
+    return time.perf_counter() - started
+
+
+def screens(pager, starts, visible):
+    """Read a screenful at each start row; returns (max ms, mean ms, peak cached rows)."""
+    worst = total = 0.0
+    peak = 0
+    for start in starts:
+        t0 = time.perf_counter()
+        for i in range(start, min(pager.count, start + visible)):
+            pager.row(i)
+        elapsed = (time.perf_counter() - t0) * 1000
+        worst = max(worst, elapsed)
+        total += elapsed
+        peak = max(peak, sum(len(page) for page in pager._pages.values()))
+    return worst, total / max(1, len(starts)), peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Transactions view paging benchmark')
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--visible', type=int, default=40, help='rows on one screen')
+    parser.add_argument('--scroll', type=int, default=2000, help='screens scrolled per pass')
+    parser.add_argument('--jumps', type=int, default=50, help='random scrollbar jumps')
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = PayinStore(os.path.join(tmp, 'payins.db'))
+        print(f"filled {args.rows:,} rows in {fill(store, args.rows):.1f}s")
+
+        for sort, descending, filters in [('seq', True, {}), ('ts', True, {}), ('amount_value', False, {}),
+                                          ('status', False, {}), ('counterparty', False, {}),
+                                          ('ts', True, {'status': 'Completed'}),
+                                          ('ts', True, {'counterparty': 'Customer 12'})]:
+            pager = TransactionPager(store)
+            t0 = time.perf_counter()
+            pager.reset(sort=sort, descending=descending, filters=filters)
+            reset_ms = (time.perf_counter() - t0) * 1000
+            scroll = [i * args.visible for i in range(min(args.scroll, pager.count // args.visible + 1))]
+            down = screens(pager, scroll, args.visible)
+            up = screens(pager, list(reversed(scroll)), args.visible)
+            fetches = pager.fetches
+            jumps = screens(pager, [rng.randrange(max(1, pager.count)) for _ in range(args.jumps)], args.visible)
+            label = f"{sort} {'desc' if descending else 'asc'}" + (f" where {filters}" if filters else '')
+            print(f"{label}: {pager.count:,} rows, sort/filter {reset_ms:.1f} ms, {fetches} page fetches scrolling")
+            print(f"  scroll down  max {down[0]:.2f} ms  mean {down[1]:.3f} ms/screen")
+            print(f"  scroll up    max {up[0]:.2f} ms  mean {up[1]:.3f} ms/screen")
+            print(f"  random jump  max {jumps[0]:.2f} ms  mean {jumps[1]:.3f} ms/screen")
+            print(f"  peak rows in memory {max(down[2], up[2], jumps[2]):,}")
+
+        pager = TransactionPager(store)
+        pager.reset(sort='ts', descending=True)
+        new = [synthetic_payin(args.rows + i) for i in range(5)]
+        store.checkpoint([(identity_key(p), p) for p in new])
+        t0 = time.perf_counter()
+        change = pager.poll()
+        pager.count += len(change[1])
+        print(f"live insert of {len(new)} rows (sorted by ts): {(time.perf_counter() - t0) * 1000:.1f} ms, "
+              f"positions {change[1]}")
+        store.close()
+
+
+if __name__ == '__main__':
+    main()
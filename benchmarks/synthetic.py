@@ -0,0 +1,45 @@
+"""Synthetic transactions and the stand-in row parser shared by the benchmarks.
+
+The benchmarks run as scripts, so they import this as a sibling module:
+
+    from synthetic import synthetic_payin, bench_parse
+"""
+
+import time
+
+from html_dom import parse_html, css_select
+
+
+def synthetic_payin(i, ts=None, display=False, settled=False):
+    """Transaction dict number `i`: payer Customer i % 5000, EGP 100-9099, every 13th Pending.
+
+    Dated in 2025 from `i`, or at `ts` when given. `display` writes the date and amount the way
+    the activity page shows them ('Mar 3, 2025, 4:05 PM', 'EGP 1,234.56'); `settled` makes it Completed.
+    """
+    if ts is not None:
+        date = time.strftime('%Y-%m-%d %H:%M', time.localtime(ts))
+    elif display:
+        date = f'Mar {1 + i % 28}, 2025, {1 + i % 12}:{i % 60:02d} PM'
+    else:
+        date = f'2025-{1 + i % 12:02d}-{1 + i % 28:02d} {i % 24:02d}:{i % 60:02d}'
+    units = f'{100 + i % 9000:,}' if display else f'{100 + i % 9000}'
+    return {
+        'id': f'BCR{i:010d}',
+        'date': date,
+        'description': f'Payment from Customer {i % 5000:04d} ref INV-{i:06d}',
+        'counterparty': f'Customer {i % 5000:04d}',
+        'status': 'Pending' if i % 13 == 0 and not settled else 'Completed',
+        'amount': f'EGP {units}.{i % 100:02d}',
+    }
+
+
+def bench_parse(payloads):
+    """Stand-in for gpay_parser: cells of the captured row markup -> transaction dict."""
+    parsed = []
+    for payload in payloads:
+        row = parse_html(payload['html']).element_children()[0]
+        cells = [c.inner_text() for c in css_select(row, 'td')]
+        if len(cells) >= 4:
+            parsed.append({'id': row.attrs.get('data-row-id'), 'date': cells[0], 'description': cells[1],
+                           'status': cells[2], 'amount': cells[3]})
+    return parsed
@@ -0,0 +1,247 @@
+"""Background health watchdog for the refresh loop's Chrome session.
+
+The watchdog runs in its own thread and only touches the driver while the
+refresh loop is idle (between `cycle_finished()` and the next
+`cycle_started()`, never between `detach()` and `attach()` while the browser
+is recycled). It probes the session with a trivial, time-bounded
+script, samples the RSS of chromedriver and every Chrome process below it,
+and compares recent cycle latency with the baseline measured after the
+browser was started. The loop asks `recycle_reason()` at the top of each
+cycle and recycles the browser there, before it starts failing.
+"""
+
+import os
+import json
+import time
+import statistics
+import threading
+import collections
+from concurrent.futures import ThreadPoolExecutor, wait
+
+try:
+    import psutil
+    HAS_PSUTIL = True
+except Exception:
+    HAS_PSUTIL = False
+
+# CONFIG
+PROBE_INTERVAL = 10  # seconds between liveness probes
+PROBE_TIMEOUT = 5  # seconds before a probe counts as failed
+MAX_PROBE_FAILURES = 2  # consecutive failed probes before recycling
+MAX_RSS_MB = 1500  # chromedriver + Chrome tree
+LATENCY_WINDOW = 5  # cycles used for the baseline and for the recent median
+LATENCY_FACTOR = 2.0  # recent median / baseline median that triggers a recycle
+MIN_LATENCY_GROWTH = 5.0  # seconds; ignore ratios on very fast cycles
+MAX_BROWSER_AGE = 24 * 3600  # seconds
+RECYCLE_LOG = 'browser_recycles.jsonl'
+
+
+def _process_tree_rss(pid):
+    """Resident memory in bytes of `pid` and all its descendants, or None if unknown."""
+    if HAS_PSUTIL:
+        try:
+            root = psutil.Process(pid)
+            total = root.memory_info().rss
+            for child in root.children(recursive=True):
+                try:
+                    total += child.memory_info().rss
+                except psutil.Error:
+                    pass
+            return total
+        except psutil.Error:
+            return None
+
+    if not os.path.isdir('/proc'):
+        return None
+    children = collections.defaultdict(list)
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat', 'rb') as f:
+                # the command name may contain spaces; fields resume after the last ')'
+                ppid = int(f.read().rsplit(b')', 1)[1].split()[1])
+            children[ppid].append(int(entry))
+        except (OSError, ValueError, IndexError):
+            continue
+    page_size = os.sysconf('SC_PAGE_SIZE')
+    total, stack, found = 0, [pid], False
+    while stack:
+        current = stack.pop()
+        try:
+            with open(f'/proc/{current}/statm') as f:
+                total += int(f.read().split()[1]) * page_size
+            found = True
+        except (OSError, ValueError, IndexError):
+            pass
+        stack.extend(children.get(current, ()))
+    return total if found else None
+
+
+def _driver_pid(driver):
+    try:
+        return driver.service.process.pid
+    except Exception:
+        return None
+
+
+class BrowserWatchdog:
+    """Tracks browser health beside the refresh loop and decides when to recycle."""
+
+    def __init__(self, driver=None, probe_interval=PROBE_INTERVAL, probe_timeout=PROBE_TIMEOUT,
+                 max_rss_mb=MAX_RSS_MB, latency_factor=LATENCY_FACTOR, max_age=MAX_BROWSER_AGE,
+                 log_path=RECYCLE_LOG):
+        self.probe_interval = probe_interval
+        self.probe_timeout = probe_timeout
+        self.max_rss_mb = max_rss_mb
+        self.latency_factor = latency_factor
+        self.max_age = max_age
+        self.log_path = log_path
+        self.events = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='watchdog-probe')
+        self._thread = None
+        self._busy = False
+        self._pending = None
+        self.attach(driver)
+
+    def attach(self, driver):
+        """Start tracking a (new) driver and reset all baselines."""
+        with self._lock:
+            if self._pending is not None and not self._pending.done():
+                # A probe stuck in the old driver would hold the only worker forever
+                self._executor.shutdown(wait=False)
+                self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='watchdog-probe')
+            self.driver = driver
+            self.started_at = time.time()
+            self.latencies = collections.deque(maxlen=200)
+            self.baseline = None
+            self.rss_mb = None
+            self.probe_failures = 0
+            self.last_probe_ms = None
+            self._pending = None
+            self._probe_started = None
+            self._cycle_started = None
+
+    def detach(self):
+        """Stop probing while the browser is torn down and restarted; `attach()` the new driver after."""
+        with self._lock:
+            self._busy = True
+            self.driver = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='browser-watchdog', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=self.probe_timeout + 1)
+        self._executor.shutdown(wait=False)
+
+    # The refresh loop brackets the part of a cycle that drives the browser.
+    def cycle_started(self):
+        with self._lock:
+            self._busy = True
+            self._cycle_started = time.time()
+            probe, started = self._pending, self._probe_started
+        if probe is not None and not probe.done():
+            # Let a probe in flight finish (it is bounded) rather than drive the browser beside it
+            wait([probe], timeout=max(0.0, started + self.probe_timeout - time.time()))
+
+    def cycle_finished(self):
+        with self._lock:
+            self._busy = False
+            if self._cycle_started is None:
+                return
+            self.latencies.append(time.time() - self._cycle_started)
+            self._cycle_started = None
+            if self.baseline is None and len(self.latencies) >= LATENCY_WINDOW:
+                self.baseline = statistics.median(list(self.latencies)[:LATENCY_WINDOW])
+
+    def _run(self):
+        while not self._stop.wait(self.probe_interval):
+            # Submit under the lock (so cycle_started() sees the probe), wait for it outside
+            with self._lock:
+                if self._busy or self.driver is None:
+                    continue
+                driver = self.driver
+                probe = self._start_probe(driver)
+            if probe is not None:
+                self._finish_probe(probe)
+            pid = _driver_pid(driver)
+            rss = _process_tree_rss(pid) if pid else None
+            with self._lock:
+                if self.driver is driver:
+                    self.rss_mb = None if rss is None else rss / (1024 * 1024)
+
+    def _start_probe(self, driver):
+        """Submit a probe (lock held). None if the previous one is still stuck inside the driver."""
+        if self._pending is not None and not self._pending.done():
+            self.probe_failures += 1
+            return None
+        self._probe_started = time.time()
+        self._pending = self._executor.submit(driver.execute_script, "return 1")
+        return self._pending
+
+    def _finish_probe(self, probe):
+        started = time.perf_counter()
+        try:
+            probe.result(timeout=self.probe_timeout)
+            ok = True
+        except Exception:
+            ok = False
+        with self._lock:
+            if probe is not self._pending:
+                return  # the driver was replaced meanwhile
+            if ok:
+                self.probe_failures = 0
+                self.last_probe_ms = (time.perf_counter() - started) * 1000
+            else:
+                self.probe_failures += 1
+
+    def recycle_reason(self):
+        """Why the browser should be recycled now, or None if it looks healthy."""
+        with self._lock:
+            if self.probe_failures >= MAX_PROBE_FAILURES:
+                return f"unresponsive ({self.probe_failures} probes failed)"
+            if (self._pending is not None and not self._pending.done()
+                    and time.time() - self._probe_started > self.probe_timeout):
+                # Driving the browser now would queue behind the stuck probe
+                return f"unresponsive (probe stuck for {time.time() - self._probe_started:.0f}s)"
+            if self.rss_mb is not None and self.rss_mb > self.max_rss_mb:
+                return f"memory ({self.rss_mb:.0f} MB > {self.max_rss_mb} MB)"
+            if self.baseline is not None and len(self.latencies) >= 2 * LATENCY_WINDOW:
+                recent = statistics.median(list(self.latencies)[-LATENCY_WINDOW:])
+                if recent > self.baseline * self.latency_factor and recent - self.baseline > MIN_LATENCY_GROWTH:
+                    return f"latency ({recent:.1f}s vs baseline {self.baseline:.1f}s)"
+            age = time.time() - self.started_at
+            if self.max_age and age > self.max_age:
+                return f"age ({age / 3600:.1f}h)"
+        return None
+
+    def status(self):
+        with self._lock:
+            return {
+                'uptime': round(time.time() - self.started_at, 1),
+                'rss_mb': None if self.rss_mb is None else round(self.rss_mb, 1),
+                'probe_ms': None if self.last_probe_ms is None else round(self.last_probe_ms, 1),
+                'probe_failures': self.probe_failures,
+                'baseline_latency': self.baseline,
+                'last_latency': self.latencies[-1] if self.latencies else None,
+                'recycles': len(self.events),
+            }
+
+    def record_recycle(self, reason):
+        """Remember a recycle (and why) in memory and in the recycle log."""
+        event = {'timestamp': time.strftime('%Y-%m-%d %H:%M:%S'), 'reason': reason}
+        event.update(self.status())
+        self.events.append(event)
+        try:
+            with open(self.log_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(event) + '\n')
+        except Exception as e:
+            print(f"⚠️ Could not write recycle log: {e}")
+        return event
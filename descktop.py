@@ -1,15 +1,15 @@
 import sys
 import json
-import subprocess
 import os
 import threading
 import queue
 import time
-import io
-import contextlib
-import traceback
+import multiprocessing
 import tempfile
-from datetime import datetime
+
+# Taken before the Qt imports so the startup probe covers them
+STARTUP_T0 = time.perf_counter()
+
 from PyQt6.QtWidgets import (
     QApplication, QWidget, QVBoxLayout, QLineEdit, QPushButton,
     QLabel, QGroupBox, QFormLayout, QScrollArea, QCheckBox,
@@ -17,14 +17,18 @@ from PyQt6.QtWidgets import (
 )
 from PyQt6.QtCore import Qt, QTimer, QThread, pyqtSignal
 from PyQt6.QtGui import QFont, QPalette, QColor, QIcon, QPixmap
+from scraper_process import ScraperProcess
+from scraper_log import get_logger, start_logging
+
+# CONFIG
+GUI_LOG_PATH = os.path.join(tempfile.gettempdir(), 'desktop_gui.jsonl')  # the scraper child logs to SCRAPER_LOG_PATH
 
-# Path to your scraper file
-PYTHON_PATH = sys.executable
-SCRAPER_PATH = "scraping.py"  # Make sure this file exists in the same directory
+log = get_logger('desktop')
 
 class ScraperWorker(QThread):
-    """Worker thread to run the scraper"""
+    """Worker thread that supervises the scraper child process"""
     log_signal = pyqtSignal(str)
+    status_signal = pyqtSignal(dict)
     finished_signal = pyqtSignal(bool, str)
     
     def __init__(self, email, password, pages, auto_bypass):
@@ -44,119 +48,40 @@ class ScraperWorker(QThread):
             self.log_signal.emit(f"🤖 Auto-bypass: {self.auto_bypass}")
             self.log_signal.emit("-" * 50)
             
-            # Prefer importing and running the scraper in-process. This
-            # makes bundling into a single exe (PyInstaller) work correctly
-            # because spawning the embedded interpreter is fragile.
-
-            try:
-                import scraping
-            except Exception as exc:
-                # Log full traceback to a temp file so we can inspect runtime errors inside the frozen exe
-                try:
-                    log_dir = tempfile.gettempdir()
-                    log_path = os.path.join(log_dir, "desktop_scraper_error.log")
-                    with open(log_path, "a", encoding="utf-8") as f:
-                        f.write(f"\n--- {datetime.now().isoformat()} ---\n")
-                        traceback.print_exc(file=f)
-                except Exception:
-                    pass
-                self.finished_signal.emit(False, "Scraper is not available.")
-                return
-            if hasattr(scraping, 'run_scraper'):
-                class _Redirector:
-                    def write(inner_self, s):
-                        if s and s.strip():
-                            for ln in s.rstrip().splitlines():
-                                self.log_signal.emit(ln)
-                    def flush(inner_self):
-                        pass
-                with contextlib.redirect_stdout(_Redirector()), contextlib.redirect_stderr(_Redirector()):
-                    try:
-                        scraping.run_scraper(self.email, self.password, self.pages, self.auto_bypass)
+            # The scraper always runs in a spawned child process so it never
+            # competes with the Qt event loop for the GIL and can be stopped
+            # or killed at any time. This thread only pumps its event queue.
+            self.process = ScraperProcess(self.email, self.password, self.pages, self.auto_bypass).start()
+            
+            while True:
+                events = self.process.poll(timeout=0.2)
+                lines = [e['line'] for e in events if e['type'] == 'log']
+                if lines:
+                    # One signal per batch keeps bursts of output cheap for the UI
+                    self.log_signal.emit("\n".join(lines))
+                for event in events:
+                    if event['type'] == 'status':
+                        self.status_signal.emit(event)
+                
+                if self.process.finished:
+                    if self.process.finished['success']:
                         self.log_signal.emit("✅ Scraper completed successfully!")
-                        self.finished_signal.emit(True, "Completed successfully")
-                        return
-                    except SystemExit as se:
-                        code = getattr(se, 'code', 1) or 0
-                        if code == 0:
-                            self.log_signal.emit("✅ Scraper completed!")
-                            self.finished_signal.emit(True, "Completed successfully")
-                            return
-                        else:
-                            self.finished_signal.emit(False, f"Exit code: {code}")
-                            return
-                    except Exception:
-                        try:
-                            log_dir = tempfile.gettempdir()
-                            log_path = os.path.join(log_dir, "desktop_scraper_error.log")
-                            with open(log_path, "a", encoding="utf-8") as f:
-                                f.write(f"\n--- {datetime.now().isoformat()} IN-PROCESS RUN ERROR ---\n")
-                                traceback.print_exc(file=f)
-                        except Exception:
-                            pass
-                        self.finished_signal.emit(False, "Scraper failed to run.")
-                        return
-            else:
-                self.finished_signal.emit(False, "Scraper is not available.")
-                return
-
-
-            # Fallback: run scraper as an external process (legacy behavior)
-            if not os.path.exists(SCRAPER_PATH):
-                self.finished_signal.emit(False, "Scraper is not available.")
-                return
-
-            cmd = [
-                PYTHON_PATH, SCRAPER_PATH,
-                "--email", self.email,
-                "--password", self.password,
-                "--pages", str(self.pages)
-            ]
-            if self.auto_bypass:
-                cmd.append("--auto-bypass")
-
-            try:
-                self.process = subprocess.Popen(
-                    cmd,
-                    stdout=subprocess.PIPE,
-                    stderr=subprocess.STDOUT,
-                    text=True,
-                    bufsize=1,
-                    universal_newlines=True
-                )
-                while True:
-                    line = self.process.stdout.readline()
-                    if not line and self.process.poll() is not None:
-                        break
-                    if line:
-                        self.log_signal.emit(line.strip())
-                exit_code = self.process.returncode
-                if exit_code == 0:
-                    self.log_signal.emit("✅ Scraper completed successfully!")
-                    self.finished_signal.emit(True, "Completed successfully")
-                else:
-                    self.finished_signal.emit(False, f"Scraper failed to run.")
-            except Exception:
-                try:
-                    log_dir = tempfile.gettempdir()
-                    log_path = os.path.join(log_dir, "desktop_scraper_error.log")
-                    with open(log_path, "a", encoding="utf-8") as f:
-                        f.write(f"\n--- {datetime.now().isoformat()} SUBPROCESS RUN ERROR ---\n")
-                        traceback.print_exc(file=f)
-                except Exception:
-                    pass
-                self.finished_signal.emit(False, "Scraper failed to run.")
+                    self.finished_signal.emit(self.process.finished['success'], self.process.finished['message'])
+                    return
+                if self.process.stop_overdue():
+                    self.log_signal.emit("💀 Scraper did not stop in time - killing it")
+                    self.process.kill()
+                if not self.process.is_alive() and not events:
+                    if self.process.stop_requested_at is not None:
+                        self.log_signal.emit("🛑 Scraper process terminated by user")
+                        self.finished_signal.emit(False, "Stopped by user")
+                    else:
+                        self.finished_signal.emit(False, f"Exit code: {self.process.status()['exitcode']}")
+                    return
 
         except Exception as e:
             # Log unexpected errors
-            try:
-                log_dir = tempfile.gettempdir()
-                log_path = os.path.join(log_dir, "desktop_scraper_error.log")
-                with open(log_path, "a", encoding="utf-8") as f:
-                    f.write(f"\n--- {datetime.now().isoformat()} WORKER UNEXPECTED ERROR ---\n")
-                    traceback.print_exc(file=f)
-            except Exception:
-                pass
+            log.exception("Worker unexpected error", extra={'category': 'worker'})
             try:
                 self.log_signal.emit("💥 Error: An unexpected error occurred while running the scraper.")
             except Exception:
@@ -164,9 +89,19 @@ class ScraperWorker(QThread):
             self.finished_signal.emit(False, "Scraper failed to run.")
     
     def stop(self):
-        if self.process and self.process.poll() is None:
-            self.process.terminate()
-            self.log_signal.emit("🛑 Scraper process terminated by user")
+        """Ask the scraper to finish its current cycle, export and close the browser"""
+        if self.process and self.process.is_alive():
+            self.process.stop()
+            self.log_signal.emit("🛑 Stop requested - finishing current cycle...")
+    
+    def kill(self):
+        """Terminate the scraper and its browser immediately"""
+        if self.process and self.process.is_alive():
+            self.process.kill()
+            self.log_signal.emit("💀 Scraper process killed by user")
+    
+    def status(self):
+        return self.process.status() if self.process else {}
 
 class LogDialog(QDialog):
     """Dialog to show scraper logs"""
@@ -273,13 +208,17 @@ class LogDialog(QDialog):
         button_layout.addStretch()
         
         self.stop_button = QPushButton("🛑 Stop Process")
+        self.kill_button = QPushButton("💀 Force Kill")
         self.close_button = QPushButton("✅ Close")
         self.close_button.setObjectName("closeBtn")
+        self.kill_button.setEnabled(False)
         
         self.stop_button.clicked.connect(self.stop_scraper)
+        self.kill_button.clicked.connect(self.kill_scraper)
         self.close_button.clicked.connect(self.accept)
         
         button_layout.addWidget(self.stop_button)
+        button_layout.addWidget(self.kill_button)
         button_layout.addWidget(self.close_button)
         layout.addLayout(button_layout)
         
@@ -290,6 +229,7 @@ class LogDialog(QDialog):
         self.status_label.setText("🔄 Scraper is running...")
         self.worker = ScraperWorker(email, password, pages, auto_bypass)
         self.worker.log_signal.connect(self.add_log)
+        self.worker.status_signal.connect(self.update_status)
         self.worker.finished_signal.connect(self.scraper_finished)
         self.worker.start()
         
@@ -299,6 +239,19 @@ class LogDialog(QDialog):
         self.log_text.verticalScrollBar().setValue(
             self.log_text.verticalScrollBar().maximum()
         )
+    
+    def update_status(self, status):
+        """Show the latest status reported by the scraper process"""
+        if self.worker and self.worker.process and self.worker.process.stop_requested_at:
+            return
+        phase = status.get('phase', '')
+        if phase == 'running':
+            self.status_label.setText(
+                f"🔄 Running - refresh #{status.get('refresh_count', 0)}, "
+                f"{status.get('total_transactions', 0)} transactions"
+            )
+        elif phase:
+            self.status_label.setText(f"🔄 Scraper is {phase}...")
         
 
     def scraper_finished(self, success, message):
@@ -335,13 +288,31 @@ class LogDialog(QDialog):
                 QLabel { color: #e74c3c; font-weight: bold; }
             """)
         self.stop_button.setEnabled(False)
+        self.kill_button.setEnabled(False)
         
     def stop_scraper(self):
         """Stop the scraper"""
         if self.worker:
             self.worker.stop()
             self.stop_button.setEnabled(False)
+            self.kill_button.setEnabled(True)
             self.status_label.setText("🛑 Stopping process...")
+    
+    def kill_scraper(self):
+        """Kill the scraper without waiting for it to finish"""
+        if self.worker:
+            self.worker.kill()
+            self.kill_button.setEnabled(False)
+            self.status_label.setText("💀 Killing process...")
+    
+    def reject(self):
+        """Closing the dialog must not leave an orphaned scraper behind"""
+        self.stop_scraper()
+        super().reject()
+    
+    def accept(self):
+        self.stop_scraper()
+        super().accept()
 
 class FormWidget(QGroupBox):
     """Single form widget for email/password input"""
@@ -722,6 +693,29 @@ class MainApp(QWidget):
         self.add_btn.clicked.connect(self.add_form)
         main_layout.addWidget(self.add_btn, alignment=Qt.AlignmentFlag.AlignCenter)
 
+        # Browse everything collected so far (reads the checkpoint store)
+        self.transactions_btn = QPushButton("📒 View Collected Transactions")
+        self.transactions_btn.setStyleSheet("""
+            QPushButton {
+                background: qlineargradient(x1: 0, y1: 0, x2: 0, y2: 1,
+                    stop: 0 #2980b9, stop: 1 #3498db);
+                color: white;
+                border: none;
+                border-radius: 12px;
+                padding: 12px 30px;
+                font-size: 14px;
+                font-weight: bold;
+                margin: 0px 50px 10px 50px;
+            }
+            QPushButton:hover {
+                background: qlineargradient(x1: 0, y1: 0, x2: 0, y2: 1,
+                    stop: 0 #3498db, stop: 1 #2980b9);
+            }
+        """)
+        self.transactions_btn.clicked.connect(self.show_transactions)
+        main_layout.addWidget(self.transactions_btn, alignment=Qt.AlignmentFlag.AlignCenter)
+        self.transactions_window = None
+
         # Add first form
         self.add_form()
 
@@ -732,6 +726,16 @@ class MainApp(QWidget):
         self.forms.append(form)
         self.forms_layout.addWidget(form)
 
+    def show_transactions(self):
+        """Open (or raise) the transactions window"""
+        # Imported on first use to keep startup lean
+        from transactions_view import TransactionsWindow
+        if self.transactions_window is None or not self.transactions_window.isVisible():
+            self.transactions_window = TransactionsWindow()
+        self.transactions_window.show()
+        self.transactions_window.raise_()
+        self.transactions_window.activateWindow()
+
     def remove_form(self, form):
         """Remove a form"""
         if len(self.forms) > 1:  # Keep at least one form
@@ -763,6 +767,7 @@ class MainApp(QWidget):
 def main():
     """Main function"""
     app = QApplication(sys.argv)
+    start_logging(GUI_LOG_PATH, console=False)
     
     # Set application properties
     app.setApplicationName("Google Pay Scraper Professional")
@@ -773,7 +778,16 @@ def main():
     window = MainApp()
     window.show()
     
+    if os.environ.get('DESKTOP_SCRAPER_STARTUP_PROBE'):
+        # Report time-to-first-window for benchmarks/bench_desktop_startup.py, then exit
+        def report_startup():
+            print(f"STARTUP_MS {(time.perf_counter() - STARTUP_T0) * 1000:.1f}", flush=True)
+            app.quit()
+        QTimer.singleShot(0, report_startup)
+    
     sys.exit(app.exec())
 
 if __name__ == "__main__":
+    # Required for the scraper child process in a frozen (PyInstaller) build
+    multiprocessing.freeze_support()
     main()
\ No newline at end of file
@@ -1,4 +1,35 @@
 # -*- mode: python ; coding: utf-8 -*-
+#
+# Default build is a one-dir bundle: nothing is unpacked to a temp dir on
+# launch, so the window comes up much faster than with a one-file EXE.
+#
+#   pyinstaller desktop_scraper.spec                         -> dist/desktop_scraper/
+#   DESKTOP_SCRAPER_ONEFILE=1 pyinstaller desktop_scraper.spec -> dist/desktop_scraper.exe
+#   DESKTOP_SCRAPER_WITH_SOLVER=1 ...                         -> also bundle torch/ultralytics
+#
+# Check startup after changing imports or excludes:
+#   python benchmarks/bench_desktop_startup.py --exe dist/desktop_scraper/desktop_scraper
+import os
+
+ONEFILE = os.environ.get('DESKTOP_SCRAPER_ONEFILE') == '1'
+WITH_SOLVER = os.environ.get('DESKTOP_SCRAPER_WITH_SOLVER') == '1'
+
+# Qt modules the app never touches (it only needs QtCore, QtGui and QtWidgets).
+UNUSED_QT = [
+    'PyQt6.' + name for name in (
+        'Qt3DAnimation', 'Qt3DCore', 'Qt3DExtras', 'Qt3DInput', 'Qt3DLogic', 'Qt3DRender',
+        'QtBluetooth', 'QtCharts', 'QtDataVisualization', 'QtDBus', 'QtDesigner', 'QtHelp',
+        'QtMultimedia', 'QtMultimediaWidgets', 'QtNetwork', 'QtNfc', 'QtOpenGL',
+        'QtOpenGLWidgets', 'QtPdf', 'QtPdfWidgets', 'QtPositioning', 'QtPrintSupport',
+        'QtQml', 'QtQuick', 'QtQuick3D', 'QtQuickWidgets', 'QtRemoteObjects', 'QtSensors',
+        'QtSerialPort', 'QtSpatialAudio', 'QtSql', 'QtSvgWidgets', 'QtTest',
+        'QtTextToSpeech', 'QtWebChannel', 'QtWebEngineCore', 'QtWebEngineQuick',
+        'QtWebEngineWidgets', 'QtWebSockets', 'QtXml',
+    )
+]
+EXCLUDES = ['PyQt5', 'tkinter', 'matplotlib', 'IPython', 'notebook', 'streamlit'] + UNUSED_QT
+if not WITH_SOLVER:
+    EXCLUDES += ['torch', 'torchvision', 'ultralytics', 'cv2']
 
 
 a = Analysis(
@@ -6,33 +37,63 @@ a = Analysis(
     pathex=[],
     binaries=[],
     datas=[],
-    hiddenimports=[],
+    # The scraper is only imported inside the child process entry point.
+    hiddenimports=['scraping'],
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
-    excludes=['PyQt5'],
+    excludes=EXCLUDES,
     noarchive=False,
     optimize=0,
 )
 pyz = PYZ(a.pure)
 
-exe = EXE(
-    pyz,
-    a.scripts,
-    a.binaries,
-    a.datas,
-    [],
-    name='desktop_scraper',
-    debug=False,
-    bootloader_ignore_signals=False,
-    strip=False,
-    upx=True,
-    upx_exclude=[],
-    runtime_tmpdir=None,
-    console=True,
-    disable_windowed_traceback=False,
-    argv_emulation=False,
-    target_arch=None,
-    codesign_identity=None,
-    entitlements_file=None,
-)
+if ONEFILE:
+    exe = EXE(
+        pyz,
+        a.scripts,
+        a.binaries,
+        a.datas,
+        [],
+        name='desktop_scraper',
+        debug=False,
+        bootloader_ignore_signals=False,
+        strip=False,
+        upx=True,
+        upx_exclude=[],
+        runtime_tmpdir=None,
+        console=True,
+        disable_windowed_traceback=False,
+        argv_emulation=False,
+        target_arch=None,
+        codesign_identity=None,
+        entitlements_file=None,
+    )
+else:
+    exe = EXE(
+        pyz,
+        a.scripts,
+        [],
+        exclude_binaries=True,
+        name='desktop_scraper',
+        debug=False,
+        bootloader_ignore_signals=False,
+        strip=False,
+        # UPX-compressed DLLs have to be decompressed on every launch.
+        upx=False,
+        console=True,
+        disable_windowed_traceback=False,
+        argv_emulation=False,
+        target_arch=None,
+        codesign_identity=None,
+        entitlements_file=None,
+    )
+    coll = COLLECT(
+        exe,
+        a.binaries,
+        a.datas,
+        strip=False,
+        upx=False,
+        upx_exclude=[],
+        name='desktop_scraper',
+    )
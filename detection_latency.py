@@ -0,0 +1,111 @@
+"""How long after a payin is posted the scraper sees it.
+
+Every new payin is stamped by the pipeline with `observed_at` (the capture
+time of the refresh that first saw it) and `cycle` (that refresh's
+"run:refresh" id, as in the JSON log lines). The stamps are stored with the
+row (`first_seen`, `cycle` columns), written to snapshots and exports and
+sent with stream events.
+
+`record_detection()` compares `observed_at` with the payin's own timestamp
+and `detection_stats()` reports p50/p95/p99/max seconds, the share within
+DETECTION_SLO_S and the same figures per hour of observation, for the
+status report, the snapshot header and the stream's /stats:
+
+    {"count": 412, "p50_s": 61.2, "p95_s": 118.4, "p99_s": 240.9, "max_s": 601.3, "within_slo": 0.98,
+     "slo_s": 300, "backfill": 57, "untimed": 3, "future": 0, "hours": {"2025-10-19 08:00": {...}, ...}}
+
+The page shows times to the minute, so a latency is overstated by up to 60 s.
+Payins without a time of day are counted as `untimed`, those whose timestamp
+is ahead of the capture (clock or time zone skew) as `future`. Payins found by
+the first capture of a run were posted while nobody was watching; they are
+counted as `backfill` and kept out of the distribution.
+"""
+
+import os
+import time
+import threading
+import collections
+
+from percentiles import percentile
+
+# CONFIG
+DETECTION_SLO_S = float(os.environ.get('DETECTION_SLO_S', '300'))  # target seconds from posting to capture
+DETECTION_SAMPLES = 2000  # recent latencies kept for the overall percentiles
+DETECTION_HOURS = 24  # hourly breakdowns kept
+
+_lock = threading.Lock()
+_samples = collections.deque(maxlen=DETECTION_SAMPLES)
+_hours = collections.OrderedDict()  # 'YYYY-MM-DD HH:00' of observation -> latencies
+_counts = {'count': 0, 'backfill': 0, 'untimed': 0, 'future': 0, 'within_slo': 0}
+_last = {}
+
+
+def posted_at(payin):
+    """The payin's own timestamp when it has a time of day, else None (a bare date says nothing about latency)."""
+    timestamp = getattr(payin, 'timestamp', None)
+    if timestamp is None:
+        return None
+    if payin.time or (payin.date and ':' in payin.date):
+        return timestamp
+    return None
+
+
+def _summary(latencies):
+    values = sorted(latencies)
+    if not values:
+        return {'count': 0}
+    return {'count': len(values), 'p50_s': round(percentile(values, 50), 1), 'p95_s': round(percentile(values, 95), 1),
+            'p99_s': round(percentile(values, 99), 1), 'max_s': round(values[-1], 1)}
+
+
+def record_detection(payins, observed_at, refresh_count=None, backfill=False):
+    """Add the latencies of `payins` (Payin records first seen at `observed_at`) to the statistics."""
+    hour = time.strftime('%Y-%m-%d %H:00', time.localtime(observed_at))
+    with _lock:
+        for p in payins:
+            if backfill:
+                _counts['backfill'] += 1
+                continue
+            posted = posted_at(p)
+            if posted is None:
+                _counts['untimed'] += 1
+                continue
+            latency = observed_at - posted
+            if latency < 0:
+                _counts['future'] += 1
+                continue
+            _counts['count'] += 1
+            if latency <= DETECTION_SLO_S:
+                _counts['within_slo'] += 1
+            _samples.append(latency)
+            if hour not in _hours:
+                _hours[hour] = []
+                while len(_hours) > DETECTION_HOURS:
+                    _hours.popitem(last=False)
+            _hours[hour].append(latency)
+            del _hours[hour][:-DETECTION_SAMPLES]
+            _last.update(latency_s=round(latency, 1), refresh=refresh_count, observed_at=observed_at)
+
+
+def detection_stats():
+    """Posting-to-capture latency of the payins this process found."""
+    with _lock:
+        stats = _summary(_samples)
+        counts = dict(_counts)
+        hours = {hour: _summary(latencies) for hour, latencies in _hours.items()}
+        last = dict(_last)
+    stats.update(count=counts['count'], backfill=counts['backfill'], untimed=counts['untimed'], future=counts['future'],
+                 slo_s=DETECTION_SLO_S,
+                 within_slo=round(counts['within_slo'] / counts['count'], 4) if counts['count'] else None,
+                 last=last or None, hours=hours)
+    return stats
+
+
+def reset_detection():
+    """Forget everything recorded (benchmarks, tests)."""
+    with _lock:
+        _samples.clear()
+        _hours.clear()
+        _last.clear()
+        for name in _counts:
+            _counts[name] = 0
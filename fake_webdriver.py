@@ -0,0 +1,681 @@
+"""In-memory stand-in for the Selenium Chrome driver.
+
+`FakeWebDriver` implements the part of the `WebDriver`/`WebElement` API the
+scraper uses (get/refresh/current_url, find_element(s) by id, name, tag,
+class, CSS and XPath, click/send_keys/clear, execute_script for the scripts
+in page_state and payin_pipeline) over fixture HTML parsed with `html_dom`.
+No browser, no network: thousands of refresh cycles per second, so the
+Python side can be profiled on its own.
+
+    site = FakeSite()
+    site.add_page(SIGNIN_URL, LOGIN_HTML)
+    site.add_page(ACTIVITY_URL, lambda driver: render_activity(rows))
+    site.on_click('#identifierNext', ACTIVITY_URL)
+    driver = FakeWebDriver(site)
+    driver.fail('refresh', times=2)            # next two refreshes raise WebDriverException
+    driver.fail('find_element', TimeoutException, after=10)
+
+`use_fake_driver(site)` swaps `scraping.create_driver`, so `run_scraper`,
+`restart_driver` and `recycle_browser` get fakes too, and `VirtualClock`
+turns the scraper's sleeps and WebDriverWait timeouts into instant clock
+jumps.
+
+Tabs (`switch_to.new_window('tab')`, `switch_to.window`, `close`) each keep
+their own page. With `load_delay` set, `get`/`refresh` take that long and a
+navigation started from a script (`location.assign`) completes that long
+later, blocking only the next command in its own tab, like chromedriver;
+`set_html_later` applies an in-page update (XHR) after a delay without
+blocking.
+"""
+
+import time
+import contextlib
+from collections import Counter
+from urllib.parse import urljoin, urldefrag
+
+from selenium.webdriver.common.by import By
+from selenium.common.exceptions import (
+    WebDriverException, NoSuchElementException, StaleElementReferenceException,
+    NoSuchFrameException
+)
+
+from html_dom import parse_html, css_select, css_matches, xpath_select, root_of
+from page_state import CLASSIFY_SCRIPT
+from payin_pipeline import CAPTURE_SCRIPT
+
+RETURN_KEYS = ('\ue006', '\ue007')  # Keys.RETURN, Keys.ENTER
+ERROR_PAGE_URL = 'chrome-error://chromewebdata/'
+ERROR_PAGE_HTML = '<html><body><div id="main-frame-error"><h1>This site can\'t be reached</h1></div></body></html>'
+
+
+class FakeSite:
+    """Fixture pages plus the scripted transitions between them."""
+
+    def __init__(self, pages=None):
+        self.pages = dict(pages or {})  # url -> html string or callable(driver) -> html
+        self.redirects = {}  # url -> url or callable(driver) -> url/None
+        self.click_actions = []  # (css selector, url or callable(driver, element))
+        self.submit_actions = []  # Enter pressed inside a matching element
+        self.unreachable = set()  # urls that raise net::ERR_NAME_NOT_RESOLVED
+
+    def add_page(self, url, html):
+        self.pages[url] = html
+        return self
+
+    def redirect(self, url, target):
+        """Send `url` to `target` (e.g. the activity page to sign-in when the session expired)."""
+        self.redirects[url] = target
+        return self
+
+    def on_click(self, selector, action):
+        """Clicking an element matching `selector` navigates to `action` or calls it."""
+        self.click_actions.append((selector, action))
+        return self
+
+    def on_submit(self, selector, action):
+        self.submit_actions.append((selector, action))
+        return self
+
+    def resolve(self, driver, url):
+        """Follow redirects; returns (final url, html) or raises like chromedriver."""
+        for _ in range(10):
+            target = self.redirects.get(url)
+            if callable(target):
+                target = target(driver)
+            if not target:
+                break
+            url = target
+        if url in self.unreachable:
+            raise WebDriverException(f"unknown error: net::ERR_NAME_NOT_RESOLVED\n  (Session info: url={url})")
+        page = self.pages.get(url)
+        if page is None:
+            page = self.pages.get(urldefrag(url)[0].split('?')[0])
+        if page is None:
+            return ERROR_PAGE_URL, ERROR_PAGE_HTML
+        return url, page(driver) if callable(page) else page
+
+
+class VirtualClock:
+    """Patches time.sleep/time.time/time.monotonic so sleeping only advances a virtual offset."""
+
+    def __init__(self):
+        self.skipped = 0.0
+        self._saved = None
+
+    def sleep(self, seconds):
+        self.skipped += max(0.0, seconds)
+        self._real_sleep(0)
+
+    def time(self):
+        return self._real_time() + self.skipped
+
+    def monotonic(self):
+        return self._real_monotonic() + self.skipped
+
+    def __enter__(self):
+        self._saved = (time.sleep, time.time, time.monotonic)
+        self._real_sleep, self._real_time, self._real_monotonic = self._saved
+        time.sleep, time.time, time.monotonic = self.sleep, self.time, self.monotonic
+        return self
+
+    def __exit__(self, *exc):
+        time.sleep, time.time, time.monotonic = self._saved
+        return False
+
+
+class _Failure:
+    __slots__ = ('command', 'error', 'times', 'after')
+
+    def __init__(self, command, error, times, after):
+        self.command = command
+        self.error = error
+        self.times = times
+        self.after = after
+
+
+class FakeWebElement:
+    """WebElement over an html_dom node of the driver's current document."""
+
+    def __init__(self, driver, node):
+        self.parent = driver
+        self._node = node
+        self.id = f"fake-{node.order}"
+
+    def _live(self, command):
+        self.parent._command(command)
+        if root_of(self._node) is not self.parent.document:
+            raise StaleElementReferenceException("stale element reference: element is not attached to the page document")
+        return self._node
+
+    @property
+    def tag_name(self):
+        return self._live('tag_name').tag
+
+    @property
+    def text(self):
+        node = self._live('text')
+        return '' if node.is_hidden() else node.inner_text()
+
+    def get_attribute(self, name):
+        node = self._live('get_attribute')
+        if name == 'outerHTML':
+            return node.outer_html()
+        if name == 'innerHTML':
+            return node.inner_html()
+        if name == 'textContent':
+            return node.text_content
+        if name == 'innerText':
+            return node.inner_text()
+        if name == 'value' and node.tag in ('input', 'textarea'):
+            return node.attrs.get('value', '')
+        return node.attrs.get(name)
+
+    get_property = get_attribute
+
+    def get_dom_attribute(self, name):
+        return self._live('get_dom_attribute').attrs.get(name)
+
+    def is_displayed(self):
+        return not self._live('is_displayed').is_hidden()
+
+    def is_enabled(self):
+        return 'disabled' not in self._live('is_enabled').attrs
+
+    def is_selected(self):
+        node = self._live('is_selected')
+        return 'checked' in node.attrs or 'selected' in node.attrs
+
+    def click(self):
+        node = self._live('click')
+        if 'disabled' not in node.attrs:
+            self.parent._activate(node, self.parent.site.click_actions, follow_links=True)
+
+    def send_keys(self, *values):
+        node = self._live('send_keys')
+        for value in values:
+            text = ''.join(value) if isinstance(value, (list, tuple)) else str(value)
+            for key in RETURN_KEYS:
+                if key in text:
+                    node.attrs['value'] = node.attrs.get('value', '') + text.split(key)[0]
+                    self.parent._activate(node, self.parent.site.submit_actions, follow_links=False)
+                    return
+            node.attrs['value'] = node.attrs.get('value', '') + text
+
+    def clear(self):
+        self._live('clear').attrs['value'] = ''
+
+    def submit(self):
+        self.send_keys(RETURN_KEYS[0])
+
+    def find_element(self, by=By.ID, value=None):
+        return self.parent._find(self._live('find_element'), by, value, single=True)
+
+    def find_elements(self, by=By.ID, value=None):
+        return self.parent._find(self._live('find_elements'), by, value, single=False)
+
+    @property
+    def location(self):
+        return {'x': 0, 'y': self._node.order}
+
+    @property
+    def size(self):
+        return {'width': 100, 'height': 20}
+
+    @property
+    def rect(self):
+        return {**self.location, **self.size}
+
+    def __eq__(self, other):
+        return isinstance(other, FakeWebElement) and other._node is self._node
+
+    def __hash__(self):
+        return hash(id(self._node))
+
+    def __repr__(self):
+        return f"<FakeWebElement {self._node.tag} {self._node.attrs}>"
+
+
+class _SwitchTo:
+    def __init__(self, driver):
+        self._driver = driver
+
+    def default_content(self):
+        self._driver._command('switch_to')
+
+    def parent_frame(self):
+        self._driver._command('switch_to')
+
+    def frame(self, reference):
+        self._driver._command('switch_to')
+        if isinstance(reference, str) and not css_select(self._driver.document, f"iframe#{reference}, iframe[name='{reference}']"):
+            raise NoSuchFrameException(f"no such frame: {reference}")
+
+    def window(self, handle):
+        self._driver._command('switch_to', settle=False)
+        if handle not in self._driver.window_handles:
+            raise WebDriverException(f"no such window: {handle}")
+        self._driver._switch(handle)
+
+    def new_window(self, type_hint=None):
+        self._driver._command('new_window', settle=False)
+        self._driver._switch(self._driver._open_window())
+
+    @property
+    def active_element(self):
+        return FakeWebElement(self._driver, self._driver.document)
+
+
+class FakeWebDriver:
+    """Selenium-compatible driver navigating a FakeSite."""
+
+    def __init__(self, site=None, start_url='data:,'):
+        self.site = site or FakeSite()
+        self.calls = Counter()  # round trips per command, for profiling
+        self.session_id = 'fake-session'
+        self.service = None  # no chromedriver process: the watchdog skips RSS sampling
+        self.window_handles = ['fake-window']
+        self.current_window_handle = 'fake-window'
+        self.switch_to = _SwitchTo(self)
+        self.load_delay = 0.0  # seconds per page load
+        self._windows = {}  # handle -> saved page state of the tabs in the background
+        self._pending = None  # (due, 'load' url | 'html' html) of the current tab
+        self.scripts = {}  # exact script text or substring -> callable(driver, *args)
+        self.epoch = 0  # DOM mutations since the last navigation (MutationObserver counter)
+        self.navigations = 0
+        self._failures = []
+        self._dead = None
+        self._url = start_url
+        self.document = parse_html('<html><body></body></html>')
+        self._install_default_scripts()
+
+    # Failure injection
+    def fail(self, command, error=None, times=1, after=0):
+        """Make the next `times` calls of `command` ('*' for any) raise `error` after `after` clean calls.
+
+        `error` is an exception instance or class (WebDriverException by default); `times=None` fails forever.
+        """
+        self._failures.append(_Failure(command, error, times, after))
+        return self
+
+    def crash(self, message='invalid session id'):
+        """Simulate a dead browser: every later command raises WebDriverException."""
+        self._dead = message
+
+    def _command(self, name, settle=True):
+        self.calls[name] += 1
+        if self._dead:
+            raise WebDriverException(self._dead)
+        if settle and self._pending:
+            self._settle()
+        for failure in self._failures:
+            if failure.command not in (name, '*'):
+                continue
+            if failure.after > 0:
+                failure.after -= 1
+                continue
+            if failure.times is not None:
+                failure.times -= 1
+                if failure.times <= 0:
+                    self._failures.remove(failure)
+            error = failure.error or WebDriverException
+            if isinstance(error, type):
+                error = error(f"injected {name} failure")
+            raise error
+
+    # Tabs
+    def _open_window(self):
+        handle = f'fake-window-{len(self.window_handles) + len(self._windows)}'
+        while handle in self.window_handles:
+            handle += '+'
+        self.window_handles.append(handle)
+        self._windows[handle] = ('about:blank', parse_html('<html><body></body></html>'), 0, None)
+        return handle
+
+    def _switch(self, handle):
+        if handle == self.current_window_handle:
+            return
+        if self.current_window_handle in self.window_handles:
+            self._windows[self.current_window_handle] = (self._url, self.document, self.epoch, self._pending)
+        self._url, self.document, self.epoch, self._pending = self._windows.pop(handle)
+        self.current_window_handle = handle
+
+    # Navigation
+    def _load(self, url):
+        final_url, html = self.site.resolve(self, url)
+        self._url = final_url
+        self.document = parse_html(html)
+        self.epoch = 0
+        self.navigations += 1
+
+    def _settle(self):
+        """Finish the current tab's pending navigation (waiting for it) or a due in-page update."""
+        due, kind, value = self._pending
+        wait = due - time.monotonic()
+        if kind == 'html' and wait > 0:
+            return
+        self._pending = None
+        if kind == 'load':
+            if wait > 0:
+                time.sleep(wait)
+            self._load(value)
+        else:
+            self.set_html(value(self) if callable(value) else value)
+
+    def navigate_later(self, url, delay=None):
+        """Start loading `url` in the current tab without waiting (a navigation started by a script)."""
+        self._pending = (time.monotonic() + (self.load_delay if delay is None else delay), 'load', url)
+
+    def set_html_later(self, html, delay=None):
+        """Replace the DOM after `delay` seconds (default `load_delay`), like an XHR-driven list update."""
+        self._pending = (time.monotonic() + (self.load_delay if delay is None else delay), 'html', html)
+
+    def get(self, url):
+        self._command('get')
+        self._pending = None
+        if self.load_delay:
+            time.sleep(self.load_delay)
+        self._load(url)
+
+    def refresh(self):
+        self._command('refresh')
+        self._pending = None
+        if self.load_delay:
+            time.sleep(self.load_delay)
+        self._load(self._url)
+
+    def back(self):
+        self._command('back')
+
+    def set_html(self, html):
+        """Replace the DOM in place, like a single-page app update (bumps the mutation epoch)."""
+        self.document = parse_html(html)
+        self.epoch += 1
+
+    @property
+    def current_url(self):
+        self._command('current_url')
+        return self._url
+
+    @property
+    def title(self):
+        self._command('title')
+        titles = css_select(self.document, 'title')
+        return titles[0].text_content.strip() if titles else ''
+
+    @property
+    def page_source(self):
+        self._command('page_source')
+        return self.document.inner_html()
+
+    def _activate(self, node, actions, follow_links):
+        target = node
+        while target is not None and target.tag != '#document':
+            for selector, action in actions:
+                if css_matches(target, selector):
+                    if callable(action):
+                        action(self, FakeWebElement(self, node))
+                    else:
+                        self._load(action)
+                    return True
+            target = target.parent
+        if follow_links:
+            target = node
+            while target is not None and target.tag != '#document':
+                if target.tag == 'a' and target.attrs.get('href'):
+                    self._load(urljoin(self._url, target.attrs['href']))
+                    return True
+                target = target.parent
+        return False
+
+    # Lookup
+    def _find(self, context, by, value, single):
+        if by == By.ID:
+            nodes = [n for n in context.iter() if n.attrs.get('id') == value]
+        elif by == By.NAME:
+            nodes = [n for n in context.iter() if n.attrs.get('name') == value]
+        elif by == By.TAG_NAME:
+            nodes = [n for n in context.iter() if n.tag == value.lower()]
+        elif by == By.CLASS_NAME:
+            nodes = [n for n in context.iter() if value in n.classes]
+        elif by == By.CSS_SELECTOR:
+            nodes = css_select(context, value)
+        elif by == By.XPATH:
+            nodes = xpath_select(context, value)
+        elif by in (By.LINK_TEXT, By.PARTIAL_LINK_TEXT):
+            exact = by == By.LINK_TEXT
+            nodes = [n for n in context.iter() if n.tag == 'a' and
+                     (n.inner_text() == value if exact else value in n.inner_text())]
+        else:
+            raise WebDriverException(f"invalid locator: {by}")
+        if single:
+            if not nodes:
+                raise NoSuchElementException(f"no such element: Unable to locate element: {{\"method\":\"{by}\",\"selector\":\"{value}\"}}")
+            return FakeWebElement(self, nodes[0])
+        return [FakeWebElement(self, n) for n in nodes]
+
+    def find_element(self, by=By.ID, value=None):
+        self._command('find_element')
+        return self._find(self.document, by, value, single=True)
+
+    def find_elements(self, by=By.ID, value=None):
+        self._command('find_elements')
+        return self._find(self.document, by, value, single=False)
+
+    # Scripts
+    def on_script(self, script, handler):
+        """Answer `execute_script` calls whose text equals or contains `script`."""
+        self.scripts[script] = handler
+
+    def _install_default_scripts(self):
+        self.scripts.update({
+            CLASSIFY_SCRIPT: _classify_script,
+            CAPTURE_SCRIPT: _capture_script,
+            'return 1': lambda driver: 1,
+            'window.location.assign(': lambda driver, url, *a: driver.navigate_later(url),
+            'arguments[0].click()': lambda driver, element, *a: element.click(),
+            'scrollIntoView': lambda driver, *a: None,
+            'Object.defineProperty(navigator': lambda driver, *a: None,
+            '.JYXaTc': _primary_action_script,
+        })
+
+    def execute_script(self, script, *args):
+        self._command('execute_script')
+        handler = self.scripts.get(script)
+        if handler is None:
+            handler = next((h for text, h in self.scripts.items() if text in script), None)
+        if handler is None:
+            return None
+        return handler(self, *args)
+
+    execute_async_script = execute_script
+
+    # Session
+    def save_screenshot(self, filename):
+        self._command('save_screenshot')
+        return True
+
+    get_screenshot_as_file = save_screenshot
+
+    def get_cookies(self):
+        self._command('get_cookies')
+        return []
+
+    def delete_all_cookies(self):
+        self._command('delete_all_cookies')
+
+    def implicitly_wait(self, seconds):
+        self._command('implicitly_wait')
+
+    def set_page_load_timeout(self, seconds):
+        self._command('set_page_load_timeout')
+
+    def maximize_window(self):
+        self._command('maximize_window')
+
+    def close(self):
+        """Close the current tab; switch to another handle before the next command, as with Selenium."""
+        self._command('close', settle=False)
+        if self.current_window_handle in self.window_handles:
+            self.window_handles.remove(self.current_window_handle)
+        self._pending = None
+        if not self.window_handles:
+            self._dead = 'no such window: target window already closed'
+
+    def quit(self):
+        self.calls['quit'] += 1
+        self._dead = 'invalid session id: session deleted because of page crash'
+
+
+def _classify_script(driver, row_selector, fingerprint_rows):
+    """Python twin of page_state.CLASSIFY_SCRIPT."""
+    doc = driver.document
+    rows = css_select(doc, row_selector)
+    heading = login = error = False
+    has_body = False
+    for node in doc.iter():
+        tag = node.tag
+        if tag == 'h1' and not heading:
+            text = node.text_content
+            heading = 'Activity' in text or 'Transactions' in text or 'History' in text
+        elif tag == 'body':
+            has_body = True
+        if node.attrs:
+            node_id = node.attrs.get('id')
+            login = login or node_id == 'identifierId' or (tag == 'input' and node.attrs.get('name') == 'Passwd')
+            error = error or node_id == 'main-frame-error'
+    hashed = 5381
+    for row in rows[:fingerprint_rows]:
+        scale, term = _djb2_terms(row.text_content)
+        hashed = (hashed * scale + term) & 0xFFFFFFFF
+    return {
+        'url': driver._url,
+        'rowCount': len(rows),
+        'heading': heading,
+        'login': login,
+        'error': not has_body or error or driver._url.startswith('chrome-error://'),
+        'fingerprint': format(hashed, 'x'),
+        'epoch': driver.epoch,
+    }
+
+
+_djb2_cache = {}
+
+
+def _djb2_terms(text):
+    """(33**len, contribution) of `text` to the 32-bit djb2 hash over UTF-16 code units, memoized:
+    rows repeat across refreshes, and djb2 composes as hash * 33**len + contribution."""
+    terms = _djb2_cache.get(text)
+    if terms is None:
+        data = text.encode('utf-16-le')
+        term = 0
+        for i in range(0, len(data), 2):
+            term = (term * 33 + (data[i] | data[i + 1] << 8)) & 0xFFFFFFFF
+        terms = (pow(33, len(data) // 2, 1 << 32), term)
+        if len(_djb2_cache) > 100000:
+            _djb2_cache.clear()
+        _djb2_cache[text] = terms
+    return terms
+
+
+def _capture_script(driver, selectors):
+    """Python twin of payin_pipeline.CAPTURE_SCRIPT."""
+    doc = driver.document
+    rows, used = [], None
+    for selector in selectors:
+        rows = css_select(doc, selector)
+        if rows:
+            used = selector
+            break
+    if not rows:
+        rows = css_select(doc, 'body tr')
+        used = 'body tr' if rows else None
+    out = []
+    for row in rows:
+        cells = css_select(row, 'td, th, [role=cell], [role=gridcell]')
+        out.append({'tag': row.tag, 'text': row.inner_text() or row.text_content, 'html': row.outer_html(),
+                    'attrs': dict(row.attrs), 'cells': [c.inner_text() or c.text_content for c in cells]})
+    return {'selector': used, 'rows': out}
+
+
+def _primary_action_script(driver, *args):
+    found = css_select(driver.document, '.JYXaTc')
+    return found[0].attrs.get('data-is-primary-action-disabled') if found else None
+
+
+@contextlib.contextmanager
+def use_fake_driver(site, factory=None):
+    """Make scraping.create_driver hand out FakeWebDrivers on `site`; yields the list of drivers created."""
+    import scraping
+    created = []
+    original = scraping.create_driver
+
+    def create_driver(chrome_options=None):
+        driver = factory(site) if factory else FakeWebDriver(site)
+        created.append(driver)
+        return driver
+
+    scraping.create_driver = create_driver
+    try:
+        yield created
+    finally:
+        scraping.create_driver = original
+
+
+# ----------------------
+# Fixture pages
+# ----------------------
+SIGNIN_URL = 'https://accounts.google.com/signin/v2/identifier'
+PASSWORD_URL = 'https://accounts.google.com/signin/v2/challenge/pwd'
+ACTIVITY_URL = 'https://pay.google.com/gp/w/u/0/home/activity'
+
+LOGIN_HTML = """<html><head><title>Sign in</title></head><body>
+<form><input type="email" id="identifierId" name="identifier">
+<div id="identifierNext"><button type="button"><span>Next</span></button></div></form>
+</body></html>"""
+
+PASSWORD_HTML = """<html><head><title>Sign in</title></head><body>
+<form><input type="password" name="Passwd">
+<div id="passwordNext"><button type="button"><span>Next</span></button></div></form>
+</body></html>"""
+
+
+def render_activity(rows):
+    """Activity page HTML for a list of row dicts (id, date, description, status, amount)."""
+    body = ''.join(
+        f'<tr data-row-id="{r["id"]}"><td>{r["date"]}</td><td>{r["description"]}</td>'
+        f'<td>{r["status"]}</td><td>{r["amount"]}</td></tr>'
+        for r in rows
+    )
+    return (f'<html><head><title>Google Pay</title></head><body><h1>Activity</h1>'
+            f'<table><tbody>{body}</tbody></table></body></html>')
+
+
+def synthetic_row(i):
+    return {
+        'id': f'BCR{i:010d}',
+        'date': f'Sep {1 + i % 28}, 2025, {1 + i % 12}:{i % 60:02d} PM',
+        'description': f'Payment from customer {i % 5000}',
+        'status': 'Completed' if i % 7 else 'Pending',
+        'amount': f'EGP {100 + i % 9000}.{i % 100:02d}',
+    }
+
+
+def google_pay_site(visible_rows=20, new_per_refresh=1):
+    """Sign-in -> password -> activity site whose list gains `new_per_refresh` rows on every load."""
+    site = FakeSite()
+    state = {'loads': 0}
+
+    def activity(driver):
+        state['loads'] += 1
+        newest = state['loads'] * new_per_refresh + visible_rows
+        return render_activity(synthetic_row(i) for i in range(newest, newest - visible_rows, -1))
+
+    site.add_page(SIGNIN_URL, LOGIN_HTML)
+    site.add_page(PASSWORD_URL, PASSWORD_HTML)
+    site.add_page(ACTIVITY_URL, activity)
+    site.on_click('#identifierNext', PASSWORD_URL)
+    site.on_submit('#identifierId', PASSWORD_URL)
+    site.on_click('#passwordNext', ACTIVITY_URL)
+    site.on_submit("input[name='Passwd']", ACTIVITY_URL)
+    site.state = state
+    return site
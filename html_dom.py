@@ -0,0 +1,642 @@
+"""Tiny in-process DOM with the CSS and XPath subsets the scraper uses.
+
+Built on the stdlib HTML parser so it works anywhere the scraper's own
+modules do. It lets captured row HTML be queried like a live element
+(`payin_pipeline.RawRow`) and backs `fake_webdriver.FakeWebDriver`.
+
+Supported CSS: `tag`, `*`, `#id`, `.class`, `[attr]`, `[attr=v]`, `[attr*=v]`,
+`[attr^=v]`, `[attr$=v]`, `[attr~=v]`, descendant and `>` combinators,
+comma groups.
+
+Supported XPath: `|` unions; `//`, `/`, `.//`, `./` steps with name tests
+or `*`; predicates combining `contains()`, `starts-with()`, `normalize-space()`,
+`not()`, `=`/`!=`, `and`/`or`, over `@attr`, `text()`, `.`, nested relative
+paths and positional `[n]`.
+"""
+
+import re
+from html import unescape
+
+VOID_TAGS = frozenset(('area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta',
+                       'param', 'source', 'track', 'wbr'))
+BLOCK_TAGS = frozenset(('address', 'article', 'aside', 'blockquote', 'div', 'dl', 'dt', 'dd', 'fieldset',
+                        'figure', 'footer', 'form', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'header', 'hr',
+                        'li', 'main', 'nav', 'ol', 'p', 'pre', 'section', 'table', 'tbody', 'thead',
+                        'tfoot', 'tr', 'ul'))
+SKIP_TEXT_TAGS = frozenset(('script', 'style', 'template', 'head', 'title'))
+
+
+class Node:
+    """Element node; text children are plain strings."""
+
+    __slots__ = ('tag', 'attrs', 'children', 'parent', 'order', 'end', 'doc')
+
+    def __init__(self, tag, attrs=None, parent=None, order=0):
+        self.tag = tag
+        self.attrs = attrs or {}
+        self.children = []
+        self.parent = parent
+        self.order = order
+        self.end = None  # order of the last descendant, set by parse_html
+        self.doc = None  # every element of the parsed document in order, set by parse_html
+
+    def iter(self):
+        """Descendant elements in document order (self excluded)."""
+        if self.doc is not None:
+            # Descendants are the contiguous run after this node in document order.
+            return iter(self.doc[self.order + 1:self.end + 1])
+        return self._walk()
+
+    def _walk(self):
+        stack = [c for c in reversed(self.children) if isinstance(c, Node)]
+        while stack:
+            node = stack.pop()
+            yield node
+            stack.extend(c for c in reversed(node.children) if isinstance(c, Node))
+
+    def element_children(self):
+        return [c for c in self.children if isinstance(c, Node)]
+
+    @property
+    def classes(self):
+        return self.attrs.get('class', '').split()
+
+    @property
+    def own_text(self):
+        return ''.join(c for c in self.children if isinstance(c, str))
+
+    @property
+    def text_content(self):
+        parts = []
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            if isinstance(node, str):
+                parts.append(node)
+            else:
+                stack.extend(reversed(node.children))
+        return ''.join(parts)
+
+    def hides_itself(self):
+        """True if this element's own tag or attributes hide it (ancestors not considered)."""
+        if self.tag in SKIP_TEXT_TAGS:
+            return True
+        attrs = self.attrs
+        if not attrs:
+            return False
+        if 'hidden' in attrs or attrs.get('type') == 'hidden':
+            return True
+        style = attrs.get('style')
+        if style:
+            style = style.replace(' ', '').lower()
+            return 'display:none' in style or 'visibility:hidden' in style
+        return False
+
+    def is_hidden(self):
+        node = self
+        while node is not None and node.tag != '#document':
+            if node.hides_itself():
+                return True
+            node = node.parent
+        return False
+
+    def inner_text(self):
+        """Approximation of the browser's innerText: visible text, one line per block, tabs between cells."""
+        lines, current = [], []
+
+        def flush():
+            cells = (' '.join(cell.split()) for cell in ''.join(current).split('\x00'))
+            line = '\t'.join(cell for cell in cells if cell)
+            if line:
+                lines.append(line)
+            current.clear()
+
+        def walk(node):
+            for child in node.children:
+                if isinstance(child, str):
+                    current.append(child)
+                    continue
+                if child.hides_itself():
+                    continue
+                if child.tag == 'br':
+                    flush()
+                elif child.tag in BLOCK_TAGS:
+                    flush()
+                    walk(child)
+                    flush()
+                elif child.tag in ('td', 'th'):
+                    walk(child)
+                    current.append('\x00')
+                else:
+                    walk(child)
+
+        walk(self)
+        flush()
+        return '\n'.join(lines)
+
+    def outer_html(self):
+        attrs = ''.join(f' {k}="{_escape(v, True)}"' if v is not None else f' {k}' for k, v in self.attrs.items())
+        if self.tag in VOID_TAGS:
+            return f"<{self.tag}{attrs}>"
+        return f"<{self.tag}{attrs}>{self.inner_html()}</{self.tag}>"
+
+    def inner_html(self):
+        return ''.join(_escape(c) if isinstance(c, str) else c.outer_html() for c in self.children)
+
+    def __repr__(self):
+        return f"<Node {self.tag} {self.attrs}>"
+
+
+def _escape(text, attr=False):
+    text = text.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
+    return text.replace('"', '&quot;') if attr else text
+
+
+_TOKEN_RE = re.compile(
+    r"<!--.*?-->|<![^>]*>|<\?[^>]*>"
+    r"|<(/?)([a-zA-Z][^\s/>]*)((?:[^>\"']|\"[^\"]*\"|'[^']*')*)>"
+    r"|[^<]+|<", re.S)
+_ATTR_PAIR_RE = re.compile(r"""([^\s=/>"']+)(?:\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s>]+)))?""")
+RAW_TEXT_TAGS = frozenset(('script', 'style', 'textarea', 'title'))
+_SELF_NESTING = frozenset(('li', 'tr', 'td', 'th', 'p', 'option'))
+
+
+def _parse_attrs(text):
+    attrs = {}
+    for m in _ATTR_PAIR_RE.finditer(text):
+        value = next((g for g in m.group(2, 3, 4) if g is not None), '')
+        attrs[m.group(1).lower()] = unescape(value) if '&' in value else value
+    return attrs
+
+
+def parse_html(html):
+    """Parse an HTML string into a '#document' Node (regex tokenizer, forgiving like a browser)."""
+    html = html or ''
+    root = Node('#document')
+    stack = [root]
+    nodes = [root]
+    counter = 0
+    pos = 0
+    match = _TOKEN_RE.match
+    while pos < len(html):
+        m = match(html, pos)
+        pos = m.end()
+        tag = m.group(2)
+        if tag is None:
+            token = m.group(0)
+            if not token.startswith(('<!', '<?')) or token == '<':
+                stack[-1].children.append(unescape(token) if '&' in token else token)
+            continue
+        tag = tag.lower()
+        if m.group(1):
+            for i in range(len(stack) - 1, 0, -1):
+                if stack[i].tag == tag:
+                    for closed in stack[i:]:
+                        closed.end = counter
+                    del stack[i:]
+                    break
+            continue
+        # Implicitly close elements that cannot nest in themselves.
+        if tag in _SELF_NESTING and stack[-1].tag == tag:
+            stack.pop().end = counter
+        raw_attrs = m.group(3)
+        counter += 1
+        node = Node(tag, _parse_attrs(raw_attrs) if raw_attrs.strip(' /') else {}, stack[-1], counter)
+        node.end = counter
+        stack[-1].children.append(node)
+        nodes.append(node)
+        if tag in VOID_TAGS or raw_attrs.endswith('/'):
+            continue
+        if tag in RAW_TEXT_TAGS:
+            close_tag = re.compile(f'</{tag}', re.I).search(html, pos)
+            end = close_tag.start() if close_tag else len(html)
+            if end > pos:
+                node.children.append(html[pos:end])
+            close = html.find('>', end)
+            pos = len(html) if close < 0 else close + 1
+            continue
+        stack.append(node)
+    for node in stack:
+        node.end = counter
+    for node in nodes:
+        node.doc = nodes
+    return root
+
+
+def root_of(node):
+    while node.parent is not None:
+        node = node.parent
+    return node
+
+
+def _unique_in_order(nodes):
+    seen = set()
+    out = []
+    for node in nodes:
+        if id(node) not in seen:
+            seen.add(id(node))
+            out.append(node)
+    out.sort(key=lambda n: n.order)
+    return out
+
+
+# ----------------------
+# CSS selectors
+# ----------------------
+_ATTR_RE = re.compile(r"""\[\s*([\w:-]+)\s*(?:([*^$~|]?=)\s*(?:"([^"]*)"|'([^']*)'|([^\]\s]+)))?\s*\]""")
+_SIMPLE_RE = re.compile(r"([#.]?)([\w-]+|\*)")
+
+_css_cache = {}
+
+
+def _split_outside(text, sep):
+    parts, depth, quote, current = [], 0, None, []
+    for ch in text:
+        if quote:
+            if ch == quote:
+                quote = None
+        elif ch in '"\'':
+            quote = ch
+        elif ch in '[(':
+            depth += 1
+        elif ch in '])':
+            depth -= 1
+        elif ch == sep and depth == 0:
+            parts.append(''.join(current))
+            current = []
+            continue
+        current.append(ch)
+    parts.append(''.join(current))
+    return parts
+
+
+def _parse_compound(text):
+    tag, ids, classes, attrs = None, [], [], []
+    pos = 0
+    while pos < len(text):
+        if text[pos] == '[':
+            m = _ATTR_RE.match(text, pos)
+            if not m:
+                raise ValueError(f"Unsupported selector: {text!r}")
+            value = next((g for g in m.group(3, 4, 5) if g is not None), None)
+            attrs.append((m.group(1), m.group(2), value))
+            pos = m.end()
+            continue
+        if text[pos] == ':':
+            raise ValueError(f"Pseudo-classes are not supported: {text!r}")
+        m = _SIMPLE_RE.match(text, pos)
+        if not m:
+            raise ValueError(f"Unsupported selector: {text!r}")
+        prefix, name = m.groups()
+        if prefix == '#':
+            ids.append(name)
+        elif prefix == '.':
+            classes.append(name)
+        else:
+            tag = name.lower()
+        pos = m.end()
+    return tag, ids, classes, attrs
+
+
+def _parse_group(group):
+    tokens = []
+    for chunk in _split_outside(group.replace('>', ' > '), ' '):
+        if chunk:
+            tokens.append(chunk)
+    parts, combinator = [], ' '
+    for token in tokens:
+        if token == '>':
+            combinator = '>'
+            continue
+        parts.append((combinator, _parse_compound(token)))
+        combinator = ' '
+    return parts
+
+
+def _compound_matches(node, compound):
+    tag, ids, classes, attrs = compound
+    if tag and tag != '*' and node.tag != tag:
+        return False
+    for i in ids:
+        if node.attrs.get('id') != i:
+            return False
+    if classes:
+        own = node.classes
+        if any(c not in own for c in classes):
+            return False
+    for name, op, value in attrs:
+        actual = node.attrs.get(name)
+        if actual is None:
+            return False
+        if op is None:
+            continue
+        if op == '=' and actual != value:
+            return False
+        if op == '*=' and value not in actual:
+            return False
+        if op == '^=' and not actual.startswith(value):
+            return False
+        if op == '$=' and not actual.endswith(value):
+            return False
+        if op == '~=' and value not in actual.split():
+            return False
+        if op == '|=' and not (actual == value or actual.startswith(value + '-')):
+            return False
+    return True
+
+
+def _chain_matches(node, parts, index):
+    combinator, compound = parts[index]
+    if not _compound_matches(node, compound):
+        return False
+    if index == 0:
+        return True
+    parent = node.parent
+    if combinator == '>':
+        return parent is not None and parent.tag != '#document' and _chain_matches(parent, parts, index - 1)
+    while parent is not None and parent.tag != '#document':
+        if _chain_matches(parent, parts, index - 1):
+            return True
+        parent = parent.parent
+    return False
+
+
+def _css_groups(selector):
+    groups = _css_cache.get(selector)
+    if groups is None:
+        groups = [_parse_group(g.strip()) for g in _split_outside(selector, ',') if g.strip()]
+        _css_cache[selector] = groups
+    return groups
+
+
+def css_matches(node, selector):
+    """True if `node` itself matches the CSS selector."""
+    return any(_chain_matches(node, parts, len(parts) - 1) for parts in _css_groups(selector))
+
+
+def css_select(context, selector):
+    """Elements below `context` matching a CSS selector, in document order."""
+    groups = _css_groups(selector)
+    if len(groups) == 1 and len(groups[0]) == 1:
+        compound = groups[0][0][1]
+        tag = compound[0]
+        if tag and tag != '*':
+            return [node for node in context.iter() if node.tag == tag and _compound_matches(node, compound)]
+        return [node for node in context.iter() if _compound_matches(node, compound)]
+    matches = []
+    for node in context.iter():
+        for parts in groups:
+            if _chain_matches(node, parts, len(parts) - 1):
+                matches.append(node)
+                break
+    return matches
+
+
+# ----------------------
+# XPath
+# ----------------------
+_XPATH_TOKEN_RE = re.compile(r"""\s*(?:(//|\.//|\./|!=|\.\.|[/|\[\](),=@.*])|("[^"]*"|'[^']*')|(\d+(?:\.\d+)?)|([\w:-]+))""")
+
+_xpath_cache = {}
+
+
+def _tokenize_xpath(expr):
+    tokens, pos = [], 0
+    expr = expr.strip()
+    while pos < len(expr):
+        m = _XPATH_TOKEN_RE.match(expr, pos)
+        if not m or m.end() == pos:
+            raise ValueError(f"Unsupported XPath at {expr[pos:]!r}")
+        op, string, number, name = m.groups()
+        if op is not None:
+            tokens.append(('op', op))
+        elif string is not None:
+            tokens.append(('str', string[1:-1]))
+        elif number is not None:
+            tokens.append(('num', float(number)))
+        else:
+            tokens.append(('name', name))
+        pos = m.end()
+    return tokens
+
+
+class _XPathParser:
+    def __init__(self, expr):
+        self.tokens = _tokenize_xpath(expr)
+        self.pos = 0
+
+    def peek(self, offset=0):
+        i = self.pos + offset
+        return self.tokens[i] if i < len(self.tokens) else (None, None)
+
+    def take(self, value=None):
+        token = self.peek()
+        if value is not None and token[1] != value:
+            raise ValueError(f"Expected {value!r}, got {token[1]!r}")
+        self.pos += 1
+        return token
+
+    def parse(self):
+        paths = [self.path()]
+        while self.peek()[1] == '|':
+            self.take('|')
+            paths.append(self.path())
+        if self.peek()[0] is not None:
+            raise ValueError(f"Unexpected token {self.peek()[1]!r}")
+        return paths
+
+    def path(self):
+        kind, value = self.peek()
+        if value in ('//', '/'):
+            self.take()
+            start = 'root-desc' if value == '//' else 'root-child'
+        elif value == './/':
+            self.take()
+            start = 'desc'
+        elif value == './':
+            self.take()
+            start = 'child'
+        else:
+            start = 'child'
+        steps = [self.step(start)]
+        while self.peek()[1] in ('//', '/'):
+            sep = self.take()[1]
+            steps.append(self.step('desc' if sep == '//' else 'child'))
+        return steps
+
+    def step(self, axis):
+        kind, value = self.peek()
+        if value == '.':
+            self.take()
+            name = '.'
+        elif value == '..':
+            self.take()
+            name = '..'
+        elif value == '*':
+            self.take()
+            name = '*'
+        elif kind == 'name':
+            self.take()
+            name = value.lower()
+            if name == 'text' and self.peek()[1] == '(':
+                self.take('(')
+                self.take(')')
+                name = 'text()'
+        else:
+            raise ValueError(f"Expected a step, got {value!r}")
+        predicates = []
+        while self.peek()[1] == '[':
+            self.take('[')
+            predicates.append(self.or_expr())
+            self.take(']')
+        return axis, name, predicates
+
+    def or_expr(self):
+        left = self.and_expr()
+        while self.peek() == ('name', 'or'):
+            self.take()
+            right = self.and_expr()
+            left = (lambda a, b: lambda n, p: _truthy(a(n, p)) or _truthy(b(n, p)))(left, right)
+        return left
+
+    def and_expr(self):
+        left = self.comparison()
+        while self.peek() == ('name', 'and'):
+            self.take()
+            right = self.comparison()
+            left = (lambda a, b: lambda n, p: _truthy(a(n, p)) and _truthy(b(n, p)))(left, right)
+        return left
+
+    def comparison(self):
+        left = self.primary()
+        if self.peek()[1] in ('=', '!='):
+            op = self.take()[1]
+            right = self.primary()
+
+            def compare(n, p, a=left, b=right, negate=(op == '!=')):
+                av, bv = _strings(a(n, p)), _strings(b(n, p))
+                result = any(x == y for x in av for y in bv)
+                return not result if negate else result
+            return compare
+        return left
+
+    def primary(self):
+        kind, value = self.peek()
+        if kind == 'str':
+            self.take()
+            return lambda n, p, v=value: v
+        if kind == 'num':
+            self.take()
+            return lambda n, p, v=value: v
+        if value == '(':
+            self.take('(')
+            expr = self.or_expr()
+            self.take(')')
+            return expr
+        if value == '@':
+            self.take('@')
+            attr = self.take()[1]
+            return lambda n, p, a=attr: n.attrs.get(a)
+        if kind == 'name' and self.peek(1)[1] == '(' and value not in ('text',):
+            return self.function()
+        # relative location path evaluated against the context node
+        steps = self.path()
+        return lambda n, p, s=steps: _eval_steps(n, s)
+
+    def function(self):
+        name = self.take()[1]
+        self.take('(')
+        args = []
+        while self.peek()[1] != ')':
+            args.append(self.or_expr())
+            if self.peek()[1] == ',':
+                self.take(',')
+        self.take(')')
+        if name == 'contains':
+            return lambda n, p: _string(args[0](n, p)) is not None and _string(args[1](n, p)) in _string(args[0](n, p))
+        if name == 'starts-with':
+            return lambda n, p: (_string(args[0](n, p)) or '').startswith(_string(args[1](n, p)) or '')
+        if name == 'normalize-space':
+            return lambda n, p: ' '.join((_string(args[0](n, p)) if args else n.text_content or '').split())
+        if name == 'not':
+            return lambda n, p: not _truthy(args[0](n, p))
+        if name == 'position':
+            return lambda n, p: p
+        raise ValueError(f"Unsupported XPath function {name}()")
+
+
+def _string(value):
+    if isinstance(value, list):
+        if not value:
+            return None
+        first = value[0]
+        return first if isinstance(first, str) else first.text_content
+    if isinstance(value, float):
+        return str(int(value)) if value.is_integer() else str(value)
+    return value
+
+
+def _strings(value):
+    if isinstance(value, list):
+        return [v if isinstance(v, str) else v.text_content for v in value]
+    if value is None:
+        return []
+    return [_string(value)]
+
+
+def _truthy(value):
+    if isinstance(value, list):
+        return bool(value)
+    return bool(value)
+
+
+def _eval_steps(context, steps):
+    current = [context]
+    for axis, name, predicates in steps:
+        found = []
+        for node in current:
+            if axis == 'root-desc':
+                candidates = list(root_of(node).iter())
+            elif axis == 'root-child':
+                candidates = root_of(node).element_children()
+            elif axis == 'desc':
+                candidates = list(node.iter())
+            else:
+                candidates = node.element_children()
+            if name == '.':
+                candidates = [node]
+            elif name == '..':
+                candidates = [node.parent] if node.parent is not None else []
+            elif name == 'text()':
+                texts = [c for c in node.children if isinstance(c, str)]
+                found.extend(texts)
+                continue
+            elif name != '*':
+                candidates = [c for c in candidates if c.tag == name]
+            for predicate in predicates:
+                kept = []
+                for position, candidate in enumerate(candidates, 1):
+                    result = predicate(candidate, position)
+                    if isinstance(result, float):
+                        if result == position:
+                            kept.append(candidate)
+                    elif _truthy(result):
+                        kept.append(candidate)
+                candidates = kept
+            found.extend(candidates)
+        if found and isinstance(found[0], str):
+            return found
+        current = _unique_in_order(found)
+    return current
+
+
+def xpath_select(context, expr):
+    """Elements matching an XPath expression (subset) evaluated from `context`."""
+    paths = _xpath_cache.get(expr)
+    if paths is None:
+        paths = _XPathParser(expr).parse()
+        _xpath_cache[expr] = paths
+    results = []
+    for steps in paths:
+        results.extend(n for n in _eval_steps(context, steps) if isinstance(n, Node))
+    return _unique_in_order(results)
@@ -0,0 +1,242 @@
+"""Import legacy snapshot, backup and export files into the checkpoint store.
+
+Past runs left payins_snapshot.json, timestamped payins_backup_* files,
+payins.json exports and emergency_payins.json dumps behind, each holding
+the whole collection at that moment, so they overlap heavily. `import_files`
+finds them, parses them in a process pool and merges them oldest first into
+the store:
+
+- workers decode a file and compute each record's identity key (as the
+  pipeline's upsert does, identical rows of one file counting as separate
+  transactions); a record equal to the one the worker last sent for that
+  key goes back as just (key, digest), so the overlap is neither hashed
+  nor pickled again and the merge is a dict lookup per record;
+- a record whose identity is new is appended, with the file's time as its
+  first-seen time; one seen before with the same content is a duplicate;
+- one seen before with different content (status or description changed)
+  is a conflict: the later file wins, unless the store changed that
+  transaction after the file was written;
+- each file's new and changed transactions go to the store in one
+  checkpoint, so an interrupted import resumes where it stopped.
+
+    python import_legacy.py ~/old_runs backups/ --workers 4
+    python import_legacy.py emergency_payins.json --dry-run
+
+Run it while the scraper is stopped: the scraper keeps its collected
+transactions in memory and would not see the imported ones until restart.
+"""
+
+import os
+import re
+import sys
+import glob
+import json
+import time
+import argparse
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from payin_record import Payin, payin_changes, without_stamps
+from payin_store import STORE_PATH, PayinStore, identity_key, payin_key
+from serialization import load
+
+# CONFIG
+IMPORT_WORKERS = os.cpu_count() or 1
+IMPORT_PATTERNS = ('payins_backup_*', 'payins_snapshot*', 'payins*.json*', 'emergency_payins*')
+IMPORT_IN_FLIGHT = 2  # files parsed ahead per worker
+
+_STAMP_RE = re.compile(r'(\d{8}_\d{6})')
+_HEADER_TIME_FIELDS = ('timestamp', 'export_timestamp')
+
+
+def discover(paths):
+    """Legacy files under `paths` (files, directories or globs), oldest first."""
+    found = set()
+    for path in paths:
+        if os.path.isdir(path):
+            for pattern in IMPORT_PATTERNS:
+                found.update(glob.glob(os.path.join(path, pattern)))
+        elif os.path.exists(path):
+            found.add(path)
+        else:
+            found.update(glob.glob(path))
+    files = [p for p in found if os.path.isfile(p) and not p.endswith(('.tmp', '.db', '-wal', '-shm'))]
+    return sorted(files, key=lambda p: (file_time(p), p))
+
+
+def file_time(path, header=None):
+    """When a file's contents were collected: its header timestamp, the stamp in its name, else its mtime."""
+    for name in _HEADER_TIME_FIELDS:
+        text = (header or {}).get(name)
+        if text:
+            try:
+                return time.mktime(time.strptime(text, '%Y-%m-%d %H:%M:%S'))
+            except (TypeError, ValueError):
+                pass
+    match = _STAMP_RE.search(os.path.basename(path))
+    if match:
+        try:
+            return time.mktime(time.strptime(match.group(1), '%Y%m%d_%H%M%S'))
+        except ValueError:
+            pass
+    return os.path.getmtime(path)
+
+
+_sent = {}  # per process: identity key -> (record, content digest) last returned
+
+
+def _reset_sent():
+    _sent.clear()
+
+
+def read_legacy_file(path, omit_sent=True):
+    """One file -> (file time, [(identity key, content digest, record)], records skipped, error or None).
+
+    With `omit_sent` a record equal to the one this process last returned for its key comes back as
+    (key, digest, None); the caller has already merged it.
+    """
+    try:
+        data = load(path)
+    except Exception as e:
+        return file_time(path), [], 0, f"{type(e).__name__}: {e}"
+    header = data if isinstance(data, dict) else {}
+    rows = data.get('transactions', []) if isinstance(data, dict) else data
+    keyed = []
+    skipped = 0
+    occurrences = {}
+    for record in rows if isinstance(rows, list) else ():
+        if not isinstance(record, dict) or not record.get('amount'):
+            skipped += 1
+            continue
+        key = identity_key(record)
+        n = occurrences.get(key, 0)
+        occurrences[key] = n + 1
+        if n:
+            key = identity_key(record, n)
+        sent = _sent.get(key) if omit_sent else None
+        if sent is not None and sent[0] == record:
+            keyed.append((key, sent[1], None))
+            continue
+        digest = payin_key(without_stamps(record))  # exports carry observed_at/cycle beside the content
+        if omit_sent:
+            _sent[key] = (record, digest)
+        keyed.append((key, digest, record))
+    return file_time(path, header), keyed, skipped, None
+
+
+def _read_all(files, workers):
+    """(path, result of read_legacy_file) in file order, with at most a few files per worker in flight."""
+    if workers <= 1 or len(files) <= 1:
+        _reset_sent()
+        for path in files:
+            yield path, read_legacy_file(path)
+        _reset_sent()
+        return
+    with ProcessPoolExecutor(max_workers=workers, initializer=_reset_sent) as pool:
+        pending = deque()
+        queued = iter(files)
+        for path in queued:
+            pending.append((path, pool.submit(read_legacy_file, path)))
+            if len(pending) >= workers * IMPORT_IN_FLIGHT:
+                break
+        while pending:
+            path, future = pending.popleft()
+            for next_path in queued:
+                pending.append((next_path, pool.submit(read_legacy_file, next_path)))
+                break
+            yield path, future.result()
+
+
+def import_files(files, store, workers=IMPORT_WORKERS, dry_run=False):
+    """Merge legacy `files` (oldest first) into `store`. Returns a summary dict."""
+    started = time.time()
+    payins, index, _ = store.load()
+    digests = {}  # identity key -> content digest of the state we hold, filled on first sighting
+    state_time = {}  # identity key -> time of the file that set the state we hold
+    summary = {'files': len(files), 'unreadable_files': 0, 'records': 0, 'skipped_records': 0, 'new': 0,
+               'duplicate': 0, 'conflicting': 0, 'updated': 0, 'kept_newer': 0, 'in_partitions': 0,
+               'dry_run': dry_run}
+    print(f"📥 Importing {len(files):,} legacy file(s) with {workers} worker(s) into {len(payins):,} stored transactions...")
+    for done, (path, (when, keyed, skipped, error)) in enumerate(_read_all(files, workers), 1):
+        if error:
+            summary['unreadable_files'] += 1
+            print(f"⚠️ Skipping unreadable file {path}: {error}")
+            continue
+        summary['records'] += len(keyed)
+        summary['skipped_records'] += skipped
+        new_payins, updated_payins = [], []
+        full = None
+        for key, digest, record in keyed:
+            position = index.get(key)
+            if record is None and (position is None or (position >= 0 and digests.get(key) != digest)):
+                # Rare: what we hold moved on since this record was merged (a later file, or a newer store row)
+                if full is None:
+                    full = {k: r for k, d, r in read_legacy_file(path, omit_sent=False)[1]}
+                record = full[key]
+            if position is None:
+                p = Payin(**record)
+                index[key] = len(payins)
+                payins.append(p)
+                digests[key] = digest
+                state_time[key] = when
+                new_payins.append((key, p))
+                continue
+            if position < 0:
+                summary['in_partitions'] += 1  # moved out to a monthly partition, which is not rewritten
+                continue
+            held = digests.get(key)
+            if held is None:
+                held = digests[key] = payin_key(payins[position])
+            if held == digest:
+                summary['duplicate'] += 1
+                continue
+            summary['conflicting'] += 1
+            held_time = state_time.get(key)
+            if held_time is None:
+                held_time = state_time[key] = store.changed_at(key) or 0
+            if held_time > when:
+                summary['kept_newer'] += 1
+                continue
+            p = Payin(**record)
+            updated_payins.append((key, p, payin_changes(payins[position], p)))
+            payins[position] = p
+            digests[key] = digest
+            state_time[key] = when
+        summary['new'] += len(new_payins)
+        summary['updated'] += len(updated_payins)
+        if (new_payins or updated_payins) and not dry_run:
+            store.checkpoint(new_payins, first_seen=when, updated_payins=updated_payins,
+                             total_transactions=len(payins), legacy_imported_at=time.time())
+        if done % 50 == 0:
+            print(f"📥 {done:,}/{len(files):,} files, {summary['records']:,} records: {summary['new']:,} new, "
+                  f"{summary['duplicate']:,} duplicate, {summary['conflicting']:,} conflicting")
+    summary['duration_s'] = round(time.time() - started, 2)
+    summary['records_per_s'] = round(summary['records'] / max(summary['duration_s'], 0.01))
+    print(f"✅ Import done: {summary['new']} new, {summary['duplicate']} duplicate, {summary['conflicting']} conflicting "
+          f"({summary['updated']} updated, {summary['kept_newer']} kept newer) in {summary['duration_s']}s")
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Import legacy snapshot/backup/export files into the store')
+    parser.add_argument('paths', nargs='*', default=['.'], help='files, directories or globs (default: .)')
+    parser.add_argument('--store', default=STORE_PATH, help='checkpoint store to merge into')
+    parser.add_argument('--workers', type=int, default=IMPORT_WORKERS)
+    parser.add_argument('--dry-run', action='store_true', help='report what would change without writing')
+    args = parser.parse_args()
+
+    files = discover(args.paths)
+    if not files:
+        print(f"❌ No legacy files found in {', '.join(args.paths)}")
+        return 1
+    store = PayinStore(args.store)
+    try:
+        summary = import_files(files, store, workers=max(1, args.workers), dry_run=args.dry_run)
+    finally:
+        store.close()
+    print(f"📋 Summary: {json.dumps(summary)}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,174 @@
+"""Bounded scraper log for the Streamlit front-end.
+
+`LogBuffer` keeps the last RING_CAPACITY lines in memory and appends every
+line to a size-rotated file, so a run of any length has a fixed memory
+footprint while the complete output is still on disk. `page()` returns one
+filtered window of the buffer (newest first) - the viewer only ever ships
+that window to the browser, never the whole log.
+
+`LogStream` is a file-like writer that feeds a buffer line by line, for
+`contextlib.redirect_stdout` around an in-process scraper run.
+"""
+
+import io
+import os
+import time
+import threading
+from collections import deque
+
+# CONFIG
+RING_CAPACITY = 5000  # lines kept in memory
+LOG_SPILL_PATH = os.environ.get('STREAMLIT_LOG_PATH', 'streamlit_scraper.log')
+SPILL_MAX_BYTES = 5 * 1024 * 1024
+SPILL_BACKUPS = 5
+
+LEVELS = ('all', 'errors', 'warnings', 'info')
+_ERROR_MARKS = ('❌', '💥', 'Traceback', 'Error:')
+_WARNING_MARKS = ('⚠️', '⚠', '🛑', '💀')
+
+
+def line_level(line):
+    """'errors', 'warnings' or 'info' from the markers the scraper prints."""
+    if any(mark in line for mark in _ERROR_MARKS):
+        return 'errors'
+    if any(mark in line for mark in _WARNING_MARKS):
+        return 'warnings'
+    return 'info'
+
+
+class LogBuffer:
+    """Ring buffer of recent log lines with a rotating on-disk spill of all of them."""
+
+    def __init__(self, capacity=RING_CAPACITY, spill_path=LOG_SPILL_PATH, max_bytes=SPILL_MAX_BYTES,
+                 backups=SPILL_BACKUPS):
+        self.capacity = capacity
+        self.spill_path = spill_path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.total = 0  # lines ever appended
+        self._lines = deque(maxlen=capacity)  # (number, time, level, text)
+        self._lock = threading.Lock()
+        self._spill = None
+        self._spill_bytes = 0
+        self._spill_error = None
+        self._stamp_second, self._stamp = None, ''
+
+    def __len__(self):
+        return len(self._lines)
+
+    @property
+    def dropped(self):
+        """Lines that fell out of memory (still in the spill file)."""
+        return self.total - len(self._lines)
+
+    def append(self, text):
+        """Add one or more lines (a multi-line string is split)."""
+        now = time.time()
+        with self._lock:
+            for line in str(text).splitlines() or ['']:
+                self.total += 1
+                self._lines.append((self.total, now, line_level(line), line))
+                self._write_spill(now, line)
+
+    def extend(self, lines):
+        for line in lines:
+            self.append(line)
+
+    def _write_spill(self, now, line):
+        if not self.spill_path or self._spill_error:
+            return
+        try:
+            if self._spill is None:
+                # Line buffered: each line reaches the file as it is logged
+                self._spill = open(self.spill_path, 'a', encoding='utf-8', buffering=1)
+                self._spill_bytes = self._spill.tell()
+            second = int(now)
+            if second != self._stamp_second:
+                self._stamp_second, self._stamp = second, time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(now))
+            self._spill.write(f"{self._stamp} {line}\n")
+            self._spill_bytes += len(line) + 21
+            if self._spill_bytes >= self.max_bytes:
+                self._rotate()
+        except Exception as e:
+            # The in-memory buffer keeps working without the file
+            self._spill_error = str(e)
+
+    def _rotate(self):
+        self._spill.close()
+        self._spill = None
+        for i in range(self.backups - 1, 0, -1):
+            source = f"{self.spill_path}.{i}"
+            if os.path.exists(source):
+                os.replace(source, f"{self.spill_path}.{i + 1}")
+        if self.backups:
+            os.replace(self.spill_path, f"{self.spill_path}.1")
+        else:
+            os.remove(self.spill_path)
+
+    def page(self, page=0, page_size=200, query='', level='all'):
+        """One window of matching lines, newest first: (lines, matching count, page count).
+
+        Lines are (number, time, level, text) tuples; `page` 0 is the newest.
+        """
+        query = (query or '').lower()
+        with self._lock:
+            snapshot = list(self._lines)
+        if query or level not in (None, 'all'):
+            snapshot = [entry for entry in snapshot
+                        if (level in (None, 'all') or entry[2] == level) and (not query or query in entry[3].lower())]
+        matching = len(snapshot)
+        pages = max(1, -(-matching // page_size))
+        page = min(max(0, page), pages - 1)
+        end = matching - page * page_size
+        window = snapshot[max(0, end - page_size):end]
+        window.reverse()
+        return window, matching, pages
+
+    def tail(self, n=20):
+        with self._lock:
+            return [entry[3] for entry in list(self._lines)[-n:]]
+
+    def counts(self):
+        """{'errors': n, 'warnings': n, 'info': n} over the lines in memory."""
+        out = {'errors': 0, 'warnings': 0, 'info': 0}
+        with self._lock:
+            for entry in self._lines:
+                out[entry[2]] += 1
+        return out
+
+    def clear(self):
+        with self._lock:
+            self._lines.clear()
+
+    def close(self):
+        with self._lock:
+            if self._spill:
+                self._spill.close()
+                self._spill = None
+
+
+class LogStream(io.TextIOBase):
+    """Write-only text stream that forwards complete lines to a LogBuffer."""
+
+    def __init__(self, log):
+        super().__init__()
+        self.log = log
+        self._partial = ''
+
+    def writable(self):
+        return True
+
+    def write(self, text):
+        lines = (self._partial + text).split('\n')
+        self._partial = lines.pop()
+        for line in lines:
+            if line.strip():
+                self.log.append(line.rstrip('\r'))
+        return len(text)
+
+    def close(self):
+        """Forward a trailing line that never got its newline."""
+        if self._partial.strip():
+            self.log.append(self._partial)
+        self._partial = ''
+        super().close()
@@ -0,0 +1,126 @@
+"""One-round-trip page classification for the Google Pay session.
+
+`classify_page(driver)` runs a single `execute_script` that reads the URL,
+counts transaction rows, looks for activity headings, login inputs and
+Chrome error pages, fingerprints the visible transaction list and reports a
+DOM-mutation epoch (a MutationObserver counter installed on first use).
+
+Results are cached per driver. A cached snapshot is reused without touching
+the browser while it is younger than `CACHE_TTL` and no navigation was
+signalled with `mark_page_changed(driver)`, so back-to-back checks within a
+refresh cycle are free.
+"""
+
+import time
+import weakref
+from enum import Enum
+from typing import NamedTuple
+
+# CONFIG
+CACHE_TTL = 1.0  # seconds a snapshot stays valid without a navigation
+TRANSACTION_URL_KEYWORDS = ('transactions', 'pay.google.com', 'activity', 'history')
+LOGIN_URL_KEYWORDS = ('signin', 'login', 'accounts.google.com')
+TRANSACTION_ROW_SELECTOR = "tr[data-row-id], div.transaction-row, li.transaction-item, .transaction, [data-testid*='transaction']"
+FINGERPRINT_ROWS = 50  # rows hashed into the list fingerprint
+
+CLASSIFY_SCRIPT = """
+if (!window.__gpsObserver && window.MutationObserver && document.documentElement) {
+    window.__gpsEpoch = 0;
+    window.__gpsObserver = new MutationObserver(function () { window.__gpsEpoch++; });
+    window.__gpsObserver.observe(document.documentElement, {childList: true, subtree: true, characterData: true});
+}
+var url = window.location.href || '';
+var rows = document.querySelectorAll(arguments[0]);
+var heading = false;
+var headings = document.getElementsByTagName('h1');
+for (var i = 0; i < headings.length && !heading; i++) {
+    var text = headings[i].textContent || '';
+    heading = text.indexOf('Activity') >= 0 || text.indexOf('Transactions') >= 0 || text.indexOf('History') >= 0;
+}
+var hash = 5381;
+for (var r = 0; r < rows.length && r < arguments[1]; r++) {
+    var s = rows[r].textContent || '';
+    for (var c = 0; c < s.length; c++) { hash = ((hash << 5) + hash + s.charCodeAt(c)) | 0; }
+}
+return {
+    url: url,
+    rowCount: rows.length,
+    heading: heading,
+    login: !!(document.getElementById('identifierId') || document.querySelector("input[name='Passwd']")),
+    error: !document.body || !!document.getElementById('main-frame-error') || url.indexOf('chrome-error://') === 0,
+    fingerprint: (hash >>> 0).toString(16),
+    epoch: window.__gpsEpoch || 0
+};
+"""
+
+
+class PageState(Enum):
+    TRANSACTIONS = 'transactions'
+    LOGIN = 'login'
+    UNKNOWN = 'unknown'
+    ERROR = 'error'
+
+
+class PageSnapshot(NamedTuple):
+    state: PageState
+    url: str
+    row_count: int
+    fingerprint: str
+    epoch: int
+    taken_at: float
+
+
+_snapshots = weakref.WeakKeyDictionary()  # driver -> (navigation counter, PageSnapshot)
+_navigations = weakref.WeakKeyDictionary()  # driver -> navigation counter
+
+
+def mark_page_changed(driver):
+    """Invalidate the cached snapshot after get/refresh/click on `driver`."""
+    try:
+        _navigations[driver] = _navigations.get(driver, 0) + 1
+    except TypeError:
+        pass
+
+
+def _classify(info):
+    url = info.get('url') or ''
+    lower = url.lower()
+    if info.get('error'):
+        return PageState.ERROR
+    if any(keyword in lower for keyword in TRANSACTION_URL_KEYWORDS) or info.get('rowCount') or info.get('heading'):
+        return PageState.TRANSACTIONS
+    if info.get('login') or any(keyword in lower for keyword in LOGIN_URL_KEYWORDS):
+        return PageState.LOGIN
+    return PageState.UNKNOWN
+
+
+def classify_page(driver, max_age=CACHE_TTL):
+    """Return the PageSnapshot of the current page, from cache when still valid."""
+    now = time.monotonic()
+    try:
+        navigations = _navigations.get(driver, 0)
+        cached = _snapshots.get(driver)
+    except TypeError:
+        navigations, cached = 0, None
+    if cached and cached[0] == navigations and now - cached[1].taken_at < max_age:
+        return cached[1]
+
+    try:
+        info = driver.execute_script(CLASSIFY_SCRIPT, TRANSACTION_ROW_SELECTOR, FINGERPRINT_ROWS) or {}
+    except Exception:
+        # Errors are not cached: the next check should talk to the browser again.
+        return PageSnapshot(PageState.ERROR, '', 0, '', -1, now)
+
+    snapshot = PageSnapshot(
+        state=_classify(info),
+        url=info.get('url') or '',
+        row_count=int(info.get('rowCount') or 0),
+        fingerprint=info.get('fingerprint') or '',
+        epoch=int(info.get('epoch') or 0),
+        taken_at=now,
+    )
+    try:
+        _snapshots[driver] = (navigations, snapshot)
+    except TypeError:
+        pass
+    return snapshot
@@ -0,0 +1,99 @@
+import os
+import sys
+import time
+
+import pandas as pd
+import streamlit as st
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from payin_store import STORE_PATH, open_payin_store
+from payin_aggregates import RunningTotals
+
+# CONFIG
+REFRESH_SECONDS = 5
+DAYS_SHOWN = 90
+TOP_COUNTERPARTIES = 20
+LATEST_ROWS = 50
+
+st.set_page_config(page_title="Transactions Dashboard", page_icon="📊", layout="wide")
+
+
+@st.cache_resource
+def get_totals(path):
+    """One store connection and one set of running totals per server, shared by every session and rerun"""
+    store = open_payin_store(path)
+    return RunningTotals(store) if store else None
+
+
+# Frames are rebuilt only when their table's version moves; an unchanged table
+# hands Streamlit the same data, so its chart is not redrawn.
+@st.cache_data(max_entries=4)
+def daily_frame(_totals, version, days):
+    rows = [row for row in _totals.rows('day') if row[0]]
+    frame = pd.DataFrame(rows, columns=['day', 'currency', 'count', 'total'])
+    if frame.empty:
+        return frame
+    frame = frame.pivot_table(index='day', columns='currency', values='total', aggfunc='sum').fillna(0)
+    return frame.tail(days)
+
+
+@st.cache_data(max_entries=4)
+def status_frame(_totals, version):
+    return pd.DataFrame(_totals.rows('status'), columns=['status', 'currency', 'count', 'total'])
+
+
+@st.cache_data(max_entries=4)
+def counterparty_frame(_totals, version, n):
+    return pd.DataFrame(_totals.top('counterparty', n), columns=['counterparty', 'currency', 'count', 'total'])
+
+
+@st.cache_data(max_entries=4)
+def latest_frame(_totals, cursor, watermark, n):
+    rows = [data for seq, value, data in _totals.store.page(sort='seq', descending=True, limit=n)]
+    return pd.DataFrame(rows)
+
+
+st.markdown("## 📊 Transactions Dashboard")
+totals = get_totals(STORE_PATH)
+if totals is None:
+    st.error(f"⚠️ Transaction store unavailable ({STORE_PATH})")
+    st.stop()
+
+started = time.perf_counter()
+changed = totals.refresh()
+
+summary = totals.summary()
+columns = st.columns(max(1, len(summary)) + 1)
+columns[0].metric("Transactions", f"{sum(count for count, total in summary.values()):,}")
+for column, (currency, (count, total)) in zip(columns[1:], sorted(summary.items())):
+    column.metric(f"Total {currency or ''}".strip(), f"{total:,.2f}", help=f"{count:,} transactions")
+
+st.markdown("### 📅 Totals per day")
+daily = daily_frame(totals, totals.versions['day'], DAYS_SHOWN)
+if daily.empty:
+    st.info("No dated transactions yet.")
+else:
+    st.bar_chart(daily)
+
+col_status, col_counterparty = st.columns(2)
+with col_status:
+    st.markdown("### 🏷️ Per status")
+    st.dataframe(status_frame(totals, totals.versions['status']), hide_index=True, use_container_width=True)
+with col_counterparty:
+    st.markdown(f"### 👥 Top {TOP_COUNTERPARTIES} counterparties")
+    st.dataframe(counterparty_frame(totals, totals.versions['counterparty'], TOP_COUNTERPARTIES),
+                 hide_index=True, use_container_width=True)
+
+st.markdown(f"### 🆕 Latest {LATEST_ROWS} transactions")
+st.dataframe(latest_frame(totals, totals.cursor, totals.watermark, LATEST_ROWS), hide_index=True,
+             use_container_width=True)
+
+render_ms = (time.perf_counter() - started) * 1000
+st.caption(f"Cursor at #{totals.cursor:,} • {', '.join(sorted(changed)) or 'no'} tables changed • "
+           f"rendered in {render_ms:.0f} ms")
+
+live = st.toggle("🔄 Live", value=True, help=f"Pick up new transactions every {REFRESH_SECONDS}s")
+if live:
+    time.sleep(REFRESH_SECONDS)
+    st.rerun()
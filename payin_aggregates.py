@@ -0,0 +1,125 @@
+"""Running totals over the transaction store for dashboards.
+
+`RunningTotals` builds its tables once from the store's rollup table, then
+tails the store from a cursor: each `refresh()` reads only the rows added
+since the last one (seq > cursor) and the rows updated since the last one
+(a status change moves the amount from one status bucket to another). Every
+table has a version counter that moves only when the table changed, so a
+dashboard can cache whatever it derives from a table per version. When
+retention drops a partition from the rollups the tables are rebuilt.
+
+Tables map (group key, currency) -> [count, amount total] for
+    day           local date of the transaction ('YYYY-MM-DD', None if unparsed)
+    status        status text
+    counterparty  counterparty name
+"""
+
+import time
+import heapq
+import threading
+
+from payin_store import TOTALS_GROUPS
+
+# CONFIG
+TAIL_BATCH = 10000
+
+
+def _group_keys(ts, status, counterparty):
+    day = time.strftime('%Y-%m-%d', time.localtime(ts)) if ts > 0 else None
+    return {'day': day, 'status': status, 'counterparty': counterparty}
+
+
+class RunningTotals:
+    """Incrementally maintained per-day/status/counterparty totals of a PayinStore."""
+
+    def __init__(self, store):
+        self.store = store
+        self.tables = {group: {} for group in TOTALS_GROUPS}
+        self.versions = {group: 0 for group in TOTALS_GROUPS}
+        self.cursor = 0  # highest seq counted
+        self.watermark = 0  # latest update time counted
+        self.refreshed_at = None
+        self.generation = None  # rollup generation the tables were built from
+        self._lock = threading.Lock()
+        self._build()
+
+    def _build(self):
+        started = time.time()
+        for table in self.tables.values():
+            table.clear()
+        with self.store.snapshot():
+            self.generation = self.store.removals()[1]
+            self.cursor, self.watermark = self.store.last_change()
+            self.watermark = self.watermark or 0
+            for group in TOTALS_GROUPS:
+                table = self.tables[group]
+                # The rollups are committed with the rows, so inside the snapshot they match the cursor
+                for key, currency, count, total in self.store.totals(group):
+                    table[(key, currency)] = [count, total]
+                self.versions[group] += 1
+        self.refreshed_at = time.time()
+        print(f"📊 Totals built over {self.cursor} transactions in {time.time() - started:.2f}s")
+
+    def _add(self, values, sign, touched):
+        ts, amount, status, counterparty, currency = values
+        for group, key in _group_keys(ts, status, counterparty).items():
+            table = self.tables[group]
+            bucket = table.get((key, currency))
+            if bucket is None:
+                bucket = table[(key, currency)] = [0, 0.0]
+            bucket[0] += sign
+            bucket[1] += sign * amount
+            if bucket[0] == 0:
+                del table[(key, currency)]
+            touched.add(group)
+
+    def refresh(self):
+        """Count what the store gained since the last call. Returns the set of tables that changed."""
+        touched = set()
+        if self.store.removals()[1] != self.generation:
+            with self._lock:
+                self._build()
+            return set(TOTALS_GROUPS)
+        with self._lock, self.store.snapshot():
+            last_seq, last_update = self.store.last_change()
+            if last_update and last_update > self.watermark:
+                # Rows counted before that changed since: take the old state out, put the new one in
+                for seq, then, now in self.store.updated_since(self.watermark, self.cursor):
+                    if then != now:
+                        self._add(then, -1, touched)
+                        self._add(now, 1, touched)
+                self.watermark = last_update
+            while self.cursor < last_seq:
+                rows = self.store.rows_after(self.cursor, TAIL_BATCH)
+                if not rows:
+                    break
+                for row in rows:
+                    self._add(row[1:], 1, touched)
+                self.cursor = rows[-1][0]
+            for group in touched:
+                self.versions[group] += 1
+            self.refreshed_at = time.time()
+        return touched
+
+    def summary(self):
+        """{currency: [count, total]} over everything."""
+        out = {}
+        with self._lock:
+            for (key, currency), (count, total) in self.tables['status'].items():
+                bucket = out.setdefault(currency, [0, 0.0])
+                bucket[0] += count
+                bucket[1] += total
+        return out
+
+    def rows(self, group):
+        """[(key, currency, count, total)] of one table, sorted by key."""
+        with self._lock:
+            rows = [(key, currency, count, total) for (key, currency), (count, total) in self.tables[group].items()]
+        return sorted(rows, key=lambda row: (row[0] is None, row[0] or '', row[1]))
+
+    def top(self, group, n=20):
+        """The `n` largest buckets of a table by amount."""
+        with self._lock:
+            return heapq.nlargest(n, ((key, currency, count, total)
+                                      for (key, currency), (count, total) in self.tables[group].items()),
+                                  key=lambda row: row[3])
@@ -0,0 +1,449 @@
+"""Monthly partitions of the transaction store.
+
+The checkpoint store (payin_store) stays small: it holds the last
+HOT_MONTHS months, where new rows land and statuses still change. A
+`Compactor` thread moves the rows of older, closed months into one file per
+month under PARTITION_DIR:
+
+    payin_partitions/payins-2025-01.db
+
+A partition is written once (rewritten only if late rows for its month turn
+up) and read-optimized: rows are clustered by transaction time, the JSON is
+zlib-compressed, the file is vacuumed. Its rows are then deleted from the
+store in small transactions with a pause in between, so the persist stage's
+checkpoints never wait on more than one short batch. The background runs
+happen in a child process at lower CPU priority, so compressing a month
+never competes with the refresh loop for the interpreter lock. Identity keys of moved
+rows stay in the store (archived_keys) and their totals in the rollups.
+
+Date-bounded reads (`iter_range()`, the `export` command) only open the
+partitions whose month overlaps the range. With RETENTION_MONTHS set,
+partitions older than that are archived to ARCHIVE_DIR (or deleted) and
+their totals taken out of the rollups.
+
+    python payin_partitions.py list
+    python payin_partitions.py compact
+    python payin_partitions.py export --since 2025-01-01 --until 2025-04-01 --out q1.json.gz
+"""
+
+import os
+import re
+import sys
+import time
+import json
+import zlib
+import shutil
+import sqlite3
+import queue
+import argparse
+import threading
+import multiprocessing
+
+from payin_record import parse_timestamp
+from payin_store import PayinStore, STORE_PATH
+from serialization import dump_records
+
+# CONFIG
+PARTITION_DIR = os.environ.get('PAYIN_PARTITION_DIR', 'payin_partitions')  # '' disables compaction
+HOT_MONTHS = 3  # the current month and the two before it stay in the store
+COMPACT_INTERVAL = 3600  # seconds between compaction runs
+COMPACT_BATCH = 500  # rows deleted from the store per transaction
+COMPACT_PAUSE = 0.05  # seconds between those transactions, so checkpoints get the write lock
+COMPACT_NICE = 10  # CPU priority decrease of the compaction process
+RETENTION_MONTHS = int(os.environ.get('PAYIN_RETENTION_MONTHS', '0') or 0)  # 0 = keep every partition
+RETENTION_ACTION = os.environ.get('PAYIN_RETENTION_ACTION', 'archive')  # 'archive' or 'delete'
+ARCHIVE_DIR = os.path.join(PARTITION_DIR or '.', 'archive')
+
+_PARTITION_SCHEMA = """
+CREATE TABLE payins (
+    ts REAL NOT NULL,
+    seq INTEGER NOT NULL,
+    key BLOB NOT NULL,
+    data BLOB NOT NULL,
+    first_seen REAL NOT NULL,
+    updated REAL,
+    version INTEGER NOT NULL,
+    amount_value REAL NOT NULL,
+    status TEXT NOT NULL,
+    counterparty TEXT NOT NULL,
+    currency TEXT NOT NULL,
+    PRIMARY KEY (ts, seq)
+) WITHOUT ROWID;
+CREATE TABLE payin_versions (
+    seq INTEGER NOT NULL,
+    version INTEGER NOT NULL,
+    changes TEXT NOT NULL,
+    replaced_at REAL NOT NULL,
+    PRIMARY KEY (seq, version)
+) WITHOUT ROWID;
+"""
+_FILE_RE = re.compile(r'^payins-(\d{4}-\d{2})\.db$')
+
+
+def month_of(ts, first_seen=None):
+    """'YYYY-MM' (local time) a row belongs to: its transaction date, or when it was first seen if undated."""
+    return time.strftime('%Y-%m', time.localtime(ts if ts and ts > 0 else first_seen or time.time()))
+
+
+def add_months(month, n):
+    year, number = map(int, month.split('-'))
+    number += n
+    year += (number - 1) // 12
+    return f"{year:04d}-{(number - 1) % 12 + 1:02d}"
+
+
+def month_start(month):
+    year, number = map(int, month.split('-'))
+    return time.mktime((year, number, 1, 0, 0, 0, 0, 0, -1))
+
+
+def partition_path(month, directory=PARTITION_DIR):
+    return os.path.join(directory, f"payins-{month}.db")
+
+
+def list_partitions(directory=PARTITION_DIR):
+    """[(month, path)] of the partition files, oldest first."""
+    if not directory or not os.path.isdir(directory):
+        return []
+    found = []
+    for name in os.listdir(directory):
+        match = _FILE_RE.match(name)
+        if match:
+            found.append((match.group(1), os.path.join(directory, name)))
+    return sorted(found)
+
+
+def _connect_ro(path):
+    return sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+
+
+def _read_partition(path):
+    """({seq: partition row}, {(seq, version): version row}) of an existing partition."""
+    conn = _connect_ro(path)
+    try:
+        rows = {row[1]: row for row in conn.execute("SELECT * FROM payins")}
+        versions = {row[:2]: row for row in conn.execute("SELECT * FROM payin_versions")}
+    finally:
+        conn.close()
+    return rows, versions
+
+
+def write_partition(path, rows, versions):
+    """Write a partition file from scratch and swap it in atomically."""
+    tmp_path = path + '.tmp'
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    conn = sqlite3.connect(tmp_path)
+    try:
+        conn.execute("PRAGMA page_size = 8192")
+        conn.execute("PRAGMA journal_mode = OFF")
+        conn.execute("PRAGMA synchronous = OFF")
+        conn.executescript(_PARTITION_SCHEMA)
+        with conn:
+            conn.executemany("INSERT INTO payins VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", sorted(rows))
+            conn.executemany("INSERT INTO payin_versions VALUES (?, ?, ?, ?)", sorted(versions))
+        conn.execute("VACUUM")
+    finally:
+        conn.close()
+    os.replace(tmp_path, path)
+
+
+def read_range(path, since=None, until=None):
+    """[(seq, data dict)] of a partition's rows dated in [since, until), oldest first."""
+    clauses, params = [], []
+    if since is not None:
+        clauses.append("ts >= ?")
+        params.append(since)
+    if until is not None:
+        clauses.append("ts < ?")
+        params.append(until)
+    conn = _connect_ro(path)
+    try:
+        rows = conn.execute("SELECT seq, data FROM payins" + (" WHERE " + " AND ".join(clauses) if clauses else "") +
+                            " ORDER BY ts, seq", params).fetchall()
+    finally:
+        conn.close()
+    return [(seq, json.loads(zlib.decompress(data))) for seq, data in rows]
+
+
+def iter_range(store, since=None, until=None, directory=PARTITION_DIR):
+    """Data dicts of every transaction dated in [since, until): the overlapping partitions by month, then the store.
+
+    Only partitions whose month overlaps the range are opened.
+    """
+    hot = store.range_rows(since, until)
+    # A row updated while it was being moved is still in the store; its copy in the partition is stale
+    hot_seqs = {seq for seq, _ in hot}
+    first = month_of(since) if since is not None else None
+    last = month_of(until - 1) if until is not None else None
+    for month, path in list_partitions(directory):
+        if (first and month < first) or (last and month > last):
+            continue
+        for seq, data in read_range(path, since, until):
+            if seq not in hot_seqs:
+                yield data
+    for seq, data in hot:
+        yield data
+
+
+def rebuild_rollups(store, directory=PARTITION_DIR):
+    """Recompute the store's rollups from its rows and every partition. Returns the number of rows counted."""
+    with store._lock, store._conn:
+        store.rebuild_rollups()
+    counted = store.count()
+    for month, path in list_partitions(directory):
+        conn = _connect_ro(path)
+        try:
+            values = conn.execute("SELECT ts, amount_value, status, counterparty, currency FROM payins").fetchall()
+        finally:
+            conn.close()
+        store.adjust_rollups(values)
+        counted += len(values)
+    return counted
+
+
+def _compact_in_child(options, results):
+    try:
+        os.nice(COMPACT_NICE)
+    except (AttributeError, OSError):
+        pass  # no nice() on Windows
+    try:
+        results.put(Compactor(**options).run_once())
+    except Exception as e:
+        results.put({'error': str(e)})
+
+
+class Compactor:
+    """Background mover of closed months from the store into partition files."""
+
+    def __init__(self, store_path=STORE_PATH, directory=PARTITION_DIR, hot_months=HOT_MONTHS,
+                 interval=COMPACT_INTERVAL, batch=COMPACT_BATCH, pause=COMPACT_PAUSE,
+                 retention_months=RETENTION_MONTHS, retention_action=RETENTION_ACTION, archive_dir=ARCHIVE_DIR):
+        self.store_path = store_path
+        self.directory = directory
+        self.hot_months = max(1, hot_months)
+        self.interval = interval
+        self.batch = batch
+        self.pause = pause
+        self.retention_months = retention_months
+        self.retention_action = retention_action
+        self.archive_dir = archive_dir
+        self.runs = 0
+        self.moved = 0
+        self.last_run = None
+        self._stop = threading.Event()
+        self._thread = None
+        self._warned_daemon = False
+
+    def run_once(self, now=None):
+        """Move every closed month out of the store, then apply retention. Returns a summary dict."""
+        started = time.time()
+        now = now or started
+        os.makedirs(self.directory, exist_ok=True)
+        # A separate connection: the long reads never hold the pipeline's store lock
+        store = PayinStore(self.store_path)
+        try:
+            cutoff = month_start(add_months(month_of(now), 1 - self.hot_months))
+            rows = store.closed_rows(cutoff)
+            if rows:
+                # The newest row keeps SQLite's rowid counter above every seq already moved out
+                last_seq = store.last_change()[0]
+                rows = [row for row in rows if row[0] != last_seq]
+            by_month = {}
+            for row in rows:
+                by_month.setdefault(month_of(row[6], row[3]), []).append(row)
+            moved = 0
+            for month, month_rows in sorted(by_month.items()):
+                if self._stop.is_set():
+                    break
+                moved += self._move_month(store, month, month_rows)
+            retired = self._apply_retention(store, now) if self.retention_months else []
+        finally:
+            store.close()
+        self.runs += 1
+        self.moved += moved
+        self.last_run = {'at': started, 'moved': moved, 'months': sorted(by_month), 'retired': retired,
+                         'seconds': round(time.time() - started, 2)}
+        if moved or retired:
+            print(f"🗜️ Compacted {moved} transactions into {len(by_month)} monthly partition(s)"
+                  + (f", retired {', '.join(retired)}" if retired else "") + f" in {self.last_run['seconds']}s")
+        return self.last_run
+
+    def run_isolated(self):
+        """run_once() in a lower-priority child process; returns its summary (None if stopped).
+
+        A daemonic process may not start children: there it runs in this thread instead.
+        """
+        if multiprocessing.current_process().daemon:
+            if not self._warned_daemon:
+                print("⚠️ Compacting in a thread: this process is daemonic and cannot start the compaction process")
+                self._warned_daemon = True
+            return self.run_once()
+        options = dict(store_path=self.store_path, directory=self.directory, hot_months=self.hot_months,
+                       batch=self.batch, pause=self.pause, retention_months=self.retention_months,
+                       retention_action=self.retention_action, archive_dir=self.archive_dir)
+        context = multiprocessing.get_context('spawn')
+        results = context.Queue()
+        process = context.Process(target=_compact_in_child, args=(options, results), name='payin-compaction',
+                                  daemon=True)
+        process.start()
+        summary = None
+        try:
+            while summary is None and not self._stop.is_set():
+                try:
+                    summary = results.get(timeout=0.5)
+                except queue.Empty:
+                    if not process.is_alive():
+                        break
+        finally:
+            if process.is_alive() and summary is None:
+                # Safe to interrupt: a partition replaces its file atomically and rows leave the store only after
+                process.terminate()
+            process.join(timeout=10)
+        if summary is None:
+            if self._stop.is_set():
+                return None
+            raise RuntimeError(f"compaction process exited with code {process.exitcode}")
+        if summary.get('error'):
+            raise RuntimeError(summary['error'])
+        self.runs += 1
+        self.moved += summary['moved']
+        self.last_run = summary
+        return summary
+
+    def _move_month(self, store, month, month_rows):
+        path = partition_path(month, self.directory)
+        rows, versions = _read_partition(path) if os.path.exists(path) else ({}, {})
+        for seq, key, data, first_seen, updated, version, ts, amount, status, counterparty, currency in month_rows:
+            rows[seq] = (ts, seq, key, zlib.compress(data.encode('utf-8')), first_seen, updated, version, amount,
+                         status, counterparty, currency)
+        for row in store.versions_of(row[0] for row in month_rows):
+            versions[row[:2]] = row
+        write_partition(path, rows.values(), versions.values())
+        # The copy is on disk: now remove the rows from the store in short transactions
+        pending = [(row[0], row[5], row[1], month) for row in month_rows]
+        removed = 0
+        for start in range(0, len(pending), self.batch):
+            removed += store.remove_moved(pending[start:start + self.batch])
+            time.sleep(self.pause)
+        return removed
+
+    def _apply_retention(self, store, now):
+        limit = add_months(month_of(now), -self.retention_months)
+        retired = []
+        for month, path in list_partitions(self.directory):
+            if month >= limit:
+                break
+            conn = _connect_ro(path)
+            try:
+                values = conn.execute("SELECT ts, amount_value, status, counterparty, currency FROM payins").fetchall()
+            finally:
+                conn.close()
+            store.drop_partition(month, values)
+            if self.retention_action == 'delete':
+                os.remove(path)
+            else:
+                os.makedirs(self.archive_dir, exist_ok=True)
+                shutil.move(path, os.path.join(self.archive_dir, os.path.basename(path)))
+            retired.append(month)
+        return retired
+
+    def _loop(self):
+        # First run shortly after startup, then every `interval`
+        wait = min(60, self.interval)
+        while not self._stop.wait(wait):
+            try:
+                self.run_isolated()
+            except Exception as e:
+                print(f"⚠️ Error compacting transaction store: {e}")
+            wait = self.interval
+
+    def start(self):
+        self._thread = threading.Thread(target=self._loop, name='payin-compactor', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=30):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=timeout)
+            self._thread = None
+
+    def stats(self):
+        return {'runs': self.runs, 'moved': self.moved, 'last_run': self.last_run}
+
+
+def start_compactor(store_path=STORE_PATH, directory=PARTITION_DIR):
+    """Background compaction for run_scraper; None when PARTITION_DIR is empty or not usable."""
+    if not directory:
+        return None
+    try:
+        os.makedirs(directory, exist_ok=True)
+        return Compactor(store_path, directory).start()
+    except Exception as e:
+        print(f"⚠️ Store compaction unavailable ({directory}): {e}")
+        return None
+
+
+def _parse_bound(text):
+    if not text:
+        return None
+    ts = parse_timestamp(text)
+    if ts is None:
+        raise ValueError(f"Unrecognized date: {text}")
+    return ts
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Monthly partitions of the transaction store')
+    parser.add_argument('command', choices=('list', 'compact', 'export'))
+    parser.add_argument('--store', default=STORE_PATH)
+    parser.add_argument('--dir', default=PARTITION_DIR or 'payin_partitions')
+    parser.add_argument('--hot-months', type=int, default=HOT_MONTHS)
+    parser.add_argument('--retention-months', type=int, default=RETENTION_MONTHS)
+    parser.add_argument('--retention-action', choices=('archive', 'delete'), default=RETENTION_ACTION)
+    parser.add_argument('--since', help='export transactions from this date on')
+    parser.add_argument('--until', help='export transactions before this date')
+    parser.add_argument('--out', default='payins_range.json')
+    args = parser.parse_args()
+
+    if args.command == 'list':
+        total = 0
+        for month, path in list_partitions(args.dir):
+            conn = _connect_ro(path)
+            try:
+                count = conn.execute("SELECT COUNT(*) FROM payins").fetchone()[0]
+            finally:
+                conn.close()
+            total += count
+            print(f"{month}  {count:>10,} transactions  {os.path.getsize(path) / 1e6:8.1f} MB")
+        print(f"📦 {total:,} transactions in partitions")
+        return 0
+    if not os.path.exists(args.store):
+        print(f"❌ No store at {args.store}")
+        return 1
+    if args.command == 'compact':
+        compactor = Compactor(args.store, args.dir, hot_months=args.hot_months, pause=0,
+                              retention_months=args.retention_months, retention_action=args.retention_action,
+                              archive_dir=os.path.join(args.dir, 'archive'))
+        print(f"📋 Summary: {json.dumps(compactor.run_once())}")
+        return 0
+    try:
+        since, until = _parse_bound(args.since), _parse_bound(args.until)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return 1
+    store = PayinStore(args.store)
+    try:
+        started = time.time()
+        records = list(iter_range(store, since, until, args.dir))
+        dump_records(args.out, {'export_timestamp': time.strftime("%Y-%m-%d %H:%M:%S"), 'since': args.since,
+                                'until': args.until, 'total_count': len(records)}, 'transactions', records)
+    finally:
+        store.close()
+    print(f"💾 Exported {len(records)} transaction(s) to {args.out} in {time.time() - started:.2f}s")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
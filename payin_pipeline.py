@@ -0,0 +1,449 @@
+"""Pipelined processing of captured transaction rows.
+
+The refresh loop (browser stage) only captures raw row payloads with one
+`execute_script` and hands them to `PayinPipeline.submit()`. Two background
+stages do the rest:
+
+    capture --(bounded queue)--> parse --(bounded queue)--> persist
+                                  |                          upsert, checkpoint,
+                                  +-- optional process pool  stream publish, snapshot
+
+A slow disk or a large snapshot therefore never delays the next refresh.
+When the parse queue is full the capture is dropped after a short wait: the
+next refresh captures the same page again, so nothing is lost, and the drop
+is counted in the stage metrics.
+
+Payins are matched to what was collected before by `identity_key`: a known
+transaction whose status or description changed is replaced in place and
+published as a `payin.updated` event with the changed fields. With a
+`raw_archive.RawArchive` attached, the persist stage also keeps every
+capture's raw rows so a later parser can re-run over them, and with
+`alert_rules.AlertRules` attached every new or updated payin is checked
+against the alert rules.
+
+New payins are stamped with the capture time and refresh cycle that first
+saw them; their posting-to-capture latency goes to detection_latency.
+"""
+
+import time
+import queue
+import threading
+from typing import NamedTuple
+from concurrent.futures import ProcessPoolExecutor, Future
+
+from payin_record import Payin, payin_changes, parse_timestamp, stamped
+from payin_store import identity_key
+from serialization import dump_records, backup_path, prune_backups
+from scraper_log import get_logger, cycle_id
+from detection_latency import record_detection, detection_stats, posted_at
+
+# CONFIG
+PARSE_WORKERS = 1  # >1 parses captures in a process pool
+QUEUE_SIZE = 8  # captures buffered between stages
+SUBMIT_TIMEOUT = 2.0  # seconds the browser stage waits on a full queue before dropping
+SNAPSHOT_PATH = 'payins_snapshot.json'  # the extension picks the format, see serialization
+BACKUP_EVERY = 10  # refreshes; older backups are pruned (serialization.BACKUP_KEEP_*)
+
+log = get_logger('pipeline')
+
+ROW_SELECTORS = [
+    "tr[data-row-id]",
+    "div.transaction-row",
+    "li.transaction-item",
+    "[data-testid*='transaction']",
+    ".transaction",
+    "[class*='transaction']",
+    "tr[role='row']",
+]
+
+CAPTURE_SCRIPT = """
+var selectors = arguments[0], rows = [], used = null;
+for (var i = 0; i < selectors.length; i++) {
+    var found = document.querySelectorAll(selectors[i]);
+    if (found.length) { rows = found; used = selectors[i]; break; }
+}
+if (!rows.length && document.body) {
+    rows = document.body.getElementsByTagName('tr');
+    if (rows.length) { used = 'body tr'; }
+}
+var out = [];
+for (var r = 0; r < rows.length; r++) {
+    var el = rows[r], attrs = {}, cells = [];
+    for (var a = 0; a < el.attributes.length; a++) { attrs[el.attributes[a].name] = el.attributes[a].value; }
+    var found_cells = el.querySelectorAll('td, th, [role=cell], [role=gridcell]');
+    for (var c = 0; c < found_cells.length; c++) { cells.push(found_cells[c].innerText || found_cells[c].textContent || ''); }
+    out.push({tag: el.tagName.toLowerCase(), text: el.innerText || el.textContent || '',
+              html: el.outerHTML, attrs: attrs, cells: cells});
+}
+return {selector: used, rows: out};
+"""
+
+
+class RawCapture(NamedTuple):
+    refresh_count: int
+    captured_at: float
+    selector: str
+    rows: list
+    consecutive_failures: int = 0
+
+
+class RawRow:
+    """Read-only stand-in for a selenium WebElement built from a captured payload."""
+
+    def __init__(self, payload):
+        self._payload = payload
+        self.tag_name = payload.get('tag', '')
+        self.text = payload.get('text', '')
+
+    def get_attribute(self, name):
+        if name == 'outerHTML':
+            return self._payload.get('html')
+        if name in ('innerText', 'textContent'):
+            return self.text
+        return self._payload.get('attrs', {}).get(name)
+
+    def find_elements(self, by=None, value=None):
+        html = self._payload.get('html')
+        if by is None or not html:
+            return [RawRow({'tag': 'td', 'text': text}) for text in self._payload.get('cells', [])]
+        # Query the captured markup like a live element (see html_dom)
+        from html_dom import parse_html, css_select, xpath_select
+        node = parse_html(html).element_children()[0]
+        if by == 'xpath':
+            found = xpath_select(node, value)
+        elif by == 'tag name':
+            found = [n for n in node.iter() if n.tag == value.lower()]
+        elif by == 'class name':
+            found = [n for n in node.iter() if value in n.classes]
+        elif by in ('id', 'name'):
+            found = [n for n in node.iter() if n.attrs.get(by) == value]
+        else:
+            found = css_select(node, value)
+        return [RawRow({'tag': n.tag, 'text': n.inner_text(), 'html': n.outer_html(), 'attrs': dict(n.attrs),
+                        'cells': [c.inner_text() for c in css_select(n, 'td, th, [role=cell], [role=gridcell]')]})
+                for n in found]
+
+    def find_element(self, by=None, value=None):
+        cells = self.find_elements(by, value)
+        if not cells:
+            raise LookupError(f"no cells in captured row for {value!r}")
+        return cells[0]
+
+
+def capture_rows(driver, refresh_count=0, consecutive_failures=0):
+    """Browser stage: grab every transaction row on the page in one round trip."""
+    captured_at = time.time()
+    result = driver.execute_script(CAPTURE_SCRIPT, ROW_SELECTORS) or {}
+    return RawCapture(refresh_count, captured_at, result.get('selector') or '', result.get('rows') or [],
+                      consecutive_failures)
+
+
+def row_id(payload):
+    """Transaction id of a captured row payload, if the page exposes one."""
+    attrs = payload.get('attrs') or {}
+    return attrs.get('data-row-id') or attrs.get('data-id') or attrs.get('id')
+
+
+def row_timestamp(payload):
+    """Epoch seconds of the first cell (or text line) of a captured row that parses as a date."""
+    for text in (payload.get('cells') or []) + (payload.get('text') or '').split('\n'):
+        ts = parse_timestamp(text.strip())
+        if ts is not None:
+            return ts
+    return None
+
+
+def parse_payloads(payloads):
+    """Parse stage: payloads -> list of parsed dicts with an amount. Runs in a worker process when pooled."""
+    import gpay_parser
+    if hasattr(gpay_parser, 'from_raw_rows'):
+        parsed = gpay_parser.from_raw_rows(payloads)
+    else:
+        parsed = gpay_parser.from_selenium_rows([RawRow(p) for p in payloads])
+    return [p for p in parsed if p.get('amount')]
+
+
+def _timed_parse(payloads):
+    started = time.perf_counter()
+    parsed = parse_payloads(payloads)
+    return time.perf_counter() - started, parsed
+
+
+def upsert_payins(collected_payins, index, parsed, updated_positions=None, observed_at=None, cycle=None):
+    """Merge one capture's parsed dicts into `collected_payins`/`index` (identity key -> position).
+
+    Returns (new_payins, updated_payins): [(key, payin)] appended and [(key, payin, changes)] replaced
+    in place, ready for PayinStore.checkpoint(). Re-merging the same capture changes nothing. New payins
+    are stamped with `observed_at`/`cycle`; updated ones keep the stamps of their first sighting.
+    """
+    new_payins = []
+    updated_payins = []
+    occurrences = {}
+    for data in parsed:
+        p = Payin.from_dict(data)
+        key = identity_key(p)
+        # Identical rows within one capture are distinct transactions (same amount, same minute)
+        n = occurrences.get(key, 0)
+        occurrences[key] = n + 1
+        if n:
+            key = identity_key(p, n)
+        position = index.get(key)
+        if position is not None and position < 0:
+            continue  # already moved out to a monthly partition (payin_partitions)
+        if position is None:
+            p.stamp(observed_at, cycle)
+            index[key] = len(collected_payins)
+            collected_payins.append(p)
+            new_payins.append((key, p))
+            continue
+        old = collected_payins[position]
+        if old == p:
+            continue
+        p.stamp(old.observed_at, old.cycle)
+        collected_payins[position] = p
+        if updated_positions is not None:
+            updated_positions.add(position)
+        updated_payins.append((key, p, payin_changes(old, p)))
+    return new_payins, updated_payins
+
+
+def write_snapshot(payins, refresh_count, consecutive_failures, backup=False):
+    """Write payins_snapshot.json (and a timestamped backup, pruning old ones). Returns the backup file name or None."""
+    header = {
+        'timestamp': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'refresh_count': refresh_count,
+        'consecutive_failures': consecutive_failures,
+        'total_transactions': len(payins),
+        'detection': detection_stats(),
+    }
+    # Stamped record by record as they are written, never as one list of every payin
+    dump_records(SNAPSHOT_PATH, header, 'transactions', (stamped(p) for p in payins), count=len(payins))
+
+    if backup:
+        backup_filename = dump_records(backup_path(), header, 'transactions', (stamped(p) for p in payins),
+                                       count=len(payins))
+        for path in prune_backups():
+            print(f"🗑️ Pruned old backup {path}")
+        return backup_filename
+    return None
+
+
+class StageMetrics:
+    """Counters for one pipeline stage."""
+
+    def __init__(self, name):
+        self.name = name
+        self.items = 0
+        self.errors = 0
+        self.dropped = 0
+        self.busy_seconds = 0.0
+        self.blocked_seconds = 0.0
+        self.max_queue_depth = 0
+        self.last_seconds = None
+
+    def observe(self, seconds):
+        self.items += 1
+        self.busy_seconds += seconds
+        self.last_seconds = seconds
+
+    def as_dict(self):
+        return {
+            'items': self.items,
+            'errors': self.errors,
+            'dropped': self.dropped,
+            'avg_ms': round(1000 * self.busy_seconds / self.items, 2) if self.items else None,
+            'last_ms': None if self.last_seconds is None else round(1000 * self.last_seconds, 2),
+            'blocked_s': round(self.blocked_seconds, 3),
+            'max_queue_depth': self.max_queue_depth,
+        }
+
+
+_STOP = object()
+
+
+class PayinPipeline:
+    """Parse and persist stages running behind the browser stage."""
+
+    def __init__(self, collected_payins, index, store=None, stream=None, reconciler=None, archive=None,
+                 alerts=None, parse_workers=PARSE_WORKERS, queue_size=QUEUE_SIZE, track_detection=True):
+        self.collected_payins = collected_payins
+        self.index = index  # identity key -> position in collected_payins
+        self.updated_positions = set()
+        self.store = store
+        self.stream = stream
+        self.reconciler = reconciler
+        self.archive = archive
+        self.alerts = alerts
+        self.metrics = {name: StageMetrics(name) for name in ('capture', 'parse', 'persist')}
+        self._raw = queue.Queue(maxsize=queue_size)
+        self._parsed = queue.Queue(maxsize=queue_size)
+        self._pool = ProcessPoolExecutor(max_workers=parse_workers) if parse_workers > 1 else None
+        self._parser_missing = False
+        self.track_detection = track_detection  # off for history backfills: nothing there is a fresh payin
+        self._first_capture = True  # its new payins were posted before the run started watching
+        self._closed = False
+        self._threads = [
+            threading.Thread(target=self._parse_loop, name='payin-parse', daemon=True),
+            threading.Thread(target=self._persist_loop, name='payin-persist', daemon=True),
+        ]
+        for t in self._threads:
+            t.start()
+
+    # Browser stage
+    def submit(self, capture, capture_seconds=None):
+        """Queue a capture for parsing. Returns False if it was dropped because of backpressure."""
+        stage = self.metrics['capture']
+        if capture_seconds is not None:
+            stage.observe(capture_seconds)
+        started = time.perf_counter()
+        try:
+            self._raw.put(capture, timeout=SUBMIT_TIMEOUT)
+            return True
+        except queue.Full:
+            stage.dropped += 1
+            log.warning(f"⚠️ Pipeline busy - dropped capture of refresh #{capture.refresh_count}",
+                        extra={'category': 'pipeline_busy', 'refresh': capture.refresh_count})
+            return False
+        finally:
+            stage.blocked_seconds += time.perf_counter() - started
+            stage.max_queue_depth = max(stage.max_queue_depth, self._raw.qsize())
+
+    def _parse_loop(self):
+        stage = self.metrics['parse']
+        while True:
+            capture = self._raw.get()
+            if capture is _STOP:
+                self._parsed.put(_STOP)
+                return
+            if self._pool is not None:
+                # Results are consumed in order by the persist stage.
+                result = self._pool.submit(_timed_parse, capture.rows)
+            else:
+                result = Future()
+                try:
+                    result.set_result(_timed_parse(capture.rows))
+                except BaseException as e:
+                    result.set_exception(e)
+            self._parsed.put((capture, result))
+            stage.max_queue_depth = max(stage.max_queue_depth, self._parsed.qsize())
+
+    def _persist_loop(self):
+        stage = self.metrics['persist']
+        while True:
+            item = self._parsed.get()
+            if item is _STOP:
+                return
+            capture, result = item
+            if self.archive:
+                # Raw rows are kept whatever the parser makes of them, so they can be re-parsed later
+                try:
+                    self.archive.add(capture)
+                except Exception as e:
+                    log.warning(f"⚠️ Error archiving refresh #{capture.refresh_count}: {e}", exc_info=True,
+                                extra={'category': 'archive_error', 'refresh': capture.refresh_count})
+            try:
+                parse_seconds, parsed = result.result()
+                self.metrics['parse'].observe(parse_seconds)
+            except ImportError:
+                if not self._parser_missing:
+                    print("📋 gpay_parser not available - raw data collection only")
+                    self._parser_missing = True
+                parsed = []
+            except Exception as e:
+                self.metrics['parse'].errors += 1
+                log.error(f"❌ Error parsing transactions: {e}", exc_info=True,
+                          extra={'category': 'parse_error', 'refresh': capture.refresh_count})
+                parsed = []
+            started = time.perf_counter()
+            try:
+                self._persist(capture, parsed)
+            except Exception as e:
+                stage.errors += 1
+                log.error(f"⚠️ Error persisting refresh #{capture.refresh_count}: {e}", exc_info=True,
+                          extra={'category': 'persist_error', 'refresh': capture.refresh_count})
+            stage.observe(time.perf_counter() - started)
+
+    def _persist(self, capture, parsed):
+        context = {'category': 'persist', 'refresh': capture.refresh_count}
+        cycle = cycle_id(capture.refresh_count)
+        new_payins, updated_payins = upsert_payins(self.collected_payins, self.index, parsed, self.updated_positions,
+                                                   observed_at=capture.captured_at, cycle=cycle)
+        # Checkpoint new and changed transactions and watermarks before anything else: a crash after a
+        # publish, alert or match must not make a restarted run see the same payins as new again
+        if self.store:
+            try:
+                self.store.checkpoint(new_payins, first_seen=capture.captured_at if new_payins else None,
+                                      updated_payins=updated_payins,
+                                      refresh_count=capture.refresh_count,
+                                      total_transactions=len(self.collected_payins))
+            except Exception as e:
+                log.error(f"⚠️ Error writing checkpoint: {e}", exc_info=True,
+                          extra=dict(context, category='checkpoint_error'))
+        if parsed and self.track_detection:
+            record_detection([p for _, p in new_payins], capture.captured_at, capture.refresh_count,
+                             backfill=self._first_capture)
+            self._first_capture = False
+        if self.stream:
+            for key, p, changes in updated_payins:
+                self.stream.publish(stamped(p), detected_at=capture.captured_at, event='payin.updated',
+                                    changes=changes, cycle=cycle, posted_at=posted_at(p))
+            for key, p in new_payins:
+                self.stream.publish(stamped(p), detected_at=capture.captured_at, cycle=cycle, posted_at=posted_at(p))
+        if self.alerts:
+            try:
+                for key, p, changes in updated_payins:
+                    self.alerts.evaluate(p, 'updated', detected_at=capture.captured_at, changes=changes)
+                for key, p in new_payins:
+                    self.alerts.evaluate(p, detected_at=capture.captured_at)
+            except Exception as e:
+                log.warning(f"⚠️ Error evaluating alert rules: {e}", exc_info=True,
+                            extra=dict(context, category='alert_error'))
+
+        log.info(f"💰 Found {len(parsed)} transactions in refresh #{capture.refresh_count}", extra=context)
+        if new_payins:
+            log.info(f"🆕 Added {len(new_payins)} new transactions", extra=context)
+        for key, p, changes in updated_payins:
+            log.info(f"🔁 Updated {p.get('id') or p.amount}: " +
+                     ', '.join(f"{name} {old!r} -> {new!r}" for name, (old, new) in changes.items()),
+                     extra={'refresh': capture.refresh_count})  # one line per payin: never rate limited
+        log.info(f"📈 Total collected: {len(self.collected_payins)} transactions", extra=context)
+
+        if self.reconciler and new_payins:
+            for _, p in new_payins:
+                try:
+                    outcome, invoice, detail = self.reconciler.add_payin(p)
+                    if outcome == 'matched':
+                        print(f"🧾 Payin {p.get('id') or p.amount} matched invoice {invoice.id} ({detail})")
+                    elif outcome == 'ambiguous':
+                        print(f"🧾 Payin {p.get('id') or p.amount} is ambiguous: {len(invoice)} candidate invoices ({detail})")
+                except Exception as e:
+                    log.warning(f"⚠️ Error reconciling payin: {e}", exc_info=True,
+                                extra=dict(context, category='reconcile_error'))
+
+        # The snapshot is a full rewrite: skip it while newer captures are waiting
+        backup = capture.refresh_count % BACKUP_EVERY == 0
+        if self._parsed.empty() or backup:
+            try:
+                backup_filename = write_snapshot(self.collected_payins, capture.refresh_count,
+                                                 capture.consecutive_failures, backup=backup)
+                if backup_filename:
+                    log.info(f"💾 Backup saved: {backup_filename}", extra=context)
+            except Exception as e:
+                log.warning(f"⚠️ Error saving snapshot: {e}", exc_info=True, extra=dict(context, category='snapshot_error'))
+
+    def stats(self):
+        return {name: m.as_dict() for name, m in self.metrics.items()}
+
+    def close(self, timeout=30):
+        """Drain everything already captured, then stop the stages."""
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            self._raw.put(_STOP, timeout=timeout)
+        except queue.Full:
+            pass
+        for t in self._threads:
+            t.join(timeout=timeout)
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,173 @@
+"""Compact in-memory representation of a collected payin.
+
+Parsed rows arrive as free-form dicts. `Payin` keeps the same information in
+a `__slots__` object: categorical text (status, counterparty, currency,
+dates, ...) is interned so repeated values share one string, and the amount
+and date are also kept as numbers for sorting and aggregation. Keys the
+class does not know about go to `extra`, so `Payin.from_dict(d).to_dict()`
+returns an equal dict and the JSON outputs keep their shape.
+
+`observed_at` and `cycle` (when and in which refresh cycle the scraper first
+saw the payin, see detection_latency) are kept beside the fields: they are
+not part of `to_dict()`, so equality and dedup keys ignore them, and
+`stamped()` adds them back for exports and stream events.
+"""
+
+import re
+import sys
+from datetime import datetime
+
+FIELDS = ('id', 'date', 'time', 'description', 'counterparty', 'status', 'amount', 'currency', 'type', 'method')
+# Fields that do not change while a transaction settles (status and description do); see payin_store.identity_key
+IDENTITY_FIELDS = ('date', 'time', 'amount', 'currency', 'counterparty', 'type', 'method')
+# Fields whose values repeat across rows and are worth interning.
+INTERNED_FIELDS = frozenset(('date', 'time', 'description', 'counterparty', 'status', 'amount', 'currency', 'type', 'method'))
+_FIELD_BIT = {name: 1 << i for i, name in enumerate(FIELDS)}
+# First-observation stamps: carried along, but not part of the payin's content
+STAMP_FIELDS = ('observed_at', 'cycle')
+
+DATE_FORMATS = (
+    '%Y-%m-%d %H:%M:%S', '%Y-%m-%d %H:%M', '%Y-%m-%dT%H:%M:%S', '%Y-%m-%d',
+    '%b %d, %Y, %I:%M %p', '%b %d, %Y %I:%M %p', '%b %d, %Y', '%d %b %Y, %H:%M', '%d %b %Y',
+    '%d/%m/%Y %H:%M', '%d/%m/%Y',
+)
+CURRENCY_SYMBOLS = {'$': 'USD', '€': 'EUR', '£': 'GBP', 'E£': 'EGP', '₹': 'INR', 'ج.م': 'EGP'}
+_AMOUNT_RE = re.compile(r'\d[\d,]*(?:\.\d+)?')
+_CODE_RE = re.compile(r'\b([A-Z]{3})\b')
+
+_timestamp_cache = {}
+
+
+def parse_amount(text):
+    """Return (value, currency code) parsed from a displayed amount like 'EGP 1,250.00' or '-$12.50'."""
+    if text is None:
+        return None, None
+    if isinstance(text, (int, float)):
+        return float(text), None
+    match = _AMOUNT_RE.search(text)
+    if not match:
+        return None, None
+    value = float(match.group(0).replace(',', ''))
+    head = text[:match.start()]
+    if '-' in head or '−' in head or (head.strip().startswith('(') and text.strip().endswith(')')):
+        value = -value
+    code = _CODE_RE.search(text)
+    if code:
+        return value, code.group(1)
+    for symbol in sorted(CURRENCY_SYMBOLS, key=len, reverse=True):
+        if symbol in text:
+            return value, CURRENCY_SYMBOLS[symbol]
+    return value, None
+
+
+def parse_timestamp(date, time_text=None):
+    """Epoch seconds for a displayed date (and optional time), or None. Results are memoized."""
+    if not date:
+        return None
+    text = f"{date} {time_text}" if time_text else date
+    if text in _timestamp_cache:
+        return _timestamp_cache[text]
+    value = None
+    for fmt in DATE_FORMATS:
+        try:
+            value = datetime.strptime(text.strip(), fmt).timestamp()
+            break
+        except ValueError:
+            continue
+    if len(_timestamp_cache) > 50000:
+        _timestamp_cache.clear()
+    _timestamp_cache[text] = value
+    return value
+
+
+class Payin:
+    """One collected transaction."""
+
+    __slots__ = FIELDS + STAMP_FIELDS + ('amount_value', 'timestamp', 'extra', '_present')
+
+    def __init__(self, **fields):
+        self.observed_at = fields.pop('observed_at', None)
+        self.cycle = fields.pop('cycle', None)
+        present = 0
+        for name in FIELDS:
+            if name in fields:
+                value = fields.pop(name)
+                if name in INTERNED_FIELDS and type(value) is str:
+                    value = sys.intern(value)
+                present |= _FIELD_BIT[name]
+            else:
+                value = None
+            setattr(self, name, value)
+        self._present = present
+        self.extra = fields or None
+        self.amount_value, currency = parse_amount(self.amount)
+        if self.currency is None and currency is not None:
+            # derived, not part of the dict shape (the bit stays unset)
+            self.currency = sys.intern(currency)
+        self.timestamp = parse_timestamp(self.date, self.time)
+
+    @classmethod
+    def from_dict(cls, data):
+        if isinstance(data, Payin):
+            return data
+        return cls(**data)
+
+    def to_dict(self):
+        """The original dict shape, for JSON output and dedup keys."""
+        data = {name: getattr(self, name) for name in FIELDS if self._present & _FIELD_BIT[name]}
+        if self.extra:
+            data.update(self.extra)
+        return data
+
+    def stamp(self, observed_at, cycle=None):
+        self.observed_at = observed_at
+        self.cycle = cycle
+
+    def get(self, key, default=None):
+        if key in _FIELD_BIT:
+            return getattr(self, key) if self._present & _FIELD_BIT[key] else default
+        if self.extra:
+            return self.extra.get(key, default)
+        return default
+
+    def __eq__(self, other):
+        if isinstance(other, Payin):
+            return self.to_dict() == other.to_dict()
+        if isinstance(other, dict):
+            return self.to_dict() == other
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"Payin({self.to_dict()!r})"
+
+
+def as_dict(payin):
+    """Dict form of a Payin or an already plain dict."""
+    return payin.to_dict() if isinstance(payin, Payin) else payin
+
+
+def stamped(payin):
+    """Dict form plus the first-observation stamps, for exports and stream events."""
+    if not isinstance(payin, Payin):
+        return payin
+    data = payin.to_dict()
+    if payin.observed_at is not None:
+        data['observed_at'] = payin.observed_at
+        data['cycle'] = payin.cycle
+    return data
+
+
+def without_stamps(data):
+    """`data` (a dict read back from an export) without the stamps, for content comparisons."""
+    if any(name in data for name in STAMP_FIELDS):
+        return {k: v for k, v in data.items() if k not in STAMP_FIELDS}
+    return data
+
+
+def payin_changes(old, new):
+    """{field: [old value, new value]} for every field that differs between two versions of a payin."""
+    old, new = as_dict(old), as_dict(new)
+    return {name: [old.get(name), new.get(name)]
+            for name in old.keys() | new.keys() if old.get(name) != new.get(name)}
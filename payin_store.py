@@ -0,0 +1,662 @@
+"""Checkpointed transaction store for run_scraper.
+
+Every refresh cycle commits the new and changed payins plus the loop
+watermarks (refresh count, last sequence number) in one SQLite transaction,
+so a crash loses at most the cycle in flight. On startup `load()` streams the
+rows back in insertion order and rebuilds the identity index from the stored
+keys instead of re-parsing snapshot or backup dumps.
+
+Rows are keyed by transaction identity (`identity_key`), not by content: when
+a payin goes from Pending to Completed its row is updated in place and the
+fields it had before are appended to `payin_versions`, so the table holds one
+row per transaction and the history stays available.
+
+The sortable/filterable fields (timestamp, amount, status, counterparty,
+currency) are also kept in columns, indexed where views sort or filter, so
+views can page, sort, filter and total in SQL (`page()`, `count_matching()`,
+`position()`, `totals()`) without loading every row.
+
+`payin_rollups` holds count and amount total per (grain, bucket, currency,
+status) for the day, hour, counterparty and overall grains. `checkpoint()`
+keeps it current in the same transaction as the rows - new payins are added,
+an updated payin moves out of its old buckets into its new ones - so
+reports (`rollup()`, `rollup_summary()`, `top_payers()`) read a few hundred
+rollup rows instead of the whole history:
+
+    python payin_store.py report --by day --since 2025-01-01
+    python payin_store.py report --by counterparty --top 20
+
+Rows of closed months are moved out to monthly partition files by
+`payin_partitions.Compactor`; the store keeps their identity keys in
+`archived_keys` (so they are not collected again) and their totals in the
+rollups.
+"""
+
+import os
+import sys
+import json
+import time
+import sqlite3
+import argparse
+import hashlib
+import functools
+import threading
+import contextlib
+
+from payin_record import Payin, IDENTITY_FIELDS, as_dict
+
+# CONFIG
+STORE_PATH = os.environ.get('PAYIN_STORE_PATH', 'payins.db')
+SCHEMA_VERSION = 5
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS payins (
+    seq INTEGER PRIMARY KEY,
+    key BLOB NOT NULL UNIQUE,
+    data TEXT NOT NULL,
+    first_seen REAL NOT NULL,
+    updated REAL,
+    version INTEGER NOT NULL DEFAULT 1,
+    cycle TEXT,
+    ts REAL NOT NULL DEFAULT 0,
+    amount_value REAL NOT NULL DEFAULT 0,
+    status TEXT NOT NULL DEFAULT '',
+    counterparty TEXT NOT NULL DEFAULT '',
+    currency TEXT NOT NULL DEFAULT ''
+);
+CREATE TABLE IF NOT EXISTS payin_versions (
+    seq INTEGER NOT NULL,
+    version INTEGER NOT NULL,
+    changes TEXT NOT NULL,
+    replaced_at REAL NOT NULL,
+    PRIMARY KEY (seq, version)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS payin_rollups (
+    grain TEXT NOT NULL,
+    bucket TEXT NOT NULL,
+    currency TEXT NOT NULL,
+    status TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    total REAL NOT NULL,
+    PRIMARY KEY (grain, bucket, currency, status)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS archived_keys (
+    key BLOB PRIMARY KEY,
+    month TEXT NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS meta (
+    name TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE INDEX IF NOT EXISTS payins_ts ON payins (ts, seq);
+CREATE INDEX IF NOT EXISTS payins_amount ON payins (amount_value, seq);
+CREATE INDEX IF NOT EXISTS payins_status ON payins (status, seq);
+CREATE INDEX IF NOT EXISTS payins_status_ts ON payins (status, ts, seq);
+CREATE INDEX IF NOT EXISTS payins_counterparty ON payins (counterparty, seq);
+CREATE INDEX IF NOT EXISTS payins_updated ON payins (updated) WHERE updated IS NOT NULL;
+"""
+
+# Columns derived from the JSON for views and totals; NULL-free so keyset comparisons on (column, seq) always hold
+SORT_COLUMNS = ('seq', 'ts', 'amount_value', 'status', 'counterparty')
+DERIVED_NAMES = ('ts', 'amount_value', 'status', 'counterparty', 'currency')
+# Groupings for totals(), each answered from the rollups
+TOTALS_GROUPS = ('day', 'status', 'counterparty')
+# Rollup grains: bucket expression over the derived columns. Undated rows go to the '' bucket;
+# rollup_buckets() must produce the same strings in Python.
+ROLLUP_GRAINS = {
+    'day': "CASE WHEN ts > 0 THEN strftime('%Y-%m-%d', ts, 'unixepoch', 'localtime') ELSE '' END",
+    'hour': "CASE WHEN ts > 0 THEN strftime('%Y-%m-%d %H:00', ts, 'unixepoch', 'localtime') ELSE '' END",
+    'counterparty': 'counterparty',
+    'all': "''",
+}
+
+
+def _digest(text):
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=16).digest()
+
+
+# json.dumps() builds a new encoder per call when given options; these are built once
+_content_encoder = json.JSONEncoder(sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+_identity_encoder = json.JSONEncoder(ensure_ascii=False, separators=(',', ':'))
+
+
+def payin_key(payin):
+    """Stable 16-byte hash of a payin's whole content (changes whenever any field does)."""
+    return _digest(_content_encoder.encode(as_dict(payin)))
+
+
+def identity_key(payin, occurrence=0):
+    """Stable 16-byte identity of a transaction across status/description changes.
+
+    The row id when the page has one, otherwise the invariant fields. `occurrence`
+    tells apart identical-looking rows of the same capture (two equal payments in
+    the same minute); the list order keeps it stable from refresh to refresh.
+    """
+    data = as_dict(payin)
+    if data.get('id'):
+        material = 'id:' + str(data['id'])
+    else:
+        material = _identity_encoder.encode([data.get(name) for name in IDENTITY_FIELDS])
+    if occurrence:
+        material += f'#{occurrence}'
+    return _digest(material)
+
+
+def derived_values(payin):
+    """(ts, amount_value, status, counterparty, currency) column values of a payin; missing values sort first."""
+    p = Payin.from_dict(payin)
+    return p.timestamp or 0.0, p.amount_value or 0.0, p.status or '', p.counterparty or '', p.currency or ''
+
+
+@functools.lru_cache(maxsize=4096)
+def _local_buckets(quarter):
+    # Every UTC offset is a whole number of quarter hours, so one quarter hour lies in one local day and hour
+    local = time.localtime(quarter * 900)
+    return time.strftime('%Y-%m-%d', local), time.strftime('%Y-%m-%d %H:00', local)
+
+
+def rollup_buckets(ts, counterparty):
+    """{grain: bucket} of a row, matching the ROLLUP_GRAINS expressions."""
+    day, hour = _local_buckets(int(ts // 900)) if ts > 0 else ('', '')
+    return {'day': day, 'hour': hour, 'counterparty': counterparty, 'all': ''}
+
+
+def _rollup_delta(deltas, values, sign):
+    """Add (sign=1) or take out (sign=-1) one row's derived values to a pending rollup delta."""
+    ts, amount, status, counterparty, currency = values
+    for grain, bucket in rollup_buckets(ts, counterparty).items():
+        delta = deltas.get((grain, bucket, currency, status))
+        if delta is None:
+            delta = deltas[(grain, bucket, currency, status)] = [0, 0.0]
+        delta[0] += sign
+        delta[1] += sign * amount
+
+
+def reverse_delta(changes):
+    """Compact prior version for the change log: {field: old value} from payin_changes() output."""
+    return {name: old for name, (old, new) in changes.items()}
+
+
+def _undo(state, changes):
+    """Turn a version's data dict back into the one before it, given the stored reverse delta (JSON)."""
+    for name, value in json.loads(changes).items():
+        if value is None:
+            state.pop(name, None)
+        else:
+            state[name] = value
+
+
+class PayinStore:
+    """SQLite-backed journal of collected payins and loop watermarks."""
+
+    def __init__(self, path=STORE_PATH):
+        self.path = path
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._migrate()
+        self._conn.commit()
+
+    def _migrate(self):
+        version = self._conn.execute("PRAGMA user_version").fetchone()[0]
+        if version not in (0, SCHEMA_VERSION):
+            raise RuntimeError(f"{self.path}: store schema version {version}, this scraper reads {SCHEMA_VERSION}")
+        self._conn.executescript(_SCHEMA)
+        if version == 0:
+            # A new store; payins of runs from before the store (JSON snapshots, backups) come in with import_legacy
+            self._conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    def rebuild_rollups(self):
+        """Recompute the rollup table from the payins (repair after editing the table by hand)."""
+        with self._lock:
+            self._conn.execute("DELETE FROM payin_rollups")
+            for grain, expression in ROLLUP_GRAINS.items():
+                self._conn.execute(
+                    f"INSERT INTO payin_rollups (grain, bucket, currency, status, count, total) "
+                    f"SELECT ?, {expression}, currency, status, COUNT(*), TOTAL(amount_value) FROM payins GROUP BY 2, 3, 4",
+                    (grain,),
+                )
+
+    def load(self):
+        """Return (payins, index, meta) from the last checkpoint.
+
+        `payins` are Payin records in first-seen order, stamped with when and in which cycle they were first
+        seen; `index` maps identity key -> position in `payins`; keys of rows moved out to partitions map to -1.
+        """
+        with self._lock:
+            payins = []
+            index = dict.fromkeys((key for key, in self._conn.execute("SELECT key FROM archived_keys")), -1)
+            loads = json.loads
+            for key, data, first_seen, cycle in self._conn.execute(
+                    "SELECT key, data, first_seen, cycle FROM payins ORDER BY seq"):
+                index[key] = len(payins)
+                p = Payin(**loads(data))
+                p.stamp(first_seen, cycle)
+                payins.append(p)
+            return payins, index, self._read_meta()
+
+    def _read_meta(self):
+        meta = {}
+        for name, value in self._conn.execute("SELECT name, value FROM meta"):
+            meta[name] = json.loads(value)
+        return meta
+
+    def checkpoint(self, new_payins=(), first_seen=None, updated_payins=(), **watermarks):
+        """Durably append `new_payins` ((key, payin) pairs), apply `updated_payins` ((key, payin, changes)
+        triples, changes as from payin_changes) with their prior versions logged, and update the watermarks.
+
+        New rows keep the payin's own `observed_at`/`cycle` stamps; `first_seen` is used for unstamped ones."""
+        now = time.time()
+        first_seen = first_seen or now
+        watermarks['last_checkpoint'] = now
+        deltas = {}
+        with self._lock, self._conn:
+            if new_payins:
+                last_seq = self._conn.execute("SELECT COALESCE(MAX(seq), 0) FROM payins").fetchone()[0]
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO payins (key, data, first_seen, cycle, ts, amount_value, status, counterparty, "
+                    "currency) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    ((key, json.dumps(as_dict(p), ensure_ascii=False), getattr(p, 'observed_at', None) or first_seen,
+                      getattr(p, 'cycle', None), *derived_values(p))
+                     for key, p in new_payins),
+                )
+                # Only the rows actually inserted (keys already stored are ignored)
+                for values in self._conn.execute(f"SELECT {', '.join(DERIVED_NAMES)} FROM payins WHERE seq > ?",
+                                                 (last_seq,)):
+                    _rollup_delta(deltas, values, 1)
+            if updated_payins:
+                updated_payins = list(updated_payins)
+                before, after = {}, {}
+                for key, p, changes in updated_payins:
+                    if key not in before:
+                        before[key] = self._conn.execute(f"SELECT {', '.join(DERIVED_NAMES)} FROM payins WHERE key = ?",
+                                                         (key,)).fetchone()
+                    after[key] = derived_values(p)
+                for key, values in before.items():
+                    if values is not None and tuple(values) != after[key]:
+                        _rollup_delta(deltas, values, -1)
+                        _rollup_delta(deltas, after[key], 1)
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO payin_versions (seq, version, changes, replaced_at) "
+                    "SELECT seq, version, ?, ? FROM payins WHERE key = ?",
+                    ((json.dumps(reverse_delta(changes), ensure_ascii=False), now, key)
+                     for key, p, changes in updated_payins),
+                )
+                self._conn.executemany(
+                    "UPDATE payins SET data = ?, updated = ?, version = version + 1, "
+                    "ts = ?, amount_value = ?, status = ?, counterparty = ?, currency = ? WHERE key = ?",
+                    ((json.dumps(as_dict(p), ensure_ascii=False), now, *derived_values(p), key)
+                     for key, p, changes in updated_payins),
+                )
+            if deltas:
+                self._apply_rollups(deltas)
+            watermarks['last_seq'] = self._conn.execute("SELECT COALESCE(MAX(seq), 0) FROM payins").fetchone()[0]
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO meta (name, value) VALUES (?, ?)",
+                ((name, json.dumps(value)) for name, value in watermarks.items()),
+            )
+
+    def adjust_rollups(self, values, sign=1):
+        """Add (or with sign=-1 take out) rows given as derived values tuples to the rollups, in one transaction."""
+        deltas = {}
+        for row in values:
+            _rollup_delta(deltas, row, sign)
+        with self._lock, self._conn:
+            self._apply_rollups(deltas)
+
+    def _apply_rollups(self, deltas):
+        rows = [(*bucket, count, total) for bucket, (count, total) in deltas.items() if count or total]
+        self._conn.executemany(
+            "INSERT INTO payin_rollups (grain, bucket, currency, status, count, total) VALUES (?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT (grain, bucket, currency, status) DO UPDATE SET "
+            "count = count + excluded.count, total = total + excluded.total",
+            rows,
+        )
+        # Buckets a status change emptied
+        self._conn.executemany(
+            "DELETE FROM payin_rollups WHERE grain = ? AND bucket = ? AND currency = ? AND status = ? AND count <= 0",
+            (row[:4] for row in rows if row[4] < 0),
+        )
+
+    def history(self, key):
+        """Versions of one transaction, oldest first: [{'version', 'replaced_at', 'data'}, ..., current]."""
+        with self._lock:
+            row = self._conn.execute("SELECT seq, data, version, updated FROM payins WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return []
+            seq, data, version, updated = row
+            deltas = self._conn.execute(
+                "SELECT version, changes, replaced_at FROM payin_versions WHERE seq = ? ORDER BY version DESC", (seq,)
+            ).fetchall()
+        state = json.loads(data)
+        versions = [{'version': version, 'replaced_at': None, 'data': dict(state)}]
+        # Walk back from the current state applying each reverse delta
+        for number, changes, replaced_at in deltas:
+            _undo(state, changes)
+            versions.append({'version': number, 'replaced_at': replaced_at, 'data': dict(state)})
+        versions.reverse()
+        return versions
+
+    def changed_at(self, key):
+        """When the stored state of a transaction was last written (first seen or last updated), or None."""
+        with self._lock:
+            row = self._conn.execute("SELECT COALESCE(updated, first_seen) FROM payins WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    # Views: sorted, filtered pages straight from the indexes
+    @staticmethod
+    def _where(status=None, counterparty=None, since=None, until=None, min_amount=None, max_amount=None):
+        """SQL conditions and parameters for the view filters (`counterparty` is a prefix)."""
+        clauses, params = [], []
+        if status:
+            clauses.append("status = ?")
+            params.append(status)
+        if counterparty:
+            # Prefix as a range so the counterparty index is used
+            clauses.append("counterparty >= ? AND counterparty < ?")
+            params += [counterparty, counterparty + '\U0010ffff']
+        if since is not None:
+            clauses.append("ts >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("ts < ?")
+            params.append(until)
+        if min_amount is not None:
+            clauses.append("amount_value >= ?")
+            params.append(min_amount)
+        if max_amount is not None:
+            clauses.append("amount_value <= ?")
+            params.append(max_amount)
+        return clauses, params
+
+    def count_matching(self, **filters):
+        clauses, params = self._where(**filters)
+        with self._lock:
+            return self._count(clauses, params)
+
+    def page(self, sort='seq', descending=True, after=None, before=None, offset=0, limit=256, min_seq=None, **filters):
+        """One page of the sorted, filtered view: [(seq, sort value, data dict)].
+
+        `after`/`before` are (sort value, seq) keys of a neighbouring row and seek through the index;
+        without them the page starts at `offset`. `min_seq` limits it to rows newer than a seq.
+        """
+        if sort not in SORT_COLUMNS:
+            raise ValueError(f"cannot sort by {sort!r}")
+        clauses, params = self._where(**filters)
+        if min_seq is not None:
+            clauses.append("seq > ?")
+            params.append(min_seq)
+        key = after if after is not None else before
+        # Pages before a key are read backwards from it and flipped
+        query_descending = descending if before is None else not descending
+        order = 'DESC' if query_descending else 'ASC'
+        beyond = '<' if query_descending else '>'
+        order_by = f"seq {order}" if sort == 'seq' else f"{sort} {order}, seq {order}"
+        rows = []
+        with self._lock:
+            if key is None:
+                rows = self._select(sort, clauses, params, order_by, limit, offset)
+            elif sort == 'seq':
+                rows = self._select(sort, clauses + [f"seq {beyond} ?"], params + [key[1]], order_by, limit)
+            else:
+                # Ties on the sort value first, then the values beyond it: two index seeks instead of
+                # a row-value range that would rescan every row sharing the value
+                rows = self._select(sort, clauses + [f"{sort} = ?", f"seq {beyond} ?"], params + list(key),
+                                    order_by, limit)
+                if len(rows) < limit:
+                    rows += self._select(sort, clauses + [f"{sort} {beyond} ?"], params + [key[0]], order_by,
+                                         limit - len(rows))
+        if before is not None:
+            rows.reverse()
+        loads = json.loads
+        return [(seq, value, loads(data)) for seq, value, data in rows]
+
+    def _select(self, sort, clauses, params, order_by, limit, offset=0):
+        sql = (f"SELECT seq, {sort}, data FROM payins" + (" WHERE " + " AND ".join(clauses) if clauses else "") +
+               f" ORDER BY {order_by} LIMIT ? OFFSET ?")
+        return self._conn.execute(sql, params + [limit, offset]).fetchall()
+
+    def position(self, seq, sort='seq', descending=True, **filters):
+        """Index of a row in the sorted, filtered view (rows ordered before it)."""
+        clauses, params = self._where(**filters)
+        before = '>' if descending else '<'
+        with self._lock:
+            if sort == 'seq':
+                return self._count(clauses + [f"seq {before} ?"], params + [seq])
+            value = self._conn.execute(f"SELECT {sort} FROM payins WHERE seq = ?", (seq,)).fetchone()[0]
+            return (self._count(clauses + [f"{sort} = ?", f"seq {before} ?"], params + [value, seq]) +
+                    self._count(clauses + [f"{sort} {before} ?"], params + [value]))
+
+    def _count(self, clauses, params):
+        sql = "SELECT COUNT(*) FROM payins" + (" WHERE " + " AND ".join(clauses) if clauses else "")
+        return self._conn.execute(sql, params).fetchone()[0]
+
+    @contextlib.contextmanager
+    def snapshot(self):
+        """Consistent view of the store across several queries (one read transaction)."""
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                yield self
+            finally:
+                self._conn.execute("COMMIT")
+
+    def totals(self, group):
+        """[(group key, currency, count, amount total)] over every stored payin, partitioned ones included.
+
+        Answered from the rollup table, not a scan; undated rows have key None for 'day'.
+        """
+        if group not in TOTALS_GROUPS:
+            raise ValueError(f"no totals by {group!r}")
+        if group == 'status':
+            return [(status, currency, count, total) for bucket, status, currency, count, total, average
+                    in self.rollup('all', by_status=True)]
+        return [row[:4] for row in self.rollup(group)]
+
+    # Reports: answered from payin_rollups, independent of how many payins are stored
+    def rollup(self, grain='day', since=None, until=None, status=None, currency=None, by_status=False):
+        """[(bucket, currency, count, total, average)] of one grain, sorted by bucket.
+
+        `since`/`until` bound the bucket text ('2025-03-01', '2025-03-01 14:00'); since inclusive,
+        until exclusive. Undated rows have bucket None. With `by_status` rows are
+        (bucket, status, currency, count, total, average) instead of summed over statuses.
+        """
+        if grain not in ROLLUP_GRAINS:
+            raise ValueError(f"no rollup by {grain!r}")
+        clauses, params = ["grain = ?"], [grain]
+        for clause, value in (("bucket >= ?", since), ("bucket < ?", until), ("status = ?", status),
+                              ("currency = ?", currency)):
+            if value is not None:
+                clauses.append(clause)
+                params.append(value)
+        keys = "bucket, status, currency" if by_status else "bucket, currency"
+        sql = (f"SELECT {keys}, SUM(count), TOTAL(total) FROM payin_rollups WHERE {' AND '.join(clauses)} "
+               f"GROUP BY {keys} HAVING SUM(count) > 0 ORDER BY {keys}")
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        dated = grain in ('day', 'hour')
+        return [((row[0] or None) if dated else row[0], *row[1:], row[-1] / row[-2]) for row in rows]
+
+    def rollup_summary(self, status=None):
+        """{currency: (count, total, average ticket)} over every stored payin (or one status)."""
+        return {currency: (count, total, average)
+                for bucket, currency, count, total, average in self.rollup('all', status=status)}
+
+    def top_payers(self, n=20, currency=None, status=None):
+        """The `n` counterparties with the largest amount total: [(counterparty, currency, count, total, average)]."""
+        clauses, params = ["grain = 'counterparty'"], []
+        for clause, value in (("status = ?", status), ("currency = ?", currency)):
+            if value is not None:
+                clauses.append(clause)
+                params.append(value)
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT bucket, currency, SUM(count), TOTAL(total) FROM payin_rollups WHERE {' AND '.join(clauses)} "
+                "GROUP BY bucket, currency HAVING SUM(count) > 0 ORDER BY 4 DESC LIMIT ?", params + [n]
+            ).fetchall()
+        return [(*row, row[3] / row[2]) for row in rows]
+
+    def rows_after(self, seq, limit=10000):
+        """[(seq, ts, amount_value, status, counterparty, currency)] of rows added after `seq`, oldest first."""
+        with self._lock:
+            return self._conn.execute(f"SELECT seq, {', '.join(DERIVED_NAMES)} FROM payins WHERE seq > ? "
+                                      "ORDER BY seq LIMIT ?", (seq, limit)).fetchall()
+
+    def updated_since(self, since, max_seq):
+        """Rows up to `max_seq` updated after `since`: [(seq, derived values then, derived values now)].
+
+        "Then" is the state as of `since`, rebuilt from the version log.
+        """
+        with self._lock:
+            rows = self._conn.execute("SELECT seq, data FROM payins WHERE updated > ? AND seq <= ?",
+                                      (since or 0, max_seq)).fetchall()
+            changed = []
+            for seq, data in rows:
+                state = json.loads(data)
+                now = derived_values(state)
+                for changes, in self._conn.execute("SELECT changes FROM payin_versions WHERE seq = ? AND replaced_at > ? "
+                                                   "ORDER BY version DESC", (seq, since or 0)):
+                    _undo(state, changes)
+                changed.append((seq, derived_values(state), now))
+            return changed
+
+    # Partitions (see payin_partitions)
+    def closed_rows(self, cutoff):
+        """Rows dated before `cutoff` (undated: first seen before it), as
+        [(seq, key, data, first_seen, updated, version, ts, amount_value, status, counterparty, currency)]."""
+        with self._lock:
+            return self._conn.execute(
+                f"SELECT seq, key, data, first_seen, updated, version, {', '.join(DERIVED_NAMES)} FROM payins "
+                "WHERE (ts > 0 AND ts < ?) OR (ts = 0 AND first_seen < ?) ORDER BY seq", (cutoff, cutoff)
+            ).fetchall()
+
+    def versions_of(self, seqs):
+        """[(seq, version, changes, replaced_at)] of the prior versions of these rows."""
+        seqs = list(seqs)
+        out = []
+        with self._lock:
+            for start in range(0, len(seqs), 500):
+                chunk = seqs[start:start + 500]
+                out += self._conn.execute(f"SELECT seq, version, changes, replaced_at FROM payin_versions "
+                                          f"WHERE seq IN ({', '.join('?' * len(chunk))})", chunk).fetchall()
+        return out
+
+    def remove_moved(self, moved):
+        """Delete rows copied into a partition; `moved` is [(seq, version, key, month)].
+
+        A row updated after it was copied (its version moved on) stays. Returns the number removed.
+        """
+        removed = []
+        with self._lock, self._conn:
+            for seq, version, key, month in moved:
+                if self._conn.execute("DELETE FROM payins WHERE seq = ? AND version = ?", (seq, version)).rowcount:
+                    removed.append((seq, key, month))
+            self._conn.executemany("DELETE FROM payin_versions WHERE seq = ?", ((seq,) for seq, _, _ in removed))
+            self._conn.executemany("INSERT OR REPLACE INTO archived_keys (key, month) VALUES (?, ?)",
+                                   ((key, month) for _, key, month in removed))
+            self._bump('removed_rows', len(removed))
+        return len(removed)
+
+    def drop_partition(self, month, values):
+        """Forget a retired partition: take its rows (derived values tuples) out of the rollups, drop its keys."""
+        deltas = {}
+        for row in values:
+            _rollup_delta(deltas, row, -1)
+        with self._lock, self._conn:
+            self._apply_rollups(deltas)
+            self._conn.execute("DELETE FROM archived_keys WHERE month = ?", (month,))
+            self._bump('rollup_generation', 1)
+
+    def _bump(self, name, n):
+        self._conn.execute("INSERT INTO meta (name, value) VALUES (?, ?) ON CONFLICT (name) DO UPDATE SET "
+                           "value = CAST(CAST(value AS INTEGER) + excluded.value AS TEXT)", (name, str(n)))
+
+    def removals(self):
+        """(rows moved out or deleted so far, rollup generation): views reload when the first moves,
+        running totals rebuild when the second does."""
+        with self._lock:
+            found = dict(self._conn.execute("SELECT name, value FROM meta "
+                                            "WHERE name IN ('removed_rows', 'rollup_generation')"))
+        return int(found.get('removed_rows', 0)), int(found.get('rollup_generation', 0))
+
+    def range_rows(self, since=None, until=None):
+        """[(seq, data dict)] of rows dated in [since, until), oldest first."""
+        clauses, params = self._where(since=since, until=until)
+        sql = ("SELECT seq, data FROM payins" + (" WHERE " + " AND ".join(clauses) if clauses else "") +
+               " ORDER BY ts, seq")
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [(seq, json.loads(data)) for seq, data in rows]
+
+    def last_change(self):
+        """(highest seq, latest update time): cheap to poll, moves whenever a row is added or updated."""
+        with self._lock:
+            return self._conn.execute("SELECT (SELECT COALESCE(MAX(seq), 0) FROM payins), "
+                                      "(SELECT MAX(updated) FROM payins WHERE updated IS NOT NULL)").fetchone()
+
+    def statuses(self):
+        with self._lock:
+            return [row[0] for row in self._conn.execute("SELECT DISTINCT status FROM payins ORDER BY status")]
+
+    def count(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM payins").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def open_payin_store(path=STORE_PATH):
+    """Open the checkpoint store for run_scraper; returns None if it cannot be opened."""
+    try:
+        return PayinStore(path)
+    except sqlite3.Error as e:
+        print(f"⚠️ Checkpoint store unavailable ({path}): {e}")
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Payin store reports')
+    parser.add_argument('command', choices=('report', 'rebuild-rollups'))
+    parser.add_argument('--store', default=STORE_PATH)
+    parser.add_argument('--by', default='day', choices=tuple(ROLLUP_GRAINS) + ('status',))
+    parser.add_argument('--since', help="first bucket, e.g. 2025-03-01 or '2025-03-01 14:00'")
+    parser.add_argument('--until', help='bucket to stop before')
+    parser.add_argument('--status')
+    parser.add_argument('--currency')
+    parser.add_argument('--top', type=int, help='largest counterparties only (with --by counterparty)')
+    args = parser.parse_args()
+
+    if not os.path.exists(args.store):
+        print(f"❌ No store at {args.store}")
+        return 1
+    store = PayinStore(args.store)
+    try:
+        if args.command == 'rebuild-rollups':
+            from payin_partitions import rebuild_rollups
+            started = time.time()
+            rows = rebuild_rollups(store)
+            print(f"✅ Rollups rebuilt over {rows} transactions in {time.time() - started:.1f}s")
+            return 0
+        if args.by == 'counterparty' and args.top:
+            rows = store.top_payers(args.top, currency=args.currency, status=args.status)
+        elif args.by == 'status':
+            rows = [row[1:] for row in store.rollup('all', status=args.status, currency=args.currency, by_status=True)]
+        else:
+            rows = store.rollup(args.by, since=args.since, until=args.until, status=args.status,
+                                currency=args.currency)
+        print(f"{args.by:<24} {'currency':<8} {'count':>10} {'total':>18} {'average':>14}")
+        for key, currency, count, total, average in rows:
+            print(f"{str(key if key is not None else '(no date)'):<24} {currency:<8} {count:>10,} {total:>18,.2f} "
+                  f"{average:>14,.2f}")
+        for currency, (count, total, average) in sorted(store.rollup_summary(status=args.status).items()):
+            print(f"📊 {currency or '(none)'}: {count:,} transactions, {total:,.2f} total, {average:,.2f} average")
+        return 0
+    finally:
+        store.close()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,268 @@
+"""Local push channel for newly collected payins.
+
+`run_scraper` publishes every transaction the moment it is deduplicated and
+local consumers receive it as a Server-Sent Event instead of polling
+`payins_snapshot.json`.
+
+    GET /events               stream new events (text/event-stream)
+    GET /events?cursor=ID     resume after event ID (same as a Last-Event-ID header)
+    GET /stats                delivery latency and backlog counters as JSON
+
+Event ids are "<run>:<n>": the scraper run (scraper_log.RUN_ID) and a counter
+that starts at 1 in every run. A cursor from another run (the scraper was
+restarted) gets a `gap` event with `previous_run`, since whatever that run
+published after the cursor is gone, and then everything of this run.
+
+Every event carries `detected_at` (when the row was seen on the page),
+`published_at`, the refresh `cycle` and, when the payin shows a time of day,
+`posted_at`, so end-to-end latency can be measured by the consumer; the
+server keeps its own detection-to-socket-write figures under /stats, next
+to the posting-to-detection figures of detection_latency.
+"""
+
+import os
+import json
+import time
+import threading
+import itertools
+import collections
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+from detection_latency import detection_stats
+from percentiles import percentile
+from scraper_log import RUN_ID
+
+# CONFIG
+STREAM_HOST = os.environ.get('PAYIN_STREAM_HOST', '127.0.0.1')
+STREAM_PORT = int(os.environ.get('PAYIN_STREAM_PORT', '8765') or 0)  # 0 disables the channel
+STREAM_BACKLOG = 10000  # events kept in memory for reconnecting consumers
+KEEPALIVE_INTERVAL = 15  # seconds
+
+
+class PayinStream:
+    """Bounded, ordered event log with blocking reads by cursor."""
+
+    def __init__(self, backlog=STREAM_BACKLOG, run=RUN_ID):
+        self.run = run
+        self._events = collections.deque(maxlen=backlog)
+        self._cond = threading.Condition()
+        self._next_seq = 1
+        self._closed = False
+        self._latencies = collections.deque(maxlen=1000)
+        self._delivered = 0
+        self._server = None
+        self._thread = None
+
+    @property
+    def last_seq(self):
+        return self._next_seq - 1
+
+    @property
+    def last_id(self):
+        return self.event_id(self.last_seq)
+
+    def event_id(self, seq):
+        return f"{self.run}:{seq}"
+
+    def parse_cursor(self, cursor):
+        """(run, seq) of a cursor: "<run>:<n>", or a bare number meaning this run. Raises ValueError."""
+        run, _, seq = str(cursor).strip().rpartition(':')
+        return run or self.run, int(seq)
+
+    @property
+    def closed(self):
+        return self._closed
+
+    @property
+    def address(self):
+        return self._server.server_address if self._server else None
+
+    def publish(self, payin, detected_at=None, event='payin', changes=None, cycle=None, posted_at=None):
+        """Append an event and wake up every waiting consumer. Returns its id.
+
+        `changes` ({field: [old, new]}) goes along with `payin.updated` events.
+        """
+        now = time.time()
+        with self._cond:
+            seq = self._next_seq
+            self._next_seq += 1
+            event_id = self.event_id(seq)
+            message = {
+                'id': event_id,
+                'detected_at': detected_at or now,
+                'published_at': now,
+                'transaction': payin,
+            }
+            if cycle is not None:
+                message['cycle'] = cycle
+            if posted_at is not None:
+                message['posted_at'] = posted_at
+            if changes:
+                message['changes'] = changes
+            body = json.dumps(message, ensure_ascii=False)
+            # Serialized once here so each connected consumer only writes bytes.
+            frame = f"id: {event_id}\nevent: {event}\ndata: {body}\n\n".encode('utf-8')
+            self._events.append((seq, detected_at or now, frame))
+            self._cond.notify_all()
+        return event_id
+
+    def events_since(self, cursor, timeout=None):
+        """Return (missed, events) for everything after event number `cursor` of this run.
+
+        `missed` is the number of events that already fell out of the backlog,
+        so the consumer knows it has to resync from the snapshot file.
+        """
+        with self._cond:
+            if timeout and not self._closed and self.last_seq <= cursor:
+                self._cond.wait_for(lambda: self._closed or self.last_seq > cursor, timeout)
+            if not self._events or self.last_seq <= cursor:
+                return 0, []
+            first_id = self._events[0][0]
+            missed = max(0, first_id - cursor - 1)
+            start = max(0, cursor + 1 - first_id)
+            return missed, list(itertools.islice(self._events, start, None))
+
+    def record_delivery(self, detected_at):
+        with self._cond:
+            self._latencies.append(time.time() - detected_at)
+            self._delivered += 1
+
+    def stats(self):
+        with self._cond:
+            latencies = sorted(self._latencies)
+            stats = {
+                'run': self.run,
+                'last_id': self.last_id,
+                'backlog': len(self._events),
+                'delivered': self._delivered,
+                'latency_p50_ms': None if not latencies else round(percentile(latencies, 50) * 1000, 3),
+                'latency_p95_ms': None if not latencies else round(percentile(latencies, 95) * 1000, 3),
+                'latency_max_ms': None if not latencies else round(latencies[-1] * 1000, 3),
+            }
+        stats['detection'] = detection_stats()
+        return stats
+
+    def start(self, host=STREAM_HOST, port=STREAM_PORT):
+        """Serve the stream over HTTP in a daemon thread."""
+        stream = self
+
+        class Handler(_StreamHandler):
+            pass
+        Handler.stream = stream
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, name='payin-stream', daemon=True)
+        self._thread.start()
+        return self
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+class _StreamHandler(BaseHTTPRequestHandler):
+    stream = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path == '/stats':
+            body = json.dumps(self.stream.stats()).encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+        if url.path != '/events':
+            self.send_error(404)
+            return
+
+        cursor = self.headers.get('Last-Event-ID') or parse_qs(url.query).get('cursor', [None])[0]
+        previous_run = None
+        try:
+            run, cursor = self.stream.parse_cursor(cursor) if cursor is not None else (self.stream.run, self.stream.last_seq)
+        except ValueError:
+            self.send_error(400, 'cursor must be an event id ("run:n") or a number')
+            return
+        if run != self.stream.run or cursor > self.stream.last_seq:
+            # Cursor from another scraper run: its later events are lost, replay this run from the start.
+            previous_run, cursor = run, 0
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-cache')
+        self.end_headers()
+        try:
+            self.wfile.write(b"retry: 2000\n\n")
+            if previous_run is not None:
+                gap = {'missed': None, 'previous_run': previous_run, 'run': self.stream.run}
+                self.wfile.write(f"event: gap\ndata: {json.dumps(gap)}\n\n".encode('utf-8'))
+            self.wfile.flush()
+            while not self.stream.closed:
+                missed, events = self.stream.events_since(cursor, timeout=KEEPALIVE_INTERVAL)
+                if missed:
+                    self.wfile.write(f"event: gap\ndata: {json.dumps({'missed': missed})}\n\n".encode('utf-8'))
+                if not events:
+                    self.wfile.write(b": keepalive\n\n")
+                    self.wfile.flush()
+                    continue
+                for seq, detected_at, frame in events:
+                    self.wfile.write(frame)
+                    cursor = seq
+                self.wfile.flush()
+                for _, detected_at, _ in events:
+                    self.stream.record_delivery(detected_at)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+
+def start_payin_stream(host=STREAM_HOST, port=STREAM_PORT):
+    """Start the push channel for run_scraper; returns None when disabled or the port is taken."""
+    if not port:
+        return None
+    try:
+        stream = PayinStream().start(host, port)
+        print(f"📡 Payin stream listening on http://{host}:{port}/events")
+        return stream
+    except OSError as e:
+        print(f"⚠️ Payin stream unavailable on {host}:{port}: {e}")
+        return None
+
+
+def iter_events(url, cursor=None, timeout=None):
+    """Minimal SSE consumer. Yields decoded events; `payin` and `payin.updated` carry a `latency` field (seconds).
+
+    Pass the last seen `id` back as `cursor` after a reconnect to receive only
+    what was missed. A `gap` event means events were lost (`missed` of them,
+    or an unknown number when `previous_run` is set): resync from the snapshot.
+    """
+    request = urllib.request.Request(url)
+    if cursor is not None:
+        request.add_header('Last-Event-ID', str(cursor))
+    with urllib.request.urlopen(request, timeout=timeout) as resp:
+        event, data = 'message', []
+        for raw in resp:
+            line = raw.decode('utf-8').rstrip('\n')
+            if not line:
+                if data:
+                    payload = json.loads('\n'.join(data))
+                    if event in ('payin', 'payin.updated') and 'detected_at' in payload:
+                        payload['latency'] = time.time() - payload['detected_at']
+                    payload['event'] = event
+                    yield payload
+                event, data = 'message', []
+            elif line.startswith('event:'):
+                event = line[6:].strip()
+            elif line.startswith('data:'):
+                data.append(line[5:].strip())
@@ -0,0 +1,9 @@
+"""Percentiles for the latency and timing figures the scraper reports."""
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank `pct` percentile of an already sorted sequence, None when it is empty."""
+    if not sorted_values:
+        return None
+    idx = min(len(sorted_values) - 1, int(round(pct / 100.0 * (len(sorted_values) - 1))))
+    return sorted_values[idx]
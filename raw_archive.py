@@ -0,0 +1,364 @@
+"""Archive of raw captured rows, for re-parsing after a parser fix.
+
+The persist stage hands every capture to `RawArchive.add()`. Each row
+payload (tag, text, html, attrs, cells) is stored once, zlib-compressed and
+keyed by a hash of its content; a capture is just the packed list of its row
+ids. The activity list shifts by one row when a payment arrives, so a new
+capture usually adds one row blob, and a capture identical to the previous
+one (nothing arrived) is not stored at all - only its repeat count grows.
+
+When Google Pay changes its markup and rows were mis-parsed or dropped,
+`reparse` runs the current `gpay_parser` over the archive:
+
+- every distinct row is parsed exactly once, in chunks spread over a
+  process pool (workers read their chunk straight from the archive, so only
+  row ids and parsed dicts cross process boundaries);
+- the captures are then replayed in order through the same upsert the
+  pipeline uses, and only the net difference is written to the store.
+  Running it twice changes nothing the second time.
+
+    python raw_archive.py stats
+    python raw_archive.py reparse --since 2025-06-01 --workers 8
+
+Run reparse while the scraper is stopped: the scraper keeps its collected
+transactions in memory and would not see what reparse merged until restart.
+"""
+
+import os
+import sys
+import json
+import time
+import zlib
+import array
+import sqlite3
+import hashlib
+import argparse
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from payin_record import payin_changes, parse_timestamp
+from payin_store import STORE_PATH, PayinStore
+from payin_pipeline import parse_payloads, upsert_payins
+
+# CONFIG
+ARCHIVE_PATH = os.environ.get('RAW_ARCHIVE_PATH', 'raw_archive.db')  # '' = archive off
+COMPRESS_LEVEL = 6
+REPARSE_CHUNK = 2000  # distinct rows per worker task
+REPARSE_WORKERS = os.cpu_count() or 1
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS raw_rows (
+    id INTEGER PRIMARY KEY,
+    hash BLOB NOT NULL UNIQUE,
+    data BLOB NOT NULL,
+    first_seen REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS captures (
+    seq INTEGER PRIMARY KEY,
+    captured_at REAL NOT NULL,
+    last_seen REAL NOT NULL,
+    repeats INTEGER NOT NULL DEFAULT 0,
+    refresh_count INTEGER,
+    selector TEXT,
+    page BLOB NOT NULL,
+    rows BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS captures_captured_at ON captures (captured_at);
+"""
+
+_ID_TYPE = 'q'
+
+
+def _encode(payload):
+    return json.dumps(payload, sort_keys=True, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def _digest(data):
+    return hashlib.blake2b(data, digest_size=16).digest()
+
+
+def _unpack_ids(blob):
+    ids = array.array(_ID_TYPE)
+    ids.frombytes(blob)
+    return ids
+
+
+class RawArchive:
+    """Content-deduplicated, compressed store of captured row payloads."""
+
+    def __init__(self, path=ARCHIVE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._conn.commit()
+        last = self._conn.execute("SELECT seq, page, rows FROM captures ORDER BY seq DESC LIMIT 1").fetchone()
+        self._last_seq, self._last_page = (last[0], last[1]) if last else (None, None)
+        # Rows of the previous capture: almost every row of the next one is among them
+        self._recent = {}
+        if last:
+            ids = _unpack_ids(last[2])
+            for row_id, digest in self._conn.execute(
+                    f"SELECT id, hash FROM raw_rows WHERE id IN ({','.join('?' * len(ids))})", list(ids)):
+                self._recent[digest] = row_id
+        self._repeats = 0
+        self._last_seen = None
+        self.stored = 0
+        self.skipped = 0
+        self.new_rows = 0
+
+    def add(self, capture):
+        """Archive a RawCapture. Returns False when the page was unchanged and only counted."""
+        encoded = [_encode(row) for row in capture.rows]
+        hashes = [_digest(data) for data in encoded]
+        page = _digest((capture.selector or '').encode('utf-8') + b''.join(hashes))
+        with self._lock:
+            if page == self._last_page:
+                self._repeats += 1
+                self._last_seen = capture.captured_at
+                self.skipped += 1
+                return False
+            with self._conn:
+                self._flush_repeats()
+                recent = {}
+                ids = array.array(_ID_TYPE)
+                for data, digest in zip(encoded, hashes):
+                    row_id = self._recent.get(digest) or recent.get(digest)
+                    if row_id is None:
+                        found = self._conn.execute("SELECT id FROM raw_rows WHERE hash = ?", (digest,)).fetchone()
+                        if found:
+                            row_id = found[0]
+                        else:
+                            row_id = self._conn.execute(
+                                "INSERT INTO raw_rows (hash, data, first_seen) VALUES (?, ?, ?)",
+                                (digest, zlib.compress(data, COMPRESS_LEVEL), capture.captured_at)).lastrowid
+                            self.new_rows += 1
+                    recent[digest] = row_id
+                    ids.append(row_id)
+                self._last_seq = self._conn.execute(
+                    "INSERT INTO captures (captured_at, last_seen, refresh_count, selector, page, rows) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (capture.captured_at, capture.captured_at, capture.refresh_count, capture.selector,
+                     page, ids.tobytes())).lastrowid
+            self._recent = recent
+            self._last_page = page
+            self.stored += 1
+            return True
+
+    def _flush_repeats(self):
+        if self._repeats and self._last_seq is not None:
+            self._conn.execute("UPDATE captures SET repeats = repeats + ?, last_seen = ? WHERE seq = ?",
+                               (self._repeats, self._last_seen, self._last_seq))
+        self._repeats = 0
+
+    def captures(self, since=None, until=None):
+        """Yield (seq, captured_at, row ids) in capture order, optionally limited to [since, until] timestamps."""
+        query = "SELECT seq, captured_at, rows FROM captures WHERE captured_at >= ? AND captured_at <= ? ORDER BY seq"
+        with self._lock:
+            found = self._conn.execute(query, (since or 0, until or float('inf'))).fetchall()
+        for seq, captured_at, rows in found:
+            yield seq, captured_at, _unpack_ids(rows)
+
+    def stats(self):
+        with self._lock:
+            captures, repeats, first, last = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(repeats), 0), MIN(captured_at), MAX(last_seen) FROM captures"
+            ).fetchone()
+            rows, compressed = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(LENGTH(data)), 0) FROM raw_rows").fetchone()
+        return {
+            'captures': captures,
+            'unchanged_refreshes': repeats + self._repeats,
+            'distinct_rows': rows,
+            'compressed_bytes': compressed,
+            'file_bytes': os.path.getsize(self.path) if os.path.exists(self.path) else None,
+            'first_capture': first,
+            'last_capture': last,
+        }
+
+    def close(self):
+        with self._lock:
+            try:
+                with self._conn:
+                    self._flush_repeats()
+            except sqlite3.Error:
+                pass
+            self._conn.close()
+
+
+def open_raw_archive(path=ARCHIVE_PATH):
+    """Open the raw capture archive for run_scraper; None when disabled or it cannot be opened."""
+    if not path:
+        return None
+    try:
+        return RawArchive(path)
+    except sqlite3.Error as e:
+        print(f"⚠️ Raw capture archive unavailable ({path}): {e}")
+        return None
+
+
+# ----------------------
+# Re-parsing
+# ----------------------
+_worker_conn = None
+
+
+def _parse_chunk(path, packed_ids, parse=None):
+    """Worker: parse one chunk of distinct rows read from the archive. Returns ({row id: parsed}, errors, first error)."""
+    global _worker_conn
+    parse = parse or parse_payloads
+    if _worker_conn is None:
+        _worker_conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    wanted = _unpack_ids(packed_ids)
+    wanted_set = set(wanted)
+    results = {}
+    errors = 0
+    first_error = None
+    # Ids of one chunk are close together: a range scan beats a huge IN list
+    for row_id, data in _worker_conn.execute("SELECT id, data FROM raw_rows WHERE id BETWEEN ? AND ?",
+                                             (min(wanted), max(wanted))):
+        if row_id not in wanted_set:
+            continue
+        try:
+            results[row_id] = parse([json.loads(zlib.decompress(data))])
+        except ImportError:
+            raise
+        except Exception as e:
+            errors += 1
+            first_error = first_error or f"row {row_id}: {e}"
+    return results, errors, first_error
+
+
+def parse_archive(path, row_ids, workers=REPARSE_WORKERS, chunk_rows=REPARSE_CHUNK, parse=None):
+    """Parse the given distinct row ids, `workers` processes at a time. Returns ({row id: parsed}, errors)."""
+    row_ids = sorted(row_ids)
+    chunks = [array.array(_ID_TYPE, row_ids[i:i + chunk_rows]).tobytes() for i in range(0, len(row_ids), chunk_rows)]
+    parsed = {}
+    errors = 0
+    if workers > 1 and len(chunks) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = pool.map(_parse_chunk, [path] * len(chunks), chunks, [parse] * len(chunks))
+            for chunk_results, chunk_errors, first_error in results:
+                parsed.update(chunk_results)
+                errors += chunk_errors
+                if first_error:
+                    print(f"⚠️ Re-parse errors in chunk: {chunk_errors} (first: {first_error})")
+    else:
+        for chunk in chunks:
+            chunk_results, chunk_errors, first_error = _parse_chunk(path, chunk, parse)
+            parsed.update(chunk_results)
+            errors += chunk_errors
+            if first_error:
+                print(f"⚠️ Re-parse errors in chunk: {chunk_errors} (first: {first_error})")
+    return parsed, errors
+
+
+def reparse(archive, store, since=None, until=None, workers=REPARSE_WORKERS, chunk_rows=REPARSE_CHUNK,
+            parse=None, dry_run=False):
+    """Re-parse archived captures and merge the result into `store`. Returns a summary dict."""
+    started = time.time()
+    captures = list(archive.captures(since, until))
+    distinct = set()
+    for _, _, ids in captures:
+        distinct.update(ids)
+    print(f"🗄️ Re-parsing {len(distinct):,} distinct rows from {len(captures):,} captures with {workers} worker(s)...")
+    parsed_rows, errors = parse_archive(archive.path, distinct, workers=workers, chunk_rows=chunk_rows, parse=parse)
+    parse_seconds = time.time() - started
+
+    # Replay the captures in order to get each transaction's latest state and when it was first/last seen
+    replayed, index = [], {}
+    first_seen, last_seen = {}, {}
+    for _, captured_at, ids in captures:
+        parsed = [p for row_id in ids for p in parsed_rows.get(row_id, ())]
+        new_payins, updated_payins = upsert_payins(replayed, index, parsed)
+        for key, _ in new_payins:
+            first_seen[key] = captured_at
+        for key, _, _ in updated_payins:
+            last_seen[key] = captured_at
+        for key, _ in new_payins:
+            last_seen[key] = captured_at
+
+    # Merge only the net difference; a transaction the store changed after its last archived sighting keeps its state
+    payins, store_index, _ = store.load()
+    added, changed, kept, partitioned = {}, [], 0, 0
+    for key, position in index.items():
+        p = replayed[position]
+        current = store_index.get(key)
+        if current is not None and current < 0:
+            partitioned += 1  # moved out to a monthly partition, which is not rewritten
+        elif current is None:
+            added.setdefault(first_seen[key], []).append((key, p))
+        elif payins[current] != p:
+            if (store.changed_at(key) or 0) > last_seen.get(key, first_seen[key]):
+                kept += 1
+            else:
+                changed.append((key, p, payin_changes(payins[current], p)))
+    summary = {
+        'captures': len(captures),
+        'distinct_rows': len(distinct),
+        'parse_errors': errors,
+        'parsed_transactions': len(index),
+        'new_transactions': sum(len(group) for group in added.values()),
+        'updated_transactions': len(changed),
+        'kept_newer': kept,
+        'in_partitions': partitioned,
+        'parse_seconds': round(parse_seconds, 2),
+        'dry_run': dry_run,
+    }
+    if not dry_run:
+        for captured_at in sorted(added):
+            store.checkpoint(added[captured_at], first_seen=captured_at)
+        store.checkpoint(updated_payins=changed, reparsed_at=time.time(),
+                         total_transactions=len(payins) + summary['new_transactions'])
+    summary['duration_s'] = round(time.time() - started, 2)
+    print(f"✅ Re-parse done: {summary['new_transactions']} new, {summary['updated_transactions']} updated, "
+          f"{errors} row errors in {summary['duration_s']}s")
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Raw capture archive')
+    parser.add_argument('command', choices=('stats', 'reparse'))
+    parser.add_argument('--archive', default=ARCHIVE_PATH or 'raw_archive.db')
+    parser.add_argument('--store', default=STORE_PATH, help='checkpoint store to merge re-parsed payins into')
+    parser.add_argument('--since', help='only captures from this date on')
+    parser.add_argument('--until', help='only captures up to this date')
+    parser.add_argument('--workers', type=int, default=REPARSE_WORKERS)
+    parser.add_argument('--chunk-rows', type=int, default=REPARSE_CHUNK)
+    parser.add_argument('--dry-run', action='store_true', help='report what would change without writing')
+    args = parser.parse_args()
+
+    if not os.path.exists(args.archive):
+        print(f"❌ No archive at {args.archive}")
+        return 1
+    archive = RawArchive(args.archive)
+    try:
+        if args.command == 'stats':
+            print(json.dumps(archive.stats(), indent=2))
+            return 0
+        bounds = []
+        for text in (args.since, args.until):
+            ts = parse_timestamp(text) if text else None
+            if text and ts is None:
+                print(f"❌ Unrecognized date: {text}")
+                return 1
+            bounds.append(ts)
+        store = PayinStore(args.store)
+        try:
+            summary = reparse(archive, store, since=bounds[0], until=bounds[1], workers=max(1, args.workers),
+                              chunk_rows=args.chunk_rows, dry_run=args.dry_run)
+        except ImportError as e:
+            print(f"❌ Parser not available: {e}")
+            return 1
+        finally:
+            store.close()
+        print(f"📋 Summary: {json.dumps(summary)}")
+        return 0
+    finally:
+        archive.close()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
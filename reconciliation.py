@@ -0,0 +1,392 @@
+"""Match collected payins against expected payments (invoices).
+
+Expected payments come from a CSV or JSON file. Both sides are indexed:
+
+- references (invoice id / reference column) in a hash map, looked up with
+  the reference-like tokens found in a payin's description;
+- amounts in minor units in a hash map of buckets, each bucket keeping its
+  invoices sorted by date so the time window is a bisect, not a scan.
+
+A payin is matched by reference first, then by amount inside the window
+[invoice date - WINDOW_BEFORE, invoice date + WINDOW_AFTER]. Several open
+candidates are narrowed by counterparty similarity; what is still tied is
+reported as ambiguous. `Reconciler.add_payin()` does one lookup per payin,
+so the pipeline can reconcile every new transaction as it is persisted.
+
+    python reconciliation.py expected.csv payins.json --out reconciliation_report.json
+"""
+
+import gc
+import os
+import re
+import csv
+import sys
+import json
+import time
+import bisect
+import argparse
+import contextlib
+
+from payin_record import Payin, as_dict, parse_amount, parse_timestamp
+
+# CONFIG
+EXPECTED_PAYMENTS_PATH = os.environ.get('EXPECTED_PAYMENTS_PATH')  # unset = reconciliation off
+REPORT_PATH = 'reconciliation_report.json'
+WINDOW_BEFORE = 3 * 86400  # a payment may arrive this long before the invoice date
+WINDOW_AFTER = 45 * 86400  # ... and this long after it
+AMOUNT_TOLERANCE = 0  # minor units (e.g. 100 = 1.00) accepted for fees/rounding
+REFERENCE_RE = re.compile(r'\b[A-Z]{2,5}[-_/]?\d{3,}\b|\b\d{6,}\b')
+
+FIELD_ALIASES = {
+    'id': ('id', 'invoice_id', 'invoice', 'number', 'invoice_number'),
+    'amount': ('amount', 'total', 'amount_due', 'expected_amount'),
+    'currency': ('currency', 'currency_code'),
+    'reference': ('reference', 'ref', 'payment_reference', 'memo'),
+    'date': ('date', 'due_date', 'issued', 'issue_date', 'created_at'),
+    'counterparty': ('counterparty', 'customer', 'name', 'payer', 'customer_name'),
+}
+
+_WORD_RE = re.compile(r'\w+')
+
+
+def to_minor(value):
+    """Amount in minor units (int), from a number or a displayed amount; None if unparseable."""
+    if value is None or value == '':
+        return None
+    if isinstance(value, (int, float)):
+        number = value
+    else:
+        try:
+            number = float(value)
+        except ValueError:
+            number = parse_amount(str(value))[0]
+    return None if number is None else int(round(abs(number) * 100))
+
+
+_tokens_cache = {}
+
+
+def _name_tokens(text):
+    """Lower-cased words longer than two letters, memoized (names repeat across invoices and payins)."""
+    if not text:
+        return frozenset()
+    tokens = _tokens_cache.get(text)
+    if tokens is None:
+        tokens = frozenset(w for w in _WORD_RE.findall(text.lower()) if len(w) > 2)
+        if len(_tokens_cache) > 200000:
+            _tokens_cache.clear()
+        _tokens_cache[text] = tokens
+    return tokens
+
+
+def resolve_columns(row):
+    """Map each field to the first alias present in `row` (files have one header, so this runs once)."""
+    return {field: next((name for name in aliases if name in row), None) for field, aliases in FIELD_ALIASES.items()}
+
+
+class Invoice:
+    """One expected payment."""
+
+    __slots__ = ('id', 'amount_minor', 'currency', 'reference', 'timestamp', 'counterparty', 'data', 'matched_by')
+
+    def __init__(self, data, columns=None):
+        columns = columns or resolve_columns(data)
+
+        def pick(field):
+            name = columns[field]
+            value = data.get(name) if name else None
+            return None if value == '' else value
+
+        self.data = data
+        self.id = str(pick('id') or '')
+        amount = pick('amount')
+        self.amount_minor = to_minor(amount)
+        currency = pick('currency')
+        if currency is None and isinstance(amount, str):
+            currency = parse_amount(amount)[1]
+        self.currency = currency.upper() if currency else None
+        reference = pick('reference')
+        self.reference = str(reference).upper() if reference else None
+        date = pick('date')
+        self.timestamp = parse_timestamp(str(date)) if date else None
+        self.counterparty = pick('counterparty')
+        self.matched_by = None  # key of the matching payin
+
+
+@contextlib.contextmanager
+def _gc_paused():
+    """Bulk loads create millions of long-lived objects; full GC passes over them only cost time."""
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+class _Bucket:
+    """Open invoices of one amount, sorted by date; undated ones kept aside."""
+
+    __slots__ = ('times', 'invoices', 'undated')
+
+    def __init__(self):
+        self.times = []
+        self.invoices = []
+        self.undated = []
+
+    def add(self, invoice):
+        if invoice.timestamp is None:
+            self.undated.append(invoice)
+            return
+        if not self.times or invoice.timestamp >= self.times[-1]:
+            self.times.append(invoice.timestamp)
+            self.invoices.append(invoice)
+        else:
+            i = bisect.bisect_right(self.times, invoice.timestamp)
+            self.times.insert(i, invoice.timestamp)
+            self.invoices.insert(i, invoice)
+
+    def window(self, timestamp, before, after):
+        """Open invoices whose date lies in [timestamp - after, timestamp + before]."""
+        if timestamp is None:
+            return [inv for inv in self.invoices if inv.matched_by is None] + \
+                   [inv for inv in self.undated if inv.matched_by is None]
+        lo = bisect.bisect_left(self.times, timestamp - after)
+        hi = bisect.bisect_right(self.times, timestamp + before)
+        found = [inv for inv in self.invoices[lo:hi] if inv.matched_by is None]
+        found.extend(inv for inv in self.undated if inv.matched_by is None)
+        return found
+
+
+class Reconciler:
+    """Incremental matcher of payins against indexed invoices."""
+
+    def __init__(self, invoices=(), window_before=WINDOW_BEFORE, window_after=WINDOW_AFTER,
+                 tolerance=AMOUNT_TOLERANCE):
+        self.window_before = window_before
+        self.window_after = window_after
+        self.tolerance = tolerance
+        self.invoices = []
+        self._by_reference = {}
+        self._by_amount = {}
+        self.matched = []  # (payin, invoice, method)
+        self.ambiguous = []  # (payin, [candidate invoices], reason)
+        self.unmatched_payins = []
+        self.stats = {'payins': 0, 'matched': 0, 'ambiguous': 0, 'unmatched': 0, 'seconds': 0.0}
+        self.add_invoices(invoices)
+
+    def add_invoices(self, invoices):
+        """Bulk-index invoices (dicts from one file, or Invoice objects)."""
+        columns = None
+        with _gc_paused():
+            for invoice in invoices:
+                if not isinstance(invoice, Invoice):
+                    if columns is None or any(name is not None and name not in invoice for name in columns.values()):
+                        columns = resolve_columns(invoice)
+                    invoice = Invoice(invoice, columns)
+                self.add_invoice(invoice)
+        return self
+
+    def add_invoice(self, invoice):
+        if not isinstance(invoice, Invoice):
+            invoice = Invoice(invoice)
+        if invoice.amount_minor is None:
+            return None
+        self.invoices.append(invoice)
+        for ref in (invoice.reference, invoice.id.upper() if invoice.id else None):
+            if ref:
+                self._by_reference.setdefault(ref, []).append(invoice)
+        bucket = self._by_amount.get(invoice.amount_minor)
+        if bucket is None:
+            bucket = self._by_amount[invoice.amount_minor] = _Bucket()
+        bucket.add(invoice)
+        return invoice
+
+    # Matching
+    def _currency_ok(self, payin, invoice):
+        return payin.currency is None or invoice.currency is None or payin.currency == invoice.currency
+
+    def _references(self, payin):
+        text = payin.description or ''
+        if payin.counterparty:
+            text = f"{text} {payin.counterparty}"
+        if payin.extra:
+            text = ' '.join([text] + [str(payin.extra[k]) for k in ('reference', 'note') if payin.extra.get(k)])
+        return REFERENCE_RE.findall(text.upper()) if text else ()
+
+    def _narrow(self, payin, candidates):
+        """Prefer the candidates whose counterparty shares the most words with the payin."""
+        words = _name_tokens(' '.join(str(v) for v in (payin.counterparty, payin.description) if v))
+        if not words:
+            return candidates
+        scored = [(len(words & _name_tokens(inv.counterparty)), inv) for inv in candidates]
+        best = max(score for score, _ in scored)
+        if best == 0:
+            return candidates
+        return [inv for score, inv in scored if score == best]
+
+    def add_payin(self, payin):
+        """Match one payin; returns ('matched', invoice, method), ('ambiguous', candidates, reason) or ('unmatched', None, None)."""
+        started = time.perf_counter()
+        payin = Payin.from_dict(payin)
+        self.stats['payins'] += 1
+        try:
+            amount = payin.amount_value
+            amount_minor = None if amount is None else int(round(abs(amount) * 100))
+            if amount is not None and amount < 0:
+                # outgoing money never settles an invoice
+                return self._unmatched(payin)
+
+            # 1. reference hash join
+            for ref in self._references(payin):
+                candidates = [inv for inv in self._by_reference.get(ref, ()) if inv.matched_by is None]
+                if not candidates:
+                    continue
+                exact = [inv for inv in candidates
+                         if amount_minor is not None and abs(inv.amount_minor - amount_minor) <= self.tolerance
+                         and self._currency_ok(payin, inv)]
+                if len(exact) == 1:
+                    return self._match(payin, exact[0], 'reference')
+                return self._ambiguous(payin, exact or candidates,
+                                       'reference_duplicates' if exact else 'reference_amount_mismatch')
+
+            if amount_minor is None:
+                return self._unmatched(payin)
+
+            # 2. amount hash join inside the time window
+            candidates = []
+            for delta in range(-self.tolerance, self.tolerance + 1) if self.tolerance else (0,):
+                bucket = self._by_amount.get(amount_minor + delta)
+                if bucket is not None:
+                    candidates.extend(bucket.window(payin.timestamp, self.window_before, self.window_after))
+            currency = payin.currency
+            if currency is not None:
+                candidates = [inv for inv in candidates if inv.currency is None or inv.currency == currency]
+            if not candidates:
+                return self._unmatched(payin)
+            method = 'amount_window'
+            if len(candidates) > 1:
+                candidates = self._narrow(payin, candidates)
+                method = 'fuzzy'
+            if len(candidates) == 1:
+                return self._match(payin, candidates[0], method)
+            # still tied: the oldest open invoice is the most likely, but let a human decide
+            return self._ambiguous(payin, candidates, 'amount_window_ties')
+        finally:
+            self.stats['seconds'] += time.perf_counter() - started
+
+    def add_payins(self, payins):
+        with _gc_paused():
+            for payin in payins:
+                self.add_payin(payin)
+        return self
+
+    def _match(self, payin, invoice, method):
+        invoice.matched_by = payin.id or id(payin)
+        self.matched.append((payin, invoice, method))
+        self.stats['matched'] += 1
+        return 'matched', invoice, method
+
+    def _ambiguous(self, payin, candidates, reason):
+        self.ambiguous.append((payin, candidates, reason))
+        self.stats['ambiguous'] += 1
+        return 'ambiguous', candidates, reason
+
+    def _unmatched(self, payin):
+        self.unmatched_payins.append(payin)
+        self.stats['unmatched'] += 1
+        return 'unmatched', None, None
+
+    # Results
+    def unmatched_invoices(self):
+        return [inv for inv in self.invoices if inv.matched_by is None]
+
+    def summary(self):
+        return {
+            'invoices': len(self.invoices),
+            'payins': self.stats['payins'],
+            'matched': self.stats['matched'],
+            'ambiguous': self.stats['ambiguous'],
+            'unmatched_payins': self.stats['unmatched'],
+            'unmatched_invoices': len(self.invoices) - self.stats['matched'],
+            'avg_match_us': round(1e6 * self.stats['seconds'] / self.stats['payins'], 2) if self.stats['payins'] else None,
+        }
+
+    def write_report(self, path=REPORT_PATH):
+        """Write matched / ambiguous / unmatched sets as JSON."""
+        report = {
+            'timestamp': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'summary': self.summary(),
+            'matched': [{'invoice': inv.data, 'payin': as_dict(p), 'method': method} for p, inv, method in self.matched],
+            'ambiguous': [{'payin': as_dict(p), 'candidates': [inv.data for inv in cands], 'reason': reason}
+                          for p, cands, reason in self.ambiguous],
+            'unmatched_payins': [as_dict(p) for p in self.unmatched_payins],
+            'unmatched_invoices': [inv.data for inv in self.unmatched_invoices()],
+        }
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"📑 Reconciliation report saved: {path} ({report['summary']})")
+        return path
+
+
+def load_expected(path):
+    """Rows of an expected-payments CSV or JSON file (list, or {'invoices'|'transactions': [...]})."""
+    if path.lower().endswith('.csv'):
+        with open(path, newline='', encoding='utf-8-sig') as f:
+            return list(csv.DictReader(f))
+    with open(path, encoding='utf-8') as f:
+        data = json.load(f)
+    if isinstance(data, dict):
+        data = data.get('invoices') or data.get('expected') or data.get('transactions') or []
+    return data
+
+
+def load_payins(path):
+    """Payins from an export/snapshot JSON file or a checkpoint store (.db)."""
+    if path.endswith('.db'):
+        from payin_store import PayinStore
+        store = PayinStore(path)
+        try:
+            return store.load()[0]
+        finally:
+            store.close()
+    from serialization import load
+    data = load(path)
+    rows = data.get('transactions', []) if isinstance(data, dict) else data
+    return [Payin.from_dict(r) for r in rows]
+
+
+def open_reconciler(path=EXPECTED_PAYMENTS_PATH):
+    """Reconciler over the configured expected-payments file; None when not configured or unreadable."""
+    if not path:
+        return None
+    try:
+        started = time.time()
+        reconciler = Reconciler(load_expected(path))
+        print(f"📑 Loaded {len(reconciler.invoices)} expected payments from {path} in {time.time() - started:.2f}s")
+        return reconciler
+    except Exception as e:
+        print(f"⚠️ Reconciliation disabled - cannot load {path}: {e}")
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Reconcile payins against expected payments')
+    parser.add_argument('expected', help='expected payments (CSV or JSON)')
+    parser.add_argument('payins', help='payins export/snapshot JSON or checkpoint store (.db)')
+    parser.add_argument('--out', default=REPORT_PATH)
+    parser.add_argument('--window-before-days', type=float, default=WINDOW_BEFORE / 86400)
+    parser.add_argument('--window-after-days', type=float, default=WINDOW_AFTER / 86400)
+    parser.add_argument('--tolerance', type=int, default=AMOUNT_TOLERANCE, help='amount tolerance in minor units')
+    args = parser.parse_args()
+
+    reconciler = Reconciler(load_expected(args.expected), window_before=args.window_before_days * 86400,
+                            window_after=args.window_after_days * 86400, tolerance=args.tolerance)
+    reconciler.add_payins(load_payins(args.payins))
+    reconciler.write_report(args.out)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
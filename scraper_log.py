@@ -0,0 +1,264 @@
+"""Asynchronous structured logging for the scraper.
+
+Code logs through `get_logger(name)` (children of the 'gpay' logger). A
+record costs the calling thread a rate-limit check and a `put_nowait` on a
+bounded queue; a listener thread formats it and writes it out:
+
+- as one JSON object per line to SCRAPER_LOG_PATH, rotated by size and by
+  time (LOG_MAX_BYTES / LOG_ROTATE_INTERVAL, LOG_BACKUPS old files kept),
+  with the traceback of `log.exception(...)` calls;
+- as the plain message to stdout, where the GUI/Streamlit front-ends pick
+  it up like a print.
+
+Each record carries the process's run id and the current refresh number
+(`set_refresh()`, or `extra={'refresh': n}` from a pipeline stage) so the
+lines of one refresh cycle can be grepped together. Repetitive messages are
+rate limited per category (`extra={'category': ...}`, else logger + message
+template): past LOG_RATE_BURST records per LOG_RATE_WINDOW seconds they are
+dropped and the next one let through says how many were suppressed. When the
+queue is full records are dropped and counted, so a stuck disk or console
+never blocks the refresh loop.
+
+    {"ts": 1760851200.12, "time": "2025-10-19T08:00:00", "level": "WARNING", "logger": "gpay.scraper",
+     "category": "driver_error", "run": "5f2c9a", "refresh": 42, "cycle": "5f2c9a:42", "msg": "..."}
+"""
+
+import os
+import copy
+import json
+import time
+import queue
+import atexit
+import logging
+import tempfile
+import threading
+import logging.handlers
+
+# CONFIG
+SCRAPER_LOG_PATH = os.environ.get('SCRAPER_LOG_PATH',
+                                  os.path.join(tempfile.gettempdir(), 'desktop_scraper.jsonl'))  # '' = no file
+LOG_LEVEL = os.environ.get('SCRAPER_LOG_LEVEL', 'INFO')
+LOG_MAX_BYTES = 5 * 1024 * 1024
+LOG_ROTATE_INTERVAL = 24 * 3600  # seconds between rotations, whatever the size
+LOG_BACKUPS = 5
+LOG_QUEUE_SIZE = 10000  # records waiting for the listener before new ones are dropped
+LOG_RATE_BURST = 20  # records per category and window before suppression
+LOG_RATE_WINDOW = 60.0  # seconds
+
+ROOT_LOGGER = 'gpay'
+RUN_ID = os.urandom(3).hex()
+
+_context = {'refresh': None}
+_STANDARD_ATTRS = frozenset(logging.makeLogRecord({}).__dict__) | {'message', 'asctime', 'category', 'refresh',
+                                                                      'suppressed', 'console'}
+
+
+def get_logger(name):
+    return logging.getLogger(f'{ROOT_LOGGER}.{name}')
+
+
+def cycle_id(refresh):
+    """'run:refresh' id of a refresh cycle, unique across restarts (None without a refresh number)."""
+    return None if refresh is None else f"{RUN_ID}:{refresh}"
+
+
+def set_refresh(refresh):
+    """Refresh number stamped on records that do not carry their own."""
+    _context['refresh'] = refresh
+
+
+class RateLimitFilter(logging.Filter):
+    """Let at most `burst` records per category through per `window` seconds."""
+
+    def __init__(self, burst=LOG_RATE_BURST, window=LOG_RATE_WINDOW):
+        super().__init__()
+        self.burst = burst
+        self.window = window
+        self.suppressed_total = 0
+        self._windows = {}  # category -> [window start, records let through, records suppressed]
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        category = getattr(record, 'category', None) or (record.name, record.msg)
+        now = time.monotonic()
+        with self._lock:
+            window = self._windows.get(category)
+            if window is None or now - window[0] >= self.window:
+                suppressed = window[2] if window else 0
+                if len(self._windows) > 10000:
+                    self._windows.clear()
+                self._windows[category] = [now, 1, 0]
+            elif window[1] < self.burst:
+                window[1] += 1
+                suppressed, window[2] = window[2], 0
+            else:
+                window[2] += 1
+                self.suppressed_total += 1
+                return False
+        if suppressed:
+            record.suppressed = suppressed
+        return True
+
+
+class AsyncQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that never blocks: full queue -> record dropped and counted.
+
+    Only the message is merged in the calling thread; tracebacks and JSON are formatted by the listener.
+    """
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if getattr(record, 'refresh', None) is None:
+            record.refresh = _context['refresh']
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class JsonLineFormatter(logging.Formatter):
+    def format(self, record):
+        refresh = getattr(record, 'refresh', None)
+        entry = {
+            'ts': round(record.created, 3),
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(record.created)),
+            'level': record.levelname,
+            'logger': record.name,
+            'category': getattr(record, 'category', None),
+            'run': RUN_ID,
+            'refresh': refresh,
+            'cycle': cycle_id(refresh),
+            'msg': record.getMessage(),
+        }
+        if getattr(record, 'suppressed', 0):
+            entry['suppressed'] = record.suppressed
+        for name, value in record.__dict__.items():
+            if name not in _STANDARD_ATTRS and not name.startswith('_'):
+                entry[name] = value
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry['exc'] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class RotatingJsonFileHandler(logging.handlers.RotatingFileHandler):
+    """Size-rotated file that is also rotated every `interval` seconds."""
+
+    def __init__(self, path, max_bytes=LOG_MAX_BYTES, backups=LOG_BACKUPS, interval=LOG_ROTATE_INTERVAL):
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        super().__init__(path, maxBytes=max_bytes, backupCount=backups, encoding='utf-8')
+        self.interval = interval
+        self.rollover_at = time.time() + interval
+        self.setFormatter(JsonLineFormatter())
+
+    def shouldRollover(self, record):
+        if self.interval and record.created >= self.rollover_at:
+            return True
+        return super().shouldRollover(record)
+
+    def doRollover(self):
+        super().doRollover()
+        self.rollover_at = time.time() + self.interval
+
+
+class ConsoleHandler(logging.Handler):
+    """The message alone on the current sys.stdout, like the print() it replaces.
+
+    Records logged with `extra={'console': False}` (tracebacks behind a friendly print) go to the file only.
+    """
+
+    def emit(self, record):
+        if getattr(record, 'console', True) is False:
+            return
+        try:
+            line = record.getMessage()
+            if getattr(record, 'suppressed', 0):
+                line += f" (+{record.suppressed} similar suppressed)"
+            print(line, flush=True)
+        except Exception:
+            self.handleError(record)
+
+
+class _Logging:
+    def __init__(self, path, console, level):
+        self.queue = queue.Queue(LOG_QUEUE_SIZE)
+        self.handler = AsyncQueueHandler(self.queue)
+        self.rate_limit = RateLimitFilter()
+        self.handler.addFilter(self.rate_limit)
+        self.path = path
+        self.file_error = None
+        outputs = []
+        if path:
+            try:
+                outputs.append(RotatingJsonFileHandler(path))
+            except Exception as e:
+                self.file_error = str(e)
+                print(f"⚠️ Could not open log file {path}: {e}")
+        if console:
+            outputs.append(ConsoleHandler())
+        self.listener = logging.handlers.QueueListener(self.queue, *outputs, respect_handler_level=False)
+        self.outputs = outputs
+        self.logger = logging.getLogger(ROOT_LOGGER)
+        self.logger.setLevel(level)
+        self.logger.propagate = False  # front-ends see the console lines; the root logger would repeat them
+        self.logger.removeHandler(_fallback)
+        self.logger.addHandler(self.handler)
+        self.listener.start()
+
+    def stop(self):
+        self.logger.removeHandler(self.handler)
+        self.logger.addHandler(_fallback)
+        self.listener.stop()  # drains what is queued
+        for output in self.outputs:
+            output.close()
+
+
+# Until start_logging() runs (tools, benchmarks), records are printed synchronously as before
+_fallback = ConsoleHandler()
+logging.getLogger(ROOT_LOGGER).addHandler(_fallback)
+logging.getLogger(ROOT_LOGGER).setLevel(LOG_LEVEL)
+logging.getLogger(ROOT_LOGGER).propagate = False
+
+_active = None
+_active_lock = threading.Lock()
+_atexit_registered = False
+
+
+def start_logging(path=SCRAPER_LOG_PATH, console=True, level=LOG_LEVEL):
+    """Install the queue handler and start the listener thread (once per process)."""
+    global _active, _atexit_registered
+    with _active_lock:
+        if _active is None:
+            if not _atexit_registered:
+                atexit.register(stop_logging)
+                _atexit_registered = True
+            _active = _Logging(path, console, level)
+        return _active
+
+
+def stop_logging():
+    """Write out everything queued and stop the listener."""
+    global _active
+    with _active_lock:
+        active, _active = _active, None
+    if active:
+        active.stop()
+
+
+def logging_stats():
+    active = _active
+    if active is None:
+        return None
+    return {'path': active.path, 'queued': active.queue.qsize(), 'dropped': active.handler.dropped,
+            'suppressed': active.rate_limit.suppressed_total, 'file_error': active.file_error}
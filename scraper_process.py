@@ -0,0 +1,205 @@
+"""Run scraping.run_scraper in a managed child process.
+
+The GUI front-ends never import `scraping` themselves: the scraper (Chrome,
+selenium, the optional torch solver) lives in a spawned child, and
+everything it has to say comes back as small dicts over a multiprocessing
+queue:
+
+    {'type': 'log', 'level': 'INFO', 'line': '...', 'ts': 1695...}
+    {'type': 'status', 'phase': 'running', 'refresh_count': 3, ...}
+    {'type': 'finished', 'success': True, 'message': 'Completed successfully'}
+
+`stop()` asks the refresh loop to finish (final export, browser closed),
+`kill()` tears down the child and its browser immediately. The child is
+not daemonic (the scraper starts processes of its own, e.g. store
+compaction), so `shutdown()` - stop, wait, then kill - also runs at exit for
+any child still alive.
+"""
+
+import sys
+import time
+import queue
+import atexit
+import logging
+import weakref
+import traceback
+import multiprocessing
+import multiprocessing.util  # registers its exit handler now, so _shutdown_all (registered later) runs first
+
+try:
+    import psutil
+    HAS_PSUTIL = True
+except Exception:
+    HAS_PSUTIL = False
+
+# CONFIG
+STOP_GRACE_PERIOD = 45  # seconds a graceful stop may take before the child is killed
+
+_running = weakref.WeakSet()  # started, not yet shut down; see _shutdown_all
+
+
+class _QueueWriter:
+    """File-like object that forwards complete lines to the parent as log events."""
+
+    def __init__(self, events, level='INFO'):
+        self._events = events
+        self._level = level
+        self._buffer = ''
+
+    def write(self, s):
+        self._buffer += s
+        while '\n' in self._buffer:
+            line, self._buffer = self._buffer.split('\n', 1)
+            if line.strip():
+                self._events.put({'type': 'log', 'level': self._level, 'line': line, 'ts': time.time()})
+        return len(s)
+
+    def flush(self):
+        if self._buffer.strip():
+            self._events.put({'type': 'log', 'level': self._level, 'line': self._buffer, 'ts': time.time()})
+        self._buffer = ''
+
+
+class _QueueLogHandler(logging.Handler):
+    def __init__(self, events):
+        super().__init__()
+        self._events = events
+
+    def emit(self, record):
+        try:
+            self._events.put({'type': 'log', 'level': record.levelname, 'line': self.format(record),
+                              'logger': record.name, 'ts': record.created})
+        except Exception:
+            self.handleError(record)
+
+
+def _child_main(params, events, stop_event):
+    """Entry point of the child process."""
+    sys.stdout = _QueueWriter(events)
+    sys.stderr = _QueueWriter(events, level='ERROR')
+    logging.getLogger().addHandler(_QueueLogHandler(events))
+    events.put({'type': 'status', 'phase': 'importing'})
+
+    success, message = False, 'Scraper failed to run.'
+    try:
+        import scraping
+        scraping.run_scraper(
+            params['email'], params['password'], params['pages'], params['auto_bypass'],
+            stop_event=stop_event,
+            on_status=lambda status: events.put(dict(status, type='status')),
+        )
+        success, message = True, 'Completed successfully'
+    except SystemExit as se:
+        code = getattr(se, 'code', 1) or 0
+        success, message = code == 0, 'Completed successfully' if code == 0 else f"Exit code: {code}"
+    except ImportError:
+        traceback.print_exc()
+        message = 'Scraper is not available.'
+    except Exception:
+        traceback.print_exc()
+    finally:
+        sys.stdout.flush()
+        sys.stderr.flush()
+        events.put({'type': 'finished', 'success': success, 'message': message})
+
+
+class ScraperProcess:
+    """Handle on one scraper child process."""
+
+    def __init__(self, email, password, pages=1, auto_bypass=True):
+        ctx = multiprocessing.get_context('spawn')
+        self.events = ctx.Queue()
+        self._stop_event = ctx.Event()
+        self._process = ctx.Process(
+            target=_child_main,
+            args=({'email': email, 'password': password, 'pages': pages, 'auto_bypass': auto_bypass},
+                  self.events, self._stop_event),
+            name='gpay-scraper',
+            # Daemonic processes may not have children, and run_scraper starts some
+            daemon=False,
+        )
+        self.last_status = {}
+        self.started_at = None
+        self.stop_requested_at = None
+        self.finished = None
+
+    def start(self):
+        self._process.start()
+        self.started_at = time.time()
+        _running.add(self)
+        return self
+
+    def poll(self, timeout=0.1, max_events=200):
+        """Return the events that arrived within `timeout`, draining up to `max_events`."""
+        received = []
+        try:
+            received.append(self.events.get(timeout=timeout))
+            while len(received) < max_events:
+                received.append(self.events.get_nowait())
+        except queue.Empty:
+            pass
+        for event in received:
+            if event['type'] == 'status':
+                self.last_status = event
+            elif event['type'] == 'finished':
+                self.finished = event
+        return received
+
+    def is_alive(self):
+        return self._process.is_alive()
+
+    def stop(self):
+        """Ask the refresh loop to finish at its next check (final export, browser closed)."""
+        if self.stop_requested_at is None:
+            self.stop_requested_at = time.time()
+        self._stop_event.set()
+
+    def stop_overdue(self):
+        return (self.stop_requested_at is not None and self.is_alive()
+                and time.time() - self.stop_requested_at > STOP_GRACE_PERIOD)
+
+    def kill(self):
+        """Kill the child and the browser processes it started."""
+        pid = self._process.pid
+        if HAS_PSUTIL and pid:
+            try:
+                for child in psutil.Process(pid).children(recursive=True):
+                    try:
+                        child.kill()
+                    except psutil.Error:
+                        pass
+            except psutil.Error:
+                pass
+        if self._process.is_alive():
+            self._process.kill()
+        self._process.join(timeout=5)
+        _running.discard(self)
+
+    def shutdown(self, timeout=STOP_GRACE_PERIOD):
+        """Stop the child gracefully, killing it if it is not done within `timeout` seconds."""
+        if self._process.is_alive():
+            self.stop()
+            deadline = time.time() + timeout
+            # Drain while waiting: a child with unflushed queue data (its final events) cannot exit
+            while self._process.is_alive() and time.time() < deadline:
+                self.poll(timeout=0.2)
+        if self._process.is_alive():
+            self.kill()
+        _running.discard(self)
+
+    def status(self):
+        return {
+            'pid': self._process.pid,
+            'alive': self._process.is_alive(),
+            'exitcode': self._process.exitcode,
+            'uptime': None if self.started_at is None else round(time.time() - self.started_at, 1),
+            'stopping': self.stop_requested_at is not None,
+            'last_status': self.last_status,
+        }
+
+
+@atexit.register
+def _shutdown_all():
+    # multiprocessing's own exit handler would wait on a non-daemonic child forever
+    for process in list(_running):
+        process.shutdown()
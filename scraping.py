@@ -6,6 +6,7 @@ import time
 import tempfile
 import json
 import shutil
+import datetime
 import warnings
 import argparse
 from selenium import webdriver
@@ -20,6 +21,21 @@ from selenium.common.exceptions import (
 from selenium.webdriver.common.action_chains import ActionChains
 from selenium.webdriver.common.keys import Keys
 import importlib.util
+from payin_stream import start_payin_stream
+from payin_store import open_payin_store
+from payin_record import stamped, parse_timestamp
+from payin_pipeline import PayinPipeline, capture_rows, row_id, row_timestamp
+from reconciliation import open_reconciler
+from raw_archive import open_raw_archive
+from alert_rules import open_alert_rules
+from serialization import dump_records
+from payin_partitions import start_compactor
+from browser_watchdog import BrowserWatchdog
+from page_state import PageState, classify_page, mark_page_changed
+from transactions_nav import LOAD_MORE_XPATH, navigate, navigation_stats, wait_for_page
+from detection_latency import detection_stats
+from tab_backfill import BACKFILL_TABS, backfill
+from scraper_log import get_logger, set_refresh, start_logging, stop_logging, logging_stats
 
 try:
     from webdriver_manager.chrome import ChromeDriverManager
@@ -29,44 +45,45 @@ except Exception:
 
 warnings.filterwarnings("ignore", category=UserWarning, module="urllib3")
 
+# Structured, asynchronous log (SCRAPER_LOG_PATH); see scraper_log
+log = get_logger('scraper')
+
 # ----------------------
-# Initialize Captcha Solver
+# Captcha Solver (loaded lazily: torch/ultralytics are only imported when a captcha shows up)
 # ----------------------
 HAS_SOLVER = False
 CaptchaSolver = None
+_SOLVER_INITIALIZED = False
 
-try:
-    if importlib.util.find_spec("torch") is not None:
-        sys.path.append("ReCaptchaV2-DeepLearning-Solver")
-        try:
-            from solver import get_captcha_solver as _get_solver
-            CaptchaSolver = _get_solver()
-            HAS_SOLVER = True
-        except ImportError:
+def init_captcha_solver():
+    """Import the optional deep-learning captcha solver on first use. Returns True if available."""
+    global HAS_SOLVER, CaptchaSolver, _SOLVER_INITIALIZED
+    if _SOLVER_INITIALIZED:
+        return HAS_SOLVER
+    _SOLVER_INITIALIZED = True
+    try:
+        if importlib.util.find_spec("torch") is not None:
+            sys.path.append("ReCaptchaV2-DeepLearning-Solver")
             try:
-                from solver import CaptchaSolver as _CaptchaSolver
-                CaptchaSolver = _CaptchaSolver
+                from solver import get_captcha_solver as _get_solver
+                CaptchaSolver = _get_solver()
                 HAS_SOLVER = True
+            except ImportError:
+                try:
+                    from solver import CaptchaSolver as _CaptchaSolver
+                    CaptchaSolver = _CaptchaSolver
+                    HAS_SOLVER = True
+                except Exception as e:
+                    print(f"❌ Failed to import CaptchaSolver: {e}")
             except Exception as e:
-                print(f"❌ Failed to import CaptchaSolver: {e}")
-        except Exception as e:
-            print(f"❌ Unexpected error during solver import: {e}")
-    else:
-        print("⚠️ Torch not installed. CaptchaSolver unavailable.")
-except Exception as e:
-    print(f"❌ Error initializing CaptchaSolver: {e}")
-
-print("✅ CaptchaSolver is ready!" if HAS_SOLVER else "⚠️ CaptchaSolver is not available. Manual solve may be required.")
-
-# ----------------------
-# Initialize Selenium driver
-# ----------------------
-chrome_options = ChromeOptions()
-chrome_options.add_argument("--start-maximized")
-if HAS_WEBDRIVER_MANAGER:
-    driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=chrome_options)
-else:
-    driver = webdriver.Chrome(options=chrome_options)  # uses chromedriver in PATH
+                print(f"❌ Unexpected error during solver import: {e}")
+        else:
+            print("⚠️ Torch not installed. CaptchaSolver unavailable.")
+    except Exception as e:
+        print(f"❌ Error initializing CaptchaSolver: {e}")
+    
+    print("✅ CaptchaSolver is ready!" if HAS_SOLVER else "⚠️ CaptchaSolver is not available. Manual solve may be required.")
+    return HAS_SOLVER
 
 # ----------------------
 # Helper function to wait for element
@@ -80,74 +97,77 @@ def wait_for_element(driver, by, value, timeout=5):
         return None
 
 # ----------------------
-# Start Login Flow
+# Quick login flow (standalone, not run on import)
 # ----------------------
-driver.get("https://accounts.google.com/signin")
-time.sleep(2)  # give the page a moment to load
+def quick_login(email="your_email@gmail.com", password="your_password"):
+    """Open a maximized Chrome and walk the basic email/captcha/password flow. Returns the driver."""
+    chrome_options = ChromeOptions()
+    chrome_options.add_argument("--start-maximized")
+    if HAS_WEBDRIVER_MANAGER:
+        driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=chrome_options)
+    else:
+        driver = webdriver.Chrome(options=chrome_options)  # uses chromedriver in PATH
 
-# --- Step 1: Enter email ---
-email_input = wait_for_element(driver, By.ID, "identifierId", timeout=15)
-if not email_input:
-    print("❌ Email input not found.")
-    driver.quit()
-    sys.exit(1)
+    driver.get("https://accounts.google.com/signin")
+    time.sleep(2)  # give the page a moment to load
 
-email_input.send_keys("your_email@gmail.com")
-driver.find_element(By.ID, "identifierNext").click()
-print("📧 Email submitted, waiting for next step...")
+    # --- Step 1: Enter email ---
+    email_input = wait_for_element(driver, By.ID, "identifierId", timeout=15)
+    if not email_input:
+        print("❌ Email input not found.")
+        driver.quit()
+        return None
 
-# --- Step 2: Handle captcha OR password ---
-for step in range(30):
-    current_url = driver.current_url
-    print(f"[{step}] Current URL: {current_url}")
+    email_input.send_keys(email)
+    driver.find_element(By.ID, "identifierNext").click()
+    print("📧 Email submitted, waiting for next step...")
 
-    # If captcha detected
-    if "recaptcha" in current_url:
-        print("🔎 Captcha challenge detected.")
-        try:
-            captcha_iframe = wait_for_element(driver, By.CSS_SELECTOR, "iframe[src*='recaptcha']", timeout=15)
-            if captcha_iframe:
-                if HAS_SOLVER:
-                    solver = CaptchaSolver(driver)
-                    solver.solve_captcha()
-                    print("✅ Captcha solved automatically.")
-                else:
-                    print("⚠️ Manual captcha solving required. Waiting...")
-                    WebDriverWait(driver, 300).until(
-                        lambda d: not wait_for_element(d, By.CSS_SELECTOR, "iframe[src*='recaptcha']", timeout=2)
-                    )
-            # Optional: click next after captcha
+    # --- Step 2: Handle captcha OR password ---
+    for step in range(30):
+        current_url = driver.current_url
+        print(f"[{step}] Current URL: {current_url}")
+
+        # If captcha detected
+        if "recaptcha" in current_url:
+            print("🔎 Captcha challenge detected.")
             try:
-                click_next(driver)
-            except Exception:
-                pass
-        except Exception as e:
-            print("⚠️ Error while solving captcha:", e)
-            driver.save_screenshot("captcha_error.png")
-        time.sleep(2)
-        continue
+                captcha_iframe = wait_for_element(driver, By.CSS_SELECTOR, "iframe[src*='recaptcha']", timeout=15)
+                if captcha_iframe:
+                    if init_captcha_solver():
+                        solver = CaptchaSolver(driver)
+                        solver.solve_captcha()
+                        print("✅ Captcha solved automatically.")
+                    else:
+                        print("⚠️ Manual captcha solving required. Waiting...")
+                        WebDriverWait(driver, 300).until(
+                            lambda d: not wait_for_element(d, By.CSS_SELECTOR, "iframe[src*='recaptcha']", timeout=2)
+                        )
+                # Optional: click next after captcha
+                try:
+                    click_next(driver)
+                except Exception:
+                    pass
+            except Exception as e:
+                print("⚠️ Error while solving captcha:", e)
+                driver.save_screenshot("captcha_error.png")
+            time.sleep(2)
+            continue
 
-    # If password page detected
-    if "signin/v2/challenge/pwd" in current_url:
-        print("🔑 Password page detected. Proceeding...")
-        password_input = wait_for_element(driver, By.NAME, "password", timeout=15)
-        if password_input:
-            password_input.send_keys("your_password")
-            driver.find_element(By.ID, "passwordNext").click()
-            print("✅ Password submitted, login flow complete.")
-        else:
-            print("❌ Password input not found, possibly blocked by captcha.")
-        break
+        # If password page detected
+        if "signin/v2/challenge/pwd" in current_url:
+            print("🔑 Password page detected. Proceeding...")
+            password_input = wait_for_element(driver, By.NAME, "password", timeout=15)
+            if password_input:
+                password_input.send_keys(password)
+                driver.find_element(By.ID, "passwordNext").click()
+                print("✅ Password submitted, login flow complete.")
+            else:
+                print("❌ Password input not found, possibly blocked by captcha.")
+            break
 
-    time.sleep(1)
+        time.sleep(1)
 
-# ----------------------
-# Optional: report CaptchaSolver status
-# ----------------------
-if HAS_SOLVER:
-    print("✅ CaptchaSolver ready and available.")
-else:
-    print("⚠️ CaptchaSolver not available, manual solve may be needed.")
+    return driver
 
 
 # Helper to attempt runtime import of solver with diagnostics. Returns a class or None.
@@ -168,14 +188,7 @@ def load_solver_class_devlog():
             return m.CaptchaSolver
         return None
     except Exception:
-        try:
-            import tempfile, traceback, datetime
-            log_path = os.path.join(tempfile.gettempdir(), 'desktop_scraper_error.log')
-            with open(log_path, 'a', encoding='utf-8') as f:
-                f.write(f"\n--- {datetime.datetime.now().isoformat()} SOLVER IMPORT ERROR ---\n")
-                traceback.print_exc(file=f)
-        except Exception:
-            pass
+        log.exception("Solver import error", extra={'category': 'solver', 'console': False})
         return None
 
 def load_user_config():
@@ -257,6 +270,15 @@ def parse_command_line_args():
     parser.add_argument('--auto-bypass', action='store_true', help='Auto bypass passkey prompts')
     parser.add_argument('--data', type=str, help='JSON data with credentials')
     parser.add_argument('--interactive', action='store_true', help='Interactive mode for user input')
+    parser.add_argument('--once', action='store_true',
+                        help='One-shot run: harvest back to the watermark, export, exit (0 ok, 2 partial, 1 failed)')
+    parser.add_argument('--stop-at-id', type=str, help='One-shot: stop at this transaction id')
+    parser.add_argument('--since', type=str, help='One-shot: stop at transactions older than this date (YYYY-MM-DD)')
+    parser.add_argument('--out', type=str, default=ONCE_EXPORT_PATH, help='One-shot: export file')
+    parser.add_argument('--backfill-since', type=str,
+                        help='Backfill: harvest everything from this date (YYYY-MM-DD) by date range, export, exit')
+    parser.add_argument('--backfill-until', type=str, help='Backfill: last day to harvest (default: today)')
+    parser.add_argument('--tabs', type=int, default=BACKFILL_TABS, help='Backfill: browser tabs to use (capped)')
     
     return parser.parse_args()
 
@@ -456,6 +478,7 @@ def click_next(driver):
                 pass
         
         if next_clicked:
+            mark_page_changed(driver)
             time.sleep(3)
             return True
         
@@ -477,84 +500,12 @@ def wait_for_primary_action_enabled(driver, timeout=30, poll=0.5):
     return False
 
 def is_on_transactions_page(driver):
-    """Check if currently on transactions page"""
-    try:
-        cur = driver.current_url or ''
-        # Check for various transaction page indicators
-        if any(keyword in cur.lower() for keyword in ['transactions', 'pay.google.com', 'activity', 'history']):
-            return True
-        
-        # Check for transaction elements on page
-        transaction_elements = driver.find_elements(By.CSS_SELECTOR, 
-            "tr[data-row-id], div.transaction-row, li.transaction-item, .transaction, [data-testid*='transaction']")
-        if transaction_elements:
-            return True
-            
-        # Check for activity/history page elements
-        activity_elements = driver.find_elements(By.XPATH, 
-            "//h1[contains(text(), 'Activity')] | //h1[contains(text(), 'Transactions')] | //h1[contains(text(), 'History')]")
-        if activity_elements:
-            return True
-            
-    except Exception:
-        pass
-    return False
+    """Check if currently on transactions page (one cached browser round trip, see page_state)"""
+    return classify_page(driver).state is PageState.TRANSACTIONS
 
-def navigate_to_transactions_page(driver):
-    """Navigate to transactions page after successful login"""
-    print("🎯 Navigating to transactions page...")
-    
-    # List of possible transaction page URLs to try
-    transaction_urls = [
-        "https://pay.google.com/gp/w/u/0/home/activity",
-        "https://pay.google.com/g4b/u/0/transactions",
-        "https://pay.google.com/gp/w/u/0/home/transactions",
-        "https://pay.google.com/payments/u/0/home/activity",
-        "https://payments.google.com/payments/u/0/home/activity"
-    ]
-    
-    for url in transaction_urls:
-        try:
-            print(f"🔗 Trying URL: {url}")
-            driver.get(url)
-            time.sleep(3)
-            
-            if is_on_transactions_page(driver):
-                print(f"✅ Successfully reached transactions page: {url}")
-                return True
-                
-        except Exception as e:
-            print(f"❌ Failed to load {url}: {e}")
-            continue
-    
-    # If direct URLs fail, try to find activity/transaction links on current page
-    print("🔍 Looking for transaction/activity links on current page...")
-    try:
-        # Look for various activity/transaction links
-        activity_links = driver.find_elements(By.XPATH, 
-            "//a[contains(@href, 'activity')] | //a[contains(@href, 'transactions')] | //a[contains(@href, 'history')] | " +
-            "//a[contains(text(), 'Activity')] | //a[contains(text(), 'Transactions')] | //a[contains(text(), 'History')] | " +
-            "//button[contains(text(), 'Activity')] | //button[contains(text(), 'Transactions')]")
-        
-        for link in activity_links:
-            try:
-                if link.is_displayed():
-                    driver.execute_script("arguments[0].click();", link)
-                    print(f"✅ Clicked activity/transaction link")
-                    time.sleep(3)
-                    
-                    if is_on_transactions_page(driver):
-                        print("✅ Successfully reached transactions page via link")
-                        return True
-                    break
-            except Exception:
-                continue
-                
-    except Exception as e:
-        print(f"❌ Error finding activity links: {e}")
-    
-    print("⚠️ Could not navigate to transactions page")
-    return False
+def navigate_to_transactions_page(driver, account=None):
+    """Navigate to transactions page after successful login (remembered URL first, see transactions_nav)"""
+    return navigate(driver, account)
 
 def auto_login_if_needed(driver, email, password):
     """Automatically handle login if redirected back to login page"""
@@ -605,17 +556,22 @@ def auto_login_if_needed(driver, email, password):
 # CONFIG
 REFRESH_INTERVAL = 30  # seconds
 
+class ScraperStopped(Exception):
+    """Raised inside the refresh loop when the controlling process asked it to stop"""
+
+def create_driver(chrome_options):
+    """Start Chrome. Replaced by fake_webdriver.use_fake_driver() for browser-free runs."""
+    if HAS_WEBDRIVER_MANAGER:
+        service = Service(ChromeDriverManager().install())
+        return webdriver.Chrome(service=service, options=chrome_options)
+    print("⚠️ webdriver-manager not installed. Relying on chromedriver in PATH.")
+    return webdriver.Chrome(options=chrome_options)
+
 def restart_driver(chrome_options):
     """Restart Chrome driver with error handling"""
     print("🔄 Restarting Chrome driver...")
     try:
-        if HAS_WEBDRIVER_MANAGER:
-            service = Service(ChromeDriverManager().install())
-            driver = webdriver.Chrome(service=service, options=chrome_options)
-        else:
-            print("⚠️ webdriver-manager not installed. Relying on chromedriver in PATH.")
-            driver = webdriver.Chrome(options=chrome_options)
-        
+        driver = create_driver(chrome_options)
         driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
         print("✅ Chrome driver restarted successfully")
         return driver
@@ -623,13 +579,360 @@ def restart_driver(chrome_options):
         print(f"❌ Failed to restart driver: {e}")
         return None
 
-def run_scraper(email: str, password: str, pages: int = 1, auto_bypass: bool = True):
+def recycle_browser(driver, chrome_options, email, password):
+    """Replace the browser with a fresh one and log back in. Returns the new driver or None."""
+    try:
+        driver.quit()
+    except Exception:
+        pass
+    
+    driver = restart_driver(chrome_options)
+    if not driver:
+        print("💥 Failed to restart driver.")
+        return None
+    
+    # Re-login and navigate to transactions
+    print("🔑 Re-authenticating after driver restart...")
+    try:
+        # Navigate to sign-in
+        driver.get("https://accounts.google.com/signin/v2/identifier")
+        mark_page_changed(driver)
+        wait_for_page(driver, timeout=3, settle=0)
+        
+        # Auto-login
+        auto_login_if_needed(driver, email, password)
+        mark_page_changed(driver)
+        wait_for_page(driver, timeout=5, give_up=())
+        
+        # Navigate to transactions
+        if not is_on_transactions_page(driver):
+            navigate_to_transactions_page(driver, email)
+        
+        print("✅ Successfully restarted and re-authenticated")
+        return driver
+    except Exception as restart_error:
+        print(f"❌ Failed to re-authenticate: {restart_error}")
+        try:
+            driver.quit()
+        except Exception:
+            pass
+        return None
+
+def refresh_and_capture(driver, email, password, refresh_count=0):
+    """One browser-stage cycle: stay logged in on the transactions page, refresh it and capture its rows.
+
+    Driver problems surface as WebDriverException/TimeoutException for the caller's retry logic.
+    """
+    # Check if driver is still alive
+    try:
+        _ = driver.current_url
+    except Exception as e:
+        print(f"⚠️ Driver connection lost: {e}")
+        raise WebDriverException("Driver connection lost")
+    
+    # Check if we got redirected to login and auto-login if needed
+    if auto_login_if_needed(driver, email, password):
+        print("🔄 Auto-login completed. Navigating back to transactions...")
+        mark_page_changed(driver)
+        wait_for_page(driver, timeout=3, give_up=())
+        if not is_on_transactions_page(driver):
+            navigate_to_transactions_page(driver, email)
+    
+    driver.refresh()
+    mark_page_changed(driver)
+    
+    # Wait for page to load
+    WebDriverWait(driver, 20).until(
+        EC.presence_of_element_located((By.TAG_NAME, "body"))
+    )
+    
+    # Check if we're still on transactions page
+    if not is_on_transactions_page(driver):
+        print("⚠️ Not on transactions page. Attempting to navigate...")
+        navigate_to_transactions_page(driver, email)
+    
+    # Look for transaction elements
+    try:
+        WebDriverWait(driver, 10).until(
+            EC.any_of(
+                EC.presence_of_element_located((By.CSS_SELECTOR, "tr[data-row-id]")),
+                EC.presence_of_element_located((By.CSS_SELECTOR, "div.transaction-row")),
+                EC.presence_of_element_located((By.CSS_SELECTOR, "li.transaction-item")),
+                EC.presence_of_element_located((By.CSS_SELECTOR, "[data-testid*='transaction']"))
+            )
+        )
+        log.info("✅ Transactions page refreshed successfully", extra={'category': 'refresh'})
+    except TimeoutException:
+        log.warning("⚠️ Transaction elements not found, but continuing...", extra={'category': 'no_rows'})
+    
+    # Capture raw rows in one round trip; parsing and storage run in the pipeline
+    return capture_rows(driver, refresh_count)
+
+# CONFIG (one-shot mode)
+ONCE_EXPORT_PATH = 'payins.json'
+
+# Exit codes of a one-shot run
+EXIT_OK = 0  # watermark (or the end of the list) reached and exported
+EXIT_FAILED = 1  # login/navigation failed or the run crashed
+EXIT_PARTIAL = 2  # exported, but stopped before the watermark (page limit, capture errors)
+
+def row_reached_watermark(payload, stop_at_id=None, since_ts=None):
+    """True if this row is the known transaction or older than the `since` date"""
+    if stop_at_id and (row_id(payload) == stop_at_id or stop_at_id in (payload.get('text') or '')):
+        return True
+    if since_ts is not None:
+        ts = row_timestamp(payload)
+        return ts is not None and ts < since_ts
+    return False
+
+def load_older_transactions(driver):
+    """Click a 'Load more' control or scroll to the bottom. Returns True if the list changed."""
+    before = classify_page(driver, max_age=0)
+    try:
+        buttons = [b for b in driver.find_elements(By.XPATH, LOAD_MORE_XPATH) if b.is_displayed()]
+        if buttons:
+            driver.execute_script("arguments[0].click();", buttons[-1])
+        else:
+            driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+    except WebDriverException as e:
+        print(f"⚠️ Could not load older transactions: {str(e)[:100]}")
+        return False
+    mark_page_changed(driver)
+    deadline = time.time() + 10
+    while time.time() < deadline:
+        time.sleep(0.5)
+        after = classify_page(driver, max_age=0)
+        if (after.row_count, after.fingerprint, after.url) != (before.row_count, before.fingerprint, before.url):
+            return True
+    return False
+
+def harvest_once(driver, pipeline, stop_at_id=None, since_ts=None, max_pages=1, refresh_count=0):
+    """Bounded harvest for one-shot runs: capture pages until the watermark, the end of the list or `max_pages`.
+
+    Every capture goes through `pipeline`. Returns a dict with pages, rows, newest row and stop reason.
+    """
+    result = {'pages': 0, 'rows_seen': 0, 'reached': False, 'stop_reason': 'page_limit',
+              'newest_row_id': None, 'newest_row_ts': None, 'errors': 0}
+    seen_rows = set()
+    for page in range(1, max_pages + 1):
+        try:
+            capture = capture_rows(driver, refresh_count)
+        except WebDriverException as e:
+            result['errors'] += 1
+            result['stop_reason'] = f"capture failed: {str(e)[:100]}"
+            break
+        result['pages'] = page
+        fresh = []
+        for payload in capture.rows:
+            marker = row_id(payload) or payload.get('html') or payload.get('text')
+            if marker in seen_rows:
+                continue
+            seen_rows.add(marker)
+            if row_reached_watermark(payload, stop_at_id, since_ts):
+                result['reached'] = True
+                break
+            fresh.append(payload)
+        if page == 1 and capture.rows:
+            result['newest_row_id'] = row_id(capture.rows[0])
+            result['newest_row_ts'] = row_timestamp(capture.rows[0])
+        result['rows_seen'] += len(fresh)
+        print(f"📄 Page {page}: {len(fresh)} new row(s) (selector: {capture.selector})")
+        if fresh:
+            pipeline.submit(capture._replace(rows=fresh), capture_seconds=time.time() - capture.captured_at)
+        if result['reached']:
+            result['stop_reason'] = 'watermark'
+            break
+        if page < max_pages and not load_older_transactions(driver):
+            result['stop_reason'] = 'end_of_list'
+            break
+    return result
+
+def run_once(driver, collected_payins, payin_index, store, checkpoint, refresh_count,
+             stop_at_id=None, since=None, max_pages=1, out_path=ONCE_EXPORT_PATH, reconciler=None, archive=None,
+             alerts=None):
+    """Body of a one-shot run after login: harvest, quit the browser, drain, export. Returns the summary."""
+    since_ts = parse_timestamp(since) if since else None
+    watermark = checkpoint.get('once_watermark') or {}
+    if not stop_at_id and since_ts is None:
+        stop_at_id = watermark.get('row_id')
+        since_ts = watermark.get('timestamp') if not stop_at_id else None
+    print(f"🎯 One-shot harvest (stop at id: {stop_at_id or '-'}, since: {since or since_ts or '-'}, max pages: {max_pages})")
+    
+    summary = {'status': 'failed', 'exit_code': EXIT_FAILED, 'export_path': None}
+    known = len(collected_payins)
+    pipeline = PayinPipeline(collected_payins, payin_index, store=store, reconciler=reconciler, archive=archive,
+                             alerts=alerts)
+    try:
+        if not is_on_transactions_page(driver):
+            summary['error'] = 'transactions page not reached'
+            return summary
+        result = harvest_once(driver, pipeline, stop_at_id=stop_at_id, since_ts=since_ts,
+                              max_pages=max_pages, refresh_count=refresh_count + 1)
+    finally:
+        # Nothing else needs the browser: release it before draining and exporting
+        print("🔒 Closing browser...")
+        try:
+            driver.quit()
+        except Exception:
+            pass
+        pipeline.close()
+    
+    new_payins = collected_payins[known:]
+    # Earlier transactions that changed status since the last run go out again with their new state
+    updated_payins = [collected_payins[i] for i in sorted(pipeline.updated_positions) if i < known]
+    export_transactions_for_upload(updated_payins + new_payins, out_path)
+    if reconciler:
+        try:
+            reconciler.write_report()
+        except Exception as e:
+            print(f"⚠️ Error writing reconciliation report: {e}")
+    complete = (result['reached'] or result['stop_reason'] == 'end_of_list') and not result['errors']
+    # Only a complete harvest may move the watermark, otherwise the next run would skip the gap
+    if store and complete and (result['newest_row_id'] or result['newest_row_ts']):
+        try:
+            store.checkpoint(refresh_count=refresh_count + 1, total_transactions=len(collected_payins),
+                             once_watermark={'row_id': result['newest_row_id'], 'timestamp': result['newest_row_ts']})
+        except Exception as e:
+            print(f"⚠️ Error saving watermark: {e}")
+    summary.update(result)
+    if reconciler:
+        summary['reconciliation'] = reconciler.summary()
+    if alerts:
+        alerts.close()
+        summary['alerts'] = alerts.stats()
+    summary.update({
+        'status': 'complete' if complete else 'partial',
+        'exit_code': EXIT_OK if complete else EXIT_PARTIAL,
+        'new_transactions': len(new_payins),
+        'updated_transactions': len(updated_payins),
+        'total_transactions': len(collected_payins),
+        'export_path': out_path,
+        'pipeline': pipeline.stats(),
+        'detection': detection_stats(),
+    })
+    return summary
+
+def run_backfill(driver, collected_payins, payin_index, store, refresh_count, since, until=None,
+                 tabs=BACKFILL_TABS, out_path=ONCE_EXPORT_PATH, reconciler=None, archive=None, stop_event=None):
+    """Body of a backfill run after login: date ranges in several tabs, quit the browser, drain, export."""
+    known = len(collected_payins)
+    # Alert rules are for payins as they arrive, not for last year's; nothing here counts for detection
+    # latency either. Captures are never dropped: a range is not loaded again the way a refresh is.
+    pipeline = PayinPipeline(collected_payins, payin_index, store=store, reconciler=reconciler, archive=archive,
+                             queue_size=0, track_detection=False)
+    try:
+        result = backfill(driver, pipeline, since, until, tabs=tabs, refresh_count=refresh_count + 1,
+                          stop_event=stop_event)
+    except WebDriverException as e:
+        result = {'stop_reason': f"browser error: {str(e)[:100]}", 'failed_ranges': []}
+    finally:
+        print("🔒 Closing browser...")
+        try:
+            driver.quit()
+        except Exception:
+            pass
+        pipeline.close()
+
+    new_payins = collected_payins[known:]
+    updated_payins = [collected_payins[i] for i in sorted(pipeline.updated_positions) if i < known]
+    export_transactions_for_upload(updated_payins + new_payins, out_path)
+    if store:
+        try:
+            store.checkpoint(total_transactions=len(collected_payins),
+                             last_backfill={'since': since.isoformat(), 'until': (until or datetime.date.today()).isoformat(),
+                                            'stop_reason': result['stop_reason'],
+                                            'failed_ranges': result['failed_ranges']})
+        except Exception as e:
+            print(f"⚠️ Error saving backfill state: {e}")
+    complete = result['stop_reason'] == 'done' and not result['failed_ranges']
+    summary = dict(result)
+    if reconciler:
+        summary['reconciliation'] = reconciler.summary()
+    summary.update({
+        'status': 'complete' if complete else 'partial',
+        'exit_code': EXIT_OK if complete else EXIT_PARTIAL,
+        'new_transactions': len(new_payins),
+        'updated_transactions': len(updated_payins),
+        'total_transactions': len(collected_payins),
+        'export_path': out_path,
+        'pipeline': pipeline.stats(),
+    })
+    return summary
+
+def run_scraper(email: str, password: str, pages: int = 1, auto_bypass: bool = True,
+                stop_event=None, on_status=None, once=False, stop_at_id=None, since=None,
+                out_path=ONCE_EXPORT_PATH, backfill_since=None, backfill_until=None, tabs=BACKFILL_TABS):
+    """Log in and keep collecting payins until interrupted.
+
+    `stop_event` (threading/multiprocessing Event) ends the refresh loop gracefully
+    with a final export; `on_status` receives a status dict at every phase change
+    and after every refresh cycle.
+
+    With `once=True` it harvests up to `pages` pages back to `stop_at_id`, the
+    `since` date or the watermark of the previous one-shot run, closes the
+    browser, exports the new transactions to `out_path` and returns a summary
+    dict whose 'exit_code' is EXIT_OK, EXIT_PARTIAL or EXIT_FAILED.
+
+    With `backfill_since` (a YYYY-MM-DD date) it instead harvests everything from
+    that date to `backfill_until` (default today) by date range in `tabs` tabs
+    (tab_backfill), then exports and returns the summary like a one-shot run.
+    """
+    def report(phase, **extra):
+        if on_status:
+            try:
+                on_status(dict(phase=phase, refresh_count=refresh_count,
+                               total_transactions=len(collected_payins), **extra))
+            except Exception:
+                pass
+    
     driver = None
     chrome_options = None
+    stream = None
+    store = None
+    watchdog = None
+    pipeline = None
+    reconciler = None
+    archive = None
+    alerts = None
+    compactor = None
+    summary = None
+    run_started = time.time()
+    start_logging()
     try:
         print(f"🚀 Starting scraper for: {email}")
         print(f"📄 Pages to scrape: {pages}")
         print(f"🤖 Auto-bypass enabled: {auto_bypass}")
+        if once and since and parse_timestamp(since) is None:
+            raise ValueError(f"Unrecognized --since date: {since}")
+        if backfill_since:
+            once = True  # same ending: export, summary, exit code
+            backfill_since = datetime.date.fromisoformat(str(backfill_since))
+            backfill_until = datetime.date.fromisoformat(str(backfill_until)) if backfill_until else None
+            print(f"📚 Backfill: {backfill_since} .. {backfill_until or 'today'} in {tabs} tab(s)")
+        
+        # Warm start from the last checkpoint so the identity index survives a crash
+        collected_payins = []
+        payin_index = {}
+        refresh_count = 0
+        checkpoint = {}
+        store = open_payin_store()
+        if store:
+            started = time.time()
+            collected_payins, payin_index, checkpoint = store.load()
+            refresh_count = checkpoint.get('refresh_count', 0)
+            if collected_payins:
+                print(f"♻️ Restored {len(collected_payins)} transactions from checkpoint "
+                      f"(refresh #{refresh_count}) in {time.time() - started:.2f}s")
+        
+        # Expected payments to confirm (EXPECTED_PAYMENTS_PATH); restored payins are matched up front
+        reconciler = open_reconciler()
+        if reconciler and collected_payins:
+            reconciler.add_payins(collected_payins)
+        # Raw rows of every changed page (RAW_ARCHIVE_PATH), for `raw_archive.py reparse` after a parser fix
+        archive = open_raw_archive()
+        # Alert rules (ALERT_RULES_PATH) checked on every new or updated payin
+        alerts = open_alert_rules()
+        report('starting')
         
         chrome_options = ChromeOptions()
         chrome_options.add_argument("--disable-blink-features=AutomationControlled")
@@ -653,12 +956,7 @@ def run_scraper(email: str, password: str, pages: int = 1, auto_bypass: bool = T
             print(f"Using HTTPS proxy: {https_proxy}")
         
         # Initialize driver
-        if HAS_WEBDRIVER_MANAGER:
-            service = Service(ChromeDriverManager().install())
-            driver = webdriver.Chrome(service=service, options=chrome_options)
-        else:
-            print("⚠️ webdriver-manager not installed. Relying on chromedriver in PATH.")
-            driver = webdriver.Chrome(options=chrome_options)
+        driver = create_driver(chrome_options)
         
         driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
         
@@ -668,7 +966,8 @@ def run_scraper(email: str, password: str, pages: int = 1, auto_bypass: bool = T
             try:
                 print(f"🌐 Loading Google signin page (attempt {attempt}/{max_retries})")
                 driver.get("https://accounts.google.com/signin/v2/identifier")
-                time.sleep(3)
+                mark_page_changed(driver)
+                wait_for_page(driver, timeout=3, settle=0)
                 
                 if is_on_transactions_page(driver):
                     print("➡️ Already logged in - skipping login flow.")
@@ -683,6 +982,7 @@ def run_scraper(email: str, password: str, pages: int = 1, auto_bypass: bool = T
                 time.sleep(2)
         
         # Login process
+        report('login')
         try:
             if is_on_transactions_page(driver):
                 print("➡️ Already on transactions/pay page; skipping email entry.")
@@ -739,7 +1039,7 @@ def run_scraper(email: str, password: str, pages: int = 1, auto_bypass: bool = T
                         print("🤖 Attempting to use ReCaptchaV2-DeepLearning-Solver (if available)...")
                         # Load the solver class defensively and log import problems to developer log
                         solver_cls = None
-                        if HAS_SOLVER and CaptchaSolver is not None and callable(CaptchaSolver):
+                        if init_captcha_solver() and CaptchaSolver is not None and callable(CaptchaSolver):
                             solver_cls = CaptchaSolver
                         else:
                             solver_cls = load_solver_class_devlog()
@@ -755,16 +1055,8 @@ def run_scraper(email: str, password: str, pages: int = 1, auto_bypass: bool = T
                                 solver.solve_captcha()
                                 print("✅ Captcha solved using DeepLearning solver.")
                             except Exception:
-                                # Write full traceback to temp log for diagnostics and print a friendly message
-                                try:
-                                    import tempfile, traceback, datetime
-                                    log_dir = tempfile.gettempdir()
-                                    log_path = os.path.join(log_dir, "desktop_scraper_error.log")
-                                    with open(log_path, "a", encoding="utf-8") as f:
-                                        f.write(f"\n--- {datetime.datetime.now().isoformat()} SOLVER RUNTIME ERROR ---\n")
-                                        traceback.print_exc(file=f)
-                                except Exception:
-                                    pass
+                                # Full traceback to the log file for diagnostics, a friendly message on screen
+                                log.exception("Solver runtime error", extra={'category': 'solver', 'console': False})
                                 print("⚠️ Error while solving captcha (solver raised an exception). See developer log for details.")
                                 try:
                                     driver.save_screenshot("captcha_error.png")
@@ -855,206 +1147,132 @@ def run_scraper(email: str, password: str, pages: int = 1, auto_bypass: bool = T
         
         # Wait for login to complete and navigate to transactions page
         print("⏳ Waiting for login to complete...")
-        time.sleep(5)
+        mark_page_changed(driver)
+        wait_for_page(driver, timeout=5, give_up=())
         
         # Navigate to transactions page after successful login
         if not is_on_transactions_page(driver):
-            navigate_to_transactions_page(driver)
+            navigate_to_transactions_page(driver, email)
+        
+        if backfill_since:
+            summary = run_backfill(driver, collected_payins, payin_index, store, refresh_count, backfill_since,
+                                   backfill_until, tabs=tabs, out_path=out_path, reconciler=reconciler,
+                                   archive=archive, stop_event=stop_event)
+            driver = None  # already torn down
+            summary['duration_s'] = round(time.time() - run_started, 2)
+            report('done', summary=summary)
+            return summary
+        
+        if once:
+            summary = run_once(driver, collected_payins, payin_index, store, checkpoint, refresh_count,
+                               stop_at_id=stop_at_id, since=since, max_pages=max(1, pages), out_path=out_path,
+                               reconciler=reconciler, archive=archive, alerts=alerts)
+            driver = None  # already torn down
+            summary['duration_s'] = round(time.time() - run_started, 2)
+            summary['navigation'] = navigation_stats()
+            report('done', summary=summary)
+            return summary
         
         # Auto-refresh loop with auto-login capability and crash recovery
         print("🔁 Starting auto-refresh loop on Transactions page...")
-        collected_payins = []
-        refresh_count = 0
+        stream = start_payin_stream()
+        watchdog = BrowserWatchdog(driver).start()
+        # Closed months move out to monthly partition files in the background (PAYIN_PARTITION_DIR)
+        compactor = start_compactor() if store else None
+        pipeline = PayinPipeline(collected_payins, payin_index, store=store, stream=stream, reconciler=reconciler,
+                                 archive=archive, alerts=alerts)
         consecutive_failures = 0
         max_failures = 3
         
         try:
             while True:
+                if stop_event is not None and stop_event.is_set():
+                    raise ScraperStopped()
                 refresh_count += 1
-                print(f"\n🔄 Refresh #{refresh_count} at {time.strftime('%Y-%m-%d %H:%M:%S')}")
+                set_refresh(refresh_count)
+                cycle_started = time.time()
+                log.info(f"🔄 Refresh #{refresh_count} at {time.strftime('%Y-%m-%d %H:%M:%S')}",
+                         extra={'category': 'refresh'})
                 
+                # Recycle proactively at this quiet point if the watchdog says so
+                recycle_reason = watchdog.recycle_reason()
+                if recycle_reason:
+                    print(f"♻️ Watchdog recycling browser: {recycle_reason}")
+                    watchdog.record_recycle(recycle_reason)
+                    watchdog.detach()
+                    driver = recycle_browser(driver, chrome_options, email, password)
+                    if not driver:
+                        print("💥 Failed to recycle browser. Exiting...")
+                        break
+                    watchdog.attach(driver)
+                
+                watchdog.cycle_started()
                 try:
-                    # Check if driver is still alive
-                    try:
-                        _ = driver.current_url
-                    except Exception as e:
-                        print(f"⚠️ Driver connection lost: {e}")
-                        raise WebDriverException("Driver connection lost")
-                    
-                    # Check if we got redirected to login and auto-login if needed
-                    if auto_login_if_needed(driver, email, password):
-                        print("🔄 Auto-login completed. Navigating back to transactions...")
-                        time.sleep(3)
-                        if not is_on_transactions_page(driver):
-                            navigate_to_transactions_page(driver)
-                    
-                    driver.refresh()
-                    
-                    # Wait for page to load
-                    WebDriverWait(driver, 20).until(
-                        EC.presence_of_element_located((By.TAG_NAME, "body"))
-                    )
-                    
-                    # Reset failure counter on successful refresh
-                    consecutive_failures = 0
-                    
-                    # Check if we're still on transactions page
-                    if not is_on_transactions_page(driver):
-                        print("⚠️ Not on transactions page. Attempting to navigate...")
-                        navigate_to_transactions_page(driver)
-                    
-                    # Look for transaction elements
-                    try:
-                        WebDriverWait(driver, 10).until(
-                            EC.any_of(
-                                EC.presence_of_element_located((By.CSS_SELECTOR, "tr[data-row-id]")),
-                                EC.presence_of_element_located((By.CSS_SELECTOR, "div.transaction-row")),
-                                EC.presence_of_element_located((By.CSS_SELECTOR, "li.transaction-item")),
-                                EC.presence_of_element_located((By.CSS_SELECTOR, "[data-testid*='transaction']"))
-                            )
-                        )
-                        print(f"✅ Transactions page refreshed successfully")
-                    except TimeoutException:
-                        print("⚠️ Transaction elements not found, but continuing...")
-                    
-                    # Find transaction rows
-                    rows = []
-                    try:
-                        # Try multiple selectors for transaction rows
-                        selectors = [
-                            "tr[data-row-id]",
-                            "div.transaction-row", 
-                            "li.transaction-item",
-                            "[data-testid*='transaction']",
-                            ".transaction",
-                            "[class*='transaction']",
-                            "tr[role='row']"
-                        ]
-                        
-                        for selector in selectors:
-                            rows = driver.find_elements(By.CSS_SELECTOR, selector)
-                            if rows:
-                                print(f"📊 Found {len(rows)} transaction elements using selector: {selector}")
-                                break
-                    except Exception as e:
-                        print(f"❌ Error finding transaction rows: {e}")
-                        rows = []
-                    
-                    if not rows:
-                        try:
-                            # Fallback: find all table rows
-                            container = driver.find_element(By.TAG_NAME, 'body')
-                            rows = container.find_elements(By.TAG_NAME, 'tr')
-                            if rows:
-                                print(f"📊 Fallback: Found {len(rows)} table rows")
-                        except Exception:
-                            rows = []
-                    
-                    # Parse transactions if parser available
-                    try:
-                        from gpay_parser import from_selenium_rows
-                        parsed = from_selenium_rows(rows)
-                        parsed = [p for p in parsed if p.get('amount')]
-                        
-                        # Add new transactions to collection
-                        new_transactions = 0
-                        for p in parsed:
-                            if p not in collected_payins:
-                                collected_payins.append(p)
-                                new_transactions += 1
-                        
-                        print(f"💰 Found {len(parsed)} transactions this refresh")
-                        if new_transactions > 0:
-                            print(f"🆕 Added {new_transactions} new transactions")
-                        print(f"📈 Total collected: {len(collected_payins)} transactions")
-                        
-                    except ImportError:
-                        print("📋 gpay_parser not available - raw data collection only")
-                        print(f"📊 Found {len(rows)} transaction elements")
-                    except Exception as e:
-                        print(f"❌ Error parsing transactions: {e}")
+                    capture = refresh_and_capture(driver, email, password, refresh_count)
+                    consecutive_failures = 0  # Reset failure counter on successful refresh
+                    if capture.rows:
+                        log.info(f"📊 Found {len(capture.rows)} transaction elements using selector: {capture.selector}",
+                                 extra={'category': 'refresh', 'rows': len(capture.rows)})
+                    pipeline.submit(capture, capture_seconds=time.time() - capture.captured_at)
                         
                 except (WebDriverException, TimeoutException) as driver_error:
                     consecutive_failures += 1
-                    print(f"❌ Driver error (attempt {consecutive_failures}/{max_failures}): {str(driver_error)[:100]}...")
+                    log.warning(f"❌ Driver error (attempt {consecutive_failures}/{max_failures}): {str(driver_error)[:100]}...",
+                                extra={'category': 'driver_error'}, exc_info=True)
                     
                     if consecutive_failures >= max_failures:
                         print(f"🔧 Too many consecutive failures. Restarting browser...")
-                        
-                        # Close current driver
-                        try:
-                            driver.quit()
-                        except Exception:
-                            pass
-                        
-                        # Restart driver
-                        driver = restart_driver(chrome_options)
+                        watchdog.record_recycle(f"{consecutive_failures} consecutive driver errors")
+                        watchdog.detach()
+                        driver = recycle_browser(driver, chrome_options, email, password)
                         if not driver:
                             print("💥 Failed to restart driver. Exiting...")
                             break
-                        
-                        # Re-login and navigate to transactions
-                        print("🔑 Re-authenticating after driver restart...")
-                        try:
-                            # Navigate to sign-in
-                            driver.get("https://accounts.google.com/signin/v2/identifier")
-                            time.sleep(3)
-                            
-                            # Auto-login
-                            auto_login_if_needed(driver, email, password)
-                            time.sleep(5)
-                            
-                            # Navigate to transactions
-                            if not is_on_transactions_page(driver):
-                                navigate_to_transactions_page(driver)
-                                
-                            consecutive_failures = 0  # Reset counter
-                            print("✅ Successfully restarted and re-authenticated")
-                            
-                        except Exception as restart_error:
-                            print(f"❌ Failed to re-authenticate: {restart_error}")
-                            break
+                        watchdog.attach(driver)
+                        consecutive_failures = 0  # Reset counter
                     else:
-                        print(f"⏳ Waiting 10 seconds before retry...")
+                        watchdog.cycle_finished()
+                        log.info("⏳ Waiting 10 seconds before retry...", extra={'category': 'driver_error'})
                         time.sleep(10)
                         continue
                         
                 except Exception as general_error:
-                    print(f"❌ General error during refresh: {general_error}")
+                    log.error(f"❌ General error during refresh: {general_error}", extra={'category': 'refresh_error'},
+                              exc_info=True)
                     consecutive_failures += 1
                     
                     if consecutive_failures >= max_failures:
                         print("🛑 Too many consecutive errors. Stopping...")
                         break
                 
-                # Save snapshot of collected data
-                try:
-                    snapshot_data = {
-                        'timestamp': time.strftime('%Y-%m-%d %H:%M:%S'),
-                        'refresh_count': refresh_count,
-                        'consecutive_failures': consecutive_failures,
-                        'total_transactions': len(collected_payins),
-                        'transactions': collected_payins
-                    }
-                    with open('payins_snapshot.json', 'w', encoding='utf-8') as f:
-                        json.dump(snapshot_data, f, ensure_ascii=False, indent=2)
-                    
-                    # Also save a backup with timestamp every 10 refreshes
-                    if refresh_count % 10 == 0:
-                        backup_filename = f"payins_backup_{time.strftime('%Y%m%d_%H%M%S')}.json"
-                        with open(backup_filename, 'w', encoding='utf-8') as f:
-                            json.dump(snapshot_data, f, ensure_ascii=False, indent=2)
-                        print(f"💾 Backup saved: {backup_filename}")
-                        
-                except Exception as e:
-                    print(f"⚠️ Error saving snapshot: {e}")
+                watchdog.cycle_finished()
                 
-                # Wait before next refresh
-                print(f"⏰ Waiting {REFRESH_INTERVAL} seconds before next refresh...")
-                time.sleep(REFRESH_INTERVAL)
+                report('running', consecutive_failures=consecutive_failures,
+                       watchdog=watchdog.status(), pipeline=pipeline.stats(),
+                       reconciliation=reconciler.summary() if reconciler else None,
+                       alerts=alerts.stats() if alerts else None, navigation=navigation_stats(),
+                       detection=detection_stats(), logging=logging_stats())
                 
-        except KeyboardInterrupt:
+                # Wait before next refresh, keeping a steady cadence
+                wait = max(0.0, REFRESH_INTERVAL - (time.time() - cycle_started))
+                log.info(f"⏰ Waiting {wait:.0f} seconds before next refresh...", extra={'category': 'refresh'})
+                if stop_event is not None:
+                    stop_event.wait(wait)
+                else:
+                    time.sleep(wait)
+                
+        except (KeyboardInterrupt, ScraperStopped):
             print("\n🛑 Auto-refresh stopped by user.")
+            report('stopping')
+            pipeline.close()
+            print(f"📊 Pipeline stats: {pipeline.stats()}")
+            if alerts:
+                print(f"🔔 Alert stats: {alerts.stats()}")
+            print(f"🧭 Navigation stats: {navigation_stats()}")
+            detection = detection_stats()
+            print(f"⏱️ Detection latency: {detection['count']} payins, p50 {detection.get('p50_s')}s, "
+                  f"p95 {detection.get('p95_s')}s, p99 {detection.get('p99_s')}s, "
+                  f"within {detection['slo_s']:.0f}s: {detection['within_slo']}")
             print(f"📊 Final stats: {len(collected_payins)} total transactions collected")
             
             # Save final export
@@ -1062,14 +1280,25 @@ def run_scraper(email: str, password: str, pages: int = 1, auto_bypass: bool = T
                 export_transactions_for_upload(collected_payins)
             except Exception as e:
                 print(f"⚠️ Error saving final export: {e}")
+            if reconciler:
+                try:
+                    reconciler.write_report()
+                except Exception as e:
+                    print(f"⚠️ Error writing reconciliation report: {e}")
             
     except Exception as e:
         import traceback
         print("💥 Unhandled exception:")
         traceback.print_exc()
+        log.error("💥 Unhandled exception", exc_info=True, extra={'console': False})
+        if once:
+            summary = {'status': 'failed', 'exit_code': EXIT_FAILED, 'error': str(e)[:200],
+                       'duration_s': round(time.time() - run_started, 2)}
         
         # Try to save whatever data we have
         try:
+            if pipeline:
+                pipeline.close(timeout=10)
             if 'collected_payins' in locals() and collected_payins:
                 export_transactions_for_upload(collected_payins, 'emergency_payins.json')
                 print(f"💾 Emergency save completed: {len(collected_payins)} transactions")
@@ -1077,22 +1306,37 @@ def run_scraper(email: str, password: str, pages: int = 1, auto_bypass: bool = T
             pass
             
     finally:
+        if pipeline:
+            pipeline.close(timeout=10)
+        if watchdog:
+            watchdog.stop()
+        if compactor:
+            compactor.stop()
+        if stream:
+            stream.close()
+        if store:
+            store.close()
+        if archive:
+            archive.close()
+        if alerts:
+            alerts.close()
         if driver:
             print("🔒 Closing browser...")
-            driver.quit()
+            try:
+                driver.quit()
+            except Exception:
+                pass
+        set_refresh(None)
+        stop_logging()
+    return summary
 
 # Helper to export transactions
 def export_transactions_for_upload(payins, out_path='payins.json'):
-    """Export collected transactions to JSON file"""
-    export_data = {
-        'export_timestamp': time.strftime('%Y-%m-%d %H:%M:%S'),
-        'total_count': len(payins),
-        'transactions': payins
-    }
-    
-    with open(out_path, 'w', encoding='utf-8') as f:
-        json.dump(export_data, f, ensure_ascii=False, indent=2)
-    print(f"💾 Saved {len(payins)} transaction(s) to {out_path}")
+    """Export collected transactions (streamed record by record; format from the file name, see serialization)"""
+    count = len(payins)
+    dump_records(out_path, {'export_timestamp': time.strftime("%Y-%m-%d %H:%M:%S"), 'total_count': count},
+                 'transactions', (stamped(p) for p in payins), count=count)
+    print(f"💾 Saved {count} transaction(s) to {out_path}")
 
 if __name__ == "__main__":
     args = parse_command_line_args()
@@ -1101,6 +1345,13 @@ if __name__ == "__main__":
     password = None
     pages = 1
     auto_bypass = True
+    once = args.once
+    stop_at_id = args.stop_at_id
+    since = args.since
+    out_path = args.out
+    backfill_since = args.backfill_since
+    backfill_until = args.backfill_until
+    tabs = args.tabs
     
     # Handle different input methods
     if args.data:
@@ -1111,6 +1362,13 @@ if __name__ == "__main__":
             password = data.get('password')
             pages = int(data.get('pages', 1))
             auto_bypass = data.get('auto_bypass', True)
+            once = data.get('once', once)
+            stop_at_id = data.get('stop_at_id', stop_at_id)
+            since = data.get('since', since)
+            out_path = data.get('out', out_path)
+            backfill_since = data.get('backfill_since', backfill_since)
+            backfill_until = data.get('backfill_until', backfill_until)
+            tabs = int(data.get('tabs', tabs))
         except Exception as e:
             print(f"❌ Invalid JSON data: {e}")
             sys.exit(1)
@@ -1136,10 +1394,22 @@ if __name__ == "__main__":
         print(f"🔐 Password: {'*' * len(password)}")
         print(f"📄 Pages: {pages}")
         print(f"🤖 Auto-bypass: {auto_bypass}")
-        print(f"🔁 Auto-refresh: Every {REFRESH_INTERVAL} seconds")
+        if backfill_since:
+            print(f"📚 Backfill: {backfill_since} .. {backfill_until or 'today'} in {tabs} tab(s), export to {out_path}")
+        elif once:
+            print(f"🎯 One-shot: stop at id {stop_at_id or '-'}, since {since or '-'}, export to {out_path}")
+        else:
+            print(f"🔁 Auto-refresh: Every {REFRESH_INTERVAL} seconds")
         print(f"🔄 Auto-login: Enabled")
         print("-" * 50)
         
+        if once or backfill_since:
+            summary = run_scraper(email, password, pages, auto_bypass, once=True,
+                                  stop_at_id=stop_at_id, since=since, out_path=out_path,
+                                  backfill_since=backfill_since, backfill_until=backfill_until, tabs=tabs)
+            summary = summary or {'status': 'failed', 'exit_code': EXIT_FAILED}
+            print("📋 Summary: " + json.dumps(summary, ensure_ascii=False, default=str))
+            sys.exit(summary['exit_code'])
         run_scraper(email, password, pages, auto_bypass)
     else:
         print("❌ No valid credentials provided. Exiting...")
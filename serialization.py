@@ -0,0 +1,201 @@
+"""Serialization of snapshots, backups and exports.
+
+The format follows the file name, so the same call writes any of them:
+
+    payins_snapshot.json         compact JSON (orjson when installed, else stdlib)
+    payins_backup_<ts>.json.gz   the same, gzip-compressed while it is written
+    payins_backup_<ts>.msgpack   MessagePack (needs `msgpack`; JSON otherwise)
+
+`dump_records()` streams a header dict plus the records (any iterable, a
+generator included) a batch at a time through the encoder and compressor into a temporary file that
+replaces the target only when complete, so a crash never leaves a truncated
+snapshot or export behind. `load()` reads any of them back.
+
+`prune_backups()` applies the retention policy to the timestamped backups:
+the newest BACKUP_KEEP_LAST, then the newest of each of the last
+BACKUP_KEEP_HOURLY hours and BACKUP_KEEP_DAILY days.
+"""
+
+import os
+import re
+import glob
+import gzip
+import json
+import time
+import itertools
+
+try:
+    import orjson
+    HAS_ORJSON = True
+except Exception:
+    HAS_ORJSON = False
+
+try:
+    import msgpack
+    HAS_MSGPACK = True
+except Exception:
+    HAS_MSGPACK = False
+
+# CONFIG
+GZIP_LEVEL = 6  # 1 = fastest, 9 = smallest
+WRITE_BATCH = 2000  # records encoded per write
+BACKUP_SUFFIX = os.environ.get('PAYIN_BACKUP_SUFFIX', '.json.gz')  # .json, .json.gz, .msgpack, .msgpack.gz
+BACKUP_PATTERN = 'payins_backup_*'
+BACKUP_KEEP_LAST = 5
+BACKUP_KEEP_HOURLY = 24
+BACKUP_KEEP_DAILY = 14
+
+_BACKUP_TIME_RE = re.compile(r'payins_backup_(\d{8}_\d{6})')
+_warned_msgpack = False
+
+
+def file_format(path):
+    """(format, compressed) from a file name: ('json' | 'msgpack', True if .gz)."""
+    name = path.lower()
+    compressed = name.endswith('.gz')
+    if compressed:
+        name = name[:-3]
+    return ('msgpack' if name.endswith(('.msgpack', '.mpk')) else 'json'), compressed
+
+
+_encoder = json.JSONEncoder(ensure_ascii=False, separators=(',', ':'))
+
+
+def encode_json(obj):
+    """Compact UTF-8 JSON bytes."""
+    if HAS_ORJSON:
+        return orjson.dumps(obj)
+    return _encoder.encode(obj).encode('utf-8')
+
+
+def decode_json(data):
+    if HAS_ORJSON:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _open_write(path, compressed):
+    if compressed:
+        return gzip.open(path, 'wb', compresslevel=GZIP_LEVEL)
+    return open(path, 'wb')
+
+
+def _usable_format(fmt):
+    global _warned_msgpack
+    if fmt == 'msgpack' and not HAS_MSGPACK:
+        if not _warned_msgpack:
+            print("⚠️ msgpack not installed - writing JSON instead")
+            _warned_msgpack = True
+        return 'json'
+    return fmt
+
+
+def dump_records(path, header, records_key, records, count=None):
+    """Write `header` plus `records_key: [records]` to `path`, streaming the records.
+
+    `records` is any iterable of dicts, a generator included; MessagePack needs
+    their number up front: `count`, or len(records) when it is a sequence.
+    """
+    fmt, compressed = file_format(path)
+    fmt = _usable_format(fmt)
+    if fmt == 'msgpack' and count is None:
+        count = len(records)
+    records = iter(records)
+    tmp_path = path + '.tmp'
+    with _open_write(tmp_path, compressed) as f:
+        if fmt == 'msgpack':
+            packer = msgpack.Packer(use_bin_type=True)
+            f.write(packer.pack_map_header(len(header) + 1))
+            for name, value in header.items():
+                f.write(packer.pack(name))
+                f.write(packer.pack(value))
+            f.write(packer.pack(records_key))
+            f.write(packer.pack_array_header(count))
+            written = 0
+            for batch in iter(lambda: list(itertools.islice(records, WRITE_BATCH)), []):
+                f.write(b''.join(map(packer.pack, batch)))
+                written += len(batch)
+            if written != count:
+                raise ValueError(f"{path}: {written} records written, {count} announced")
+        else:
+            f.write(encode_json(header)[:-1])
+            f.write(b',' if header else b'')
+            f.write(encode_json(records_key) + b':[')
+            # Encoded in batches: one encoder call and one write per few thousand records
+            first = True
+            for batch in iter(lambda: list(itertools.islice(records, WRITE_BATCH)), []):
+                if not first:
+                    f.write(b',')
+                f.write(encode_json(batch)[1:-1])
+                first = False
+            f.write(b']}')
+    os.replace(tmp_path, path)
+    return path
+
+
+def dump(obj, path):
+    """Write one object to `path` in the format its name asks for."""
+    fmt, compressed = file_format(path)
+    fmt = _usable_format(fmt)
+    tmp_path = path + '.tmp'
+    with _open_write(tmp_path, compressed) as f:
+        f.write(msgpack.packb(obj, use_bin_type=True) if fmt == 'msgpack' else encode_json(obj))
+    os.replace(tmp_path, path)
+    return path
+
+
+def load(path):
+    """Read back anything dump()/dump_records() wrote, and plain or pretty-printed JSON."""
+    fmt, compressed = file_format(path)
+    opener = gzip.open if compressed else open
+    with opener(path, 'rb') as f:
+        data = f.read()
+    if fmt == 'msgpack' and data[:1] not in (b'{', b'['):
+        if not HAS_MSGPACK:
+            raise ImportError(f"msgpack is needed to read {path}")
+        return msgpack.unpackb(data, raw=False)
+    return decode_json(data)
+
+
+def backup_path(directory='.', when=None, suffix=BACKUP_SUFFIX):
+    return os.path.join(directory, f"payins_backup_{time.strftime('%Y%m%d_%H%M%S', time.localtime(when))}{suffix}")
+
+
+def prune_backups(directory='.', keep_last=BACKUP_KEEP_LAST, keep_hourly=BACKUP_KEEP_HOURLY,
+                  keep_daily=BACKUP_KEEP_DAILY, now=None, dry_run=False):
+    """Delete backups the retention policy does not keep. Returns the deleted paths."""
+    backups = []
+    for path in glob.glob(os.path.join(directory, BACKUP_PATTERN)):
+        match = _BACKUP_TIME_RE.search(os.path.basename(path))
+        if not match or path.endswith('.tmp'):
+            continue
+        try:
+            when = time.mktime(time.strptime(match.group(1), '%Y%m%d_%H%M%S'))
+        except ValueError:
+            continue
+        backups.append((when, path))
+    backups.sort(reverse=True)
+    now = now or time.time()
+    keep = {path for when, path in backups[:keep_last]}
+    for slots, width, bucket_format in ((keep_hourly, 3600, '%Y%m%d%H'), (keep_daily, 86400, '%Y%m%d')):
+        seen = set()
+        for when, path in backups:
+            if now - when > slots * width:
+                break
+            bucket = time.strftime(bucket_format, time.localtime(when))
+            if bucket not in seen:
+                # Newest backup of each hour/day
+                seen.add(bucket)
+                keep.add(path)
+    deleted = []
+    for when, path in backups:
+        if path in keep:
+            continue
+        if not dry_run:
+            try:
+                os.remove(path)
+            except OSError as e:
+                print(f"⚠️ Could not remove old backup {path}: {e}")
+                continue
+        deleted.append(path)
+    return deleted
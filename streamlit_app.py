@@ -6,10 +6,11 @@ import time
 import threading
 import queue
 import contextlib
-import io
 import tempfile
 import traceback
+import html
 from datetime import datetime
+from log_buffer import LogBuffer, LogStream, LEVELS
 
 # Set page config
 st.set_page_config(
@@ -31,17 +32,19 @@ if 'forms' not in st.session_state:
     st.session_state.forms = [{'id': 1}]
 if 'form_counter' not in st.session_state:
     st.session_state.form_counter = 1
-if 'logs' not in st.session_state:
-    st.session_state.logs = []
+if 'log_buffer' not in st.session_state:
+    # Last lines in memory, everything in a rotating file; the viewer pages through it
+    st.session_state.log_buffer = LogBuffer()
+if 'log_page' not in st.session_state:
+    st.session_state.log_page = 0
 if 'scraper_running' not in st.session_state:
     st.session_state.scraper_running = False
 if 'scraper_status' not in st.session_state:
     st.session_state.scraper_status = ""
 
 # Define scraper functions (unchanged)
-def run_scraper_in_process(email, password, pages, auto_bypass):
-    """Run scraper in-process and return results"""
-    logs = []
+def run_scraper_in_process(email, password, pages, auto_bypass, logs):
+    """Run scraper in-process, streaming its output into `logs` (a LogBuffer); returns success"""
     success = False
     try:
         logs.append("🚀 Starting Google Pay Scraper...")
@@ -53,8 +56,9 @@ def run_scraper_in_process(email, password, pages, auto_bypass):
         try:
             import scraping
             if hasattr(scraping, 'run_scraper'):
-                output_buffer = io.StringIO()
-                with contextlib.redirect_stdout(output_buffer), contextlib.redirect_stderr(output_buffer):
+                # Lines reach the buffer (and its spill file) as they are printed
+                output_stream = LogStream(logs)
+                with contextlib.redirect_stdout(output_stream), contextlib.redirect_stderr(output_stream):
                     try:
                         scraping.run_scraper(email, password, pages, auto_bypass)
                         logs.append("✅ Scraper completed successfully!")
@@ -68,11 +72,7 @@ def run_scraper_in_process(email, password, pages, auto_bypass):
                             logs.append(f"❌ Exit code: {code}")
                     except Exception as e:
                         logs.append(f"❌ Error: {str(e)}")
-                output = output_buffer.getvalue()
-                if output:
-                    for line in output.strip().split('\n'):
-                        if line.strip():
-                            logs.append(line)
+                output_stream.close()
             else:
                 logs.append("⚠️ Scraper function not available.")
         except ImportError:
@@ -81,16 +81,15 @@ def run_scraper_in_process(email, password, pages, auto_bypass):
             logs.append(f"❌ Import error: {str(e)}")
     except Exception as e:
         logs.append(f"💥 Unexpected error: {str(e)}")
-    return success, logs
+    return success
 
-def run_scraper_subprocess(email, password, pages, auto_bypass):
-    """Run scraper as subprocess"""
-    logs = []
+def run_scraper_subprocess(email, password, pages, auto_bypass, logs):
+    """Run scraper as subprocess, streaming its output into `logs`; returns success"""
     success = False
     try:
         if not os.path.exists("scraping.py"):
             logs.append("⚠️ Scraper file not found.")
-            return False, logs
+            return False
         cmd = [
             sys.executable, "scraping.py",
             "--email", email,
@@ -122,7 +121,44 @@ def run_scraper_subprocess(email, password, pages, auto_bypass):
             logs.append(f"❌ Scraper failed with exit code: {exit_code}")
     except Exception as e:
         logs.append(f"💥 Subprocess error: {str(e)}")
-    return success, logs
+    return success
+
+LOG_PAGE_SIZES = [100, 200, 500]
+
+def reset_log_page():
+    st.session_state.log_page = 0
+
+def render_log_viewer(logs):
+    """Filterable, paginated view of the log buffer: only the visible window goes to the browser"""
+    col_query, col_level, col_size = st.columns([3, 1, 1])
+    with col_query:
+        query = st.text_input("🔎 Filter", placeholder="Text to look for", key="log_query", on_change=reset_log_page)
+    with col_level:
+        level = st.selectbox("Level", LEVELS, key="log_level", on_change=reset_log_page)
+    with col_size:
+        page_size = st.selectbox("Lines per page", LOG_PAGE_SIZES, index=1, key="log_page_size", on_change=reset_log_page)
+    
+    window, matching, page_count = logs.page(st.session_state.log_page, page_size, query, level)
+    st.session_state.log_page = min(st.session_state.log_page, page_count - 1)
+    
+    col_newer, col_info, col_older = st.columns([1, 4, 1])
+    with col_newer:
+        if st.button("⬅️ Newer", disabled=st.session_state.log_page == 0, key="log_newer"):
+            st.session_state.log_page -= 1
+            st.rerun()
+    with col_older:
+        if st.button("Older ➡️", disabled=st.session_state.log_page >= page_count - 1, key="log_older"):
+            st.session_state.log_page += 1
+            st.rerun()
+    with col_info:
+        st.caption(f"Page {st.session_state.log_page + 1} of {page_count} • {matching:,} matching lines • "
+                   f"{len(logs):,} of {logs.total:,} lines in memory, full log in {logs.spill_path}")
+    
+    if window:
+        log_html = "<br>".join(html.escape(entry[3]) for entry in window)
+        st.markdown(f'<div class="log-container">{log_html}</div>', unsafe_allow_html=True)
+    else:
+        st.info("No log lines match.")
 
 # Header
 st.markdown("""
@@ -132,6 +168,8 @@ st.markdown("""
 </div>
 """, unsafe_allow_html=True)
 
+st.info("📊 Collected transactions and running totals are on the **Dashboard** page (sidebar).")
+
 # Add form management
 col1, col2 = st.columns([3, 1])
 with col2:
@@ -193,15 +231,17 @@ for form in st.session_state.forms[:]:  # Create a copy to avoid modification is
                     st.error("⚠️ Please enter both email and password!")
                 else:
                     st.session_state.scraper_running = True
-                    st.session_state.logs = []
+                    logs = st.session_state.log_buffer
+                    logs.clear()
+                    st.session_state.log_page = 0
                     st.session_state.scraper_status = "running"
                     
                     with st.spinner("🔄 Scraper is running..."):
-                        success, logs = run_scraper_in_process(email, password, pages, auto_bypass)
-                        if not success and not logs:
-                            success, logs = run_scraper_subprocess(email, password, pages, auto_bypass)
+                        started_at = logs.total
+                        success = run_scraper_in_process(email, password, pages, auto_bypass, logs)
+                        if not success and logs.total == started_at:
+                            success = run_scraper_subprocess(email, password, pages, auto_bypass, logs)
                     
-                    st.session_state.logs = logs
                     st.session_state.scraper_running = False
                     st.session_state.scraper_status = "success" if success else "error"
                     st.rerun()
@@ -214,7 +254,7 @@ for form in st.session_state.forms[:]:  # Create a copy to avoid modification is
     st.markdown("---")
 
 # Display logs and status
-if st.session_state.logs or st.session_state.scraper_running:
+if len(st.session_state.log_buffer) or st.session_state.scraper_running:
     st.markdown("## 📊 Scraper Status")
     
     # Status indicator
@@ -226,14 +266,14 @@ if st.session_state.logs or st.session_state.scraper_running:
         st.markdown('<div class="status-error">❌ Process failed</div>', unsafe_allow_html=True)
     
     # Logs display
-    if st.session_state.logs:
+    if len(st.session_state.log_buffer):
         st.markdown("### 📝 Live Logs")
-        log_text = "\n".join(st.session_state.logs)
-        st.markdown(f'<div class="log-container">{log_text.replace(chr(10), "<br>")}</div>', unsafe_allow_html=True)
+        render_log_viewer(st.session_state.log_buffer)
         
-        # Clear logs button
+        # Clear logs button (the spill file keeps them)
         if st.button("🗑️ Clear Logs"):
-            st.session_state.logs = []
+            st.session_state.log_buffer.clear()
+            st.session_state.log_page = 0
             st.session_state.scraper_status = ""
             st.rerun()
 
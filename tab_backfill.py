@@ -0,0 +1,296 @@
+"""Backfill a long history by date range in several tabs of one signed-in browser.
+
+Harvesting a year of activity page by page in one tab spends nearly all its
+time waiting for page loads. `backfill()` splits [since, until] into
+BACKFILL_RANGE_DAYS ranges and works through them in `tabs` tabs of the
+same session (at most MAX_BACKFILL_TABS, to stay a polite client). The tabs
+take turns on the one driver - WebDriver commands are not thread-safe and
+act on the current tab - but a tab does not wait for its own page: it
+starts a range (`location.assign`, which returns at once) or asks for older
+rows ('Load more') and the loop moves on to the next tab while it loads.
+The waiting overlaps, the driver calls do not. The driver holds any command
+on a tab until that tab's navigation is done, so a loading tab is only
+looked at once it has had the shortest recent page load: before that a
+visit would stall every other tab for the rest of the load.
+
+- Each range is opened at BACKFILL_RANGE_URL ({start}/{end} as YYYY-MM-DD,
+  the activity list filtered to those days) and read down with 'Load more'
+  until the control disappears, a row older than the range shows up, or
+  the list stops changing.
+- Rows outside the range are skipped; the rest go to the pipeline, whose
+  identity-key upsert drops what is already known, so overlapping ranges
+  and repeated backfills add nothing twice.
+- Page and 'Load more' requests from all tabs together are spaced at least
+  BACKFILL_REQUEST_GAP seconds apart. A range whose page fails or times out
+  is retried once, then reported in `failed_ranges`. A sign-in page stops
+  the backfill.
+
+The summary reports pages and rows per second and the single-tab estimate:
+the sum of the page waits and captures, i.e. what the same pages would have
+taken one after another in a single tab, and the speedup against it.
+
+    python scraping.py --email me@example.com --password ... --backfill-since 2024-10-01 --tabs 3
+"""
+
+import os
+import time
+import datetime
+from collections import deque
+
+from selenium.webdriver.common.by import By
+
+from page_state import PageState, classify_page, mark_page_changed
+from payin_pipeline import capture_rows, row_id, row_timestamp
+from percentiles import percentile
+from scraper_log import get_logger
+from transactions_nav import TRANSACTION_URLS, LOAD_MORE_XPATH
+
+# CONFIG
+BACKFILL_TABS = int(os.environ.get('BACKFILL_TABS', '3') or 1)
+MAX_BACKFILL_TABS = 4  # cap whatever is asked: more parallel loads than this is not fair use of the site
+BACKFILL_RANGE_DAYS = 14
+BACKFILL_RANGE_URL = os.environ.get('BACKFILL_RANGE_URL', TRANSACTION_URLS[0] + '?start={start}&end={end}')
+BACKFILL_REQUEST_GAP = 0.5  # seconds between two requests to the site, all tabs together
+BACKFILL_PAGE_TIMEOUT = 30.0  # seconds for a range page or a 'Load more' before giving up on it
+BACKFILL_SETTLE = 2.0  # seconds a range page must stay empty before the range counts as empty
+BACKFILL_POLL = 0.2  # seconds to sleep when no tab is ready
+BACKFILL_RETRIES = 1  # per range
+BACKFILL_MAX_PAGES = 500  # 'Load more' rounds per range
+
+OPEN_URL_SCRIPT = "window.location.assign(arguments[0]);"
+
+log = get_logger('backfill')
+
+
+class BackfillAborted(Exception):
+    """The session was lost (sign-in page) during a backfill."""
+
+
+def split_ranges(since, until, days=BACKFILL_RANGE_DAYS):
+    """[(first day, last day)] covering `since`..`until` (dates, inclusive), newest first."""
+    ranges = []
+    end = until
+    while end >= since:
+        start = max(since, end - datetime.timedelta(days=days - 1))
+        ranges.append((start, end))
+        end = start - datetime.timedelta(days=1)
+    return ranges
+
+
+def range_url(start, end, template=BACKFILL_RANGE_URL):
+    return template.format(start=start.isoformat(), end=end.isoformat())
+
+
+def _day_start(day):
+    return time.mktime(day.timetuple())
+
+
+class _Tab:
+    """One tab's progress through its current range."""
+
+    def __init__(self, handle):
+        self.handle = handle
+        self.phase = 'idle'  # idle -> loading -> [more -> paging ->]* idle
+        self.range = None
+        self.attempts = 0
+        self.url = None
+        self.left_url = None  # page shown before the range was requested
+        self.requested = None  # monotonic time of the request in flight
+        self.empty_since = None
+        self.before = None  # (row count, fingerprint) when 'Load more' was clicked
+        self.seen = set()
+        self.pages = 0
+        self.rows = 0
+
+    def start(self, day_range, attempts, left_url):
+        self.range, self.attempts = day_range, attempts
+        self.url = range_url(*day_range)
+        self.left_url = left_url
+        self.phase = 'loading'
+        self.requested = time.monotonic()
+        self.empty_since = None
+        self.seen = set()
+        self.pages = self.rows = 0
+
+
+def backfill(driver, pipeline, since, until=None, tabs=BACKFILL_TABS, range_days=BACKFILL_RANGE_DAYS,
+             refresh_count=0, stop_event=None):
+    """Harvest every transaction from `since` to `until` (dates, inclusive) in up to `tabs` tabs of `driver`.
+
+    Captures go through `pipeline`. Returns a summary dict (pages, rows, failed ranges, throughput).
+    """
+    until = until or datetime.date.today()
+    tabs = max(1, min(int(tabs), MAX_BACKFILL_TABS))
+    ranges = deque((day_range, 0) for day_range in split_ranges(since, until, range_days))
+    summary = {'since': since.isoformat(), 'until': until.isoformat(), 'tabs': tabs, 'ranges': len(ranges),
+               'ranges_done': 0, 'failed_ranges': [], 'pages': 0, 'rows': 0, 'outside_range': 0,
+               'stop_reason': 'done'}
+    waits = []  # seconds from each request to its rows being on the page
+    loads = deque(maxlen=10)  # recent range page loads, to know when a loading tab is worth a visit
+    capture_seconds = 0.0
+    last_request = [float('-inf')]
+    print(f"📚 Backfilling {since} .. {until}: {len(ranges)} range(s) of {range_days} day(s) in {tabs} tab(s)")
+
+    def request(tab, script, *args):
+        # Wait out the gap here rather than moving on: polling a loading tab would block on its page
+        gap = last_request[0] + BACKFILL_REQUEST_GAP - time.monotonic()
+        if gap > 0:
+            time.sleep(gap)
+        driver.execute_script(script, *args)
+        mark_page_changed(driver)
+        tab.requested = last_request[0] = time.monotonic()
+
+    def finish(tab, failed=None):
+        day_range = tab.range
+        tab.phase = 'idle'
+        if failed is None:
+            summary['ranges_done'] += 1
+            log.info(f"📚 {day_range[0]} .. {day_range[1]}: {tab.rows} row(s) in {tab.pages} page(s) "
+                     f"[{summary['ranges_done']}/{summary['ranges']}]", extra={'category': 'backfill'})
+        elif tab.attempts < BACKFILL_RETRIES:
+            log.warning(f"⚠️ Range {day_range[0]} .. {day_range[1]} {failed} - retrying", extra={'category': 'backfill'})
+            ranges.append((day_range, tab.attempts + 1))
+        else:
+            log.warning(f"❌ Range {day_range[0]} .. {day_range[1]} {failed} - giving up", extra={'category': 'backfill'})
+            summary['failed_ranges'].append([day_range[0].isoformat(), day_range[1].isoformat(), failed])
+
+    def capture(tab):
+        nonlocal capture_seconds
+        waits.append(time.monotonic() - tab.requested)
+        if tab.phase == 'loading':
+            loads.append(waits[-1])
+        started = time.monotonic()
+        raw = capture_rows(driver, refresh_count)
+        capture_seconds += time.monotonic() - started
+        first, last = _day_start(tab.range[0]), _day_start(tab.range[1] + datetime.timedelta(days=1))
+        fresh, reached_start = [], False
+        for payload in raw.rows:
+            marker = row_id(payload) or payload.get('html') or payload.get('text')
+            if marker in tab.seen:
+                continue
+            tab.seen.add(marker)
+            ts = row_timestamp(payload)
+            if ts is not None and not first <= ts < last:
+                summary['outside_range'] += 1
+                reached_start = reached_start or ts < first
+                continue
+            fresh.append(payload)
+        tab.pages += 1
+        tab.rows += len(fresh)
+        summary['pages'] += 1
+        summary['rows'] += len(fresh)
+        if fresh:
+            pipeline.submit(raw._replace(rows=fresh), capture_seconds=time.time() - raw.captured_at)
+        if reached_start or tab.pages >= BACKFILL_MAX_PAGES:
+            finish(tab)
+        else:
+            tab.phase = 'more'
+
+    def advance(tab):
+        """Move `tab` on if its page is ready. Returns True if anything happened."""
+        if tab.phase == 'idle':
+            if not ranges:
+                return False
+            day_range, attempts = ranges.popleft()
+            tab.start(day_range, attempts, classify_page(driver, max_age=0).url)
+            request(tab, OPEN_URL_SCRIPT, tab.url)
+            return True
+        if tab.phase == 'more':
+            try:
+                buttons = [b for b in driver.find_elements(By.XPATH, LOAD_MORE_XPATH) if b.is_displayed()]
+            except Exception:
+                buttons = []
+            if not buttons:
+                finish(tab)
+                return True
+            snapshot = classify_page(driver, max_age=0)
+            tab.before = (snapshot.row_count, snapshot.fingerprint)
+            request(tab, "arguments[0].click();", buttons[-1])
+            tab.phase = 'paging'
+            return True
+
+        snapshot = classify_page(driver, max_age=0)
+        now = time.monotonic()
+        if snapshot.state is PageState.LOGIN:
+            raise BackfillAborted(f"signed out while loading {tab.url}")
+        if tab.phase == 'loading':
+            committed = snapshot.url != tab.left_url
+            if committed and snapshot.state is PageState.ERROR:
+                finish(tab, 'failed to load')
+                return True
+            if committed and snapshot.state is PageState.TRANSACTIONS:
+                if snapshot.row_count:
+                    capture(tab)
+                    return True
+                tab.empty_since = tab.empty_since or now
+                if now - tab.empty_since >= BACKFILL_SETTLE:
+                    waits.append(now - tab.requested)
+                    summary['pages'] += 1
+                    finish(tab)
+                    return True
+        elif (snapshot.row_count, snapshot.fingerprint) != tab.before:
+            capture(tab)
+            return True
+        if now - tab.requested >= BACKFILL_PAGE_TIMEOUT:
+            if tab.phase == 'paging':
+                finish(tab)  # 'Load more' did nothing: the range has no older rows
+            else:
+                finish(tab, 'timed out')
+            return True
+        return False
+
+    started = time.monotonic()
+    handles = [driver.current_window_handle]
+    workers = []
+    try:
+        for _ in range(tabs - 1):
+            driver.switch_to.new_window('tab')
+            handles.append(driver.current_window_handle)
+        workers = [_Tab(handle) for handle in handles]
+        while ranges or any(tab.phase != 'idle' for tab in workers):
+            if stop_event is not None and stop_event.is_set():
+                summary['stop_reason'] = 'stopped'
+                break
+            progressed = False
+            for tab in workers:
+                if tab.phase == 'idle' and not ranges:
+                    continue
+                if tab.phase == 'loading' and len(workers) > 1 and loads and time.monotonic() - tab.requested < min(loads):
+                    continue
+                driver.switch_to.window(tab.handle)
+                mark_page_changed(driver)  # page_state caches per driver, not per tab
+                progressed = advance(tab) or progressed
+            if not progressed:
+                time.sleep(BACKFILL_POLL)
+    except BackfillAborted as e:
+        summary['stop_reason'] = str(e)
+        print(f"⚠️ Backfill stopped: {e}")
+    finally:
+        for handle in handles[1:]:
+            try:
+                driver.switch_to.window(handle)
+                driver.close()
+            except Exception:
+                pass
+        try:
+            driver.switch_to.window(handles[0])
+        except Exception:
+            pass
+
+    duration = time.monotonic() - started
+    single_tab = sum(waits) + capture_seconds
+    waits.sort()
+    summary['unfinished_ranges'] = len(ranges) + sum(1 for tab in workers if tab.phase != 'idle')
+    summary.update({
+        'duration_s': round(duration, 2),
+        'pages_per_s': round(summary['pages'] / duration, 3) if duration else None,
+        'rows_per_s': round(summary['rows'] / duration, 2) if duration else None,
+        'page_wait_p50_s': round(percentile(waits, 50), 2) if waits else None,
+        'page_wait_p95_s': round(percentile(waits, 95), 2) if waits else None,
+        'single_tab_estimate_s': round(single_tab, 2),
+        'speedup': round(single_tab / duration, 2) if duration else None,
+    })
+    print(f"📚 Backfill {summary['stop_reason']}: {summary['rows']} row(s) from {summary['pages']} page(s) in "
+          f"{duration:.1f}s with {tabs} tab(s) ({summary['rows_per_s']} rows/s, "
+          f"~{summary['speedup']}x a single tab's {single_tab:.1f}s)")
+    return summary
@@ -0,0 +1,121 @@
+"""Windowed access to the transaction store for table views.
+
+A view over a million transactions only ever shows a screenful, so
+`TransactionPager` keeps the total row count plus a bounded LRU of pages,
+each fetched from the store's (column, seq) indexes. A page next to one that
+was already read is fetched by keyset (seek to the neighbouring row's key),
+so scrolling costs one index seek per page wherever it is; only a jump to an
+unvisited region falls back to OFFSET.
+
+`poll()` notices transactions the scraper added or updated since the last
+call and returns the view positions where new rows belong, so the view can
+insert them in place instead of reloading. Rows moved out to monthly
+partitions (payin_partitions) reload the view.
+"""
+
+from collections import OrderedDict
+
+from payin_store import SORT_COLUMNS
+
+# CONFIG
+PAGE_ROWS = 256
+MAX_PAGES = 16  # pages kept in memory (about 4k rows, whatever the store size)
+MAX_LIVE_INSERTS = 200  # more new rows than this at once reload the view instead
+
+
+class TransactionPager:
+    """Sorted, filtered, paged view of a PayinStore."""
+
+    def __init__(self, store, page_rows=PAGE_ROWS, max_pages=MAX_PAGES):
+        self.store = store
+        self.page_rows = page_rows
+        self.max_pages = max_pages
+        self.sort = 'seq'
+        self.descending = True
+        self.filters = {}
+        self.count = 0
+        self.fetches = 0
+        self._pages = OrderedDict()  # page number -> [data dict, ...]
+        self._bounds = {}  # page number -> (first row key, last row key), kept for keyset seeks
+        self._last_seq, self._last_update = store.last_change()
+        self._removed = store.removals()[0]
+        self.reset()
+
+    def reset(self, sort=None, descending=None, filters=None):
+        """Change sort/filters (None keeps the current one) and recount."""
+        if sort is not None:
+            if sort not in SORT_COLUMNS:
+                raise ValueError(f"cannot sort by {sort!r}")
+            self.sort = sort
+        if descending is not None:
+            self.descending = descending
+        if filters is not None:
+            self.filters = {name: value for name, value in filters.items() if value not in (None, '')}
+        self._clear()
+        self.count = self.store.count_matching(**self.filters)
+
+    def _clear(self):
+        self._pages.clear()
+        self._bounds.clear()
+
+    def row(self, i):
+        """Data dict of view row `i` (None outside the view)."""
+        if not 0 <= i < self.count:
+            return None
+        number, slot = divmod(i, self.page_rows)
+        page = self._pages.get(number)
+        if page is None:
+            page = self._load(number)
+        else:
+            self._pages.move_to_end(number)
+        return page[slot] if slot < len(page) else None
+
+    def _load(self, number):
+        query = dict(sort=self.sort, descending=self.descending, limit=self.page_rows, **self.filters)
+        if number - 1 in self._bounds:
+            rows = self.store.page(after=self._bounds[number - 1][1], **query)
+        elif number + 1 in self._bounds:
+            rows = self.store.page(before=self._bounds[number + 1][0], **query)
+        else:
+            rows = self.store.page(offset=number * self.page_rows, **query)
+        self.fetches += 1
+        page = [data for seq, value, data in rows]
+        if rows:
+            if len(self._bounds) > 100000:
+                self._bounds.clear()
+            self._bounds[number] = ((rows[0][1], rows[0][0]), (rows[-1][1], rows[-1][0]))
+        self._pages[number] = page
+        while len(self._pages) > self.max_pages:
+            self._pages.popitem(last=False)
+        return page
+
+    def poll(self):
+        """Catch up with the store. Returns ('insert', positions), ('update', None), ('reset', None) or None.
+
+        Inserted rows are not in `count` yet: the caller adds them one at a time as it announces each position.
+        """
+        last_seq, last_update = self.store.last_change()
+        removed = self.store.removals()[0]
+        if removed != self._removed:
+            self._removed, self._last_seq, self._last_update = removed, last_seq, last_update
+            self.reset()
+            return 'reset', None
+        if last_seq > self._last_seq:
+            new = self.store.page(sort='seq', descending=False, min_seq=self._last_seq,
+                                  limit=MAX_LIVE_INSERTS + 1, **self.filters)
+            self._last_seq, self._last_update = last_seq, last_update
+            if len(new) > MAX_LIVE_INSERTS:
+                self.reset()
+                return 'reset', None
+            # Positions in the final order; inserting them in ascending order keeps each one valid
+            positions = sorted(self.store.position(seq, self.sort, self.descending, **self.filters)
+                               for seq, value, data in new)
+            self._clear()
+            return ('insert', positions) if positions else None
+        if last_update != self._last_update:
+            self._last_update = last_update
+            count = self.count
+            self.reset()
+            # An update can move a row in or out of the filter; anything else is a repaint
+            return ('update', None) if self.count == count else ('reset', None)
+        return None
@@ -0,0 +1,215 @@
+"""Getting the browser to the transactions page, fast.
+
+`navigate(driver, account)` tries the URL that last worked for `account`
+first (remembered in nav_state.json), then the known Google Pay activity
+URLs, then activity/transaction links on the current page. After each
+attempt it polls the page-state check (`page_state.classify_page`) until
+the transactions page shows up instead of sleeping a fixed time, and gives
+up on an attempt once it has settled on a sign-in, error or other page.
+
+Every navigation's time-to-transactions-page goes into `navigation_stats()`
+(count, failures, last/p50/p95/max seconds, how the page was reached).
+"""
+
+import os
+import json
+import time
+import threading
+
+from selenium.webdriver.common.by import By
+
+from page_state import PageState, classify_page, mark_page_changed
+from percentiles import percentile
+
+# CONFIG
+NAV_STATE_PATH = os.environ.get('NAV_STATE_PATH', 'nav_state.json')  # '' = do not remember URLs
+NAV_TIMEOUT = 10.0  # seconds to wait for the transactions page after one URL or click
+NAV_POLL = 0.25  # seconds between page-state checks while waiting
+NAV_SETTLE = 1.0  # seconds a sign-in, error or other page must stay unchanged before an attempt is given up
+NAV_SAMPLES = 200  # recent navigation times kept for the percentiles
+
+TRANSACTION_URLS = [
+    "https://pay.google.com/gp/w/u/0/home/activity",
+    "https://pay.google.com/g4b/u/0/transactions",
+    "https://pay.google.com/gp/w/u/0/home/transactions",
+    "https://pay.google.com/payments/u/0/home/activity",
+    "https://payments.google.com/payments/u/0/home/activity",
+]
+ACTIVITY_LINK_XPATH = (
+    "//a[contains(@href, 'activity')] | //a[contains(@href, 'transactions')] | //a[contains(@href, 'history')] | "
+    "//a[contains(text(), 'Activity')] | //a[contains(text(), 'Transactions')] | //a[contains(text(), 'History')] | "
+    "//button[contains(text(), 'Activity')] | //button[contains(text(), 'Transactions')]"
+)
+# "Load more"/"Older" control at the bottom of the transaction list
+LOAD_MORE_XPATH = ("//button[contains(text(), 'Load more') or contains(text(), 'Show more') or contains(text(), 'More') "
+                   "or .//span[contains(text(), 'Load more') or contains(text(), 'Show more')]] | "
+                   "//a[contains(text(), 'Load more') or contains(text(), 'Show more') or contains(text(), 'Older')]")
+DEFAULT_ACCOUNT = 'default'
+
+_lock = threading.Lock()
+_state = None  # account -> {'url': ..., 'reached_at': ...}, loaded on first use
+_stats = {'navigations': 0, 'failures': 0, 'remembered': 0, 'url': 0, 'link': 0, 'last_s': None}
+_samples = []
+
+
+def _account_key(account):
+    return (account or DEFAULT_ACCOUNT).strip().lower()
+
+
+def _load_state():
+    global _state
+    if _state is None:
+        _state = {}
+        if NAV_STATE_PATH and os.path.exists(NAV_STATE_PATH):
+            try:
+                with open(NAV_STATE_PATH, 'r', encoding='utf-8') as f:
+                    _state = json.load(f) or {}
+            except Exception as e:
+                print(f"⚠️ Could not read {NAV_STATE_PATH}: {e}")
+    return _state
+
+
+def remembered_url(account=None):
+    """The transactions URL that last worked for `account`, or None."""
+    with _lock:
+        entry = _load_state().get(_account_key(account)) or {}
+    return entry.get('url')
+
+
+def remember_url(account, url):
+    """Persist `url` as the one to try first for `account` (written only when it changes)."""
+    with _lock:
+        state = _load_state()
+        key = _account_key(account)
+        if (state.get(key) or {}).get('url') == url:
+            return
+        state[key] = {'url': url, 'reached_at': time.strftime('%Y-%m-%d %H:%M:%S')}
+        if not NAV_STATE_PATH:
+            return
+        try:
+            tmp_path = NAV_STATE_PATH + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(state, f, indent=2)
+            os.replace(tmp_path, NAV_STATE_PATH)
+        except Exception as e:
+            print(f"⚠️ Could not save {NAV_STATE_PATH}: {e}")
+
+
+def wait_for_page(driver, timeout=NAV_TIMEOUT, poll=NAV_POLL,
+                  give_up=(PageState.LOGIN, PageState.ERROR, PageState.UNKNOWN), settle=NAV_SETTLE):
+    """Poll the page state until the transactions page shows up; returns the last PageSnapshot.
+
+    A state in `give_up` ends the wait early once it has held, with no DOM mutation, for `settle`
+    seconds (redirects and single-page apps pass through such states on their way); otherwise the
+    wait ends after `timeout` seconds.
+    """
+    deadline = time.monotonic() + timeout
+    held, held_since = None, None
+    while True:
+        snapshot = classify_page(driver, max_age=0)
+        if snapshot.state is PageState.TRANSACTIONS:
+            return snapshot
+        now = time.monotonic()
+        if snapshot.state in give_up:
+            if (snapshot.state, snapshot.epoch) != held:
+                held, held_since = (snapshot.state, snapshot.epoch), now
+            if now - held_since >= settle:
+                return snapshot
+        else:
+            held = None
+        if now >= deadline:
+            return snapshot
+        time.sleep(poll)
+
+
+def _record(started, method):
+    seconds = time.monotonic() - started
+    with _lock:
+        _stats['navigations'] += 1
+        _stats['last_s'] = round(seconds, 3)
+        if method:
+            _stats[method] += 1
+            _samples.append(seconds)
+            del _samples[:-NAV_SAMPLES]
+        else:
+            _stats['failures'] += 1
+
+
+def _try_url(driver, url):
+    """Load `url` and wait for the page. Returns the PageSnapshot reached, or None if loading failed."""
+    print(f"🔗 Trying URL: {url}")
+    try:
+        driver.get(url)
+    except Exception as e:
+        print(f"❌ Failed to load {url}: {e}")
+        return None
+    mark_page_changed(driver)
+    return wait_for_page(driver)
+
+
+def _try_links(driver):
+    """Click the first visible activity/transaction link. Returns the PageSnapshot reached, or None."""
+    print("🔍 Looking for transaction/activity links on current page...")
+    try:
+        links = driver.find_elements(By.XPATH, ACTIVITY_LINK_XPATH)
+    except Exception as e:
+        print(f"❌ Error finding activity links: {e}")
+        return None
+    for link in links:
+        try:
+            if not link.is_displayed():
+                continue
+            driver.execute_script("arguments[0].click();", link)
+        except Exception:
+            continue
+        mark_page_changed(driver)
+        print("✅ Clicked activity/transaction link")
+        return wait_for_page(driver)
+    return None
+
+
+def navigate(driver, account=None):
+    """Bring `driver` to the transactions page, remembered URL first. Returns True when it got there."""
+    print("🎯 Navigating to transactions page...")
+    started = time.monotonic()
+    remembered = remembered_url(account)
+    urls = [remembered] if remembered else []
+    urls += [url for url in TRANSACTION_URLS if url != remembered]
+    for url in urls:
+        snapshot = _try_url(driver, url)
+        if snapshot is None:
+            continue
+        if snapshot.state is PageState.TRANSACTIONS:
+            method = 'remembered' if url == remembered else 'url'
+            _record(started, method)
+            print(f"✅ Successfully reached transactions page in {time.monotonic() - started:.1f}s: {url}")
+            remember_url(account, url)
+            return True
+        if snapshot.state is PageState.LOGIN:
+            # Signed out: no other URL will do better until the session is restored
+            print("⚠️ Redirected to sign-in while navigating to transactions")
+            _record(started, None)
+            return False
+
+    snapshot = _try_links(driver)
+    if snapshot is not None and snapshot.state is PageState.TRANSACTIONS:
+        _record(started, 'link')
+        print(f"✅ Successfully reached transactions page via link in {time.monotonic() - started:.1f}s")
+        if snapshot.url:
+            remember_url(account, snapshot.url)
+        return True
+
+    _record(started, None)
+    print("⚠️ Could not navigate to transactions page")
+    return False
+
+
+def navigation_stats():
+    """Time-to-transactions-page metrics of this process's navigations."""
+    with _lock:
+        samples = sorted(_samples)
+        stats = dict(_stats)
+    if samples:
+        stats.update(p50_s=round(percentile(samples, 50), 3), p95_s=round(percentile(samples, 95), 3),
+                     max_s=round(samples[-1], 3))
+    return stats
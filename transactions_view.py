@@ -0,0 +1,182 @@
+"""Transactions window for the desktop app.
+
+`TransactionsModel` is a QAbstractTableModel over the checkpoint store
+through a `TransactionPager`: the view asks only for the rows it paints, and
+sorting and filtering run in SQL on the indexed store columns. New payins
+written by the scraper process are inserted live at their sorted position.
+"""
+
+from PyQt6.QtWidgets import (
+    QWidget, QVBoxLayout, QHBoxLayout, QLineEdit, QPushButton, QLabel,
+    QComboBox, QTableView, QHeaderView, QAbstractItemView
+)
+from PyQt6.QtCore import Qt, QTimer, QAbstractTableModel, QModelIndex
+
+from payin_record import parse_timestamp
+from payin_store import open_payin_store
+from transaction_pager import TransactionPager
+
+# CONFIG
+POLL_MS = 1000
+ROW_HEIGHT = 24
+
+# (payin field, header, store column it sorts by; None = not sortable)
+COLUMNS = [
+    ('date', 'Date', 'ts'),
+    ('time', 'Time', 'ts'),
+    ('description', 'Description', None),
+    ('counterparty', 'Counterparty', 'counterparty'),
+    ('status', 'Status', 'status'),
+    ('amount', 'Amount', 'amount_value'),
+    ('currency', 'Currency', None),
+    ('type', 'Type', None),
+    ('method', 'Method', None),
+    ('id', 'ID', 'seq'),
+]
+
+
+class TransactionsModel(QAbstractTableModel):
+    """Read-only, lazily fetched table of stored transactions."""
+
+    def __init__(self, store, parent=None):
+        super().__init__(parent)
+        self.pager = TransactionPager(store)
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self.pager.count
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(COLUMNS)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        field = COLUMNS[index.column()][0]
+        if role == Qt.ItemDataRole.DisplayRole:
+            row = self.pager.row(index.row())
+            value = row.get(field) if row else None
+            return '' if value is None else str(value)
+        if role == Qt.ItemDataRole.TextAlignmentRole and field == 'amount':
+            return Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter
+        return None
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role != Qt.ItemDataRole.DisplayRole:
+            return None
+        if orientation == Qt.Orientation.Horizontal:
+            return COLUMNS[section][1]
+        return str(section + 1)
+
+    def sort(self, column, order=Qt.SortOrder.DescendingOrder):
+        """Sort in the store; columns without an index fall back to arrival order."""
+        self.beginResetModel()
+        self.pager.reset(sort=COLUMNS[column][2] or 'seq', descending=order == Qt.SortOrder.DescendingOrder)
+        self.endResetModel()
+
+    def set_filters(self, **filters):
+        self.beginResetModel()
+        self.pager.reset(filters=filters)
+        self.endResetModel()
+
+    def refresh(self):
+        """Pick up what the scraper wrote since the last call (driven by a timer)."""
+        try:
+            change = self.pager.poll()
+        except Exception as e:
+            print(f"⚠️ Error reading transactions: {e}")
+            return
+        if change is None:
+            return
+        kind, positions = change
+        if kind == 'insert':
+            for position in positions:
+                # rowCount must grow by exactly the one row each begin/end pair announces
+                self.beginInsertRows(QModelIndex(), position, position)
+                self.pager.count += 1
+                self.endInsertRows()
+        elif kind == 'update' and self.pager.count:
+            self.dataChanged.emit(self.index(0, 0), self.index(self.pager.count - 1, len(COLUMNS) - 1))
+        else:
+            self.beginResetModel()
+            self.endResetModel()
+
+
+class TransactionsWindow(QWidget):
+    """Filter bar over a virtualized table of every collected transaction."""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("📒 Collected Transactions")
+        self.resize(1100, 700)
+        self.store = open_payin_store()
+
+        layout = QVBoxLayout(self)
+        filters = QHBoxLayout()
+        self.status_box = QComboBox()
+        self.counterparty_edit = QLineEdit()
+        self.counterparty_edit.setPlaceholderText("Counterparty starts with...")
+        self.since_edit = QLineEdit()
+        self.since_edit.setPlaceholderText("From date (YYYY-MM-DD)")
+        self.until_edit = QLineEdit()
+        self.until_edit.setPlaceholderText("Until date (YYYY-MM-DD)")
+        self.apply_button = QPushButton("🔍 Apply")
+        self.count_label = QLabel()
+        for widget in (self.status_box, self.counterparty_edit, self.since_edit, self.until_edit, self.apply_button):
+            filters.addWidget(widget)
+        filters.addStretch()
+        filters.addWidget(self.count_label)
+        layout.addLayout(filters)
+
+        self.table = QTableView()
+        layout.addWidget(self.table)
+        if not self.store:
+            self.count_label.setText("⚠️ Transaction store unavailable")
+            self.model = None
+            return
+
+        self.model = TransactionsModel(self.store, self)
+        self.table.setModel(self.model)
+        # Fixed row heights let the view place a million rows without measuring them
+        self.table.verticalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
+        self.table.verticalHeader().setDefaultSectionSize(ROW_HEIGHT)
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Interactive)
+        self.table.horizontalHeader().setStretchLastSection(True)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self.table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.table.setSortingEnabled(True)
+        self.table.sortByColumn(0, Qt.SortOrder.DescendingOrder)
+
+        self.status_box.addItem("All statuses", None)
+        for status in self.store.statuses():
+            if status:
+                self.status_box.addItem(status, status)
+        self.apply_button.clicked.connect(self.apply_filters)
+        self.counterparty_edit.returnPressed.connect(self.apply_filters)
+        self.since_edit.returnPressed.connect(self.apply_filters)
+        self.until_edit.returnPressed.connect(self.apply_filters)
+        self.status_box.currentIndexChanged.connect(self.apply_filters)
+        self.model.rowsInserted.connect(self.update_count)
+        self.model.modelReset.connect(self.update_count)
+        self.update_count()
+
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.model.refresh)
+        self.timer.start(POLL_MS)
+
+    def apply_filters(self):
+        since = parse_timestamp(self.since_edit.text().strip()) if self.since_edit.text().strip() else None
+        until = parse_timestamp(self.until_edit.text().strip()) if self.until_edit.text().strip() else None
+        if until is not None:
+            until += 86400  # inclusive of the whole day
+        self.model.set_filters(status=self.status_box.currentData(), counterparty=self.counterparty_edit.text().strip(),
+                               since=since, until=until)
+
+    def update_count(self, *args):
+        self.count_label.setText(f"{self.model.pager.count:,} transactions")
+
+    def closeEvent(self, event):
+        if self.model:
+            self.timer.stop()
+        if self.store:
+            self.store.close()
+        super().closeEvent(event)